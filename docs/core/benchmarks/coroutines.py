@@ -0,0 +1,75 @@
+"""
+Benchmark comparing coroutines driven by L{ensureDeferred} with
+L{inlineCallbacks} generators.
+
+Usage: coroutines.py [tasks [awaits]]
+
+The given number of tasks (by default, 10000) are started, each of which
+waits for the given number of L{Deferred}s (by default, 10) in turn.  The
+L{Deferred}s are only fired once every task is waiting, so each one suspends
+and resumes the task.  This is done with an L{inlineCallbacks} generator and,
+on Python 3.5 and later, with an C{async} function passed to
+L{ensureDeferred}.
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from twisted.internet.defer import Deferred, inlineCallbacks, ensureDeferred
+
+
+
+@inlineCallbacks
+def generator(deferreds):
+    for d in deferreds:
+        yield d
+
+
+
+if sys.version_info >= (3, 5):
+    _namespace = {}
+    exec("""
+async def coroutine(deferreds):
+    for d in deferreds:
+        await d
+""", _namespace)
+    coroutine = _namespace["coroutine"]
+else:
+    coroutine = None
+
+
+
+def benchmark(name, start, tasks, awaits):
+    deferreds = [[Deferred() for j in range(awaits)] for i in range(tasks)]
+    before = time.time()
+    results = [start(waiting) for waiting in deferreds]
+    for j in range(awaits):
+        for waiting in deferreds:
+            waiting[j].callback(None)
+    after = time.time()
+
+    for result in results:
+        assert result.called
+    print(name, 'tasks:', tasks, 'awaits:', awaits,
+          'Time:', after - before,
+          'awaits/sec:', tasks * awaits / (after - before))
+
+
+
+def main(args):
+    tasks = int(args[0]) if args else 10000
+    awaits = int(args[1]) if len(args) > 1 else 10
+    benchmark('inlineCallbacks', generator, tasks, awaits)
+    if coroutine is None:
+        print('ensureDeferred: coroutines need Python 3.5 or later')
+    else:
+        benchmark('ensureDeferred',
+                  lambda deferreds: ensureDeferred(coroutine(deferreds)),
+                  tasks, awaits)
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,132 @@
+"""
+Benchmarks for running L{Deferred} callback chains.
+
+Usage: deferredchains.py [iterations]
+
+Each benchmark is run the given number of times (by default, 100000) and
+reports the time taken, and the rate, for:
+
+  - L{succeed}, immediately followed by a single callback;
+  - a chain of 100 trivial callbacks added before a result is given;
+  - a chain of 100 trivial callbacks added after a result is given;
+  - an errback handling a failure raised by a callback;
+  - an L{inlineCallbacks} function which yields 10 already-fired
+    L{Deferred}s;
+  - a coroutine which awaits 10 already-fired L{Deferred}s, using
+    L{ensureDeferred} (on Pythons before 3.5, a generator is used instead).
+
+No reactor is involved, so the time is all spent in L{twisted.internet.defer}.
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from twisted.internet.defer import (
+    Deferred, succeed, inlineCallbacks, ensureDeferred)
+
+
+CHAIN = 100
+YIELDS = 10
+
+
+
+def identity(result):
+    return result
+
+
+
+def raiser(result):
+    raise ValueError(result)
+
+
+
+def handler(failure):
+    return None
+
+
+
+def succeedCallback():
+    succeed(1).addCallback(identity)
+
+
+
+def chainBeforeResult():
+    d = Deferred()
+    for i in range(CHAIN):
+        d.addCallback(identity)
+    d.callback(1)
+
+
+
+def chainAfterResult():
+    d = succeed(1)
+    for i in range(CHAIN):
+        d.addCallback(identity)
+
+
+
+def handledFailure():
+    succeed(1).addCallback(raiser).addErrback(handler)
+
+
+
+@inlineCallbacks
+def inlineCallbacksFunction():
+    for i in range(YIELDS):
+        yield succeed(i)
+
+
+
+def inlineCallbacksYields():
+    inlineCallbacksFunction()
+
+
+
+if sys.version_info >= (3, 5):
+    _namespace = {"succeed": succeed, "YIELDS": YIELDS}
+    exec("""
+async def coroutine():
+    for i in range(YIELDS):
+        await succeed(i)
+""", _namespace)
+    coroutine = _namespace["coroutine"]
+else:
+    def coroutine():
+        for i in range(YIELDS):
+            yield succeed(i)
+
+
+
+def ensureDeferredAwaits():
+    ensureDeferred(coroutine())
+
+
+
+BENCHMARKS = [
+    succeedCallback,
+    chainBeforeResult,
+    chainAfterResult,
+    handledFailure,
+    inlineCallbacksYields,
+    ensureDeferredAwaits,
+]
+
+
+
+def main(args):
+    iterations = int(args[0]) if args else 100000
+    for benchmark in BENCHMARKS:
+        before = time.time()
+        for i in range(iterations):
+            benchmark()
+        after = time.time()
+        print(benchmark.__name__, 'iterations:', iterations,
+              'Time:', after - before,
+              'iterations/sec:', iterations / (after - before))
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
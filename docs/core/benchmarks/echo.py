@@ -0,0 +1,91 @@
+"""
+Echo server benchmark with many concurrent connections.
+
+Usage: echo.py [reactor [connections [round trips per connection]]]
+
+For example, to compare the level-triggered and edge-triggered epoll
+reactors::
+
+    python echo.py epoll 1000
+    python echo.py epollet 1000
+
+The server and all of the clients run in the same process, using the named
+reactor, so the time includes both ends of every connection.
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from twisted.application.reactors import installReactor
+
+
+MESSAGE = b"x" * 64
+
+
+def main(args):
+    reactorName = args[0] if args else "default"
+    connections = int(args[1]) if len(args) > 1 else 1000
+    roundTrips = int(args[2]) if len(args) > 2 else 100
+    installReactor(reactorName)
+
+    from twisted.internet import reactor, protocol
+
+    class Echo(protocol.Protocol):
+        def dataReceived(self, data):
+            self.transport.write(data)
+
+
+    class Client(protocol.Protocol):
+        def connectionMade(self):
+            self.remaining = roundTrips
+            self.received = 0
+            self.transport.write(MESSAGE)
+
+        def dataReceived(self, data):
+            self.received += len(data)
+            if self.received < len(MESSAGE):
+                return
+            self.received -= len(MESSAGE)
+            self.remaining -= 1
+            if self.remaining:
+                self.transport.write(MESSAGE)
+            else:
+                self.transport.loseConnection()
+
+        def connectionLost(self, reason):
+            self.factory.finished()
+
+
+    class ClientFactory(protocol.ClientFactory):
+        protocol = Client
+        done = 0
+
+        def finished(self):
+            self.done += 1
+            if self.done == connections:
+                reactor.stop()
+
+
+    serverFactory = protocol.ServerFactory()
+    serverFactory.protocol = Echo
+    port = reactor.listenTCP(0, serverFactory, backlog=connections,
+                             interface="127.0.0.1")
+
+    clientFactory = ClientFactory()
+    for i in range(connections):
+        reactor.connectTCP("127.0.0.1", port.getHost().port, clientFactory)
+
+    before = time.time()
+    reactor.run()
+    after = time.time()
+
+    total = connections * roundTrips
+    print(reactorName, 'connections:', connections,
+          'round trips:', total, 'Time:', after - before,
+          'round trips/sec:', total / (after - before))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
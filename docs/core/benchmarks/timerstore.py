@@ -0,0 +1,121 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Compare the timer stores available to L{twisted.internet.base.ReactorBase}.
+
+The workloads resemble a server with many idle connections, each with an
+idle timeout which is pushed back whenever data arrives: by resetting it (as
+L{twisted.protocols.policies.TimeoutMixin} does), by cancelling it and
+scheduling a new one, or by resetting it to a random, often sooner, time.
+"""
+
+from __future__ import print_function
+
+import random
+import time
+
+from twisted.internet.base import (
+    DelayedCall, HeapTimerStore, TimingWheelTimerStore)
+
+
+class FakeReactor(object):
+    """
+    Just enough of a reactor to drive an L{ITimerStore} with a fake clock.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.now = 0.0
+
+
+    def seconds(self):
+        return self.now
+
+
+    def callLater(self, delay, f, *args, **kw):
+        call = DelayedCall(
+            self.now + delay, f, args, kw,
+            self.store.cancel, self.store.reschedule, self.seconds)
+        self.store.add(call)
+        return call
+
+
+    def advance(self, amount):
+        self.now += amount
+        self.store.nextTime()
+        for call in self.store.expired(self.now):
+            call.called = 1
+            call.func(*call.args, **call.kw)
+
+
+
+def resetLater(call, reactor, timeout):
+    """
+    Reset a call the way L{twisted.protocols.policies.TimeoutMixin} does
+    when data arrives.
+    """
+    call.reset(timeout)
+    return call
+
+
+
+def cancelAndReplace(call, reactor, timeout):
+    """
+    Cancel a call and schedule a new one in its place.
+    """
+    func, args = call.func, call.args
+    call.cancel()
+    return reactor.callLater(timeout, func, *args)
+
+
+
+def resetRandomly(call, reactor, timeout):
+    """
+    Reset a call to a random time, which is often sooner than its current
+    one.
+    """
+    call.reset(random.uniform(0, timeout))
+    return call
+
+
+
+def benchmark(name, store, timers, events, resetsPerEvent, timeout, reset):
+    """
+    Run the workload against one store and print the time it took.
+    """
+    random.seed(0)
+    reactor = FakeReactor(store)
+    timedOut = []
+    calls = [
+        reactor.callLater(random.uniform(0, timeout), timedOut.append, i)
+        for i in range(timers)]
+
+    before = time.time()
+    for event in range(events):
+        reactor.advance(0.001)
+        for i in range(resetsPerEvent):
+            n = random.randrange(timers)
+            call = calls[n]
+            if call.active():
+                calls[n] = reset(call, reactor, timeout)
+            else:
+                calls[n] = reactor.callLater(timeout, timedOut.append, n)
+    after = time.time()
+
+    print(name, reset.__name__, 'timers:', timers, 'events:', events,
+          'resets/event:', resetsPerEvent, 'timed out:', len(timedOut),
+          'Time:', after - before)
+
+
+
+def main():
+    for reset in (resetLater, cancelAndReplace, resetRandomly):
+        for timers in (1000, 100000):
+            for name, factory in [('heap ', HeapTimerStore),
+                                  ('wheel', TimingWheelTimerStore)]:
+                benchmark(name, factory(), timers, 5000, 20, 3.0, reset)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark for the UDP port pool of L{twisted.names.client.Resolver}.
+
+Usage: clientpool.py [lookups [concurrency]]
+
+Address lookups of distinct names (by default, 5000) are made by a
+L{client.Resolver} against a server listening on 127.0.0.1, with at most the
+given number (by default, 50) outstanding at once: once binding a new port
+for each query, and once spreading the queries among a pool of 16 ports.
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from twisted.internet import defer, reactor, task
+from twisted.names import client, common, dns, server
+
+
+class AnswerResolver(common.ResolverBase):
+    """
+    A resolver which answers every lookup with the same address.
+    """
+    def _lookup(self, name, cls, type, timeout):
+        return defer.succeed((
+            [dns.RRHeader(name, ttl=60, payload=dns.Record_A('10.0.0.1', 60))],
+            [], []))
+
+
+
+@defer.inlineCallbacks
+def run(name, port, lookups, concurrency, udpPoolSize):
+    resolver = client.Resolver(
+        servers=[('127.0.0.1', port)], udpPoolSize=udpPoolSize)
+    names = iter([('host%d.example.com' % (i,)).encode('ascii')
+                  for i in range(lookups)])
+
+    def worker():
+        for hostname in names:
+            yield resolver.lookupAddress(hostname)
+
+    before = time.time()
+    yield defer.gatherResults([
+        task.cooperate(worker()).whenDone() for i in range(concurrency)])
+    after = time.time()
+
+    if resolver._udpPool is not None:
+        for protocol in list(resolver._udpPool._counts):
+            protocol.transport.stopListening()
+    print(name, 'lookups:', lookups, 'Time:', after - before,
+          'lookups/sec:', lookups / (after - before))
+
+
+
+@defer.inlineCallbacks
+def benchmark(lookups, concurrency):
+    factory = server.DNSServerFactory(clients=[AnswerResolver()])
+    port = reactor.listenUDP(
+        0, dns.DNSDatagramProtocol(factory), interface='127.0.0.1')
+    portNumber = port.getHost().port
+    try:
+        yield run('port per query', portNumber, lookups, concurrency, None)
+        yield run('pool of 16 ports', portNumber, lookups, concurrency, 16)
+    finally:
+        port.stopListening()
+        reactor.stop()
+
+
+
+def main(args):
+    lookups = int(args[0]) if args else 5000
+    concurrency = int(args[1]) if len(args) > 1 else 50
+    reactor.callWhenRunning(benchmark, lookups, concurrency)
+    reactor.run()
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
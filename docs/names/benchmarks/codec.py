@@ -0,0 +1,96 @@
+"""
+Benchmarks for encoding and decoding L{twisted.names.dns.Message}s.
+
+Usage: codec.py [iterations]
+
+A typical response, with a query, three address records, two name server
+records and their two addresses, is encoded and decoded the given number of
+times (by default, 20000) with:
+
+  - L{Message.encode} and L{Message.decode} on a L{BytesIO}, the stream
+    codec;
+  - L{Message.toStr} and L{Message.fromStr}, the byte string codec;
+  - L{Message.fromStr}, followed by getting the payload of every record.
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+from io import BytesIO
+
+from twisted.names import dns
+
+
+RESPONSE = dns.Message(id=1234, answer=1, recDes=1, recAv=1)
+RESPONSE.addQuery(b'www.example.com', dns.A)
+RESPONSE.answers = [
+    dns.RRHeader(b'www.example.com', dns.A, ttl=300,
+                 payload=dns.Record_A('192.0.2.%d' % (i,), ttl=300))
+    for i in range(1, 4)]
+RESPONSE.authority = [
+    dns.RRHeader(b'example.com', dns.NS, ttl=3600,
+                 payload=dns.Record_NS(b'ns%d.example.com' % (i,), ttl=3600))
+    for i in range(1, 3)]
+RESPONSE.additional = [
+    dns.RRHeader(b'ns%d.example.com' % (i,), dns.A, ttl=3600,
+                 payload=dns.Record_A('192.0.2.%d' % (52 + i,), ttl=3600))
+    for i in range(1, 3)]
+ENCODED = RESPONSE.toStr()
+
+
+
+def streamEncode():
+    RESPONSE.encode(BytesIO())
+
+
+
+def streamDecode():
+    dns.Message().decode(BytesIO(ENCODED))
+
+
+
+def toStr():
+    RESPONSE.toStr()
+
+
+
+def fromStr():
+    dns.Message().fromStr(ENCODED)
+
+
+
+def fromStrPayloads():
+    m = dns.Message()
+    m.fromStr(ENCODED)
+    for section in (m.answers, m.authority, m.additional):
+        for record in section:
+            record.payload
+
+
+
+BENCHMARKS = [
+    streamEncode,
+    toStr,
+    streamDecode,
+    fromStr,
+    fromStrPayloads,
+]
+
+
+
+def main(args):
+    iterations = int(args[0]) if args else 20000
+    for benchmark in BENCHMARKS:
+        before = time.time()
+        for i in range(iterations):
+            benchmark()
+        after = time.time()
+        print(benchmark.__name__, 'iterations:', iterations,
+              'Time:', after - before,
+              'messages/sec:', iterations / (after - before))
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
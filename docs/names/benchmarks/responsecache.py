@@ -0,0 +1,88 @@
+"""
+Benchmark for L{twisted.names.server.EncodedResponseCache}.
+
+Usage: responsecache.py [queries]
+
+A query for an address in a zone served by a L{FileAuthority} is delivered
+to a L{DNSDatagramProtocol} controlled by a L{DNSServerFactory} the given
+number of times (by default, 20000): once with no response cache, and once
+with an L{EncodedResponseCache}.
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from twisted.names import authority, common, dns, server
+
+
+SOA = dns.Record_SOA(
+    mname=b'ns1.example.com', rname=b'hostmaster.example.com',
+    serial=1, refresh=3600, retry=600, expire=86400, minimum=300, ttl=3600)
+
+RECORDS = {
+    b'example.com': [
+        SOA,
+        dns.Record_NS(b'ns1.example.com', ttl=3600),
+        dns.Record_NS(b'ns2.example.com', ttl=3600),
+    ],
+    b'www.example.com': [
+        dns.Record_A('192.0.2.1', ttl=300),
+        dns.Record_A('192.0.2.2', ttl=300),
+    ],
+    b'ns1.example.com': [dns.Record_A('192.0.2.53', ttl=3600)],
+    b'ns2.example.com': [dns.Record_A('192.0.2.54', ttl=3600)],
+}
+
+
+
+class MemoryAuthority(authority.FileAuthority):
+    """
+    A L{FileAuthority} with records given in memory.
+    """
+    def __init__(self, soa, records):
+        common.ResolverBase.__init__(self)
+        self.soa, self.records = soa, records
+
+
+
+class NullTransport(object):
+    """
+    A datagram transport which discards what is written to it.
+    """
+    def write(self, data, address):
+        pass
+
+
+
+def serve(name, responseCache, queries):
+    factory = server.DNSServerFactory(
+        authorities=[MemoryAuthority((b'example.com', SOA), RECORDS)],
+        responseCache=responseCache)
+    protocol = dns.DNSDatagramProtocol(factory)
+    protocol.startProtocol()
+    protocol.transport = NullTransport()
+
+    query = dns.Message(id=1, recDes=1)
+    query.addQuery(b'www.example.com', dns.A)
+    data = query.toStr()
+
+    before = time.time()
+    for i in range(queries):
+        protocol.datagramReceived(data, ('192.0.2.100', 53))
+    after = time.time()
+    print(name, 'queries:', queries, 'Time:', after - before,
+          'queries/sec:', queries / (after - before))
+
+
+
+def main(args):
+    queries = int(args[0]) if args else 20000
+    serve('no response cache', None, queries)
+    serve('EncodedResponseCache', server.EncodedResponseCache(), queries)
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
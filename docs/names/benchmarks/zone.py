@@ -0,0 +1,90 @@
+"""
+Benchmarks for loading a zone into a L{BindAuthority} and answering queries
+from it.
+
+Usage: zone.py [records] [queries]
+
+A zone file for C{example.com} with the given number of address records (by
+default, 100000), each with a mail exchanger, is written to a temporary
+directory and loaded.  The given number of queries (by default, 100000) are
+then made for the address and then the mail exchanger of names in the zone,
+the latter needing additional processing.
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from twisted.names import authority
+
+
+HEADER = """\
+$TTL 3600
+@ IN SOA ns1.example.com. hostmaster.example.com. (
+    1 3600 600 86400 300 )
+@ IN NS ns1.example.com.
+ns1.example.com. IN A 192.0.2.53
+"""
+
+
+
+def writeZone(directory, records):
+    path = os.path.join(directory, 'example.com')
+    with open(path, 'w') as f:
+        f.write(HEADER)
+        for i in range(records):
+            f.write(
+                'host%d.example.com. IN A 10.%d.%d.%d\n'
+                'host%d.example.com. IN MX 10 mail%d.example.com.\n'
+                'mail%d.example.com. IN A 10.%d.%d.%d\n' % (
+                    i, (i >> 16) & 255, (i >> 8) & 255, i & 255,
+                    i, i,
+                    i, 128 | ((i >> 16) & 127), (i >> 8) & 255, i & 255))
+    return path
+
+
+
+def load(path, records):
+    before = time.time()
+    zone = authority.BindAuthority(path)
+    after = time.time()
+    print('load', 'records:', records * 3, 'Time:', after - before,
+          'records/sec:', records * 3 / (after - before))
+    return zone
+
+
+
+def query(zone, method, records, queries):
+    lookup = getattr(zone, method)
+    names = [
+        ('host%d.example.com' % (i % records,)) for i in range(queries)]
+    results = []
+    before = time.time()
+    for name in names:
+        lookup(name).addCallback(results.append)
+    after = time.time()
+    assert len(results) == queries
+    print(method, 'queries:', queries, 'Time:', after - before,
+          'queries/sec:', queries / (after - before))
+
+
+
+def main(args):
+    records = int(args[0]) if args else 100000
+    queries = int(args[1]) if len(args) > 1 else 100000
+    directory = tempfile.mkdtemp()
+    try:
+        zone = load(writeZone(directory, records), records)
+    finally:
+        shutil.rmtree(directory)
+    query(zone, 'lookupAddress', records, queries)
+    query(zone, 'lookupMailExchange', records, queries)
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
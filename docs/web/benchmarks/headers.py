@@ -0,0 +1,127 @@
+"""
+Benchmarks for L{twisted.web.http_headers.Headers}.
+
+Usage: headers.py [iterations]
+
+Each benchmark is run the given number of times (by default, 100000) and
+reports the time taken, and the rate, for:
+
+  - setting a typical set of response headers with C{setRawHeaders};
+  - setting the same headers with C{setLowercaseRawHeaders};
+  - adding a typical set of received headers with C{addRawHeader};
+  - adding the same headers with C{addLowercaseRawHeader};
+  - looking up a header with C{getRawHeaders} and C{hasHeader};
+  - looking up a header with C{getLowercaseRawHeaders};
+  - listing the headers with C{getAllRawHeaders}, as when they are written.
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from twisted.web.http_headers import Headers, _lowercaseName
+
+
+RESPONSE_HEADERS = [
+    (b'Content-Type', b'text/html; charset=utf-8'),
+    (b'Content-Length', b'1234'),
+    (b'Date', b'Mon, 17 Oct 2016 12:00:00 GMT'),
+    (b'Server', b'TwistedWeb/16.5.0'),
+    (b'Cache-Control', b'no-cache'),
+    (b'ETag', b'"0123456789abcdef"'),
+    (b'X-Request-Id', b'fedcba9876543210'),
+]
+
+RECEIVED_HEADERS = [
+    (b'Host', b'www.example.com'),
+    (b'User-Agent', b'Mozilla/5.0 (X11; Linux x86_64; rv:48.0)'),
+    (b'Accept', b'text/html,application/xhtml+xml'),
+    (b'Accept-Language', b'en-US,en;q=0.5'),
+    (b'Accept-Encoding', b'gzip, deflate'),
+    (b'Cookie', b'session=0123456789abcdef'),
+    (b'Connection', b'keep-alive'),
+]
+
+LOWERCASE_RESPONSE_HEADERS = [
+    (name.lower(), value) for (name, value) in RESPONSE_HEADERS]
+
+FULL = Headers()
+for name, value in RESPONSE_HEADERS:
+    FULL.setRawHeaders(name, [value])
+
+
+
+def setRawHeaders():
+    headers = Headers()
+    for name, value in RESPONSE_HEADERS:
+        headers.setRawHeaders(name, [value])
+
+
+
+def setLowercaseRawHeaders():
+    headers = Headers()
+    for name, value in LOWERCASE_RESPONSE_HEADERS:
+        headers.setLowercaseRawHeaders(name, [value])
+
+
+
+def addRawHeader():
+    headers = Headers()
+    for name, value in RECEIVED_HEADERS:
+        headers.addRawHeader(name, value)
+
+
+
+def addLowercaseRawHeader():
+    headers = Headers()
+    for name, value in RECEIVED_HEADERS:
+        headers.addLowercaseRawHeader(_lowercaseName(name), value)
+
+
+
+def getRawHeaders():
+    FULL.getRawHeaders(b'content-length')
+    FULL.hasHeader(b'last-modified')
+
+
+
+def getLowercaseRawHeaders():
+    FULL.getLowercaseRawHeaders(b'content-length')
+    FULL.getLowercaseRawHeaders(b'last-modified')
+
+
+
+def getAllRawHeaders():
+    for name, values in FULL.getAllRawHeaders():
+        pass
+
+
+
+BENCHMARKS = [
+    setRawHeaders,
+    setLowercaseRawHeaders,
+    addRawHeader,
+    addLowercaseRawHeader,
+    getRawHeaders,
+    getLowercaseRawHeaders,
+    getAllRawHeaders,
+]
+
+
+
+def main(args):
+    iterations = int(args[0]) if args else 100000
+    for benchmark in BENCHMARKS:
+        before = time.time()
+        for i in range(iterations):
+            benchmark()
+        after = time.time()
+        print(benchmark.__name__, 'iterations:', iterations,
+              'Time:', after - before,
+              'iterations/sec:', iterations / (after - before))
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
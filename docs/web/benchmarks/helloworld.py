@@ -0,0 +1,76 @@
+"""
+"Hello, world" benchmark for L{twisted.web.server.Site}.
+
+Usage: helloworld.py [requests]
+
+Pipelined keep-alive requests for a resource which renders C{b"Hello,
+world!"} are delivered to a channel built by a L{Site}, one at a time, and
+the responses are written to an in-memory transport, so the time is spent
+parsing requests, finding and rendering the resource, and generating the
+responses, without any network I/O.
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from twisted.internet import reactor
+from twisted.test.proto_helpers import StringTransport
+from twisted.web.resource import Resource
+from twisted.web.server import Site
+
+
+REQUEST = (
+    b"GET / HTTP/1.1\r\n"
+    b"Host: localhost\r\n"
+    b"User-Agent: helloworld.py\r\n"
+    b"Accept: */*\r\n"
+    b"\r\n")
+
+
+
+class HelloWorld(Resource):
+    isLeaf = True
+
+    def render_GET(self, request):
+        return b"Hello, world!"
+
+
+
+class NullLogSite(Site):
+    """
+    A L{Site} which does not log requests.
+    """
+    def log(self, request):
+        pass
+
+
+
+def main(args):
+    requests = int(args[0]) if args else 100000
+    site = NullLogSite(HelloWorld(), reactor=reactor)
+    site.startFactory()
+    channel = site.buildProtocol(None)
+    transport = StringTransport()
+    channel.makeConnection(transport)
+
+    responses = 0
+    before = time.time()
+    for i in range(requests):
+        channel.dataReceived(REQUEST)
+        if not i % 1000:
+            responses += transport.value().count(b"Hello, world!")
+            transport.clear()
+    after = time.time()
+    responses += transport.value().count(b"Hello, world!")
+    site.stopFactory()
+
+    assert responses == requests, responses
+    print('requests:', requests, 'Time:', after - before,
+          'requests/sec:', requests / (after - before))
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,107 @@
+"""
+Benchmark for the cost of collecting request metrics in
+L{twisted.web.server.Site}.
+
+Usage: metrics.py [requests]
+
+Pipelined keep-alive requests for a resource which renders C{b"Hello,
+world!"} are delivered to a channel built by a L{Site}, as in
+C{helloworld.py}, the given number of times (by default, 100000): once with
+no metrics, and once with a L{HistogramCollector} as the site's metrics.  The
+time taken by L{HistogramCollector.requestFinished} alone is also reported.
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from twisted.internet import reactor
+from twisted.test.proto_helpers import StringTransport
+from twisted.web.metrics import HistogramCollector
+from twisted.web.resource import Resource
+from twisted.web.server import Site
+
+
+REQUEST = (
+    b"GET / HTTP/1.1\r\n"
+    b"Host: localhost\r\n"
+    b"User-Agent: metrics.py\r\n"
+    b"Accept: */*\r\n"
+    b"\r\n")
+
+
+
+class HelloWorld(Resource):
+    isLeaf = True
+
+    def render_GET(self, request):
+        return b"Hello, world!"
+
+
+
+class NullLogSite(Site):
+    """
+    A L{Site} which does not log requests.
+    """
+    def log(self, request):
+        pass
+
+
+
+class FinishedRequest(object):
+    """
+    A request as far as L{HistogramCollector} is concerned.
+    """
+    finished = True
+
+
+
+def serve(name, metrics, requests):
+    site = NullLogSite(HelloWorld(), reactor=reactor)
+    site.metrics = metrics
+    site.startFactory()
+    channel = site.buildProtocol(None)
+    transport = StringTransport()
+    channel.makeConnection(transport)
+
+    before = time.time()
+    for i in range(requests):
+        channel.dataReceived(REQUEST)
+        if not i % 1000:
+            transport.clear()
+    after = time.time()
+    site.stopFactory()
+    channel.connectionLost(None)
+
+    print(name, 'requests:', requests, 'Time:', after - before,
+          'requests/sec:', requests / (after - before))
+    return after - before
+
+
+
+def collect(requests):
+    collector = HistogramCollector()
+    request = FinishedRequest()
+    before = time.time()
+    for i in range(requests):
+        collector.requestStarted(request)
+        collector.requestFinished(
+            request, 200, b"/", 13, 0.0001 + i * 1e-9, 0.0002 + i * 1e-9)
+    after = time.time()
+    print('requestFinished', 'requests:', requests, 'Time:', after - before,
+          'usec/request:', (after - before) * 1000000 / requests)
+
+
+
+def main(args):
+    requests = int(args[0]) if args else 100000
+    without = serve('no metrics', None, requests)
+    withMetrics = serve('HistogramCollector', HistogramCollector(), requests)
+    print('overhead: %.1f%%' % ((withMetrics - without) * 100 / without,))
+    collect(requests)
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,84 @@
+"""
+Benchmark for parsing requests with L{twisted.web.http.HTTPChannel}.
+
+Usage: requestparse.py [requests [chunk size]]
+
+Pipelined keep-alive requests, with a typical set of browser headers, are
+delivered to a channel in chunks of the given size (by default, 64KiB),
+first with the line-by-line parser and then with
+L{HTTPChannel.headerBlockParsing} enabled.  Each request is finished as soon
+as it has been parsed, and nothing is written, so the time is (almost) all
+spent parsing.
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from twisted.web import http
+from twisted.test.proto_helpers import StringTransport
+
+
+REQUEST = (
+    b"GET /index.html?page=1 HTTP/1.1\r\n"
+    b"Host: www.example.com\r\n"
+    b"User-Agent: Mozilla/5.0 (X11; Linux x86_64; rv:48.0) "
+    b"Gecko/20100101 Firefox/48.0\r\n"
+    b"Accept: text/html,application/xhtml+xml,application/xml;q=0.9,"
+    b"*/*;q=0.8\r\n"
+    b"Accept-Language: en-US,en;q=0.5\r\n"
+    b"Accept-Encoding: gzip, deflate\r\n"
+    b"Referer: http://www.example.com/\r\n"
+    b"Cookie: session=0123456789abcdef; theme=dark\r\n"
+    b"Connection: keep-alive\r\n"
+    b"Cache-Control: max-age=0\r\n"
+    b"\r\n")
+
+
+
+class Request(http.Request):
+    """
+    A request which does nothing at all.
+    """
+    def process(self):
+        self.channel.requests.remove(self)
+        self.channel.requestsParsed += 1
+        self.channel._handlingRequest = False
+
+
+
+def benchmark(headerBlockParsing, requests, chunkSize):
+    data = REQUEST * requests
+    chunks = [data[i:i + chunkSize] for i in range(0, len(data), chunkSize)]
+
+    channel = http.HTTPChannel()
+    channel.headerBlockParsing = headerBlockParsing
+    channel.requestFactory = Request
+    channel.requestsParsed = 0
+    channel.makeConnection(StringTransport())
+
+    before = time.time()
+    for chunk in chunks:
+        channel.dataReceived(chunk)
+    after = time.time()
+    channel.connectionLost(None)
+
+    assert channel.requestsParsed == requests, channel.requestsParsed
+    print('headerBlockParsing:', headerBlockParsing,
+          'requests:', requests, 'chunk size:', chunkSize,
+          'Time:', after - before,
+          'requests/sec:', requests / (after - before))
+
+
+
+def main(args):
+    requests = int(args[0]) if args else 100000
+    chunkSize = int(args[1]) if len(args) > 1 else 65536
+    for headerBlockParsing in (False, True):
+        benchmark(headerBlockParsing, requests, chunkSize)
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,92 @@
+"""
+Benchmark for rendering L{twisted.web.template} documents.
+
+Usage: templates.py [renders [rows]]
+
+An L{Element} whose template is mostly static markup, with a table of the
+given number of rows (by default, 20) filled in by a renderer, is flattened
+the given number of times (by default, 10000).  This is done once with the
+template as it is parsed, and once with the template compiled, as it is
+after being rendered more than once.  The number of calls made to the write
+callable is reported, along with the time taken.
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from twisted.web.template import Element, XMLString, renderer, flatten
+
+
+TEMPLATE = """\
+<html xmlns:t="http://twistedmatrix.com/ns/twisted.web.template/0.1">
+  <head>
+    <title>Benchmark</title>
+    <link rel="stylesheet" href="/style.css" />
+  </head>
+  <body>
+    <div class="header">
+      <h1>A table of numbers</h1>
+      <p>These are <em>some</em> numbers &amp; their squares.</p>
+    </div>
+    <table>
+      <tr><th>Number</th><th>Square</th></tr>
+      <tr t:render="rows">
+        <td><t:slot name="number" /></td>
+        <td class="square"><t:slot name="square" /></td>
+      </tr>
+    </table>
+    <div class="footer">
+      <p>Rendered by <a href="https://twistedmatrix.com/">Twisted</a>.</p>
+    </div>
+  </body>
+</html>
+"""
+
+
+
+class TableElement(Element):
+    loader = XMLString(TEMPLATE)
+
+    def __init__(self, rows):
+        Element.__init__(self)
+        self.count = rows
+
+
+    @renderer
+    def rows(self, request, tag):
+        for i in range(self.count):
+            yield tag.clone().fillSlots(number=str(i), square=str(i * i))
+
+
+
+class UncompiledTableElement(TableElement):
+    def render(self, request):
+        return self.loader.load()
+
+
+
+def benchmark(name, elementFactory, renders, rows):
+    writes = []
+    before = time.time()
+    for i in range(renders):
+        flatten(None, elementFactory(rows), writes.append)
+    after = time.time()
+    print(name, 'renders:', renders, 'rows:', rows,
+          'writes/render:', len(writes) / renders,
+          'Time:', after - before,
+          'renders/sec:', renders / (after - before))
+
+
+
+def main(args):
+    renders = int(args[0]) if args else 10000
+    rows = int(args[1]) if len(args) > 1 else 20
+    benchmark('uncompiled', UncompiledTableElement, renders, rows)
+    benchmark('compiled', TableElement, renders, rows)
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
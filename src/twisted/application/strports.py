@@ -93,10 +93,18 @@ def listen(description, factory, default=None):
     @return: the port corresponding to a description of a reliable
     virtual circuit server.
 
+    @raise ValueError: If the description includes C{reusePort}, which
+        L{IReactorTCP.listenTCP} does not support; use
+        L{twisted.internet.endpoints.serverFromString} instead.
+
     @see: L{twisted.internet.endpoints.serverFromString}
     """
     from twisted.internet import reactor
     name, args, kw = endpoints._parseServer(description, factory, default)
+    if 'reusePort' in kw:
+        raise ValueError(
+            "reusePort is not supported by strports.listen; use "
+            "twisted.internet.endpoints.serverFromString instead")
     return getattr(reactor, 'listen'+name)(*args, **kw)
 
 
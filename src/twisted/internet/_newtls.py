@@ -149,6 +149,8 @@ def startTLS(transport, contextFactory, normal, bypass):
     # Remember we did this so that write and writeSequence can send the
     # data to the right place.
     transport.TLS = True
+    # Files can no longer be written without passing through TLS.
+    transport.fileWrites = False
 
     # Hook it up
     transport.protocol.makeConnection(_BypassTLS(bypass, transport))
@@ -7,7 +7,9 @@ from __future__ import division, absolute_import
 
 import itertools
 import warnings
+import weakref
 
+from collections import OrderedDict
 from hashlib import md5
 
 import OpenSSL
@@ -17,6 +19,10 @@ try:
 except ImportError:
     SSL_CB_HANDSHAKE_START = 0x10
     SSL_CB_HANDSHAKE_DONE = 0x20
+try:
+    from OpenSSL.SSL import SSL_CB_EXIT
+except ImportError:
+    SSL_CB_EXIT = 0x02
 
 from twisted.python import log
 
@@ -1154,6 +1160,125 @@ def _tolerateErrors(wrapped):
 
 
 
+_CLIENT_SESSION_ID_CONTEXT = b"twisted.internet.ssl-client"
+
+
+
+class TLSSessionCache(object):
+    """
+    A cache of the TLS sessions established by clients, so that a new
+    connection to a host can resume a session instead of performing a full
+    handshake.
+
+    Pass one to L{optionsForClientTLS} to share it between the client
+    connection creators made for any number of hosts.  Sessions are keyed by
+    the hostname of the server and the options the client was created with,
+    since resuming a session skips verifying the server's certificate chain
+    and reuses the client certificate it was established with: a creator
+    only resumes sessions established by creators with the same trust root,
+    client certificate and acceptable protocols.
+
+    @ivar maximumSize: The maximum number of sessions to keep.  Once it has
+        been reached, the least recently used session is discarded to make
+        room for a new one.
+    @type maximumSize: L{int}
+
+    @ivar _sessions: An L{OrderedDict} mapping keys to sessions, least
+        recently used first.
+
+    @since: 16.5
+    """
+
+    def __init__(self, maximumSize=100):
+        self.maximumSize = maximumSize
+        self._sessions = OrderedDict()
+
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+    def get(self, key):
+        """
+        Look up the session most recently established with a host.
+
+        @param key: The host and the options of the client, such as a
+            L{tuple} of the hostname and a description of the options.
+        @type key: any hashable object
+
+        @return: The session, or L{None} if there is none.
+        @rtype: L{OpenSSL.SSL.Session} or L{None}
+        """
+        session = self._sessions.pop(key, None)
+        if session is not None:
+            self._sessions[key] = session
+        return session
+
+
+    def store(self, key, session):
+        """
+        Remember the session established with a host.
+
+        @param key: The host and the options of the client; see L{get}.
+        @type key: any hashable object
+
+        @param session: The session.
+        @type session: L{OpenSSL.SSL.Session}
+        """
+        self._sessions.pop(key, None)
+        self._sessions[key] = session
+        while len(self._sessions) > self.maximumSize:
+            self._sessions.popitem(last=False)
+
+
+    def discard(self, key):
+        """
+        Forget the session established with a host, if there is one.
+
+        @param key: The host and the options of the client; see L{get}.
+        @type key: any hashable object
+        """
+        self._sessions.pop(key, None)
+
+
+
+def _sessionCacheOptionsKey(trustRoot, clientCertificate,
+                            acceptableProtocols, extraCertificateOptions):
+    """
+    Describe the options of a client connection creator made by
+    L{optionsForClientTLS}, so that creators with the same options, and only
+    those, share the sessions in a L{TLSSessionCache}.
+
+    @param trustRoot: See L{optionsForClientTLS}.
+    @param clientCertificate: See L{optionsForClientTLS}.
+    @param acceptableProtocols: See L{optionsForClientTLS}.
+    @param extraCertificateOptions: See L{optionsForClientTLS}.
+
+    @return: A hashable description of the options, or L{None} if they
+        cannot be described, in which case the creator should not share its
+        sessions with any other.
+    """
+    if extraCertificateOptions:
+        return None
+    if isinstance(trustRoot, OpenSSLDefaultPaths):
+        trustRootKey = OpenSSLDefaultPaths
+    elif isinstance(trustRoot, Certificate):
+        trustRootKey = trustRoot.dump()
+    elif isinstance(trustRoot, OpenSSLCertificateAuthorities):
+        trustRootKey = tuple(
+            crypto.dump_certificate(crypto.FILETYPE_ASN1, caCert)
+            for caCert in trustRoot._caCerts)
+    else:
+        return None
+    if clientCertificate:
+        clientCertificateKey = clientCertificate.dump()
+    else:
+        clientCertificateKey = None
+    return (trustRootKey, clientCertificateKey,
+            tuple(acceptableProtocols or ()))
+
+
+
 @implementer(IOpenSSLClientConnectionCreator)
 class ClientTLSOptions(object):
     """
@@ -1181,9 +1306,24 @@ class ClientTLSOptions(object):
         than working with Python's built-in (but sometimes broken) IDNA
         encoding.  ASCII values, however, will always work.
     @type _hostnameASCII: L{unicode}
+
+    @ivar _sessionCache: The cache of sessions which new connections try to
+        resume, and to which the sessions they establish are added, or
+        L{None} if sessions are not resumed.
+    @type _sessionCache: L{TLSSessionCache} or L{None}
+
+    @ivar _sessionKey: The key of the sessions established by this creator
+        in C{_sessionCache}: the hostname and a description of the options,
+        or the context, if no description was given.
+    @type _sessionKey: L{tuple}
+
+    @ivar _verified: The connections whose peers' identities have been
+        verified, and whose sessions may therefore be stored in
+        C{_sessionCache}.
+    @type _verified: L{weakref.WeakSet}
     """
 
-    def __init__(self, hostname, ctx):
+    def __init__(self, hostname, ctx, sessionCache=None, optionsKey=None):
         """
         Initialize L{ClientTLSOptions}.
 
@@ -1192,11 +1332,29 @@ class ClientTLSOptions(object):
 
         @param ctx: an L{OpenSSL.SSL.Context} to use for new connections.
         @type ctx: L{OpenSSL.SSL.Context}.
+
+        @param sessionCache: The cache of sessions to resume, if any.
+        @type sessionCache: L{TLSSessionCache} or L{None}
+
+        @param optionsKey: A hashable description of the options C{ctx} was
+            made with, such that creators with the same description may
+            resume each other's sessions, or L{None} to only resume the
+            sessions established by this creator.
         """
         self._ctx = ctx
+        self._sessionCache = sessionCache
+        self._verified = weakref.WeakSet()
+        if sessionCache is not None:
+            # OpenSSL refuses to resume a session established by a connection
+            # with a different session ID context, and each context made by
+            # CertificateOptions has its own.
+            ctx.set_session_id(_CLIENT_SESSION_ID_CONTEXT)
         self._hostname = hostname
         self._hostnameBytes = _idnaBytes(hostname)
         self._hostnameASCII = self._hostnameBytes.decode("ascii")
+        if optionsKey is None:
+            optionsKey = ctx
+        self._sessionKey = (self._hostnameASCII, optionsKey)
         ctx.set_info_callback(
             _tolerateErrors(self._identityVerifyingInfoCallback)
         )
@@ -1221,6 +1379,10 @@ class ClientTLSOptions(object):
         context = self._ctx
         connection = SSL.Connection(context, None)
         connection.set_app_data(tlsProtocol)
+        if self._sessionCache is not None:
+            session = self._sessionCache.get(self._sessionKey)
+            if session is not None:
+                connection.set_session(session)
         return connection
 
 
@@ -1229,7 +1391,8 @@ class ClientTLSOptions(object):
         U{info_callback
         <http://pythonhosted.org/pyOpenSSL/api/ssl.html#OpenSSL.SSL.Context.set_info_callback>
         } for pyOpenSSL that verifies the hostname in the presented certificate
-        matches the one passed to this L{ClientTLSOptions}.
+        matches the one passed to this L{ClientTLSOptions}, and stores the
+        session in the session cache if it does.
 
         @param connection: the connection which is handshaking.
         @type connection: L{OpenSSL.SSL.Connection}
@@ -1247,8 +1410,20 @@ class ClientTLSOptions(object):
                 verifyHostname(connection, self._hostnameASCII)
             except VerificationError:
                 f = Failure()
+                if self._sessionCache is not None:
+                    self._sessionCache.discard(self._sessionKey)
                 transport = connection.get_app_data()
                 transport.failVerification(f)
+            else:
+                if self._sessionCache is not None:
+                    self._verified.add(connection)
+                    self._sessionCache.store(
+                        self._sessionKey, connection.get_session())
+        elif where & SSL_CB_EXIT and connection in self._verified:
+            # With TLS 1.3 the session tickets arrive after the handshake, and
+            # each of them gives the connection a new session.
+            self._sessionCache.store(
+                self._sessionKey, connection.get_session())
 
 
 
@@ -1301,6 +1476,14 @@ def optionsForClientTLS(hostname, trustRoot=None, clientCertificate=None,
         interface.
     @type extraCertificateOptions: L{dict}
 
+    @param sessionCache: keyword-only argument; a cache of sessions.  If
+        given, connections resume the session most recently established with
+        C{hostname} by a creator with the same C{trustRoot},
+        C{clientCertificate} and C{acceptableProtocols}, if there is one,
+        rather than performing a full handshake, and the sessions they
+        establish are stored in it.  (Since 16.5)
+    @type sessionCache: L{TLSSessionCache}
+
     @param kw: (Backwards compatibility hack to allow keyword-only arguments on
         Python 2.  Please ignore; arbitrary keyword arguments will be errors.)
     @type kw: L{dict}
@@ -1309,8 +1492,12 @@ def optionsForClientTLS(hostname, trustRoot=None, clientCertificate=None,
     @rtype: L{IOpenSSLClientConnectionCreator}
     """
     extraCertificateOptions = kw.pop('extraCertificateOptions', None) or {}
+    sessionCache = kw.pop('sessionCache', None)
     if trustRoot is None:
         trustRoot = platformTrust()
+    optionsKey = _sessionCacheOptionsKey(
+        trustRoot, clientCertificate, acceptableProtocols,
+        extraCertificateOptions)
     if kw:
         raise TypeError(
             "optionsForClientTLS() got an unexpected keyword argument"
@@ -1333,7 +1520,8 @@ def optionsForClientTLS(hostname, trustRoot=None, clientCertificate=None,
         acceptableProtocols=acceptableProtocols,
         **extraCertificateOptions
     )
-    return ClientTLSOptions(hostname, certificateOptions.getContext())
+    return ClientTLSOptions(hostname, certificateOptions.getContext(),
+                            sessionCache, optionsKey)
 
 
 
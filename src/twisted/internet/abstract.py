@@ -8,6 +8,7 @@ Support for generic select()able objects.
 
 from __future__ import division, absolute_import
 
+from collections import deque
 from socket import AF_INET6, inet_pton, error
 
 from zope.interface import implementer
@@ -164,6 +165,28 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
     This is an abstract superclass of all objects which may be notified when
     they are readable or writable; e.g. they have a file-descriptor that is
     valid to be passed to select(2).
+
+    @ivar vectoredWrites: If C{True}, C{doWrite} hands the buffered chunks to
+        C{writeSomeVectors} as a sequence, rather than concatenating them and
+        handing the result to C{writeSomeData}.  Defaults to C{False}.
+    @type vectoredWrites: L{bool}
+
+    @ivar SEND_LIMIT: The maximum number of bytes handed to C{writeSomeData}
+        or C{writeSomeVectors} by one call to C{doWrite}, beyond the unsent
+        remainder of an earlier write.
+
+    @ivar SEND_IOVEC_LIMIT: The maximum number of chunks handed to
+        C{writeSomeVectors} by one call to C{doWrite}.  This matches
+        C{IOV_MAX} on most platforms.
+
+    @ivar fileWrites: C{True} if this descriptor implements
+        C{writeSomeFile}, so that C{writeFile} can be used.  Defaults to
+        C{False}.
+    @type fileWrites: L{bool}
+
+    @ivar _fileToWrite: The part of a file passed to C{writeFile} which has
+        not been written yet, as a C{(fileno, offset, count)} tuple, or
+        L{None}.
     """
     connected = 0
     disconnected = 0
@@ -173,7 +196,12 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
     dataBuffer = b""
     offset = 0
 
+    vectoredWrites = False
+    fileWrites = False
+    _fileToWrite = None
+
     SEND_LIMIT = 128*1024
+    SEND_IOVEC_LIMIT = 1024
 
     def __init__(self, reactor=None):
         """
@@ -184,7 +212,7 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
         if not reactor:
             from twisted.internet import reactor
         self.reactor = reactor
-        self._tempDataBuffer = [] # will be added to dataBuffer in doWrite
+        self._tempDataBuffer = deque() # will be added to dataBuffer in doWrite
         self._tempDataLen = 0
 
 
@@ -200,6 +228,7 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
         """
         self.disconnected = 1
         self.connected = 0
+        self._fileToWrite = None
         if self.producer is not None:
             self.producer.stopProducing()
             self.producer = None
@@ -221,6 +250,57 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
                                   reflect.qual(self.__class__))
 
 
+    def writeSomeVectors(self, vectors):
+        """
+        Write as much as possible of the given sequence of buffers,
+        immediately, as if they had been concatenated.
+
+        This is called by C{doWrite} instead of C{writeSomeData} when
+        C{vectoredWrites} is true.  The return value is interpreted in the
+        same way as that of C{writeSomeData}.
+
+        Subclasses which can write several buffers with a single system call,
+        such as C{sendmsg(2)} or C{writev(2)}, should override this.  This
+        implementation concatenates the buffers and calls C{writeSomeData}.
+
+        @param vectors: The buffers to write, in order.
+        @type vectors: L{list} of L{bytes} or buffers
+
+        @since: 16.5
+        """
+        return self.writeSomeData(
+            b"".join([bytes(vector) for vector in vectors]))
+
+
+    def writeSomeFile(self, fileno, offset, count):
+        """
+        Write as much as possible of part of a file, immediately.
+
+        This is called by C{doWrite} to write the file passed to
+        C{writeFile}, once all the data written before it has been written.
+        The return value is interpreted in the same way as that of
+        C{writeSomeData}, except that the number of bytes written is only
+        zero if writing would block.
+
+        Subclasses which can copy data from a file without reading it into
+        memory, such as with C{sendfile(2)}, should override this and set
+        C{fileWrites} to C{True}.
+
+        @param fileno: The file descriptor of the file to write from.
+        @type fileno: L{int}
+
+        @param offset: The offset in the file of the first byte to write.
+        @type offset: L{int}
+
+        @param count: The number of bytes to write.
+        @type count: L{int}
+
+        @since: 16.5
+        """
+        raise NotImplementedError("%s does not implement writeSomeFile" %
+                                  reflect.qual(self.__class__))
+
+
     def doRead(self):
         """
         Called when data is available for reading.
@@ -240,30 +320,30 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
 
         @see: L{twisted.internet.interfaces.IWriteDescriptor.doWrite}.
         """
-        if len(self.dataBuffer) - self.offset < self.SEND_LIMIT:
-            # If there is currently less than SEND_LIMIT bytes left to send
-            # in the string, extend it with the array data.
-            self.dataBuffer = _concatenate(
-                self.dataBuffer, self.offset, self._tempDataBuffer)
-            self.offset = 0
-            self._tempDataBuffer = []
-            self._tempDataLen = 0
-
-        # Send as much data as you can.
-        if self.offset:
-            l = self.writeSomeData(lazyByteSlice(self.dataBuffer, self.offset))
-        else:
-            l = self.writeSomeData(self.dataBuffer)
-
-        # There is no writeSomeData implementation in Twisted which returns
-        # < 0, but the documentation for writeSomeData used to claim negative
-        # integers meant connection lost.  Keep supporting this here,
-        # although it may be worth deprecating and removing at some point.
-        if isinstance(l, Exception) or l < 0:
-            return l
-        self.offset += l
+        if (self._fileToWrite is None or self._tempDataLen or
+                self.offset < len(self.dataBuffer)):
+            if self.vectoredWrites:
+                l = self._writeVectors()
+            else:
+                l = self._writeConcatenated()
+
+            # There is no writeSomeData implementation in Twisted which
+            # returns < 0, but the documentation for writeSomeData used to
+            # claim negative integers meant connection lost.  Keep supporting
+            # this here, although it may be worth deprecating and removing at
+            # some point.
+            if isinstance(l, Exception) or l < 0:
+                return l
         # If there is nothing left to send,
         if self.offset == len(self.dataBuffer) and not self._tempDataLen:
+            # except for a file,
+            if self._fileToWrite is not None:
+                l = self._writeFile()
+                if isinstance(l, Exception) or l < 0:
+                    return l
+                if self._fileToWrite is not None:
+                    # keep writing it.
+                    return None
             self.dataBuffer = b""
             self.offset = 0
             # stop writing.
@@ -288,6 +368,99 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
                 return result
         return None
 
+
+    def _writeFile(self):
+        """
+        Write as much as possible of the file passed to C{writeFile},
+        forgetting about it once all of it has been written.
+
+        @return: The result of C{writeSomeFile}.
+        """
+        fileno, offset, count = self._fileToWrite
+        l = self.writeSomeFile(fileno, offset, count)
+        if not (isinstance(l, Exception) or l < 0):
+            if l < count:
+                self._fileToWrite = (fileno, offset + l, count - l)
+            else:
+                self._fileToWrite = None
+        return l
+
+
+    def _writeConcatenated(self):
+        """
+        Concatenate the buffered chunks onto the unsent remainder of
+        C{dataBuffer} and write as much of it as possible, advancing
+        C{offset} past whatever was written.
+
+        @return: The result of C{writeSomeData}.
+        """
+        if len(self.dataBuffer) - self.offset < self.SEND_LIMIT:
+            # If there is currently less than SEND_LIMIT bytes left to send
+            # in the string, extend it with the array data.
+            self.dataBuffer = _concatenate(
+                self.dataBuffer, self.offset, self._tempDataBuffer)
+            self.offset = 0
+            self._tempDataBuffer = deque()
+            self._tempDataLen = 0
+
+        # Send as much data as you can.
+        if self.offset:
+            l = self.writeSomeData(lazyByteSlice(self.dataBuffer, self.offset))
+        else:
+            l = self.writeSomeData(self.dataBuffer)
+        if not (isinstance(l, Exception) or l < 0):
+            self.offset += l
+        return l
+
+
+    def _writeVectors(self):
+        """
+        Write as much as possible of the unsent remainder of C{dataBuffer}
+        followed by the buffered chunks, without concatenating them.
+
+        Chunks which were written completely are discarded.  If a chunk was
+        only partly written, it becomes C{dataBuffer} and C{offset} records
+        how much of it was written.
+
+        @return: The result of C{writeSomeVectors}.
+        """
+        vectors = []
+        size = len(self.dataBuffer) - self.offset
+        if size:
+            vectors.append(lazyByteSlice(self.dataBuffer, self.offset))
+        for chunk in self._tempDataBuffer:
+            if size >= self.SEND_LIMIT or (
+                    len(vectors) >= self.SEND_IOVEC_LIMIT):
+                break
+            vectors.append(chunk)
+            size += len(chunk)
+
+        l = self.writeSomeVectors(vectors)
+        if isinstance(l, Exception) or l < 0:
+            return l
+
+        written = l
+        remaining = len(self.dataBuffer) - self.offset
+        if written < remaining:
+            self.offset += written
+            return l
+        written -= remaining
+        self.dataBuffer = b""
+        self.offset = 0
+        while written:
+            chunk = self._tempDataBuffer.popleft()
+            self._tempDataLen -= len(chunk)
+            if written < len(chunk):
+                self.dataBuffer = chunk
+                self.offset = written
+                break
+            written -= len(chunk)
+        if not self._tempDataLen:
+            # Only empty chunks, if any, are left.
+            self._tempDataBuffer.clear()
+        return l
+
+
     def _postLoseConnection(self):
         """Called after a loseConnection(), when all data has been written.
 
@@ -383,6 +556,40 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
         self.startWriting()
 
 
+    def writeFile(self, fileno, offset, count):
+        """
+        Reliably write part of a file, after everything written so far,
+        without reading it into memory.
+
+        This can only be used if C{fileWrites} is C{True}.  Nothing else may
+        be written until all of the file has been; a registered non-streaming
+        producer can tell when that is, because its C{resumeProducing()}
+        method is called, as it would be once written data was.  The file
+        must not be closed until then, either.
+
+        @param fileno: The file descriptor of the file to write from.
+        @type fileno: L{int}
+
+        @param offset: The offset in the file of the first byte to write.
+        @type offset: L{int}
+
+        @param count: The number of bytes to write.
+        @type count: L{int}
+
+        @raise RuntimeError: If part of another file is still being written.
+
+        @since: 16.5
+        """
+        if self._fileToWrite is not None:
+            raise RuntimeError(
+                "Cannot write a file before the last one has been written.")
+        if not self.connected or self._writeDisconnected:
+            return
+        if count > 0:
+            self._fileToWrite = (fileno, offset, count)
+            self.startWriting()
+
+
     def loseConnection(self, _connDone=failure.Failure(main.CONNECTION_DONE)):
         """Close the connection at the next available opportunity.
 
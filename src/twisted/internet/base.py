@@ -12,6 +12,7 @@ import socket # needed only for sync-dns
 from zope.interface import implementer, classImplements
 
 import sys
+import math
 import warnings
 from heapq import heappush, heappop, heapify
 
@@ -20,6 +21,7 @@ import traceback
 from twisted.internet.interfaces import IReactorCore, IReactorTime, IReactorThreads
 from twisted.internet.interfaces import IResolverSimple, IReactorPluggableResolver
 from twisted.internet.interfaces import IConnector, IDelayedCall
+from twisted.internet.interfaces import ITimerStore
 from twisted.internet import fdesc, main, error, abstract, defer, threads
 from twisted.python import log, failure, reflect
 from twisted.python.compat import unicode, iteritems
@@ -210,6 +212,351 @@ class DelayedCall:
 
 
 
+@implementer(ITimerStore)
+class HeapTimerStore(object):
+    """
+    An L{ITimerStore} which keeps calls in a binary heap ordered by time.
+
+    This is the default timer store of L{ReactorBase}.  Adding a call is
+    O(log n), but moving a call earlier is O(n) and cancelled calls stay in
+    the heap until they are due or until they make up more than half of it.
+
+    @ivar _pendingTimedCalls: The heap of calls.
+    @ivar _newTimedCalls: Calls added since the heap was last updated.
+    @ivar _cancellations: The number of cancelled calls still in the heap.
+    """
+
+    def __init__(self):
+        self._pendingTimedCalls = []
+        self._newTimedCalls = []
+        self._cancellations = 0
+
+
+    def add(self, call):
+        """
+        See L{ITimerStore.add}.
+        """
+        self._newTimedCalls.append(call)
+
+
+    def cancel(self, call):
+        """
+        See L{ITimerStore.cancel}.
+        """
+        self._cancellations += 1
+
+
+    def reschedule(self, call):
+        """
+        See L{ITimerStore.reschedule}.
+        """
+        # Linear time find: slow.
+        heap = self._pendingTimedCalls
+        try:
+            pos = heap.index(call)
+
+            # Move elt up the heap until it rests at the right place.
+            elt = heap[pos]
+            while pos != 0:
+                parent = (pos-1) // 2
+                if heap[parent] <= elt:
+                    break
+                # move parent down
+                heap[pos] = heap[parent]
+                pos = parent
+            heap[pos] = elt
+        except ValueError:
+            # element was not found in heap - oh well...
+            pass
+
+
+    def _insertNewDelayedCalls(self):
+        for call in self._newTimedCalls:
+            if call.cancelled:
+                self._cancellations-=1
+            else:
+                call.activate_delay()
+                heappush(self._pendingTimedCalls, call)
+        self._newTimedCalls = []
+
+
+    def nextTime(self):
+        """
+        See L{ITimerStore.nextTime}.
+        """
+        # insert new delayed calls to make sure to include them in timeout value
+        self._insertNewDelayedCalls()
+
+        if not self._pendingTimedCalls:
+            return None
+        return self._pendingTimedCalls[0].time
+
+
+    def expired(self, now):
+        """
+        See L{ITimerStore.expired}.
+        """
+        # insert new delayed calls now
+        self._insertNewDelayedCalls()
+
+        while self._pendingTimedCalls and (self._pendingTimedCalls[0].time <= now):
+            call = heappop(self._pendingTimedCalls)
+            if call.cancelled:
+                self._cancellations-=1
+                continue
+
+            if call.delayed_time > 0:
+                call.activate_delay()
+                heappush(self._pendingTimedCalls, call)
+                continue
+
+            yield call
+
+        if (self._cancellations > 50 and
+             self._cancellations > len(self._pendingTimedCalls) >> 1):
+            self._cancellations = 0
+            self._pendingTimedCalls = [x for x in self._pendingTimedCalls
+                                       if not x.cancelled]
+            heapify(self._pendingTimedCalls)
+
+
+    def getDelayedCalls(self):
+        """
+        See L{ITimerStore.getDelayedCalls}.
+        """
+        return [x for x in (self._pendingTimedCalls + self._newTimedCalls)
+                if not x.cancelled]
+
+
+
+@implementer(ITimerStore)
+class TimingWheelTimerStore(object):
+    """
+    An L{ITimerStore} which keeps calls in a hierarchical timing wheel.
+
+    Time is divided into ticks of C{resolution} seconds.  The first level of
+    the wheel has a bucket for each of the next C{slots} ticks; each further
+    level has buckets C{slots} times wider than the level below it, and the
+    last level is unbounded.  Whenever the wheel reaches the start of a
+    bucket on a higher level, the calls in it are moved down to narrower
+    buckets.  Adding, cancelling and moving a call earlier are O(1); delaying
+    a call is handled when its original bucket is reached, also in O(1).
+
+    This suits reactors with very many timeouts which are reset or cancelled
+    long before they expire.  The price is that calls may run up to one tick
+    later than they are scheduled to (they are never run early).
+
+    @ivar _resolution: The length of a tick, in seconds.
+    @ivar _spans: The number of ticks covered by one bucket of each level.
+    @ivar _limits: The number of ticks ahead covered by each level but the
+        last.
+    @ivar _levels: For each level, a L{dict} mapping the index of a bucket
+        (its first tick divided by the level's span) to a L{dict} of the calls
+        in it, each mapped to the order in which it was added.
+    @ivar _ready: A bucket of calls which were due, or nearly due, when they
+        were placed in the wheel.
+    @ivar _buckets: A L{dict} mapping each tracked call to its bucket.
+    @ivar _current: The first tick which has not been processed yet.
+    @ivar _nextTick: A tick no later than the start of the earliest non-empty
+        bucket, or L{None} if that has to be recomputed.
+    @ivar _counter: The order in which the next call is added.
+    """
+
+    def __init__(self, resolution=0.001, slots=256, levels=4):
+        """
+        @param resolution: The length of a tick, in seconds.
+        @type resolution: L{float}
+
+        @param slots: The number of buckets per level, other than the last.
+        @type slots: L{int}
+
+        @param levels: The number of levels of the wheel.
+        @type levels: L{int}
+        """
+        self._resolution = resolution
+        self._spans = [slots ** level for level in range(levels)]
+        self._limits = self._spans[1:]
+        self._levels = [{} for level in range(levels)]
+        self._buckets = {}
+        self._ready = {}
+        self._current = None
+        self._nextTick = None
+        self._counter = 0
+
+
+    def _place(self, call, order):
+        """
+        Put a call in the narrowest bucket covering its time.
+
+        @param call: The call to place.
+        @type call: L{DelayedCall}
+
+        @param order: The order in which C{call} was added.
+        @type order: L{int}
+        """
+        # The tick at the end of which the call must be run: the first one
+        # starting no earlier than its time.
+        tick = int(math.ceil(call.time / self._resolution))
+        delta = tick - self._current
+        if delta < 0:
+            # Its tick has already been processed, so it was due when the
+            # wheel was last checked.
+            bucket = self._ready
+        else:
+            spans = self._spans
+            level = 0
+            for span in self._limits:
+                if delta < span:
+                    break
+                level += 1
+            span = spans[level]
+            key = tick // span
+            buckets = self._levels[level]
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = {}
+                start = key * span
+                if self._nextTick is not None and start < self._nextTick:
+                    self._nextTick = start
+        bucket[call] = order
+        self._buckets[call] = bucket
+
+
+    def add(self, call):
+        """
+        See L{ITimerStore.add}.
+        """
+        if not self._buckets:
+            # With nothing else in the wheel it can be moved to the present
+            # time, so that the call lands in the narrowest possible bucket.
+            now = int(math.floor(call.seconds() / self._resolution))
+            if self._current is None or now > self._current:
+                self._current = now
+        self._counter += 1
+        if call.time <= self._current * self._resolution:
+            # It is due, or will be before the wheel next moves on; keep it
+            # where it will be looked at straight away.
+            self._ready[call] = self._counter
+            self._buckets[call] = self._ready
+        else:
+            self._place(call, self._counter)
+
+
+    def cancel(self, call):
+        """
+        See L{ITimerStore.cancel}.
+        """
+        bucket = self._buckets.pop(call, None)
+        if bucket is not None:
+            del bucket[call]
+
+
+    def reschedule(self, call):
+        """
+        See L{ITimerStore.reschedule}.
+        """
+        bucket = self._buckets.pop(call, None)
+        if bucket is None:
+            # It has already been taken out of the wheel and is about to run.
+            return
+        self._place(call, bucket.pop(call))
+
+
+    def _earliestTick(self):
+        """
+        @return: The start of the earliest non-empty bucket, or L{None} if the
+            wheel is empty.
+        """
+        if self._nextTick is None:
+            # Buckets emptied by cancellation are left in place until they
+            # are reached, rather than being looked for here.
+            starts = [min(buckets) * span
+                      for span, buckets in zip(self._spans, self._levels)
+                      if buckets]
+            if starts:
+                self._nextTick = min(starts)
+        return self._nextTick
+
+
+    def nextTime(self):
+        """
+        See L{ITimerStore.nextTime}.
+        """
+        if not self._buckets:
+            return None
+        if self._ready:
+            return min(call.time for call in self._ready)
+        return self._earliestTick() * self._resolution
+
+
+    def expired(self, now):
+        """
+        See L{ITimerStore.expired}.
+        """
+        if not self._buckets:
+            return
+        nowTick = int(math.floor(now / self._resolution))
+        due = []
+        ready, self._ready = self._ready, {}
+        for call, order in ready.items():
+            del self._buckets[call]
+            due.append((call.time, order, call))
+        while self._buckets and self._current <= nowTick:
+            tick = self._earliestTick()
+            if tick is None or tick > nowTick:
+                break
+            self._current = tick
+            self._nextTick = None
+            # Move calls out of wider buckets starting here, widest first, so
+            # that they are in the right place when the next level down is
+            # processed.
+            for level in range(len(self._spans) - 1, 0, -1):
+                span = self._spans[level]
+                if tick % span:
+                    continue
+                bucket = self._levels[level].pop(tick // span, None)
+                if bucket:
+                    for call, order in bucket.items():
+                        # Apply any delay now rather than when it is found
+                        # in a narrower bucket, to avoid moving it twice.
+                        call.activate_delay()
+                        self._place(call, order)
+            self._current = tick + 1
+            bucket = self._levels[0].pop(tick, None)
+            if bucket:
+                for call, order in bucket.items():
+                    if call.delayed_time > 0:
+                        # It was reset to a later time; it may still be due.
+                        call.activate_delay()
+                        self._place(call, order)
+                    else:
+                        del self._buckets[call]
+                        due.append((call.time, order, call))
+        if self._current <= nowTick:
+            self._current = nowTick + 1
+        self._nextTick = None
+        due.sort()
+
+        for time, order, call in due:
+            if call.cancelled or call.called:
+                continue
+            if call.delayed_time > 0 or call.time > now:
+                # It was reset to a later time by a call which ran before it,
+                # or it is not quite due yet.
+                call.activate_delay()
+                self._place(call, order)
+                continue
+            yield call
+
+
+    def getDelayedCalls(self):
+        """
+        See L{ITimerStore.getDelayedCalls}.
+        """
+        return list(self._buckets)
+
+
+
 @implementer(IResolverSimple)
 class ThreadedResolver(object):
     """
@@ -461,6 +808,9 @@ class ReactorBase(object):
     @ivar _registerAsIOThread: A flag controlling whether the reactor will
         register the thread it is running in as the I/O thread when it starts.
         If C{True}, registration will be done, otherwise it will not be.
+
+    @ivar _timerStore: The L{ITimerStore} provider keeping track of delayed
+        calls; see L{installTimerStore}.
     """
 
     _registerAsIOThread = True
@@ -475,9 +825,7 @@ class ReactorBase(object):
     def __init__(self):
         self.threadCallQueue = []
         self._eventTriggers = {}
-        self._pendingTimedCalls = []
-        self._newTimedCalls = []
-        self._cancellations = 0
+        self._timerStore = HeapTimerStore()
         self.running = False
         self._started = False
         self._justStopped = False
@@ -710,31 +1058,31 @@ class ReactorBase(object):
                            self._cancelCallLater,
                            self._moveCallLaterSooner,
                            seconds=self.seconds)
-        self._newTimedCalls.append(tple)
+        self._timerStore.add(tple)
         return tple
 
     def _moveCallLaterSooner(self, tple):
-        # Linear time find: slow.
-        heap = self._pendingTimedCalls
-        try:
-            pos = heap.index(tple)
-
-            # Move elt up the heap until it rests at the right place.
-            elt = heap[pos]
-            while pos != 0:
-                parent = (pos-1) // 2
-                if heap[parent] <= elt:
-                    break
-                # move parent down
-                heap[pos] = heap[parent]
-                pos = parent
-            heap[pos] = elt
-        except ValueError:
-            # element was not found in heap - oh well...
-            pass
+        self._timerStore.reschedule(tple)
 
     def _cancelCallLater(self, tple):
-        self._cancellations+=1
+        self._timerStore.cancel(tple)
+
+
+    def installTimerStore(self, store):
+        """
+        Replace the data structure used to keep track of delayed calls.
+
+        Any delayed calls which are outstanding are moved to the new store.
+
+        @param store: The new timer store.
+        @type store: L{ITimerStore} provider
+
+        @since: 16.5
+        """
+        calls = self._timerStore.getDelayedCalls()
+        self._timerStore = store
+        for call in calls:
+            store.add(call)
 
 
     def getDelayedCalls(self):
@@ -742,16 +1090,7 @@ class ReactorBase(object):
         They are returned in no particular order.
         This method is not efficient -- it is really only meant for
         test cases."""
-        return [x for x in (self._pendingTimedCalls + self._newTimedCalls) if not x.cancelled]
-
-    def _insertNewDelayedCalls(self):
-        for call in self._newTimedCalls:
-            if call.cancelled:
-                self._cancellations-=1
-            else:
-                call.activate_delay()
-                heappush(self._pendingTimedCalls, call)
-        self._newTimedCalls = []
+        return self._timerStore.getDelayedCalls()
 
 
     def timeout(self):
@@ -763,13 +1102,11 @@ class ReactorBase(object):
         @return: The maximum number of seconds the reactor may sleep.
         @rtype: L{float}
         """
-        # insert new delayed calls to make sure to include them in timeout value
-        self._insertNewDelayedCalls()
-
-        if not self._pendingTimedCalls:
+        nextTime = self._timerStore.nextTime()
+        if nextTime is None:
             return None
 
-        delay = self._pendingTimedCalls[0].time - self.seconds()
+        delay = nextTime - self.seconds()
 
         # Pick a somewhat arbitrary maximum possible value for the timeout.
         # This value is 2 ** 31 / 1000, which is the number of seconds which can
@@ -805,21 +1142,8 @@ class ReactorBase(object):
             if self.threadCallQueue:
                 self.wakeUp()
 
-        # insert new delayed calls now
-        self._insertNewDelayedCalls()
-
         now = self.seconds()
-        while self._pendingTimedCalls and (self._pendingTimedCalls[0].time <= now):
-            call = heappop(self._pendingTimedCalls)
-            if call.cancelled:
-                self._cancellations-=1
-                continue
-
-            if call.delayed_time > 0:
-                call.activate_delay()
-                heappush(self._pendingTimedCalls, call)
-                continue
-
+        for call in self._timerStore.expired(now):
             try:
                 call.called = 1
                 call.func(*call.args, **call.kw)
@@ -834,14 +1158,6 @@ class ReactorBase(object):
                     e += "\n"
                     log.msg(e)
 
-
-        if (self._cancellations > 50 and
-             self._cancellations > len(self._pendingTimedCalls) >> 1):
-            self._cancellations = 0
-            self._pendingTimedCalls = [x for x in self._pendingTimedCalls
-                                       if not x.cancelled]
-            heapify(self._pendingTimedCalls)
-
         if self._justStopped:
             self._justStopped = False
             self.fireSystemEvent("shutdown")
@@ -84,7 +84,14 @@ def succeed(result):
     @rtype: L{Deferred}
     """
     d = Deferred()
-    d.callback(result)
+    if Deferred.debug:
+        d.callback(result)
+    else:
+        # There are no callbacks to run yet, so there is no need to go through
+        # Deferred.callback, but the same check of the result is made.
+        assert not isinstance(result, Deferred)
+        d.called = True
+        d.result = result
     return d
 
 
@@ -193,7 +200,7 @@ _CONTINUE = object()
 
 
 
-class Deferred:
+class Deferred(object):
     """
     This is a callback which will be put off until later.
 
@@ -238,22 +245,42 @@ class Deferred:
         L{None}.
     """
 
-    called = False
-    paused = False
-    _debugInfo = None
-    _suppressAlreadyCalled = False
-
-    # Are we currently running a user-installed callback?  Meant to prevent
-    # recursive running of callbacks when a reentrant call to add a callback is
-    # used.
-    _runningCallbacks = False
+    # Most Deferreds only ever have these attributes, so keep them in slots
+    # rather than a dictionary.  __dict__ is still allowed for the sake of
+    # subclasses and code which stores its own attributes on a Deferred; it is
+    # only created if something does so.
+    __slots__ = ('callbacks', 'result', 'called', 'paused', '_canceller',
+                 '_debugInfo', '_suppressAlreadyCalled', '_runningCallbacks',
+                 '_chainedTo', '__dict__', '__weakref__')
+
+    # The values of the slots above which were class attributes before
+    # Deferred had slots, for Deferreds which have not set them, such as those
+    # of subclasses which do not call Deferred.__init__.
+    _slotDefaults = {
+        'called': False,
+        'paused': False,
+        '_debugInfo': None,
+        '_suppressAlreadyCalled': False,
+        '_runningCallbacks': False,
+        '_chainedTo': None,
+    }
+
+    def __getattr__(self, name):
+        """
+        Look up the default value of an attribute in C{_slotDefaults}, which
+        is only done if the attribute has not been set.
+        """
+        try:
+            return self._slotDefaults[name]
+        except KeyError:
+            raise AttributeError(
+                "%r object has no attribute %r" % (
+                    self.__class__.__name__, name))
 
     # Keep this class attribute for now, for compatibility with code that
     # sets it directly.
     debug = False
 
-    _chainedTo = None
-
     def __init__(self, canceller=None):
         """
         Initialize a L{Deferred}.
@@ -279,7 +306,16 @@ class Deferred:
             return result is ignored.
         """
         self.callbacks = []
+        self.called = False
+        self.paused = False
         self._canceller = canceller
+        self._debugInfo = None
+        self._suppressAlreadyCalled = False
+        # Are we currently running a user-installed callback?  Meant to
+        # prevent recursive running of callbacks when a reentrant call to add
+        # a callback is used.
+        self._runningCallbacks = False
+        self._chainedTo = None
         if self.debug:
             self._debugInfo = DebugInfo()
             self._debugInfo.creator = traceback.format_stack()[:-1]
@@ -539,6 +575,11 @@ class Deferred:
             # Don't recursively run callbacks
             return
 
+        # This loop runs for every callback of every Deferred, so the names it
+        # needs are looked up once here rather than on each iteration.
+        Failure = failure.Failure
+        captureVars = self.debug
+
         # Keep track of all the Deferreds encountered while propagating results
         # up a chain.  The way a Deferred gets onto this stack is by having
         # added its _continuation() to the callbacks list of a second Deferred
@@ -557,69 +598,84 @@ class Deferred:
 
             finished = True
             current._chainedTo = None
-            while current.callbacks:
-                item = current.callbacks.pop(0)
-                callback, args, kw = item[
-                    isinstance(current.result, failure.Failure)]
-                args = args or ()
-                kw = kw or {}
-
-                # Avoid recursion if we can.
-                if callback is _CONTINUE:
-                    # Give the waiting Deferred our current result and then
-                    # forget about that result ourselves.
-                    chainee = args[0]
-                    chainee.result = current.result
-                    current.result = None
-                    # Making sure to update _debugInfo
-                    if current._debugInfo is not None:
-                        current._debugInfo.failResult = None
-                    chainee.paused -= 1
-                    chain.append(chainee)
-                    # Delay cleaning this Deferred and popping it from the chain
-                    # until after we've dealt with chainee.
-                    finished = False
-                    break
+            callbacks = current.callbacks
+            current._runningCallbacks = True
+            try:
+                while callbacks:
+                    item = callbacks.pop(0)
+                    callback, args, kw = item[
+                        isinstance(current.result, Failure)]
+
+                    # Avoid recursion if we can.
+                    if callback is _CONTINUE:
+                        # Give the waiting Deferred our current result and then
+                        # forget about that result ourselves.
+                        chainee = args[0]
+                        chainee.result = current.result
+                        current.result = None
+                        # Making sure to update _debugInfo
+                        if current._debugInfo is not None:
+                            current._debugInfo.failResult = None
+                        chainee.paused -= 1
+                        chain.append(chainee)
+                        # Delay cleaning this Deferred and popping it from the
+                        # chain until after we've dealt with chainee.
+                        finished = False
+                        break
 
-                try:
-                    current._runningCallbacks = True
                     try:
-                        current.result = callback(current.result, *args, **kw)
-                        if current.result is current:
+                        # Most callbacks are added without extra arguments,
+                        # so avoid building an argument tuple and keyword
+                        # dictionary for them.
+                        if kw:
+                            result = callback(current.result, *(args or ()),
+                                              **kw)
+                        elif args:
+                            result = callback(current.result, *args)
+                        else:
+                            result = callback(current.result)
+                        current.result = result
+                        if result is current:
                             warnAboutFunction(
                                 callback,
                                 "Callback returned the Deferred "
                                 "it was attached to; this breaks the "
                                 "callback chain and will raise an "
                                 "exception in the future.")
-                    finally:
-                        current._runningCallbacks = False
-                except:
-                    # Including full frame information in the Failure is quite
-                    # expensive, so we avoid it unless self.debug is set.
-                    current.result = failure.Failure(captureVars=self.debug)
-                else:
-                    if isinstance(current.result, Deferred):
-                        # The result is another Deferred.  If it has a result,
-                        # we can take it and keep going.
-                        resultResult = getattr(current.result, 'result', _NO_RESULT)
-                        if resultResult is _NO_RESULT or isinstance(resultResult, Deferred) or current.result.paused:
-                            # Nope, it didn't.  Pause and chain.
-                            current.pause()
-                            current._chainedTo = current.result
-                            # Note: current.result has no result, so it's not
-                            # running its callbacks right now.  Therefore we can
-                            # append to the callbacks list directly instead of
-                            # using addCallbacks.
-                            current.result.callbacks.append(current._continuation())
-                            break
-                        else:
-                            # Yep, it did.  Steal it.
-                            current.result.result = None
-                            # Make sure _debugInfo's failure state is updated.
-                            if current.result._debugInfo is not None:
-                                current.result._debugInfo.failResult = None
-                            current.result = resultResult
+                    except:
+                        # Including full frame information in the Failure is
+                        # quite expensive, so we avoid it unless self.debug is
+                        # set.
+                        current.result = Failure(captureVars=captureVars)
+                        continue
+
+                    if not isinstance(result, Deferred):
+                        continue
+
+                    # The result is another Deferred.  If it has a result, we
+                    # can take it and keep going.
+                    resultResult = getattr(result, 'result', _NO_RESULT)
+                    if (resultResult is _NO_RESULT or
+                            isinstance(resultResult, Deferred) or
+                            result.paused):
+                        # Nope, it didn't.  Pause and chain.
+                        current.pause()
+                        current._chainedTo = result
+                        # Note: result has no result, so it's not running its
+                        # callbacks right now.  Therefore we can append to the
+                        # callbacks list directly instead of using
+                        # addCallbacks.
+                        result.callbacks.append(current._continuation())
+                        break
+                    else:
+                        # Yep, it did.  Steal it.
+                        result.result = None
+                        # Make sure _debugInfo's failure state is updated.
+                        if result._debugInfo is not None:
+                            result._debugInfo.failResult = None
+                        current.result = resultResult
+            finally:
+                current._runningCallbacks = False
 
             if finished:
                 # As much of the callback chain - perhaps all of it - as can be
@@ -662,16 +718,55 @@ class Deferred:
 
 
     def __iter__(self):
-
-        if getattr(self, "result", _NO_RESULT) is _NO_RESULT:
-            yield self
-        raise StopIteration(self.result)
+        return _DeferredIterator(self)
 
     # For PEP492/async + await
     __await__ = __iter__
 
 
 
+class _DeferredIterator(object):
+    """
+    The iterator used to C{await} (or C{yield from}) a L{Deferred}.
+
+    It yields the L{Deferred} itself if it does not have a result yet, and
+    then stops with the L{Deferred}'s result.  This is equivalent to a
+    generator, but cheaper to create and to resume, and raising
+    L{StopIteration} is the usual way for an iterator to finish.
+
+    @ivar _deferred: The L{Deferred} being waited for.
+
+    @ivar _yielded: Whether the L{Deferred} has been yielded.
+    """
+    __slots__ = ('_deferred', '_yielded')
+
+    def __init__(self, deferred):
+        self._deferred = deferred
+        self._yielded = False
+
+
+    def __iter__(self):
+        return self
+
+
+    def send(self, value=None):
+        """
+        Yield the L{Deferred} if it has no result yet, or stop with its result.
+
+        @param value: Ignored; when resumed after the L{Deferred} has been
+            yielded, the L{Deferred}'s result is used instead.
+        """
+        deferred = self._deferred
+        if not self._yielded:
+            self._yielded = True
+            if getattr(deferred, "result", _NO_RESULT) is _NO_RESULT:
+                return deferred
+        raise StopIteration(deferred.result)
+
+    __next__ = next = send
+
+
+
 def ensureDeferred(coro):
     """
     Transform a coroutine that uses L{Deferred}s into a L{Deferred} itself.
@@ -700,7 +795,112 @@ def ensureDeferred(coro):
 
         react(main)
     """
-    return _inlineCallbacks(None, coro, Deferred())
+    if isinstance(coro, types.GeneratorType):
+        # Generators (using "yield from") may use returnValue and so on, so
+        # drive them in the same way as inlineCallbacks generators.
+        return _inlineCallbacks(None, coro, Deferred())
+    deferred = Deferred()
+    _CoroutineTask(coro, deferred)._step(None)
+    return deferred
+
+
+
+class _CoroutineTask(object):
+    """
+    Drive a coroutine for L{ensureDeferred}, resuming it with the result of
+    each L{Deferred} it awaits, until it returns.
+
+    Unlike L{_inlineCallbacks}, which has to allow for generators, this uses
+    the same callback (L{_resume}) for every L{Deferred} the coroutine waits
+    for, so that no closure or other state is allocated per C{await}.
+
+    @ivar _coro: The coroutine.
+
+    @ivar _deferred: The L{Deferred} to give the coroutine's result to.
+
+    @ivar _callbacks: The callback and errback pair to add to the callbacks
+        of a L{Deferred} the coroutine awaits, which both call L{_resume}.
+        Like the bound method they refer to, it is made once per task.
+
+    @ivar _stepping: C{True} while L{_step} is running.
+
+    @ivar _result: The result given to L{_resume} while L{_step} was running,
+        if any, or L{_NO_RESULT}.
+    """
+    __slots__ = ('_coro', '_deferred', '_callbacks', '_stepping', '_result')
+
+    def __init__(self, coro, deferred):
+        self._coro = coro
+        self._deferred = deferred
+        resume = self._resume
+        self._callbacks = ((resume, None, None), (resume, None, None))
+        self._stepping = False
+        self._result = _NO_RESULT
+
+
+    def _step(self, result):
+        """
+        Send C{result} (throwing it, if it is a L{failure.Failure}) into the
+        coroutine, and keep doing so with the results of whatever it awaits
+        until it returns or has to wait for a L{Deferred} without a result.
+
+        @param result: The value to resume the coroutine with.
+        """
+        coro = self._coro
+        Failure = failure.Failure
+        self._stepping = True
+        try:
+            while True:
+                try:
+                    if isinstance(result, Failure):
+                        result = result.throwExceptionIntoGenerator(coro)
+                    else:
+                        result = coro.send(result)
+                except StopIteration as e:
+                    self._deferred.callback(getattr(e, "value", None))
+                    return
+                except _DefGen_Return as e:
+                    self._deferred.callback(e.value)
+                    return
+                except:
+                    self._deferred.errback()
+                    return
+
+                if not isinstance(result, Deferred):
+                    # Something other than a Deferred was awaited; give it
+                    # straight back, as _inlineCallbacks does.
+                    continue
+
+                if result.called:
+                    result.addBoth(self._resume)
+                else:
+                    # Nothing can be running the callbacks of a Deferred
+                    # which has not been called, so there is no need for
+                    # addCallbacks.
+                    result.callbacks.append(self._callbacks)
+                if self._result is _NO_RESULT:
+                    # The coroutine has to wait; _resume will carry on once
+                    # the Deferred has a result.
+                    return
+                result, self._result = self._result, _NO_RESULT
+        finally:
+            self._stepping = False
+
+
+    def _resume(self, result):
+        """
+        Resume the coroutine with the result of the L{Deferred} it awaited.
+
+        If the L{Deferred} already had a result, this is called while the
+        coroutine is being stepped, so the result is left for L{_step} to
+        pick up rather than stepping recursively.
+
+        @param result: The result of the awaited L{Deferred}.
+        """
+        if self._stepping:
+            self._result = result
+        else:
+            self._step(result)
 
 
 
@@ -86,7 +86,8 @@ class _WrappingProtocol(Protocol):
         self._wrappedProtocol = wrappedProtocol
 
         for iface in [interfaces.IHalfCloseableProtocol,
-                      interfaces.IFileDescriptorReceiver]:
+                      interfaces.IFileDescriptorReceiver,
+                      interfaces.IHandshakeListener]:
             if iface.providedBy(self._wrappedProtocol):
                 directlyProvides(self, iface)
 
@@ -146,6 +147,14 @@ class _WrappingProtocol(Protocol):
         self._wrappedProtocol.writeConnectionLost()
 
 
+    def handshakeCompleted(self):
+        """
+        Proxy L{interfaces.IHandshakeListener} to our
+        C{self._wrappedProtocol}.
+        """
+        self._wrappedProtocol.handshakeCompleted()
+
+
 
 class _WrappingFactory(ClientFactory):
     """
@@ -171,6 +180,9 @@ class _WrappingFactory(ClientFactory):
         self._wrappedFactory = wrappedFactory
         self._onConnection = defer.Deferred(canceller=self._canceller)
 
+        if interfaces.IProtocolNegotiationFactory.providedBy(wrappedFactory):
+            directlyProvides(self, interfaces.IProtocolNegotiationFactory)
+
 
     def startedConnecting(self, connector):
         """
@@ -219,6 +231,15 @@ class _WrappingFactory(ClientFactory):
         self._wrappedFactory.doStop()
 
 
+    def acceptableProtocols(self):
+        """
+        Proxy L{interfaces.IProtocolNegotiationFactory} to our
+        C{self._wrappedFactory}, so that the protocols it wants to negotiate
+        over TLS are offered.
+        """
+        return self._wrappedFactory.acceptableProtocols()
+
+
     def buildProtocol(self, addr):
         """
         Proxy C{buildProtocol} to our C{self._wrappedFactory} or errback the
@@ -438,11 +459,16 @@ class ProcessEndpoint(object):
 class _TCPServerEndpoint(object):
     """
     A TCP server endpoint interface
+
+    @ivar _addressFamily: The address family of the socket created when
+        C{reusePort} is true.
     """
+    _addressFamily = AF_INET
 
-    def __init__(self, reactor, port, backlog, interface):
+    def __init__(self, reactor, port, backlog, interface, reusePort=False):
         """
-        @param reactor: An L{IReactorTCP} provider.
+        @param reactor: An L{IReactorTCP} provider.  If C{reusePort} is true,
+            it must also provide L{IReactorSocket}.
 
         @param port: The port number used for listening
         @type port: int
@@ -452,11 +478,17 @@ class _TCPServerEndpoint(object):
 
         @param interface: The hostname to bind to
         @type interface: str
+
+        @param reusePort: If true, set C{SO_REUSEPORT} on the listening
+            socket, so that several processes can listen on the same port
+            and have the kernel distribute connections among them.
+        @type reusePort: L{bool}
         """
         self._reactor = reactor
         self._port = port
         self._backlog = backlog
         self._interface = interface
+        self._reusePort = reusePort
 
 
     def listen(self, protocolFactory):
@@ -464,6 +496,8 @@ class _TCPServerEndpoint(object):
         Implement L{IStreamServerEndpoint.listen} to listen on a TCP
         socket
         """
+        if self._reusePort:
+            return defer.execute(self._listenReusingPort, protocolFactory)
         return defer.execute(self._reactor.listenTCP,
                              self._port,
                              protocolFactory,
@@ -471,14 +505,47 @@ class _TCPServerEndpoint(object):
                              interface=self._interface)
 
 
+    def _listenReusingPort(self, protocolFactory):
+        """
+        Create, bind and listen on a socket with C{SO_REUSEPORT} set, then
+        hand it to the reactor with L{IReactorSocket.adoptStreamPort}.
+
+        @raise CannotListenError: If the socket could not be set up.
+
+        @return: An L{IListeningPort} provider.
+        """
+        reusePort = getattr(socket, "SO_REUSEPORT", None)
+        if reusePort is None:
+            raise error.CannotListenError(
+                self._interface, self._port,
+                "SO_REUSEPORT is not supported on this platform")
+        skt = socket.socket(self._addressFamily, socket.SOCK_STREAM)
+        try:
+            try:
+                skt.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                skt.setsockopt(socket.SOL_SOCKET, reusePort, 1)
+                skt.bind((self._interface, self._port))
+                skt.listen(self._backlog)
+            except socket.error as e:
+                raise error.CannotListenError(self._interface, self._port, e)
+            skt.setblocking(False)
+            return self._reactor.adoptStreamPort(
+                skt.fileno(), self._addressFamily, protocolFactory)
+        finally:
+            # The reactor has its own copy of the file descriptor.
+            skt.close()
+
+
 
 class TCP4ServerEndpoint(_TCPServerEndpoint):
     """
     Implements TCP server endpoint with an IPv4 configuration
     """
-    def __init__(self, reactor, port, backlog=50, interface=''):
+    def __init__(self, reactor, port, backlog=50, interface='',
+                 reusePort=False):
         """
-        @param reactor: An L{IReactorTCP} provider.
+        @param reactor: An L{IReactorTCP} provider.  If C{reusePort} is true,
+            it must also provide L{IReactorSocket}.
 
         @param port: The port number used for listening
         @type port: int
@@ -488,8 +555,14 @@ class TCP4ServerEndpoint(_TCPServerEndpoint):
 
         @param interface: The hostname to bind to, defaults to '' (all)
         @type interface: str
+
+        @param reusePort: If true, set C{SO_REUSEPORT} on the listening
+            socket, so that several processes can listen on the same port.
+            (Since 16.5)
+        @type reusePort: L{bool}
         """
-        _TCPServerEndpoint.__init__(self, reactor, port, backlog, interface)
+        _TCPServerEndpoint.__init__(
+            self, reactor, port, backlog, interface, reusePort)
 
 
 
@@ -497,9 +570,13 @@ class TCP6ServerEndpoint(_TCPServerEndpoint):
     """
     Implements TCP server endpoint with an IPv6 configuration
     """
-    def __init__(self, reactor, port, backlog=50, interface='::'):
+    _addressFamily = AF_INET6
+
+    def __init__(self, reactor, port, backlog=50, interface='::',
+                 reusePort=False):
         """
-        @param reactor: An L{IReactorTCP} provider.
+        @param reactor: An L{IReactorTCP} provider.  If C{reusePort} is true,
+            it must also provide L{IReactorSocket}.
 
         @param port: The port number used for listening
         @type port: int
@@ -509,8 +586,14 @@ class TCP6ServerEndpoint(_TCPServerEndpoint):
 
         @param interface: The hostname to bind to, defaults to C{::} (all)
         @type interface: str
+
+        @param reusePort: If true, set C{SO_REUSEPORT} on the listening
+            socket, so that several processes can listen on the same port.
+            (Since 16.5)
+        @type reusePort: L{bool}
         """
-        _TCPServerEndpoint.__init__(self, reactor, port, backlog, interface)
+        _TCPServerEndpoint.__init__(
+            self, reactor, port, backlog, interface, reusePort)
 
 
 
@@ -1024,7 +1107,7 @@ class AdoptedStreamServerEndpoint(object):
 
 
 
-def _parseTCP(factory, port, interface="", backlog=50):
+def _parseTCP(factory, port, interface="", backlog=50, reusePort=False):
     """
     Internal parser function for L{_parseServer} to convert the string
     arguments for a TCP(IPv4) stream endpoint into the structured arguments.
@@ -1042,12 +1125,21 @@ def _parseTCP(factory, port, interface="", backlog=50):
     @param backlog: the length of the listen queue
     @type backlog: C{str}
 
+    @param reusePort: A string '0' or '1', mapping to False and True, saying
+        whether to set C{SO_REUSEPORT} on the listening socket.  It is only
+        included in the result if it is true, since L{IReactorTCP.listenTCP}
+        does not accept it; L{twisted.application.strports.listen} rejects
+        descriptions which include it.
+    @type reusePort: C{str}
+
     @return: a 2-tuple of (args, kwargs), describing  the parameters to
         L{IReactorTCP.listenTCP} (or, modulo argument 2, the factory, arguments
         to L{TCP4ServerEndpoint}.
     """
-    return (int(port), factory), {'interface': interface,
-                                  'backlog': int(backlog)}
+    kwargs = {'interface': interface, 'backlog': int(backlog)}
+    if reusePort and int(reusePort):
+        kwargs['reusePort'] = True
+    return (int(port), factory), kwargs
 
 
 
@@ -1254,7 +1346,8 @@ class _TCP6ServerParser(object):
     """
     prefix = "tcp6"     # Used in _parseServer to identify the plugin with the endpoint type
 
-    def _parseServer(self, reactor, port, backlog=50, interface='::'):
+    def _parseServer(self, reactor, port, backlog=50, interface='::',
+                     reusePort='0'):
         """
         Internal parser function for L{_parseServer} to convert the string
         arguments into structured arguments for the L{TCP6ServerEndpoint}
@@ -1269,10 +1362,15 @@ class _TCP6ServerParser(object):
 
         @param interface: The hostname to bind to
         @type interface: str
+
+        @param reusePort: A string '0' or '1', mapping to False and True,
+            saying whether to set C{SO_REUSEPORT} on the listening socket.
+        @type reusePort: str
         """
         port = int(port)
         backlog = int(backlog)
-        return TCP6ServerEndpoint(reactor, port, backlog, interface)
+        reusePort = bool(int(reusePort))
+        return TCP6ServerEndpoint(reactor, port, backlog, interface, reusePort)
 
 
     def parseStreamServer(self, reactor, *args, **kwargs):
@@ -1476,6 +1574,11 @@ def serverFromString(reactor, description):
 
         serverFromString(reactor, "tcp:80:interface=127.0.0.1")
 
+    Several processes can listen on the same TCP port, with the kernel
+    distributing connections among them, if they all set C{SO_REUSEPORT}::
+
+        serverFromString(reactor, "tcp:80:reusePort=1")
+
     SSL server endpoints may be specified with the 'ssl' prefix, and the
     private key and certificate files may be specified by the C{privateKey} and
     C{certKey} arguments::
@@ -0,0 +1,207 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+An edge-triggered epoll() based implementation of the twisted main loop.
+
+To install the event loop (and you should do this before any connections,
+listeners or connectors are added)::
+
+    from twisted.internet import epolletreactor
+    epolletreactor.install()
+
+@since: 16.5
+"""
+
+from __future__ import division, absolute_import
+
+from select import EPOLLIN, EPOLLOUT, EPOLLET
+import errno
+
+from zope.interface import implementer
+
+from twisted.internet.interfaces import IReactorFDSet
+
+from twisted.python import log
+from twisted.internet import epollreactor
+
+
+
+@implementer(IReactorFDSet)
+class EdgeTriggeredEPollReactor(epollreactor.EPollReactor):
+    """
+    A reactor that uses epoll(7) with edge-triggered notification where it
+    can.
+
+    The level-triggered L{epollreactor.EPollReactor} has to call
+    C{epoll_ctl(2)} whenever a descriptor starts or stops reading or writing,
+    which for a typical connection happens at least twice for every
+    response it sends.  This reactor instead registers each descriptor once,
+    for both read and write readiness with C{EPOLLET}, and keeps track of
+    which descriptors are readable and writable itself.
+
+    A descriptor remains readable (or writable) until a read (or write) on
+    it fails with C{EAGAIN}, so that it is read from (or written to) on every
+    iteration, as long as it wants to be, until then.  The descriptor reports
+    this by setting C{_readWouldBlock} (or C{_writeWouldBlock}) to C{True};
+    only descriptors which set C{_edgeTriggerable} to C{True} promise to do
+    so, such as L{twisted.internet.tcp.Connection}.  Other descriptors are
+    registered as level-triggered, just as L{epollreactor.EPollReactor}
+    would.
+
+    @ivar _edgeTriggered: A C{set} of the integer file descriptors which are
+        registered with C{_poller} as edge-triggered.
+
+    @ivar _readable: A C{set} of the integer file descriptors in
+        C{_edgeTriggered} which have been reported readable and have not
+        been read from until C{EAGAIN} since.
+
+    @ivar _writable: A C{set} of the integer file descriptors in
+        C{_edgeTriggered} which have been reported writable and have not
+        been written to until C{EAGAIN} since.
+    """
+
+    def __init__(self):
+        self._edgeTriggered = set()
+        self._readable = set()
+        self._writable = set()
+        epollreactor.EPollReactor.__init__(self)
+
+
+    def _add(self, xer, primary, other, selectables, event, antievent):
+        """
+        Private method for adding a descriptor from the event loop.
+
+        A descriptor which supports edge-triggered notification is registered
+        for both read and write readiness the first time it is added, and is
+        not modified again until it is removed.
+        """
+        if not getattr(xer, "_edgeTriggerable", False):
+            return epollreactor.EPollReactor._add(
+                self, xer, primary, other, selectables, event, antievent)
+        fd = xer.fileno()
+        if fd not in primary:
+            if fd not in other:
+                self._poller.register(fd, EPOLLIN | EPOLLOUT | EPOLLET)
+                self._edgeTriggered.add(fd)
+            primary.add(fd)
+            selectables[fd] = xer
+
+
+    def _remove(self, xer, primary, other, selectables, event, antievent):
+        """
+        Private method for removing a descriptor from the event loop.
+
+        A descriptor which is registered as edge-triggered is only
+        unregistered once it is neither reading nor writing.
+        """
+        fd = xer.fileno()
+        if fd == -1:
+            for fd, fdes in selectables.items():
+                if xer is fdes:
+                    break
+            else:
+                return
+        if fd not in self._edgeTriggered:
+            return epollreactor.EPollReactor._remove(
+                self, xer, primary, other, selectables, event, antievent)
+        if fd in primary:
+            if fd not in other:
+                del selectables[fd]
+                self._poller.unregister(fd)
+                self._edgeTriggered.remove(fd)
+                self._readable.discard(fd)
+                self._writable.discard(fd)
+            primary.remove(fd)
+
+
+    def _ready(self):
+        """
+        Find the descriptors which can be read from or written to without
+        waiting for another notification.
+
+        @return: A C{set} of integer file descriptors.
+        """
+        return (self._readable & self._reads) | (self._writable & self._writes)
+
+
+    def _doReadOrWriteEdge(self, selectable, fd, event):
+        """
+        Read from and/or write to a descriptor registered as edge-triggered,
+        and forget that it is readable or writable if doing so would have
+        blocked.
+        """
+        selectable._readWouldBlock = selectable._writeWouldBlock = False
+        self._doReadOrWrite(selectable, fd, event)
+        if selectable._readWouldBlock:
+            self._readable.discard(fd)
+        if selectable._writeWouldBlock:
+            self._writable.discard(fd)
+
+
+    def doPoll(self, timeout):
+        """
+        Poll the poller for new events, then read from and write to every
+        descriptor that is ready.
+        """
+        if self._ready():
+            # There is work left over from the last iteration, so only
+            # collect whatever is already waiting.
+            timeout = 0
+        elif timeout is None:
+            timeout = -1  # Wait indefinitely.
+
+        try:
+            l = self._poller.poll(timeout, len(self._selectables))
+        except IOError as err:
+            if err.errno == errno.EINTR:
+                return
+            raise
+
+        _drdw = self._doReadOrWrite
+        for fd, event in l:
+            try:
+                selectable = self._selectables[fd]
+            except KeyError:
+                continue
+            if fd not in self._edgeTriggered:
+                log.callWithLogger(selectable, _drdw, selectable, fd, event)
+            elif event & self._POLL_DISCONNECTED and not event & EPOLLIN:
+                # Nothing left to read, so there is no need to wait for
+                # anything to drain.
+                log.callWithLogger(selectable, _drdw, selectable, fd, event)
+            else:
+                if event & EPOLLIN:
+                    self._readable.add(fd)
+                if event & EPOLLOUT:
+                    self._writable.add(fd)
+
+        _drdwe = self._doReadOrWriteEdge
+        for fd in self._ready():
+            try:
+                selectable = self._selectables[fd]
+            except KeyError:
+                # Removed by a descriptor handled earlier in this loop.
+                continue
+            event = 0
+            if fd in self._readable and fd in self._reads:
+                event |= EPOLLIN
+            if fd in self._writable and fd in self._writes:
+                event |= EPOLLOUT
+            if event:
+                log.callWithLogger(selectable, _drdwe, selectable, fd, event)
+
+    doIteration = doPoll
+
+
+
+def install():
+    """
+    Install the edge-triggered epoll() reactor.
+    """
+    p = EdgeTriggeredEPollReactor()
+    from twisted.internet.main import installReactor
+    installReactor(p)
+
+
+__all__ = ["EdgeTriggeredEPollReactor", "install"]
@@ -1218,6 +1218,77 @@ class IDelayedCall(Interface):
 
 
 
+class ITimerStore(Interface):
+    """
+    The data structure a reactor uses to keep track of its outstanding
+    L{IDelayedCall}s and to find out which of them are due.
+
+    @since: 16.5
+    """
+
+    def add(call):
+        """
+        Begin tracking a newly scheduled call.
+
+        @param call: The call to track.
+        @type call: L{twisted.internet.base.DelayedCall}
+        """
+
+
+    def cancel(call):
+        """
+        Stop tracking a call which is being cancelled.
+
+        @param call: A call previously passed to L{add}.
+        @type call: L{twisted.internet.base.DelayedCall}
+        """
+
+
+    def reschedule(call):
+        """
+        Note that the C{time} of a tracked call has been moved earlier.
+
+        Calls which are moved later only have their C{delayed_time} changed
+        and are not reported to the store; the store must apply the delay
+        (using C{activate_delay}) when it finds such a call to be due.
+
+        @param call: A call previously passed to L{add}.
+        @type call: L{twisted.internet.base.DelayedCall}
+        """
+
+
+    def nextTime():
+        """
+        Get the time at which L{expired} should next be called so that the
+        earliest tracked call runs on time, to the precision of the store.
+
+        @return: A time in seconds since the epoch, or L{None} if no calls are
+            being tracked.
+        @rtype: L{float} or L{None}
+        """
+
+
+    def expired(now):
+        """
+        Stop tracking and return each call whose time is no later than
+        C{now}, in the order in which they should be run.
+
+        @param now: The current time, in seconds since the epoch.
+        @type now: L{float}
+
+        @return: An iterable of the calls which should be run.  Calls which
+            are cancelled while this iterable is being consumed are not
+            produced.
+        """
+
+
+    def getDelayedCalls():
+        """
+        @return: A L{list} of all tracked calls which have not been cancelled.
+        """
+
+
+
 class IReactorFromThreads(Interface):
     """
     This interface is the set of thread-safe methods which may be invoked on
@@ -1847,6 +1918,49 @@ class IProtocol(Interface):
         """
 
 
+
+class IBufferedProtocol(IProtocol):
+    """
+    A protocol which supplies the memory into which a transport reads data,
+    so that it can be parsed where it lands instead of being copied into a
+    new L{bytes} object first.
+
+    Transports which support this call L{getBuffer} and L{bufferUpdated}
+    instead of L{IProtocol.dataReceived}; others keep calling
+    L{IProtocol.dataReceived}.
+
+    @since: 16.5
+    """
+
+    def getBuffer(sizeHint):
+        """
+        Get a buffer for the transport to read data into.
+
+        The buffer may be reused by the protocol once L{bufferUpdated} has been
+        called.
+
+        @param sizeHint: The number of bytes the transport would like to read
+            at most.  The buffer may be smaller or larger than this, but must
+            not be empty.
+        @type sizeHint: L{int}
+
+        @return: A writable object supporting the buffer protocol, such as a
+            L{bytearray} or a L{memoryview} of one.
+        """
+
+
+    def bufferUpdated(nbytes):
+        """
+        Called when data has been read into the buffer most recently returned
+        by L{getBuffer}.
+
+        @param nbytes: The number of bytes read, starting at the beginning of
+            the buffer.
+        @type nbytes: L{int}
+        """
+
+
+
 class IProcessProtocol(Interface):
     """
     Interface for process-related event handlers.
@@ -1994,6 +2108,40 @@ class IFileDescriptorReceiver(Interface):
 
 
 
+class IBufferedDatagramProtocol(Interface):
+    """
+    A datagram protocol which supplies the memory into which a transport reads
+    each datagram.  See L{IBufferedProtocol}.
+
+    @since: 16.5
+    """
+
+    def getBuffer(sizeHint):
+        """
+        Get a buffer for the transport to read a datagram into.
+
+        @param sizeHint: The largest datagram the transport will read.  Any
+            part of a datagram which does not fit in the buffer is discarded.
+        @type sizeHint: L{int}
+
+        @return: A non-empty writable object supporting the buffer protocol.
+        """
+
+
+    def bufferUpdated(nbytes, addr):
+        """
+        Called when a datagram has been read into the buffer most recently
+        returned by L{getBuffer}.
+
+        @param nbytes: The size of the datagram, starting at the beginning of
+            the buffer.
+        @type nbytes: L{int}
+
+        @param addr: The address the datagram came from.
+        """
+
+
+
 class IProtocolFactory(Interface):
     """
     Interface for protocol factories.
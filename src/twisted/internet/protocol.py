@@ -555,6 +555,51 @@ class Protocol(BaseProtocol):
         """
 
 
+@implementer(interfaces.IBufferedProtocol)
+class BufferedProtocol(Protocol):
+    """
+    Base class for protocols which parse data in place, in a buffer they
+    own, rather than out of the L{bytes} passed to L{Protocol.dataReceived}.
+
+    Subclasses implement L{getBuffer} and L{bufferUpdated}.  Transports which
+    support L{interfaces.IBufferedProtocol} read straight into the buffer;
+    for the others, L{dataReceived} copies the data into it.
+    """
+
+    def getBuffer(self, sizeHint):
+        """
+        See L{interfaces.IBufferedProtocol.getBuffer}.
+        """
+        raise NotImplementedError()
+
+
+    def bufferUpdated(self, nbytes):
+        """
+        See L{interfaces.IBufferedProtocol.bufferUpdated}.
+        """
+        raise NotImplementedError()
+
+
+    def dataReceived(self, data):
+        """
+        Copy C{data} into buffers from L{getBuffer}, calling L{bufferUpdated}
+        each time one has been filled or all of C{data} has been copied.
+
+        @param data: The data received.
+        @type data: L{bytes}
+        """
+        view = memoryview(data)
+        while len(view):
+            buf = self.getBuffer(len(view))
+            if not len(buf):
+                raise ValueError("getBuffer returned an empty buffer")
+            nbytes = min(len(buf), len(view))
+            memoryview(buf)[:nbytes] = view[:nbytes]
+            view = view[nbytes:]
+            self.bufferUpdated(nbytes)
+
+
+
 @implementer(interfaces.IConsumer)
 class ProtocolToConsumerAdapter(components.Adapter):
 
@@ -754,6 +799,44 @@ class DatagramProtocol(AbstractDatagramProtocol):
         """
 
 
+@implementer(interfaces.IBufferedDatagramProtocol)
+class BufferedDatagramProtocol(DatagramProtocol):
+    """
+    Base class for datagram protocols which parse each datagram in place, in
+    a buffer they own.  See L{BufferedProtocol}.
+    """
+
+    def getBuffer(self, sizeHint):
+        """
+        See L{interfaces.IBufferedDatagramProtocol.getBuffer}.
+        """
+        raise NotImplementedError()
+
+
+    def bufferUpdated(self, nbytes, addr):
+        """
+        See L{interfaces.IBufferedDatagramProtocol.bufferUpdated}.
+        """
+        raise NotImplementedError()
+
+
+    def datagramReceived(self, datagram, addr):
+        """
+        Copy C{datagram} into a buffer from L{getBuffer} and call
+        L{bufferUpdated}, truncating the datagram if it does not fit.
+
+        @param datagram: The datagram received.
+        @type datagram: L{bytes}
+
+        @param addr: The address the datagram came from.
+        """
+        buf = self.getBuffer(len(datagram))
+        nbytes = min(len(buf), len(datagram))
+        memoryview(buf)[:nbytes] = memoryview(datagram)[:nbytes]
+        self.bufferUpdated(nbytes, addr)
+
+
+
 class ConnectedDatagramProtocol(DatagramProtocol):
     """Protocol for connected datagram-oriented transport.
 
@@ -856,4 +939,4 @@ class FileWrapper:
 __all__ = ["Factory", "ClientFactory", "ReconnectingClientFactory", "connectionDone",
            "Protocol", "ProcessProtocol", "FileWrapper", "ServerFactory",
            "AbstractDatagramProtocol", "DatagramProtocol", "ConnectedDatagramProtocol",
-           "ClientCreator"]
+           "ClientCreator", "BufferedProtocol", "BufferedDatagramProtocol"]
@@ -234,7 +234,7 @@ from twisted.internet._sslverify import (
     platformTrust, OpenSSLDefaultPaths, VerificationError,
     optionsForClientTLS, ProtocolNegotiationSupport,
     protocolNegotiationMechanisms,
-    trustRootFromCertificates,
+    trustRootFromCertificates, TLSSessionCache,
 )
 
 __all__ = [
@@ -248,5 +248,5 @@ __all__ = [
 
     'VerificationError', 'optionsForClientTLS',
     'ProtocolNegotiationSupport', 'protocolNegotiationMechanisms',
-    'trustRootFromCertificates',
+    'trustRootFromCertificates', 'TLSSessionCache',
 ]
@@ -11,6 +11,7 @@ End users shouldn't use this module directly - use the reactor APIs instead.
 from __future__ import division, absolute_import
 
 # System Imports
+import os
 import socket
 import sys
 import operator
@@ -173,7 +174,35 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
 
     @ivar logstr: prefix used when logging events related to this connection.
     @type logstr: C{str}
+
+    @ivar _edgeTriggerable: C{True}, to tell reactors which use
+        edge-triggered readiness notification, such as
+        L{twisted.internet.epolletreactor.EdgeTriggeredEPollReactor}, that
+        this connection sets C{_readWouldBlock} and C{_writeWouldBlock}.
+
+    @ivar _readWouldBlock: Set to C{True} when reading from the socket fails
+        because it would block.  Reactors which use edge-triggered readiness
+        notification reset it before each read.
+
+    @ivar _writeWouldBlock: Like C{_readWouldBlock}, but for writing.
+
+    @ivar fileWrites: C{True} if C{os.sendfile} is available, so that
+        C{writeFile} can be used (until TLS is started).
+
+    @ivar _bufferedFor: The protocol for which C{_readsIntoBuffer} was last
+        decided, so that the decision is only made again when the protocol
+        is replaced.
+
+    @ivar _readsIntoBuffer: C{True} if data for C{_bufferedFor} is read
+        straight into a buffer it supplies.
     """
+    _edgeTriggerable = True
+    _readWouldBlock = False
+    _writeWouldBlock = False
+    _bufferedFor = None
+    _readsIntoBuffer = False
+
+    fileWrites = getattr(os, "sendfile", None) is not None
 
 
     def __init__(self, skt, protocol, reactor=None):
@@ -197,10 +226,16 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
         lost through an error in the physical recv(), this function will return
         the result of the dataReceived call.
         """
+        protocol = self.protocol
+        if protocol is not self._bufferedFor:
+            self._checkBuffered(protocol)
+        if self._readsIntoBuffer:
+            return self._readIntoBuffer(protocol)
         try:
             data = self.socket.recv(self.bufferSize)
         except socket.error as se:
             if se.args[0] == EWOULDBLOCK:
+                self._readWouldBlock = True
                 return
             else:
                 return main.CONNECTION_LOST
@@ -208,6 +243,51 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
         return self._dataReceived(data)
 
 
+    def _checkBuffered(self, protocol):
+        """
+        Decide whether data for C{protocol} should be read straight into a
+        buffer it supplies, and remember C{protocol} as the one the decision
+        was made for.
+
+        @param protocol: The protocol to deliver data to.
+        @type protocol: L{interfaces.IProtocol} provider
+        """
+        self._bufferedFor = protocol
+        self._readsIntoBuffer = interfaces.IBufferedProtocol.providedBy(
+            protocol)
+
+
+    def _readIntoBuffer(self, protocol):
+        """
+        Read as much data as fits straight into a buffer supplied by
+        C{protocol}, asking for C{self.bufferSize} bytes, then tell
+        C{protocol} how much was read.
+
+        @param protocol: The protocol to deliver data to.
+        @type protocol: L{interfaces.IBufferedProtocol} provider
+
+        @return: L{None}, or the reason the connection has been lost.
+
+        @raise ValueError: If C{protocol} supplies an empty buffer.
+        """
+        buf = protocol.getBuffer(self.bufferSize)
+        if not len(buf):
+            raise ValueError(
+                "%r.getBuffer returned an empty buffer" % (protocol,))
+        try:
+            nbytes = self.socket.recv_into(buf)
+        except socket.error as se:
+            if se.args[0] == EWOULDBLOCK:
+                self._readWouldBlock = True
+                return
+            else:
+                return main.CONNECTION_LOST
+
+        if not nbytes:
+            return main.CONNECTION_DONE
+        protocol.bufferUpdated(nbytes)
+
+
     def _dataReceived(self, data):
         if not data:
             return main.CONNECTION_DONE
@@ -239,7 +319,64 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
         try:
             return untilConcludes(self.socket.send, limitedData)
         except socket.error as se:
-            if se.args[0] in (EWOULDBLOCK, ENOBUFS):
+            if se.args[0] == EWOULDBLOCK:
+                self._writeWouldBlock = True
+                return 0
+            elif se.args[0] == ENOBUFS:
+                return 0
+            else:
+                return main.CONNECTION_LOST
+
+
+    def writeSomeFile(self, fileno, offset, count):
+        """
+        Write as much as possible of part of a file to this TCP connection
+        with C{sendfile(2)}.
+
+        This sends up to C{self.SEND_LIMIT} bytes of the file.  If the
+        connection is lost, or the file ends before C{count} bytes have been
+        sent, an exception is returned.  Otherwise, the number of bytes
+        successfully written is returned.
+        """
+        try:
+            sent = untilConcludes(
+                os.sendfile, self.socket.fileno(), fileno, offset,
+                min(count, self.SEND_LIMIT))
+        except (OSError, socket.error) as se:
+            if se.args[0] == EWOULDBLOCK:
+                self._writeWouldBlock = True
+                return 0
+            elif se.args[0] == ENOBUFS:
+                return 0
+            else:
+                return main.CONNECTION_LOST
+        if not sent:
+            return error.ConnectionLost(
+                "The file ended before all of it was written.")
+        return sent
+
+
+    def writeSomeVectors(self, vectors):
+        """
+        Write as much as possible of the given buffers to this TCP connection
+        with a single C{sendmsg(2)} call.
+
+        If the socket does not support C{sendmsg} (as is the case on Python
+        2), the buffers are concatenated and written with C{writeSomeData}.
+        If the connection is lost, an exception is returned.  Otherwise, the
+        number of bytes successfully written is returned.
+        """
+        sendmsg = getattr(self.socket, "sendmsg", None)
+        if sendmsg is None:
+            return abstract.FileDescriptor.writeSomeVectors(self, vectors)
+
+        try:
+            return untilConcludes(sendmsg, vectors)
+        except socket.error as se:
+            if se.args[0] == EWOULDBLOCK:
+                self._writeWouldBlock = True
+                return 0
+            elif se.args[0] == ENOBUFS:
                 return 0
             else:
                 return main.CONNECTION_LOST
@@ -569,6 +706,7 @@ class BaseClient(_BaseBaseClient, _TLSClientMixin, Connection):
             # http://msdn.microsoft.com/library/default.asp?url=/library/en-us/winsock/winsock/connect_2.asp
             elif ((connectResult in (EWOULDBLOCK, EINPROGRESS, EALREADY)) or
                   (connectResult == EINVAL and platformType == "win32")):
+                self._readWouldBlock = self._writeWouldBlock = True
                 self.startReading()
                 self.startWriting()
                 return
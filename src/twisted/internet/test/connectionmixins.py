@@ -13,6 +13,7 @@ import socket
 from gc import collect
 from weakref import ref
 
+from zope.interface import implementer
 from zope.interface.verify import verifyObject
 
 from twisted.python import context, log
@@ -20,7 +21,8 @@ from twisted.python.failure import Failure
 from twisted.python.runtime import platform
 from twisted.python.log import ILogContext, msg, err
 from twisted.internet.defer import Deferred, gatherResults
-from twisted.internet.interfaces import IConnector, IReactorFDSet
+from twisted.internet.interfaces import (
+    IConnector, IReactorFDSet, IBufferedProtocol)
 from twisted.internet.protocol import ClientFactory, Protocol, ServerFactory
 from twisted.trial.unittest import SkipTest
 from twisted.internet.test.reactormixins import needsRunningReactor
@@ -321,6 +323,44 @@ class ConnectionTestsMixin(object):
         self.assertIn("Custom Server", server.system)
 
 
+    def test_bufferedProtocol(self):
+        """
+        Data sent to an L{IBufferedProtocol} provider is delivered through
+        the buffer it supplies, however many reads that takes.
+        """
+        message = b"x" * 50 + b"y" * 50
+
+        @implementer(IBufferedProtocol)
+        class BufferedReceiver(ConnectableProtocol):
+            def __init__(self):
+                self.buffer = bytearray(7)
+                self.received = []
+
+            def getBuffer(self, sizeHint):
+                return self.buffer
+
+            def bufferUpdated(self, nbytes):
+                self.received.append(bytes(self.buffer[:nbytes]))
+                if len(b"".join(self.received)) == len(message):
+                    self.transport.loseConnection()
+
+            def dataReceived(self, data):
+                # For transports which do not support IBufferedProtocol.
+                while data:
+                    self.buffer[:len(data[:7])] = data[:7]
+                    self.bufferUpdated(len(data[:7]))
+                    data = data[7:]
+
+        class Sender(ConnectableProtocol):
+            def connectionMade(self):
+                self.transport.write(message)
+
+        server = BufferedReceiver()
+        runProtocolsWithReactor(self, server, Sender(), self.endpoints)
+        self.assertEqual(b"".join(server.received), message)
+        self.assertTrue(max(map(len, server.received)) <= 7)
+
+
     def test_writeAfterDisconnect(self):
         """
         After a connection is disconnected, L{ITransport.write} and
@@ -157,7 +157,9 @@ class ReactorBuilder:
         else:
             _reactors.extend([
                     "twisted.internet.pollreactor.PollReactor",
-                    "twisted.internet.epollreactor.EPollReactor"])
+                    "twisted.internet.epollreactor.EPollReactor",
+                    "twisted.internet.epolletreactor."
+                    "EdgeTriggeredEPollReactor"])
             if not platform.isLinux():
                 # Presumably Linux is not going to start supporting kqueue, so
                 # skip even trying this configuration.
@@ -12,11 +12,15 @@ except ImportError:
     from queue import Queue
 
 from zope.interface import implementer
+from zope.interface.verify import verifyObject
 
 from twisted.python.threadpool import ThreadPool
 from twisted.internet.interfaces import IReactorTime, IReactorThreads
+from twisted.internet.interfaces import ITimerStore
 from twisted.internet.error import DNSLookupError
 from twisted.internet.base import ThreadedResolver, DelayedCall
+from twisted.internet.base import ReactorBase
+from twisted.internet.base import HeapTimerStore, TimingWheelTimerStore
 from twisted.internet.task import Clock
 from twisted.trial.unittest import TestCase
 
@@ -270,3 +274,277 @@ class DelayedCallTests(TestCase):
         self.assertTrue(self.zero != self.one)
         self.assertFalse(self.zero != self.zero)
         self.assertFalse(self.one != self.one)
+
+
+
+class TimerStoreTestsMixin(object):
+    """
+    Tests for L{ITimerStore} implementations.
+
+    Mix into a L{TestCase} which defines C{createStore}.
+    """
+
+    def setUp(self):
+        self.now = 1000.0
+        self.store = self.createStore()
+        self.called = []
+
+
+    def schedule(self, delay, name):
+        """
+        Add a call to C{self.store} which records C{name} in C{self.called}
+        when run.
+
+        @param delay: How long after C{self.now} to schedule the call.
+
+        @return: The new L{DelayedCall}.
+        """
+        call = DelayedCall(
+            self.now + delay, self.called.append, (name,), {},
+            self.store.cancel, self.store.reschedule, lambda: self.now)
+        self.store.add(call)
+        return call
+
+
+    def advance(self, amount):
+        """
+        Move C{self.now} forward and run the calls the store reports as due,
+        the way L{ReactorBase.runUntilCurrent} does.
+        """
+        self.now += amount
+        for call in self.store.expired(self.now):
+            call.called = 1
+            call.func(*call.args, **call.kw)
+
+
+    def test_interface(self):
+        """
+        The store provides L{ITimerStore}.
+        """
+        self.assertTrue(verifyObject(ITimerStore, self.store))
+
+
+    def test_empty(self):
+        """
+        An empty store has no next time, no delayed calls and nothing due.
+        """
+        self.assertIsNone(self.store.nextTime())
+        self.assertEqual(self.store.getDelayedCalls(), [])
+        self.assertEqual(list(self.store.expired(self.now + 10)), [])
+
+
+    def test_order(self):
+        """
+        Due calls are produced in the order of their times, and calls which
+        are not yet due are kept.
+        """
+        self.schedule(3, "c")
+        self.schedule(1, "a")
+        self.schedule(2, "b")
+        late = self.schedule(700, "d")
+        self.advance(5)
+        self.assertEqual(self.called, ["a", "b", "c"])
+        self.assertEqual(self.store.getDelayedCalls(), [late])
+        self.advance(700)
+        self.assertEqual(self.called, ["a", "b", "c", "d"])
+        self.assertIsNone(self.store.nextTime())
+
+
+    def test_notEarly(self):
+        """
+        A call is not produced before its time, but is once its time has
+        come.
+        """
+        self.schedule(1.5, "a")
+        self.advance(1.49)
+        self.assertEqual(self.called, [])
+        self.advance(0.01)
+        self.assertEqual(self.called, ["a"])
+
+
+    def test_nextTime(self):
+        """
+        L{ITimerStore.nextTime} is the time of the earliest call, to the
+        precision of the store.
+        """
+        self.schedule(100, "a")
+        self.schedule(5, "b")
+        nextTime = self.store.nextTime()
+        self.assertTrue(nextTime <= self.now + 5.01)
+        self.assertTrue(nextTime > self.now)
+
+
+    def test_cancel(self):
+        """
+        A cancelled call is not produced and not included in
+        L{ITimerStore.getDelayedCalls}.
+        """
+        call = self.schedule(1, "a")
+        other = self.schedule(1, "b")
+        call.cancel()
+        self.assertEqual(self.store.getDelayedCalls(), [other])
+        self.advance(2)
+        self.assertEqual(self.called, ["b"])
+
+
+    def test_cancelWhileRunning(self):
+        """
+        A due call cancelled by another call which runs before it is not
+        produced.
+        """
+        second = self.schedule(2, "b")
+        call = self.schedule(1, "a")
+        call.func = lambda name: second.cancel()
+        self.advance(3)
+        self.assertEqual(self.called, [])
+        self.assertFalse(second.called)
+
+
+    def test_resetSooner(self):
+        """
+        A call which is reset to an earlier time is produced at that time.
+        """
+        call = self.schedule(500, "a")
+        self.advance(1)
+        call.reset(1)
+        self.advance(1)
+        self.assertEqual(self.called, ["a"])
+
+
+    def test_resetLater(self):
+        """
+        A call which is reset to a later time is not produced at its original
+        time, only at the new one.
+        """
+        call = self.schedule(1, "a")
+        call.reset(300)
+        self.advance(2)
+        self.assertEqual(self.called, [])
+        self.assertEqual(self.store.getDelayedCalls(), [call])
+        self.advance(298)
+        self.assertEqual(self.called, ["a"])
+
+
+    def test_resetRepeatedly(self):
+        """
+        A call which keeps being reset before it is due is never produced.
+        """
+        call = self.schedule(10, "a")
+        for i in range(100):
+            self.advance(1)
+            call.reset(10)
+        self.assertEqual(self.called, [])
+        self.advance(10)
+        self.assertEqual(self.called, ["a"])
+
+
+    def test_scheduledWhileRunning(self):
+        """
+        A call added while due calls are being run is not produced by the
+        same iteration, even if it is due.
+        """
+        self.schedule(1, "a").func = lambda name: self.schedule(0, "b")
+        self.advance(1)
+        self.assertEqual(self.called, [])
+        self.advance(0)
+        self.assertEqual(self.called, ["b"])
+
+
+
+class HeapTimerStoreTests(TimerStoreTestsMixin, TestCase):
+    """
+    Tests for L{HeapTimerStore}.
+    """
+
+    def createStore(self):
+        return HeapTimerStore()
+
+
+
+class TimingWheelTimerStoreTests(TimerStoreTestsMixin, TestCase):
+    """
+    Tests for L{TimingWheelTimerStore}.
+    """
+
+    def createStore(self):
+        return TimingWheelTimerStore(resolution=0.01, slots=8, levels=3)
+
+
+    def test_allLevels(self):
+        """
+        Calls spread over every level of the wheel and beyond its last level
+        are all produced in order, within one tick of their time.
+        """
+        delays = [0.005, 0.07, 0.5, 0.63, 3, 5.11, 40, 400]
+        for delay in delays:
+            self.schedule(delay, delay)
+        while self.called != delays:
+            expected = [d for d in delays if self.now - 1000.0 >= d]
+            self.assertEqual(self.called, expected)
+            self.advance(0.01)
+            self.assertTrue(self.now - 1000.0 <= 400.02)
+
+
+    def test_longIdle(self):
+        """
+        After a long time during which nothing was due, calls added relative
+        to the new time are placed correctly.
+        """
+        self.schedule(1000000, "late")
+        self.advance(500000)
+        self.schedule(0.5, "a")
+        self.schedule(2, "b")
+        self.advance(1)
+        self.assertEqual(self.called, ["a"])
+        self.advance(1)
+        self.assertEqual(self.called, ["a", "b"])
+
+
+    def test_nextTimeAfterCancel(self):
+        """
+        After the earliest call is cancelled, L{ITimerStore.nextTime} reports
+        the next call once the store has been checked for due calls.
+        """
+        self.schedule(1, "a").cancel()
+        self.schedule(5, "b")
+        self.advance(1)
+        self.assertTrue(self.store.nextTime() > self.now + 3)
+
+
+
+class InstallTimerStoreTests(TestCase):
+    """
+    Tests for L{ReactorBase.installTimerStore}.
+    """
+
+    def setUp(self):
+        self.now = 100.0
+        self.reactor = ReactorBase.__new__(ReactorBase)
+        self.patch(ReactorBase, "installWaker", lambda reactor: None)
+        self.reactor.__init__()
+        self.reactor.seconds = lambda: self.now
+
+
+    def test_default(self):
+        """
+        L{ReactorBase} keeps delayed calls in a L{HeapTimerStore} by default.
+        """
+        self.assertIsInstance(self.reactor._timerStore, HeapTimerStore)
+
+
+    def test_moveCalls(self):
+        """
+        Outstanding delayed calls are moved to the new store and run from it.
+        """
+        called = []
+        self.reactor.callLater(2, called.append, "a")
+        self.reactor.callLater(1, called.append, "b").cancel()
+        store = TimingWheelTimerStore()
+        self.reactor.installTimerStore(store)
+        self.assertEqual(len(store.getDelayedCalls()), 1)
+        self.reactor.callLater(1, called.append, "c")
+        self.assertTrue(0 < self.reactor.timeout() <= 1)
+        self.now += 3
+        self.reactor.runUntilCurrent()
+        self.assertEqual(called, ["c", "a"])
+        self.assertEqual(self.reactor.getDelayedCalls(), [])
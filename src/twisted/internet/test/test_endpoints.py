@@ -146,6 +146,33 @@ class TestFileDescriptorReceiverProtocol(TestProtocol):
 
 
 
+@implementer(interfaces.IHandshakeListener)
+class TestHandshakeListenerProtocol(TestProtocol):
+    """
+    A Protocol that implements L{IHandshakeListener} and records whether its
+    C{handshakeCompleted} method is called.
+
+    @ivar handshakes: The number of times C{handshakeCompleted} was called.
+    """
+    handshakes = 0
+
+    def handshakeCompleted(self):
+        self.handshakes += 1
+
+
+
+@implementer(interfaces.IProtocolNegotiationFactory)
+class TestNegotiationFactory(ClientFactory):
+    """
+    A factory that implements L{IProtocolNegotiationFactory}.
+    """
+    protocol = TestProtocol
+
+    def acceptableProtocols(self):
+        return [b'h2', b'http/1.1']
+
+
+
 class TestFactory(ClientFactory):
     """
     Simple factory to be used both when connecting and listening. It contains
@@ -414,6 +441,48 @@ class WrappingFactoryTests(unittest.TestCase):
         self.assertTrue(hcp.writeLost)
 
 
+    def test_wrappingProtocolHandshakeListener(self):
+        """
+        Our L{_WrappingProtocol} is an L{IHandshakeListener} if the wrapped
+        protocol is, and passes C{handshakeCompleted} on to it.
+        """
+        listener = TestHandshakeListenerProtocol()
+        p = endpoints._WrappingProtocol(None, listener)
+        self.assertTrue(verifyObject(interfaces.IHandshakeListener, p))
+        p.handshakeCompleted()
+        self.assertEqual(listener.handshakes, 1)
+
+
+    def test_wrappingProtocolNotHandshakeListener(self):
+        """
+        Our L{_WrappingProtocol} does not provide L{IHandshakeListener} if the
+        wrapped protocol doesn't.
+        """
+        p = endpoints._WrappingProtocol(None, TestProtocol())
+        self.assertFalse(interfaces.IHandshakeListener.providedBy(p))
+
+
+    def test_wrappingFactoryProtocolNegotiation(self):
+        """
+        Our L{_WrappingFactory} is an L{IProtocolNegotiationFactory} if the
+        wrapped factory is, and offers the same protocols.
+        """
+        wf = endpoints._WrappingFactory(TestNegotiationFactory())
+        self.assertTrue(
+            verifyObject(interfaces.IProtocolNegotiationFactory, wf))
+        self.assertEqual(wf.acceptableProtocols(), [b'h2', b'http/1.1'])
+
+
+    def test_wrappingFactoryNoProtocolNegotiation(self):
+        """
+        Our L{_WrappingFactory} does not provide
+        L{IProtocolNegotiationFactory} if the wrapped factory doesn't.
+        """
+        wf = endpoints._WrappingFactory(TestFactory())
+        self.assertFalse(
+            interfaces.IProtocolNegotiationFactory.providedBy(wf))
+
+
 
 class ClientEndpointTestCaseMixin(object):
     """
@@ -2471,6 +2540,63 @@ class ParserTests(unittest.TestCase):
 
 
 
+class TCPServerEndpointReusePortTests(unittest.TestCase):
+    """
+    Tests for L{endpoints.TCP4ServerEndpoint} with C{reusePort} set.
+    """
+    if getattr(socket, "SO_REUSEPORT", None) is None:
+        skip = "SO_REUSEPORT is not supported on this platform"
+
+    def listen(self, port, reusePort):
+        """
+        Listen on C{port} on the loopback interface with a
+        L{endpoints.TCP4ServerEndpoint}.
+
+        @return: A L{Deferred} which fires with the L{IListeningPort}.
+        """
+        endpoint = endpoints.TCP4ServerEndpoint(
+            reactor, port, interface="127.0.0.1", reusePort=reusePort)
+        d = endpoint.listen(Factory.forProtocol(Protocol))
+        def listening(port):
+            self.addCleanup(port.stopListening)
+            return port
+        d.addCallback(listening)
+        return d
+
+
+    def test_reusePort(self):
+        """
+        Several endpoints with C{reusePort} set can listen on the same port,
+        and each has C{SO_REUSEPORT} set on its socket.
+        """
+        d = self.listen(0, True)
+        def listening(port):
+            self.assertEqual(
+                port.socket.getsockopt(
+                    socket.SOL_SOCKET, socket.SO_REUSEPORT), 1)
+            return self.listen(port.getHost().port, True).addCallback(
+                lambda second: self.assertEqual(
+                    port.getHost(), second.getHost()))
+        d.addCallback(listening)
+        return d
+
+
+    def test_portInUse(self):
+        """
+        If the port is already in use by a socket without C{SO_REUSEPORT}
+        set, listening with C{reusePort} set fails with
+        L{error.CannotListenError}.
+        """
+        d = self.listen(0, False)
+        def listening(port):
+            return self.assertFailure(
+                self.listen(port.getHost().port, True),
+                error.CannotListenError)
+        d.addCallback(listening)
+        return d
+
+
+
 class ServerStringTests(unittest.TestCase):
     """
     Tests for L{twisted.internet.endpoints.serverFromString}.
@@ -2490,6 +2616,19 @@ class ServerStringTests(unittest.TestCase):
         self.assertEqual(server._port, 1234)
         self.assertEqual(server._backlog, 12)
         self.assertEqual(server._interface, "10.0.0.1")
+        self.assertFalse(server._reusePort)
+
+
+    def test_tcpReusePort(self):
+        """
+        When passed a TCP strports description with C{reusePort=1},
+        L{endpoints.serverFromString} returns a L{TCP4ServerEndpoint} which
+        will set C{SO_REUSEPORT}.
+        """
+        server = endpoints.serverFromString(
+            object(), "tcp:1234:reusePort=1")
+        self.assertIsInstance(server, endpoints.TCP4ServerEndpoint)
+        self.assertTrue(server._reusePort)
 
 
     def test_ssl(self):
@@ -3274,6 +3413,19 @@ class TCP6ServerEndpointPluginTests(unittest.TestCase):
         self.assertEqual(ep._port, 8080)
         self.assertEqual(ep._backlog, 12)
         self.assertEqual(ep._interface, '::1')
+        self.assertFalse(ep._reusePort)
+
+
+    def test_stringDescriptionReusePort(self):
+        """
+        L{serverFromString} returns a L{TCP6ServerEndpoint} which will set
+        C{SO_REUSEPORT} when given a 'tcp6' endpoint string description with
+        C{reusePort=1}.
+        """
+        ep = endpoints.serverFromString(
+            MemoryReactor(), "tcp6:8080:reusePort=1")
+        self.assertIsInstance(ep, endpoints.TCP6ServerEndpoint)
+        self.assertTrue(ep._reusePort)
 
 
 
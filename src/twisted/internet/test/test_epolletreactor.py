@@ -0,0 +1,222 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.internet.epolletreactor}.
+"""
+
+from __future__ import division, absolute_import
+
+from twisted.trial.unittest import TestCase
+try:
+    from select import EPOLLIN, EPOLLOUT, EPOLLET
+    from twisted.internet.epolletreactor import EdgeTriggeredEPollReactor
+except ImportError:
+    EdgeTriggeredEPollReactor = None
+
+
+
+class FakePoller(object):
+    """
+    A fake C{epoll} object which records registrations and returns canned
+    events.
+
+    @ivar calls: A C{list} of tuples describing the calls made to
+        C{register}, C{modify} and C{unregister}.
+
+    @ivar events: A C{list} of C{(fd, event)} pairs to return from the next
+        call to C{poll}.
+
+    @ivar timeouts: A C{list} of the timeouts passed to C{poll}.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.events = []
+        self.timeouts = []
+
+
+    def register(self, fd, flags):
+        self.calls.append(("register", fd, flags))
+
+
+    def modify(self, fd, flags):
+        self.calls.append(("modify", fd, flags))
+
+
+    def unregister(self, fd):
+        self.calls.append(("unregister", fd))
+
+
+    def poll(self, timeout, maxevents):
+        self.timeouts.append(timeout)
+        events, self.events = self.events, []
+        return events
+
+
+    def close(self):
+        pass
+
+
+
+class EdgeTriggerableDescriptor(object):
+    """
+    Records reads and writes, as if it were a C{FileDescriptor}, and claims
+    that a read or write would block after C{reads} reads or C{writes}
+    writes.
+    """
+    _edgeTriggerable = True
+    _readWouldBlock = False
+    _writeWouldBlock = False
+
+    def __init__(self, fd=10, reads=1, writes=1):
+        self.fd = fd
+        self.reads = reads
+        self.writes = writes
+        self.events = []
+
+
+    def fileno(self):
+        return self.fd
+
+
+    def logPrefix(self):
+        return "descriptor"
+
+
+    def doRead(self):
+        self.events.append("read")
+        self.reads -= 1
+        if not self.reads:
+            self._readWouldBlock = True
+
+
+    def doWrite(self):
+        self.events.append("write")
+        self.writes -= 1
+        if not self.writes:
+            self._writeWouldBlock = True
+
+
+
+class LevelTriggeredDescriptor(EdgeTriggerableDescriptor):
+    """
+    A descriptor which does not support edge-triggered notification.
+    """
+    _edgeTriggerable = False
+
+
+
+class EdgeTriggeredEPollReactorTests(TestCase):
+    """
+    Tests for L{EdgeTriggeredEPollReactor}.
+    """
+    if EdgeTriggeredEPollReactor is None:
+        skip = "epoll is not available"
+
+    def setUp(self):
+        self.reactor = EdgeTriggeredEPollReactor()
+        self.reactor.removeReader(self.reactor.waker)
+        self.addCleanup(self.reactor.waker.connectionLost, None)
+        self.reactor._poller.close()
+        self.poller = self.reactor._poller = FakePoller()
+
+
+    def test_registeredOnce(self):
+        """
+        A descriptor which supports edge-triggered notification is registered
+        for both read and write readiness when it is first added, and is not
+        modified as it starts and stops writing.
+        """
+        descriptor = EdgeTriggerableDescriptor()
+        self.reactor.addReader(descriptor)
+        self.reactor.addWriter(descriptor)
+        self.reactor.removeWriter(descriptor)
+        self.reactor.addWriter(descriptor)
+        self.assertEqual(
+            [("register", 10, EPOLLIN | EPOLLOUT | EPOLLET)],
+            self.poller.calls)
+        self.assertEqual([descriptor], self.reactor.getReaders())
+        self.assertEqual([descriptor], self.reactor.getWriters())
+
+
+    def test_unregisteredWhenIdle(self):
+        """
+        A descriptor which supports edge-triggered notification is
+        unregistered once it is neither reading nor writing.
+        """
+        descriptor = EdgeTriggerableDescriptor()
+        self.reactor.addReader(descriptor)
+        self.reactor.addWriter(descriptor)
+        self.reactor.removeReader(descriptor)
+        self.reactor.removeWriter(descriptor)
+        self.assertEqual(
+            [("register", 10, EPOLLIN | EPOLLOUT | EPOLLET),
+             ("unregister", 10)],
+            self.poller.calls)
+        self.assertEqual([], self.reactor.getReaders())
+        self.assertEqual([], self.reactor.getWriters())
+
+
+    def test_levelTriggered(self):
+        """
+        A descriptor which does not support edge-triggered notification is
+        registered as level-triggered.
+        """
+        descriptor = LevelTriggeredDescriptor()
+        self.reactor.addReader(descriptor)
+        self.reactor.addWriter(descriptor)
+        self.assertEqual(
+            [("register", 10, EPOLLIN), ("modify", 10, EPOLLOUT | EPOLLIN)],
+            self.poller.calls)
+
+
+    def test_readUntilWouldBlock(self):
+        """
+        A descriptor which has been reported readable is read from on every
+        iteration, without waiting, until a read would block.
+        """
+        descriptor = EdgeTriggerableDescriptor(reads=3)
+        self.reactor.addReader(descriptor)
+        self.poller.events = [(10, EPOLLIN)]
+        for i in range(4):
+            self.reactor.doPoll(1)
+        self.assertEqual(["read", "read", "read"], descriptor.events)
+        self.assertEqual([1, 0, 0, 1], self.poller.timeouts)
+
+
+    def test_writableWhileNotWriting(self):
+        """
+        A descriptor which was writable when it stopped writing is written to
+        as soon as it starts writing again, without waiting for another
+        notification.
+        """
+        descriptor = EdgeTriggerableDescriptor(writes=2)
+        self.reactor.addReader(descriptor)
+        self.reactor.addWriter(descriptor)
+        self.poller.events = [(10, EPOLLOUT)]
+        self.reactor.doPoll(1)
+        self.reactor.removeWriter(descriptor)
+        self.reactor.doPoll(1)
+        self.reactor.addWriter(descriptor)
+        self.reactor.doPoll(1)
+        self.assertEqual(["write", "write"], descriptor.events)
+        self.assertEqual([1, 1, 0], self.poller.timeouts)
+
+
+    def test_notReadingWhilePaused(self):
+        """
+        A descriptor which has been reported readable is not read from while
+        it is not reading.
+        """
+        descriptor = EdgeTriggerableDescriptor()
+        self.reactor.addReader(descriptor)
+        self.reactor.addWriter(descriptor)
+        self.reactor.removeReader(descriptor)
+        self.poller.events = [(10, EPOLLIN)]
+        self.reactor.doPoll(1)
+        self.assertEqual([], descriptor.events)
+        self.reactor.addReader(descriptor)
+        self.reactor.doPoll(1)
+        self.assertEqual(["read"], descriptor.events)
+        self.assertEqual([1, 0], self.poller.timeouts)
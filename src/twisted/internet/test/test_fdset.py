@@ -286,7 +286,8 @@ class ReactorFDSetTestsBuilder(ReactorBuilder):
         reactor = self.buildReactor()
 
         name = reactor.__class__.__name__
-        if name in ('EPollReactor', 'KQueueReactor', 'CFReactor',
+        if name in ('EPollReactor', 'EdgeTriggeredEPollReactor',
+                    'KQueueReactor', 'CFReactor',
                     'AsyncioSelectorReactor'):
             # Closing a file descriptor immediately removes it from the epoll
             # set without generating a notification.  That means epollreactor
@@ -55,6 +55,62 @@ class MemoryFile(FileDescriptor):
 
 
 
+class MemoryVectorFile(MemoryFile):
+    """
+    A L{MemoryFile} which also accepts vectored writes, recording each
+    sequence of buffers it is given.
+
+    @ivar _vectors: A C{list} of the C{list}s of C{bytes} passed to
+        C{writeSomeVectors}.
+    """
+    vectoredWrites = True
+
+    def __init__(self):
+        MemoryFile.__init__(self)
+        self._vectors = []
+
+
+    def writeSomeVectors(self, vectors):
+        """
+        Record C{vectors} and accept at most C{self._freeSpace} bytes of them.
+
+        @return: A C{int} indicating how many bytes were accepted.
+        """
+        self._vectors.append([bytes(vector) for vector in vectors])
+        data = b"".join(self._vectors[-1])
+        return self.writeSomeData(data)
+
+
+
+class MemoryFileWriter(MemoryFile):
+    """
+    A L{MemoryFile} which also accepts parts of files, recording each part it
+    is given.
+
+    @ivar _fileParts: A C{list} of the C{(fileno, offset, count)} tuples of
+        the parts of files which have been accepted as written.
+    """
+    fileWrites = True
+
+    def __init__(self):
+        MemoryFile.__init__(self)
+        self._fileParts = []
+
+
+    def writeSomeFile(self, fileno, offset, count):
+        """
+        Accept at most C{self._freeSpace} bytes of the part of the file.
+
+        @return: A C{int} indicating how many bytes were accepted.
+        """
+        acceptLength = min(self._freeSpace, count)
+        if acceptLength:
+            self._freeSpace -= acceptLength
+            self._fileParts.append((fileno, offset, acceptLength))
+        return acceptLength
+
+
+
 class FileDescriptorTests(SynchronousTestCase):
     """
     Tests for L{FileDescriptor}.
@@ -97,3 +153,204 @@ class WriteDescriptorTests(SynchronousTestCase):
         descriptor = MemoryFile()
         descriptor.write(b"hello, world")
         self.assertIsNone(descriptor.doWrite())
+
+
+
+class VectoredWriteTests(SynchronousTestCase):
+    """
+    Tests for L{FileDescriptor.doWrite} when L{FileDescriptor.vectoredWrites}
+    is true.
+    """
+    def test_buffersNotConcatenated(self):
+        """
+        The buffered chunks are passed to L{FileDescriptor.writeSomeVectors}
+        separately and in order.
+        """
+        descriptor = MemoryVectorFile()
+        descriptor._freeSpace = 100
+        descriptor.writeSequence([b"a", b"bc"])
+        descriptor.write(b"def")
+        self.assertIsNone(descriptor.doWrite())
+        self.assertEqual([[b"a", b"bc", b"def"]], descriptor._vectors)
+        self.assertEqual(b"", descriptor.dataBuffer)
+        self.assertEqual(0, descriptor.offset)
+        self.assertEqual(0, descriptor._tempDataLen)
+        self.assertEqual(0, len(descriptor._tempDataBuffer))
+
+
+    def test_partialWrite(self):
+        """
+        If only part of a chunk is written, the next call to
+        L{FileDescriptor.doWrite} starts with the rest of that chunk,
+        followed by the chunks after it.
+        """
+        descriptor = MemoryVectorFile()
+        descriptor._freeSpace = 4
+        descriptor.writeSequence([b"a", b"bc", b"def", b"gh"])
+        descriptor.doWrite()
+        descriptor._freeSpace = 100
+        descriptor.doWrite()
+        self.assertEqual(
+            [[b"a", b"bc", b"def", b"gh"], [b"ef", b"gh"]],
+            descriptor._vectors)
+        self.assertEqual(b"abcdefgh", b"".join(descriptor._written))
+        self.assertEqual(0, descriptor._tempDataLen)
+
+
+    def test_partialWriteOfRemainder(self):
+        """
+        If only part of the unsent remainder of an earlier chunk is written,
+        the buffered chunks are kept.
+        """
+        descriptor = MemoryVectorFile()
+        descriptor._freeSpace = 1
+        descriptor.writeSequence([b"abcd", b"ef"])
+        descriptor.doWrite()
+        descriptor.doWrite()
+        self.assertEqual(
+            [[b"abcd", b"ef"], [b"bcd", b"ef"]], descriptor._vectors)
+        self.assertEqual(b"abcd", descriptor.dataBuffer)
+        self.assertEqual(1, descriptor.offset)
+        self.assertEqual(2, descriptor._tempDataLen)
+
+
+    def test_sendLimit(self):
+        """
+        Chunks are passed to L{FileDescriptor.writeSomeVectors} until at
+        least L{FileDescriptor.SEND_LIMIT} bytes or
+        L{FileDescriptor.SEND_IOVEC_LIMIT} chunks have been gathered.
+        """
+        descriptor = MemoryVectorFile()
+        descriptor._freeSpace = 100
+        descriptor.SEND_LIMIT = 3
+        descriptor.SEND_IOVEC_LIMIT = 3
+        descriptor.writeSequence([b"ab", b"cd", b"e", b"f", b"g", b"h"])
+        descriptor.doWrite()
+        descriptor.doWrite()
+        descriptor.doWrite()
+        self.assertEqual(
+            [[b"ab", b"cd"], [b"e", b"f", b"g"], [b"h"]], descriptor._vectors)
+
+
+    def test_connectionLost(self):
+        """
+        If L{FileDescriptor.writeSomeVectors} returns an exception,
+        L{FileDescriptor.doWrite} returns it and keeps the buffered chunks.
+        """
+        descriptor = MemoryVectorFile()
+        lost = Exception("lost")
+        descriptor.writeSomeVectors = lambda vectors: lost
+        descriptor.write(b"abc")
+        self.assertIs(lost, descriptor.doWrite())
+        self.assertEqual(3, descriptor._tempDataLen)
+
+
+    def test_defaultConcatenates(self):
+        """
+        By default, L{FileDescriptor.writeSomeVectors} concatenates the
+        buffers and passes them to L{FileDescriptor.writeSomeData}.
+        """
+        descriptor = MemoryFile()
+        descriptor.vectoredWrites = True
+        descriptor._freeSpace = 4
+        descriptor.writeSequence([b"ab", b"cd", b"ef"])
+        descriptor.doWrite()
+        self.assertEqual([b"abcd"], descriptor._written)
+        self.assertEqual([b"ef"], list(descriptor._tempDataBuffer))
+        self.assertEqual(2, descriptor._tempDataLen)
+
+
+
+class FileWriteTests(SynchronousTestCase):
+    """
+    Tests for L{FileDescriptor.writeFile}.
+    """
+
+    def test_afterData(self):
+        """
+        The part of a file passed to L{FileDescriptor.writeFile} is written by
+        L{FileDescriptor.doWrite} with L{FileDescriptor.writeSomeFile} after
+        the data written before it.
+        """
+        descriptor = MemoryFileWriter()
+        descriptor.write(b"abc")
+        descriptor.writeFile(7, 10, 5)
+        descriptor._freeSpace = 2
+        descriptor.doWrite()
+        self.assertEqual([b"ab"], descriptor._written)
+        self.assertEqual([], descriptor._fileParts)
+        descriptor._freeSpace = 3
+        descriptor.doWrite()
+        self.assertEqual([b"ab", b"c"], descriptor._written)
+        self.assertEqual([(7, 10, 2)], descriptor._fileParts)
+
+
+    def test_partialWrite(self):
+        """
+        If L{FileDescriptor.writeSomeFile} does not write all of the part of
+        the file, L{FileDescriptor.doWrite} writes the rest of it next time.
+        """
+        descriptor = MemoryFileWriter()
+        descriptor.writeFile(7, 10, 5)
+        descriptor._freeSpace = 2
+        descriptor.doWrite()
+        self.assertEqual((7, 12, 3), descriptor._fileToWrite)
+        descriptor._freeSpace = 10
+        descriptor.doWrite()
+        self.assertEqual([(7, 10, 2), (7, 12, 3)], descriptor._fileParts)
+        self.assertIs(None, descriptor._fileToWrite)
+
+
+    def test_resumesProducer(self):
+        """
+        A registered non-streaming producer is resumed once all of the part of
+        the file has been written, and not before.
+        """
+        resumed = []
+        class Producer(object):
+            def resumeProducing(self):
+                resumed.append(True)
+
+        descriptor = MemoryFileWriter()
+        descriptor.registerProducer(Producer(), False)
+        del resumed[:]
+        descriptor.writeFile(7, 0, 4)
+        descriptor._freeSpace = 3
+        descriptor.doWrite()
+        self.assertEqual([], resumed)
+        descriptor._freeSpace = 3
+        descriptor.doWrite()
+        self.assertEqual([True], resumed)
+
+
+    def test_secondFile(self):
+        """
+        L{FileDescriptor.writeFile} raises L{RuntimeError} if part of another
+        file is still being written.
+        """
+        descriptor = MemoryFileWriter()
+        descriptor.writeFile(7, 0, 4)
+        self.assertRaises(RuntimeError, descriptor.writeFile, 8, 0, 4)
+
+
+    def test_connectionLost(self):
+        """
+        If L{FileDescriptor.writeSomeFile} returns an exception,
+        L{FileDescriptor.doWrite} returns it.
+        """
+        descriptor = MemoryFileWriter()
+        lost = Exception("lost")
+        descriptor.writeSomeFile = lambda fileno, offset, count: lost
+        descriptor.writeFile(7, 0, 4)
+        self.assertIs(lost, descriptor.doWrite())
+
+
+    def test_notImplemented(self):
+        """
+        L{FileDescriptor.writeSomeFile} raises L{NotImplementedError} unless
+        it is overridden.
+        """
+        self.assertFalse(FileDescriptor.fileWrites)
+        descriptor = MemoryFile()
+        self.assertRaises(
+            NotImplementedError, descriptor.writeSomeFile, 7, 0, 4)
@@ -12,11 +12,12 @@ from zope.interface import implementer
 
 from twisted.python.failure import Failure
 from twisted.internet.interfaces import (
-    IProtocol, ILoggingContext, IProtocolFactory, IConsumer)
+    IProtocol, ILoggingContext, IProtocolFactory, IConsumer,
+    IBufferedProtocol, IBufferedDatagramProtocol)
 from twisted.internet.defer import CancelledError
 from twisted.internet.protocol import (
     Protocol, ClientCreator, Factory, ProtocolToConsumerAdapter,
-    ConsumerToProtocolAdapter)
+    ConsumerToProtocolAdapter, BufferedProtocol, BufferedDatagramProtocol)
 from twisted.trial.unittest import TestCase
 from twisted.test.proto_helpers import MemoryReactorClock, StringTransport
 from twisted.logger import LogLevel, globalLogPublisher
@@ -340,6 +341,88 @@ class ProtocolTests(TestCase):
 
 
 
+class BufferedProtocolTests(TestCase):
+    """
+    Tests for L{twisted.internet.protocol.BufferedProtocol}.
+    """
+    def setUp(self):
+        self.received = []
+        self.buffer = bytearray(4)
+
+        class Collector(BufferedProtocol):
+            def getBuffer(collector, sizeHint):
+                return self.buffer
+
+            def bufferUpdated(collector, nbytes):
+                self.received.append(bytes(self.buffer[:nbytes]))
+
+        self.protocol = Collector()
+
+
+    def test_interfaces(self):
+        """
+        L{BufferedProtocol} instances provide L{IBufferedProtocol}.
+        """
+        self.assertTrue(verifyObject(IBufferedProtocol, BufferedProtocol()))
+
+
+    def test_dataReceived(self):
+        """
+        L{BufferedProtocol.dataReceived} copies the data into as many buffers
+        as it takes, calling C{bufferUpdated} after each.
+        """
+        self.protocol.dataReceived(b"abcdefghij")
+        self.assertEqual(self.received, [b"abcd", b"efgh", b"ij"])
+
+
+    def test_dataReceivedEmptyBuffer(self):
+        """
+        L{BufferedProtocol.dataReceived} raises L{ValueError} if C{getBuffer}
+        returns an empty buffer.
+        """
+        self.buffer = bytearray()
+        self.assertRaises(ValueError, self.protocol.dataReceived, b"abc")
+
+
+
+class BufferedDatagramProtocolTests(TestCase):
+    """
+    Tests for L{twisted.internet.protocol.BufferedDatagramProtocol}.
+    """
+    def test_interfaces(self):
+        """
+        L{BufferedDatagramProtocol} instances provide
+        L{IBufferedDatagramProtocol}.
+        """
+        self.assertTrue(verifyObject(
+            IBufferedDatagramProtocol, BufferedDatagramProtocol()))
+
+
+    def test_datagramReceived(self):
+        """
+        L{BufferedDatagramProtocol.datagramReceived} copies the datagram into
+        the buffer and calls C{bufferUpdated}, truncating the datagram if it
+        does not fit.
+        """
+        received = []
+        buf = bytearray(4)
+
+        class Collector(BufferedDatagramProtocol):
+            def getBuffer(self, sizeHint):
+                return buf
+
+            def bufferUpdated(self, nbytes, addr):
+                received.append((bytes(buf[:nbytes]), addr))
+
+        protocol = Collector()
+        protocol.datagramReceived(b"ab", ("127.0.0.1", 53))
+        protocol.datagramReceived(b"abcdef", ("127.0.0.1", 54))
+        self.assertEqual(
+            received,
+            [(b"ab", ("127.0.0.1", 53)), (b"abcd", ("127.0.0.1", 54))])
+
+
+
 class FactoryTests(TestCase):
     """
     Tests for L{protocol.Factory}.
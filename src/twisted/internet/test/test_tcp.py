@@ -11,6 +11,7 @@ from __future__ import division, absolute_import
 __metaclass__ = type
 
 import errno
+import os
 import socket
 
 from functools import wraps
@@ -39,8 +40,10 @@ from twisted.internet.interfaces import (
 from twisted.internet.address import IPv4Address, IPv6Address
 from twisted.internet.defer import (
     Deferred, DeferredList, maybeDeferred, gatherResults, succeed, fail)
+from twisted.internet.main import CONNECTION_DONE
 from twisted.internet.endpoints import TCP4ServerEndpoint, TCP4ClientEndpoint
-from twisted.internet.protocol import ServerFactory, ClientFactory, Protocol
+from twisted.internet.protocol import (
+    ServerFactory, ClientFactory, Protocol, BufferedProtocol)
 from twisted.internet.interfaces import (
     IPushProducer, IPullProducer, IHalfCloseableProtocol)
 from twisted.internet.tcp import Connection, Server, _resolveIPv6
@@ -122,7 +125,8 @@ class FakeSocket(object):
     @ivar data: A C{str} giving the data which will be returned from
         L{FakeSocket.recv}.
 
-    @ivar sendBuffer: A C{list} of the objects passed to L{FakeSocket.send}.
+    @ivar sendBuffer: A C{list} of the objects passed to L{FakeSocket.send}
+        and L{FakeSocket.sendmsg}.
     """
     def __init__(self, data):
         self.data = data
@@ -134,6 +138,17 @@ class FakeSocket(object):
     def recv(self, size):
         return self.data
 
+
+    def recv_into(self, buffer):
+        """
+        I{Receive} as much of C{self.data} as fits into C{buffer}.
+
+        @return: The number of bytes written into C{buffer}.
+        """
+        nbytes = min(len(buffer), len(self.data))
+        buffer[:nbytes] = self.data[:nbytes]
+        return nbytes
+
     def send(self, bytes):
         """
         I{Send} all of C{bytes} by accumulating it into C{self.sendBuffer}.
@@ -145,6 +160,17 @@ class FakeSocket(object):
         return len(bytes)
 
 
+    def sendmsg(self, buffers):
+        """
+        I{Send} all of C{buffers} by accumulating them, as a C{list}, into
+        C{self.sendBuffer}.
+
+        @return: The total length of C{buffers}.
+        """
+        self.sendBuffer.append(list(buffers))
+        return sum(len(b) for b in buffers)
+
+
     def shutdown(self, how):
         """
         Shutdown is not implemented.  The method is provided since real sockets
@@ -220,6 +246,31 @@ class FakeProtocol(Protocol):
 
 
 
+class FakeBufferedProtocol(BufferedProtocol):
+    """
+    An L{IBufferedProtocol} which records what is read into its buffer.
+
+    @ivar buffer: The buffer returned from every call to L{getBuffer}.
+    @ivar sizeHints: The size hints passed to L{getBuffer}.
+    @ivar received: The data read into the buffer for each call to
+        L{bufferUpdated}.
+    """
+    def __init__(self, size):
+        self.buffer = bytearray(size)
+        self.sizeHints = []
+        self.received = []
+
+
+    def getBuffer(self, sizeHint):
+        self.sizeHints.append(sizeHint)
+        return self.buffer
+
+
+    def bufferUpdated(self, nbytes):
+        self.received.append(bytes(self.buffer[:nbytes]))
+
+
+
 @implementer(IReactorFDSet)
 class _FakeFDSetReactor(object):
     """
@@ -353,6 +404,164 @@ class TCPConnectionTests(TestCase):
         self.assertEqual(len(warnings), 1)
 
 
+    def test_doReadIntoBuffer(self):
+        """
+        L{Connection.doRead} reads data into the buffer supplied by an
+        L{IBufferedProtocol} provider and tells it how much was read.
+        """
+        skt = FakeSocket(b"someData")
+        protocol = FakeBufferedProtocol(4)
+        conn = Connection(skt, protocol)
+        self.assertIsNone(conn.doRead())
+        self.assertEqual(protocol.received, [b"some"])
+        self.assertEqual(protocol.sizeHints, [conn.bufferSize])
+
+
+    def test_doReadIntoBufferConnectionDone(self):
+        """
+        L{Connection.doRead} returns L{CONNECTION_DONE} without calling
+        L{IBufferedProtocol.bufferUpdated} when there is no more data.
+        """
+        skt = FakeSocket(b"")
+        protocol = FakeBufferedProtocol(4)
+        conn = Connection(skt, protocol)
+        self.assertIs(conn.doRead(), CONNECTION_DONE)
+        self.assertEqual(protocol.received, [])
+
+
+    def test_doReadIntoEmptyBuffer(self):
+        """
+        L{Connection.doRead} raises L{ValueError} if an L{IBufferedProtocol}
+        provider supplies an empty buffer, which could not be told apart from
+        the end of the connection.
+        """
+        skt = FakeSocket(b"someData")
+        protocol = FakeBufferedProtocol(0)
+        conn = Connection(skt, protocol)
+        self.assertRaises(ValueError, conn.doRead)
+        self.assertEqual(protocol.received, [])
+
+
+    def test_doReadAfterProtocolSwitch(self):
+        """
+        L{Connection.doRead} delivers data through C{dataReceived} once an
+        L{IBufferedProtocol} provider has been replaced by a protocol which
+        does not provide it, and reads into the buffer again after switching
+        back.
+        """
+        skt = FakeSocket(b"someData")
+        buffered = FakeBufferedProtocol(4)
+        conn = Connection(skt, buffered)
+        conn.doRead()
+
+        received = []
+        plain = Protocol()
+        plain.dataReceived = received.append
+        conn.protocol = plain
+        conn.doRead()
+        self.assertEqual(received, [b"someData"])
+
+        conn.protocol = buffered
+        conn.doRead()
+        self.assertEqual(buffered.received, [b"some", b"some"])
+        self.assertEqual(received, [b"someData"])
+
+
+    def test_writeSomeVectors(self):
+        """
+        L{Connection.writeSomeVectors} sends all of the buffers it is given
+        with a single call to C{sendmsg} and returns the number of bytes
+        sent.
+        """
+        skt = FakeSocket(b"")
+        conn = Connection(skt, FakeProtocol())
+        self.assertEqual(
+            conn.writeSomeVectors([b"abc", b"de"]), 5)
+        self.assertEqual(skt.sendBuffer, [[b"abc", b"de"]])
+
+
+    def test_writeSomeVectorsWithoutSendmsg(self):
+        """
+        If the socket has no C{sendmsg} method, L{Connection.writeSomeVectors}
+        concatenates the buffers and sends them with C{send}.
+        """
+        skt = FakeSocket(b"")
+        skt.sendmsg = None
+        conn = Connection(skt, FakeProtocol())
+        self.assertEqual(
+            conn.writeSomeVectors([b"abc", b"de"]), 5)
+        self.assertEqual([bytes(b) for b in skt.sendBuffer], [b"abcde"])
+
+
+    def test_vectoredDoWrite(self):
+        """
+        When L{Connection.vectoredWrites} is true, L{Connection.doWrite}
+        sends the buffered chunks without concatenating them.
+        """
+        skt = FakeSocket(b"")
+        conn = Connection(skt, FakeProtocol())
+        conn.vectoredWrites = True
+        conn.connected = True
+        conn.startWriting = lambda: None
+        conn.stopWriting = lambda: None
+        conn.writeSequence([b"GET ", b"/ ", b"HTTP/1.1\r\n"])
+        conn.doWrite()
+        self.assertEqual(
+            skt.sendBuffer, [[b"GET ", b"/ ", b"HTTP/1.1\r\n"]])
+
+
+    def test_writeSomeFile(self):
+        """
+        L{Connection.writeSomeFile} sends part of a file with C{sendfile} and
+        returns the number of bytes sent.
+        """
+        server, client = socket.socketpair()
+        self.addCleanup(server.close)
+        self.addCleanup(client.close)
+        path = self.mktemp()
+        with open(path, "wb") as f:
+            f.write(b"0123456789")
+        with open(path, "rb") as f:
+            conn = Connection(server, FakeProtocol())
+            self.assertEqual(conn.writeSomeFile(f.fileno(), 2, 5), 5)
+        self.assertEqual(client.recv(100), b"23456")
+
+
+    def test_writeSomeFileAfterEnd(self):
+        """
+        L{Connection.writeSomeFile} returns an exception if the file ends
+        before the part of it which is to be sent.
+        """
+        server, client = socket.socketpair()
+        self.addCleanup(server.close)
+        self.addCleanup(client.close)
+        path = self.mktemp()
+        with open(path, "wb") as f:
+            f.write(b"0123456789")
+        with open(path, "rb") as f:
+            conn = Connection(server, FakeProtocol())
+            self.assertIsInstance(
+                conn.writeSomeFile(f.fileno(), 10, 5), ConnectionLost)
+
+
+    def test_tlsDisablesFileWrites(self):
+        """
+        L{Connection.fileWrites} is C{False} after L{Connection.startTLS} is
+        called, since files would have to be encrypted.
+        """
+        skt = FakeSocket(b"")
+        conn = Connection(skt, FakeProtocol(), reactor=_FakeFDSetReactor())
+        conn._tlsClientDefault = True
+        conn.startTLS(ClientContextFactory(), True)
+        self.assertFalse(conn.fileWrites)
+    if not useSSL:
+        test_tlsDisablesFileWrites.skip = "No SSL support available"
+
+    if getattr(os, "sendfile", None) is None:
+        test_writeSomeFile.skip = test_writeSomeFileAfterEnd.skip = (
+            "os.sendfile is not available")
+
+
     def test_noTLSBeforeStartTLS(self):
         """
         The C{TLS} attribute of a L{Connection} instance is C{False} before
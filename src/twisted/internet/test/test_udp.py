@@ -22,7 +22,8 @@ from twisted.internet.defer import Deferred, maybeDeferred
 from twisted.internet.interfaces import (
     ILoggingContext, IListeningPort, IReactorUDP, IReactorSocket)
 from twisted.internet.address import IPv4Address, IPv6Address
-from twisted.internet.protocol import DatagramProtocol
+from twisted.internet.protocol import (
+    DatagramProtocol, BufferedDatagramProtocol)
 
 from twisted.internet.test.connectionmixins import (LogObserverMixin,
                                                     findFreePort)
@@ -228,6 +229,39 @@ class UDPPortTestsMixin(object):
         self.runReactor(reactor)
 
 
+    def test_bufferedProtocol(self):
+        """
+        Datagrams for an L{IBufferedDatagramProtocol} provider are read into
+        the buffer it supplies, and it is told their sizes and senders.
+        """
+        class BufferedProtocol(BufferedDatagramProtocol):
+            def __init__(self):
+                self.buffer = bytearray(16)
+                self.received = []
+                self.sizeHints = []
+
+            def getBuffer(self, sizeHint):
+                self.sizeHints.append(sizeHint)
+                return self.buffer
+
+            def bufferUpdated(self, nbytes, addr):
+                self.received.append((bytes(self.buffer[:nbytes]), addr))
+                if len(self.received) == 2:
+                    reactor.stop()
+
+        reactor = self.buildReactor()
+        protocol = BufferedProtocol()
+        port = self.getListeningPort(reactor, protocol, maxPacketSize=1000)
+        address = ('127.0.0.1', port.getHost().port)
+        port.write(b"some bytes", address)
+        port.write(b"more bytes than fit", address)
+        self.runReactor(reactor)
+        self.assertEqual(
+            protocol.received,
+            [(b"some bytes", address), (b"more bytes than ", address)])
+        self.assertEqual(protocol.sizeHints[:2], [1000, 1000])
+
+
     def test_str(self):
         """
         C{str()} on the listening port object includes the port number.
@@ -221,10 +221,17 @@ class Port(base.BasePort):
         """
         Called when my socket is ready for reading.
         """
+        buffered = interfaces.IBufferedDatagramProtocol.providedBy(
+            self.protocol)
         read = 0
         while read < self.maxThroughput:
             try:
-                data, addr = self.socket.recvfrom(self.maxPacketSize)
+                if buffered:
+                    buf = self.protocol.getBuffer(self.maxPacketSize)
+                    nbytes, addr = self.socket.recvfrom_into(buf)
+                else:
+                    data, addr = self.socket.recvfrom(self.maxPacketSize)
+                    nbytes = len(data)
             except socket.error as se:
                 no = se.args[0]
                 if no in _sockErrReadIgnore:
@@ -235,7 +242,7 @@ class Port(base.BasePort):
                     return
                 raise
             else:
-                read += len(data)
+                read += nbytes
                 if self.addressFamily == socket.AF_INET6:
                     # Remove the flow and scope ID from the address tuple,
                     # reducing it to a tuple of just (host, port).
@@ -245,7 +252,10 @@ class Port(base.BasePort):
                     # and scope ID. See http://tm.tl/6826
                     addr = addr[:2]
                 try:
-                    self.protocol.datagramReceived(data, addr)
+                    if buffered:
+                        self.protocol.bufferUpdated(nbytes, addr)
+                    else:
+                        self.protocol.datagramReceived(data, addr)
                 except:
                     log.err()
 
@@ -23,7 +23,7 @@ from zope.interface import implementer, implementer_only, implementedBy
 if not hasattr(socket, 'AF_UNIX'):
     raise ImportError("UNIX sockets not supported on this platform")
 
-from twisted.internet import main, base, tcp, udp, error, interfaces
+from twisted.internet import main, base, tcp, udp, error, interfaces, abstract
 from twisted.internet import protocol, address
 from twisted.python import lockfile, log, reflect, failure
 from twisted.python.filepath import _coerceToFilesystemEncoding
@@ -133,7 +133,10 @@ class _SendmsgMixin(object):
                         sendmsg.sendmsg, self.socket, data[index:index+1],
                         _ancillaryDescriptor(fd))
                 except socket.error as se:
-                    if se.args[0] in (EWOULDBLOCK, ENOBUFS):
+                    if se.args[0] == EWOULDBLOCK:
+                        self._writeWouldBlock = True
+                        return index
+                    elif se.args[0] == ENOBUFS:
                         return index
                     else:
                         return main.CONNECTION_LOST
@@ -152,6 +155,31 @@ class _SendmsgMixin(object):
             return result
 
 
+    def writeSomeVectors(self, vectors):
+        """
+        Send as much of C{vectors} as possible.
+
+        File descriptors can only be sent along with some of the data, so
+        while any are pending this falls back to concatenating C{vectors}
+        and calling L{writeSomeData}.
+        """
+        if self._sendmsgQueue:
+            return abstract.FileDescriptor.writeSomeVectors(self, vectors)
+        return self._writeSomeDataBase.writeSomeVectors(self, vectors)
+
+
+    def _checkBuffered(self, protocol):
+        """
+        Like L{tcp.Connection._checkBuffered}, but a protocol which provides
+        L{IFileDescriptorReceiver} never has data read into its buffer, so
+        that file descriptors sent to it are still received.
+        """
+        self._bufferedFor = protocol
+        self._readsIntoBuffer = (
+            interfaces.IBufferedProtocol.providedBy(protocol) and not
+            interfaces.IFileDescriptorReceiver.providedBy(protocol))
+
+
     def doRead(self):
         """
         Calls L{IFileDescriptorReceiver.fileDescriptorReceived} and
@@ -161,12 +189,22 @@ class _SendmsgMixin(object):
         dispatches the data to protocol callbacks to be handled.  If the
         connection is not lost through an error in the underlying recvmsg(),
         this function will return the result of the dataReceived call.
+
+        A protocol which provides L{IBufferedProtocol} but not
+        L{IFileDescriptorReceiver} has data read straight into its buffer;
+        any file descriptors sent to it are discarded by the kernel.
         """
+        protocol = self.protocol
+        if protocol is not self._bufferedFor:
+            self._checkBuffered(protocol)
+        if self._readsIntoBuffer:
+            return self._readIntoBuffer(protocol)
         try:
             data, ancillary, flags = untilConcludes(
                 sendmsg.recvmsg, self.socket, self.bufferSize)
         except socket.error as se:
             if se.args[0] == EWOULDBLOCK:
+                self._readWouldBlock = True
                 return
             else:
                 return main.CONNECTION_LOST
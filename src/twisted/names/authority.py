@@ -60,10 +60,120 @@ def getSerial(filename = '/tmp/twisted-names.serial'):
 
 
 
+class _ZoneIndex(object):
+    """
+    The records of a zone, indexed for answering queries.
+
+    @ivar soa: The SOA record of the zone, as in L{FileAuthority.soa}.
+
+    @ivar records: The records of the zone, as in L{FileAuthority.records}.
+    @type records: L{dict} mapping L{bytes} to L{list} of L{IRecord}
+        providers
+
+    @ivar defaultTTL: The TTL of records which have none.
+    @type defaultTTL: L{int}
+
+    @ivar answersByType: The records of each name and type which answer a
+        query for that type: all but the I{NS} records of delegation points.
+    @type answersByType: L{dict} mapping L{tuple} of L{bytes} and L{int} to
+        L{list}
+
+    @ivar referrals: The I{NS} records at each delegation point: each name
+        other than the origin of the zone which has I{NS} records.
+    @type referrals: L{dict} mapping L{bytes} to L{list}
+
+    @ivar addresses: The address records at each name, for the additional
+        section of responses, such as glue for referrals.
+    @type addresses: L{dict} mapping L{bytes} to L{list}
+    """
+
+    def __init__(self, soa, records, addressTypes):
+        """
+        @param soa: See L{soa}.
+
+        @param records: See L{records}.
+
+        @param addressTypes: The types of the records in L{addresses}.
+        @type addressTypes: L{tuple} of L{int}
+        """
+        self.soa = soa
+        self.records = records
+        self.defaultTTL = max(soa[1].minimum, soa[1].expire)
+        self.answersByType = answersByType = {}
+        self.referrals = referrals = {}
+        self.addresses = addresses = {}
+
+        origin = soa[0].lower()
+        for name, nameRecords in records.items():
+            delegated = name != origin
+            if len(nameRecords) == 1:
+                # Most names have a single record: share its list rather
+                # than making more.
+                recordType = nameRecords[0].TYPE
+                if recordType == dns.NS and delegated:
+                    referrals[name] = nameRecords
+                else:
+                    answersByType[name, recordType] = nameRecords
+                    if recordType in addressTypes:
+                        addresses[name] = nameRecords
+                continue
+
+            for record in nameRecords:
+                recordType = record.TYPE
+                if recordType == dns.NS and delegated:
+                    index, key = referrals, name
+                else:
+                    index, key = answersByType, (name, recordType)
+                    if recordType in addressTypes:
+                        self._append(addresses, name, record)
+                self._append(index, key, record)
+
+
+    def _append(self, index, key, record):
+        """
+        Add a record to the list of records for a key in one of the indexes.
+
+        @param index: The index.
+        @type index: L{dict} mapping keys to L{list}s
+
+        @param key: The key.
+
+        @param record: The record.
+        """
+        keyRecords = index.get(key)
+        if keyRecords is None:
+            index[key] = [record]
+        else:
+            keyRecords.append(record)
+
+
+    def answers(self, name):
+        """
+        Find the records which answer a query for all records of a name.
+
+        @param name: The name, in lower case.
+        @type name: L{bytes}
+
+        @return: The records of C{name}, other than those which are
+            C{referrals}.
+        @rtype: L{list}
+        """
+        nameRecords = self.records.get(name, [])
+        if name in self.referrals:
+            nameRecords = [
+                record for record in nameRecords if record.TYPE != dns.NS]
+        return nameRecords
+
+
+
 class FileAuthority(common.ResolverBase):
     """
     An Authority that is loaded from a file.
 
+    Queries are answered from an index of C{records}, which is built again
+    when C{soa} or C{records} is replaced.  Changes made to C{records} in
+    place are not seen until then.
+
     @ivar _ADDITIONAL_PROCESSING_TYPES: Record types for which additional
         processing will be done.
 
@@ -72,6 +182,10 @@ class FileAuthority(common.ResolverBase):
 
     @ivar soa: A 2-tuple containing the SOA domain name as a L{bytes} and a
         L{dns.Record_SOA}.
+
+    @ivar _index: The index of C{records}, or L{None} if it has not been
+        built yet.
+    @type _index: L{_ZoneIndex} or L{None}
     """
     # See https://twistedmatrix.com/trac/ticket/6650
     _ADDITIONAL_PROCESSING_TYPES = (dns.CNAME, dns.MX, dns.NS)
@@ -79,11 +193,14 @@ class FileAuthority(common.ResolverBase):
 
     soa = None
     records = None
+    _index = None
 
     def __init__(self, filename):
         common.ResolverBase.__init__(self)
         self.loadFile(filename)
         self._cache = {}
+        if self.soa is not None:
+            self._zoneIndex()
 
 
     def __setstate__(self, state):
@@ -91,6 +208,21 @@ class FileAuthority(common.ResolverBase):
 #        print 'setstate ', self.soa
 
 
+    def _zoneIndex(self):
+        """
+        Get the index of the records of this authority, building it if it is
+        missing or out of date.
+
+        @rtype: L{_ZoneIndex}
+        """
+        index = self._index
+        if (index is None or index.records is not self.records or
+                index.soa is not self.soa):
+            index = self._index = _ZoneIndex(
+                self.soa, self.records, self._ADDRESS_TYPES)
+        return index
+
+
     def _additionalRecords(self, answer, authority, ttl):
         """
         Find locally known information that could be useful to the consumer of
@@ -112,14 +244,14 @@ class FileAuthority(common.ResolverBase):
             I{additional} section.  These instances represent extra information
             about the records in C{answer} and C{authority}.
         """
+        addresses = self._zoneIndex().addresses
         for record in answer + authority:
             if record.type in self._ADDITIONAL_PROCESSING_TYPES:
                 name = record.payload.name.name
-                for rec in self.records.get(name.lower(), ()):
-                    if rec.TYPE in self._ADDRESS_TYPES:
-                        yield dns.RRHeader(
-                            name, rec.TYPE, dns.IN,
-                            rec.ttl or ttl, rec, auth=True)
+                for rec in addresses.get(name.lower(), ()):
+                    yield dns.RRHeader(
+                        name, rec.TYPE, dns.IN,
+                        rec.ttl or ttl, rec, auth=True)
 
 
     def _lookup(self, name, cls, type, timeout = None):
@@ -146,38 +278,41 @@ class FileAuthority(common.ResolverBase):
             I{additional} sections of a DNS response) or with a L{Failure} if
             there is a problem processing the query.
         """
-        cnames = []
-        results = []
-        authority = []
-        additional = []
-        default_ttl = max(self.soa[1].minimum, self.soa[1].expire)
+        index = self._zoneIndex()
+        default_ttl = index.defaultTTL
+        lowerName = name.lower()
 
-        domain_records = self.records.get(name.lower())
+        domain_records = self.records.get(lowerName)
 
         if domain_records:
-            for record in domain_records:
-                if record.ttl is not None:
-                    ttl = record.ttl
-                else:
-                    ttl = default_ttl
-
-                if record.TYPE == dns.NS and name.lower() != self.soa[0].lower():
-                    # NS record belong to a child zone: this is a referral.  As
-                    # NS records are authoritative in the child zone, ours here
-                    # are not.  RFC 2181, section 6.1.
-                    authority.append(
-                        dns.RRHeader(name, record.TYPE, dns.IN, ttl, record, auth=False)
-                    )
-                elif record.TYPE == type or type == dns.ALL_RECORDS:
-                    results.append(
-                        dns.RRHeader(name, record.TYPE, dns.IN, ttl, record, auth=True)
-                    )
-                if record.TYPE == dns.CNAME:
-                    cnames.append(
-                        dns.RRHeader(name, record.TYPE, dns.IN, ttl, record, auth=True)
-                    )
-            if not results:
-                results = cnames
+            if type == dns.ALL_RECORDS:
+                matching = index.answers(lowerName)
+            else:
+                matching = index.answersByType.get((lowerName, type), ())
+            results = [
+                dns.RRHeader(
+                    name, record.TYPE, dns.IN,
+                    default_ttl if record.ttl is None else record.ttl,
+                    record, auth=True)
+                for record in matching]
+            # NS records belonging to a child zone make this a referral.  As
+            # NS records are authoritative in the child zone, ours here are
+            # not.  RFC 2181, section 6.1.
+            authority = [
+                dns.RRHeader(
+                    name, record.TYPE, dns.IN,
+                    default_ttl if record.ttl is None else record.ttl,
+                    record, auth=False)
+                for record in index.referrals.get(lowerName, ())]
+            additional = []
+            cnames = index.answersByType.get((lowerName, dns.CNAME))
+            if not results and cnames:
+                results = [
+                    dns.RRHeader(
+                        name, record.TYPE, dns.IN,
+                        default_ttl if record.ttl is None else record.ttl,
+                        record, auth=True)
+                    for record in cnames]
 
             # https://tools.ietf.org/html/rfc1034#section-4.3.2 - sort of.
             # See https://twistedmatrix.com/trac/ticket/6732
@@ -191,7 +326,11 @@ class FileAuthority(common.ResolverBase):
             if not results and not authority:
                 # Empty response. Include SOA record to allow clients to cache
                 # this response.  RFC 1034, sections 3.7 and 4.3.4, and RFC 2181
-                # section 7.1.
+                # section 7.1.  It is given the TTL of the last record at the
+                # name.
+                ttl = domain_records[-1].ttl
+                if ttl is None:
+                    ttl = default_ttl
                 authority.append(
                     dns.RRHeader(self.soa[0], dns.SOA, dns.IN, ttl, self.soa[1], auth=True)
                     )
@@ -271,7 +410,18 @@ class PySourceAuthority(FileAuthority):
 
 
 class BindAuthority(FileAuthority):
-    """An Authority that loads BIND configuration files"""
+    """
+    An Authority that loads BIND configuration files
+
+    @ivar _CLASSES: The record class names.
+    @type _CLASSES: L{frozenset} of L{str}
+
+    @ivar _MARKERS: The record class and type names, which mark the fields
+        after the owner name in a record line.
+    @type _MARKERS: L{frozenset} of L{str}
+    """
+    _CLASSES = frozenset(dns.QUERY_CLASSES.values())
+    _MARKERS = _CLASSES.union(dns.QUERY_TYPES.values())
 
     def loadFile(self, filename):
         self.origin = os.path.basename(filename) + '.' # XXX - this might suck
@@ -320,7 +470,7 @@ class BindAuthority(FileAuthority):
 
         self.records = {}
 
-        for (line, index) in zip(lines, range(len(lines))):
+        for line in lines:
             if line[0] == '$TTL':
                 TTL = dns.str2time(line[1])
             elif line[0] == '$ORIGIN':
@@ -352,7 +502,6 @@ class BindAuthority(FileAuthority):
             r.ttl = ttl
             self.records.setdefault(domain.lower(), []).append(r)
 
-            print('Adding IN Record', domain, ttl, r)
             if type == 'SOA':
                 self.soa = (domain, r)
         else:
@@ -363,7 +512,7 @@ class BindAuthority(FileAuthority):
     # This file ends here.  Read no further.
     #
     def parseRecordLine(self, origin, ttl, line):
-        MARKERS = dns.QUERY_CLASSES.values() + dns.QUERY_TYPES.values()
+        MARKERS = self._MARKERS
         cls = 'IN'
         owner = origin
 
@@ -385,7 +534,7 @@ class BindAuthority(FileAuthority):
             line = line[1:]
 #            print 'domain is ', domain
 
-        if line[0] in dns.QUERY_CLASSES.values():
+        if line[0] in self._CLASSES:
             cls = line[0]
             line = line[1:]
 #            print 'cls is ', cls
@@ -397,7 +546,7 @@ class BindAuthority(FileAuthority):
             ttl = int(line[0])
             line = line[1:]
 #            print 'ttl is ', ttl
-            if line[0] in dns.QUERY_CLASSES.values():
+            if line[0] in self._CLASSES:
                 cls = line[0]
                 line = line[1:]
 #                print 'cls is ', cls
@@ -8,80 +8,419 @@ An in-memory caching resolver.
 
 from __future__ import division, absolute_import
 
+import heapq
+import math
+from collections import MutableMapping, OrderedDict
+
 from twisted.names import dns, common
 from twisted.python import failure, log
+from twisted.python.deprecate import deprecatedProperty
+from twisted.python.versions import Version
 from twisted.internet import defer
 
 
 
+class CacheStatistics(object):
+    """
+    Counters describing the use of a L{CacheResolver}.
+
+    @ivar hits: The number of lookups answered from the cache.
+    @type hits: L{int}
+
+    @ivar negativeHits: The number of C{hits} which found a cached name
+        error.
+    @type negativeHits: L{int}
+
+    @ivar misses: The number of lookups which found no unexpired entry.
+    @type misses: L{int}
+
+    @ivar evictions: The number of entries removed to keep the cache within
+        its size.
+    @type evictions: L{int}
+
+    @ivar expirations: The number of entries removed because their TTL ran
+        out.
+    @type expirations: L{int}
+
+    @ivar size: The number of entries in the cache.
+    @type size: L{int}
+
+    @since: 16.5
+    """
+
+    def __init__(self, hits, negativeHits, misses, evictions, expirations,
+                 size):
+        self.hits = hits
+        self.negativeHits = negativeHits
+        self.misses = misses
+        self.evictions = evictions
+        self.expirations = expirations
+        self.size = size
+
+
+
+class _CacheEntry(object):
+    """
+    A cached result.
+
+    @ivar when: The time at which the entry was added to the cache.
+    @type when: L{float}
+
+    @ivar payload: The cached answer, authority and additional records.
+    @type payload: L{tuple} of three L{list}s of L{dns.RRHeader}
+
+    @ivar ttl: The number of seconds for which the entry may be used, or
+        L{None} if it holds no records, in which case it is only removed by
+        the sweeper.
+    @type ttl: L{int} or L{None}
+
+    @ivar nameError: Whether the entry records that the name does not exist.
+    @type nameError: L{bool}
+
+    @ivar sequence: A number unique to this entry, which identifies it in the
+        expiry heap of its resolver.
+    @type sequence: L{int}
+
+    @ivar _elapsed: The number of whole seconds after C{when} for which
+        C{_result} was made, or L{None}.
+    @type _elapsed: L{int} or L{None}
+
+    @ivar _result: C{payload}, with the TTLs reduced by C{_elapsed}.
+    @type _result: L{tuple} of three L{list}s of L{dns.RRHeader}
+    """
+    _elapsed = None
+    _result = None
+
+    def __init__(self, when, payload, ttl, nameError, sequence):
+        self.when = when
+        self.payload = payload
+        self.ttl = ttl
+        self.nameError = nameError
+        self.sequence = sequence
+
+
+    @property
+    def expires(self):
+        """
+        The time at which the entry expires.
+        """
+        return self.when + (self.ttl or 0)
+
+
+    def result(self, now):
+        """
+        Get the records of the entry with their TTLs reduced by the time they
+        have spent in the cache.
+
+        The records are only built again when the number of whole seconds
+        elapsed changes, so that lookups made within the same second share
+        them.  Each lookup gets its own lists, but the records in them must
+        not be changed.
+
+        @param now: The current time.
+        @type now: L{float}
+
+        @return: The answer, authority and additional records.
+        @rtype: L{tuple} of three L{list}s of L{dns.RRHeader}
+        """
+        elapsed = int(math.ceil(now - self.when))
+        if elapsed != self._elapsed:
+            self._result = tuple(
+                [dns.RRHeader(r.name.name, r.type, r.cls,
+                              max(r.ttl - elapsed, 0), r.payload)
+                 for r in section]
+                for section in self.payload)
+            self._elapsed = elapsed
+        return tuple(list(section) for section in self._result)
+
+
+    def isResult(self, payload):
+        """
+        Check whether a payload is made of the records last returned by
+        L{result}.
+
+        @param payload: The answer, authority and additional records.
+        @type payload: L{tuple} of three L{list}s of L{dns.RRHeader}
+
+        @rtype: L{bool}
+        """
+        if self._result is None:
+            return False
+        for cached, given in zip(self._result, payload):
+            if len(cached) != len(given):
+                return False
+            for cachedRecord, givenRecord in zip(cached, given):
+                if cachedRecord is not givenRecord:
+                    return False
+        return True
+
+
+
+class _CacheView(MutableMapping):
+    """
+    The entries of a L{CacheResolver}, as the C{(when, payload)} tuples of
+    earlier versions.
+
+    Entries set in it are cached with L{CacheResolver.cacheResult}, and
+    entries deleted from it are removed with L{CacheResolver.clearEntry}.
+
+    @ivar _resolver: The resolver whose entries are given.
+    @type _resolver: L{CacheResolver}
+    """
+
+    def __init__(self, resolver):
+        self._resolver = resolver
+
+
+    def __getitem__(self, query):
+        entry = self._resolver._entries[query]
+        return (entry.when, entry.payload)
+
+
+    def __setitem__(self, query, value):
+        when, payload = value
+        self._resolver.cacheResult(query, payload, when)
+
+
+    def __delitem__(self, query):
+        self._resolver.clearEntry(query)
+
+
+    def __iter__(self):
+        return iter(self._resolver._entries)
+
+
+    def __len__(self):
+        return len(self._resolver._entries)
+
+
+    def __repr__(self):
+        return '<%s %r>' % (self.__class__.__name__, dict(self.items()))
+
+
+
+def _payloadTTL(payload):
+    """
+    Find the time for which a result may be cached: the smallest TTL of its
+    records, or, if it has no answers, the negative TTL given by the SOA
+    record in its authority section, if that is smaller.
+
+    @param payload: The answer, authority and additional records.
+    @type payload: L{tuple} of three L{list}s of L{dns.RRHeader}
+
+    @return: The TTL, or L{None} if there are no records.
+    @rtype: L{int} or L{None}
+    """
+    ttl = None
+    for section in payload:
+        for r in section:
+            if ttl is None or r.ttl < ttl:
+                ttl = r.ttl
+    if not payload[0]:
+        negativeTTL = _negativeTTL(payload[1])
+        if negativeTTL is not None and negativeTTL < ttl:
+            ttl = negativeTTL
+    return ttl
+
+
+
+def _negativeTTL(authority):
+    """
+    Find the TTL of a negative response, as given by RFC 2308 section 5: the
+    smaller of the TTL of the SOA record in its authority section and the
+    minimum field of that record.
+
+    @param authority: The authority section of the response.
+    @type authority: L{list} of L{dns.RRHeader}
+
+    @return: The TTL, or L{None} if there is no SOA record.
+    @rtype: L{int} or L{None}
+    """
+    for r in authority:
+        if r.type == dns.SOA:
+            return min(r.ttl, r.payload.minimum)
+    return None
+
+
+
 class CacheResolver(common.ResolverBase):
     """
     A resolver that serves records from a local, memory cache.
 
+    The cache holds at most C{maxEntries} entries, evicting the least
+    recently used entry to make room for a new one.  Entries are removed when
+    their smallest TTL runs out by a single timed call for the entry which
+    expires first, and expired entries which have not been removed yet are
+    never returned.
+
+    Negative responses are cached as described by RFC 2308: responses with no
+    answers are kept for the TTL given by the SOA record in their authority
+    section, and name errors may be cached with L{cacheNameError}.
+
+    @ivar maxEntries: The largest number of entries kept.
+    @type maxEntries: L{int}
+
     @ivar _reactor: A provider of L{interfaces.IReactorTime}.
+
+    @ivar _entries: The cache entries, from the least to the most recently
+        used.
+    @type _entries: L{OrderedDict} mapping L{dns.Query} to L{_CacheEntry}
+
+    @ivar _expiries: A heap of the expiry time, sequence number and query of
+        each entry, which may also hold those of entries since replaced or
+        evicted.
+    @type _expiries: L{list} of L{tuple}
+
+    @ivar _sweeper: The call which removes the entry which expires first,
+        or L{None}.
+    @type _sweeper: L{IDelayedCall<twisted.internet.interfaces.IDelayedCall>}
+        or L{None}
     """
-    cache = None
+    maxEntries = 10000
+
+    def __init__(self, cache=None, verbose=0, reactor=None, maxEntries=None):
+        """
+        @param cache: Entries to add to the cache.
+        @type cache: L{dict} mapping L{dns.Query} to a L{tuple} of the time
+            at which the entry was added and the answer, authority and
+            additional records.
+
+        @param verbose: The verbosity of the log messages about the cache.
+        @type verbose: L{int}
+
+        @param reactor: A provider of L{interfaces.IReactorTime}, or L{None}
+            to use the global reactor.
 
-    def __init__(self, cache=None, verbose=0, reactor=None):
+        @param maxEntries: The largest number of entries kept, or L{None} for
+            the class default.
+        @type maxEntries: L{int} or L{None}
+        """
         common.ResolverBase.__init__(self)
 
-        self.cache = {}
+        self._entries = OrderedDict()
         self.verbose = verbose
-        self.cancel = {}
+        if maxEntries is not None:
+            self.maxEntries = maxEntries
         if reactor is None:
             from twisted.internet import reactor
         self._reactor = reactor
+        self._resetCounters()
 
         if cache:
             for query, (seconds, payload) in cache.items():
                 self.cacheResult(query, payload, seconds)
 
 
+    def _resetCounters(self):
+        """
+        Forget the expiry heap and the statistics.
+        """
+        self._expiries = []
+        self._sweeper = None
+        self._sequence = 0
+        self._hits = 0
+        self._negativeHits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+
+    @property
+    def cache(self):
+        """
+        The cache entries, from the least to the most recently used, as
+        C{(when, payload)} tuples of the time at which the entry was added and
+        the answer, authority and additional records.
+
+        @rtype: L{MutableMapping} mapping L{dns.Query} to L{tuple}
+        """
+        return _CacheView(self)
+
+
+    @deprecatedProperty(Version('Twisted', 16, 5, 0))
+    def cancel(self):
+        """
+        Entries are no longer removed by a delayed call each, so this is
+        always empty.
+
+        @rtype: L{dict}
+        """
+        return {}
+
+
     def __setstate__(self, state):
+        # Resolvers pickled by older versions have a cancel attribute, and
+        # (time, payload) tuples for entries in a cache attribute.
+        state.pop('cancel', None)
+        cache = state.pop('cache', None)
+        if cache is None:
+            cache = state.pop('_entries')
         self.__dict__ = state
-
+        self._resetCounters()
+        self._entries = OrderedDict()
         now = self._reactor.seconds()
-        for (k, (when, (ans, add, ns))) in self.cache.items():
-            diff = now - when
-            for rec in ans + add + ns:
-                if rec.ttl < diff:
-                    del self.cache[k]
-                    break
+        for query, entry in cache.items():
+            if isinstance(entry, tuple):
+                when, payload = entry
+                entry = self._makeEntry(
+                    when, payload, _payloadTTL(payload), False)
+            else:
+                self._sequence += 1
+                entry.sequence = self._sequence
+            if entry.ttl is None or now - entry.when <= entry.ttl:
+                self._addEntry(query, entry)
 
 
     def __getstate__(self):
-        for c in self.cancel.values():
-            c.cancel()
-        self.cancel.clear()
+        if self._sweeper is not None and self._sweeper.active():
+            self._sweeper.cancel()
+        self._sweeper = None
         return self.__dict__
 
 
+    def statistics(self):
+        """
+        Get the counters of the use of this cache.
+
+        @rtype: L{CacheStatistics}
+
+        @since: 16.5
+        """
+        return CacheStatistics(
+            self._hits, self._negativeHits, self._misses, self._evictions,
+            self._expirations, len(self._entries))
+
+
     def _lookup(self, name, cls, type, timeout):
         now = self._reactor.seconds()
         q = dns.Query(name, type, cls)
-        try:
-            when, (ans, auth, add) = self.cache[q]
-        except KeyError:
+        entry = self._entries.get(q)
+        if entry is not None and (
+                entry.ttl is not None and now - entry.when > entry.ttl):
+            entry = None
+        if entry is None:
+            self._misses += 1
             if self.verbose > 1:
                 log.msg('Cache miss for ' + repr(name))
             return defer.fail(failure.Failure(dns.DomainError(name)))
-        else:
-            if self.verbose:
-                log.msg('Cache hit for ' + repr(name))
-            diff = now - when
-
-            try:
-                result = (
-                    [dns.RRHeader(r.name.name, r.type, r.cls, r.ttl - diff,
-                                  r.payload) for r in ans],
-                    [dns.RRHeader(r.name.name, r.type, r.cls, r.ttl - diff,
-                                  r.payload) for r in auth],
-                    [dns.RRHeader(r.name.name, r.type, r.cls, r.ttl - diff,
-                                  r.payload) for r in add])
-            except ValueError:
-                return defer.fail(failure.Failure(dns.DomainError(name)))
-            else:
-                return defer.succeed(result)
+
+        self._hits += 1
+        if self.verbose:
+            log.msg('Cache hit for ' + repr(name))
+        # Mark the entry as the most recently used.
+        self._entries[q] = self._entries.pop(q)
+        if entry.nameError:
+            # Unlike DomainError, this stops a ResolverChain from asking the
+            # resolvers after this one.
+            # The reply carries the SOA record in its authority section, which
+            # RFC 2308 requires in a negative response.
+            self._negativeHits += 1
+            reply = dns.Message(rCode=dns.ENAME)
+            reply.queries = [q]
+            reply.authority = entry.result(now)[1]
+            return defer.fail(
+                failure.Failure(dns.AuthoritativeDomainError(reply)))
+        return defer.succeed(entry.result(now))
 
 
     def lookupAllRecords(self, name, timeout = None):
@@ -92,6 +431,10 @@ class CacheResolver(common.ResolverBase):
         """
         Cache a DNS entry.
 
+        The entry is kept for the smallest TTL of its records, or, if it has
+        no answers, for the negative TTL given by the SOA record in its
+        authority section, if that is smaller.
+
         @param query: a L{dns.Query} instance.
 
         @param payload: a 3-tuple of lists of L{dns.RRHeader} records, the
@@ -101,25 +444,138 @@ class CacheResolver(common.ResolverBase):
             considered to have been added to the cache. If L{None} is given,
             the current time is used.
         """
+        existing = self._entries.get(query)
+        if existing is not None and existing.isResult(payload):
+            # This is the result of a lookup in this cache, being cached
+            # again; it holds nothing new.
+            return
+
         if self.verbose > 1:
             log.msg('Adding %r to cache' % query)
 
-        self.cache[query] = (cacheTime or self._reactor.seconds(), payload)
+        self._addEntry(
+            query,
+            self._makeEntry(cacheTime, payload, _payloadTTL(payload), False))
 
-        if query in self.cancel:
-            self.cancel[query].cancel()
 
-        s = list(payload[0]) + list(payload[1]) + list(payload[2])
-        if s:
-            m = s[0].ttl
-            for r in s:
-                m = min(m, r.ttl)
+    def cacheNameError(self, query, authority, cacheTime=None):
+        """
+        Cache the absence of a name, as reported by a response with a
+        response code of L{dns.ENAME}.
+
+        As described by RFC 2308, the name error is only cached if the
+        authority section of the response has an SOA record, which gives the
+        time for which the name error is kept.  Until then, lookups of the
+        name and type fail with L{dns.AuthoritativeDomainError}, given a
+        L{dns.Message} with a response code of L{dns.ENAME} and the authority
+        section, whose TTLs are reduced by the time spent in the cache.
+
+        @param query: The query which failed.
+        @type query: L{dns.Query}
+
+        @param authority: The authority section of the response.
+        @type authority: L{list} of L{dns.RRHeader}
+
+        @param cacheTime: The time (seconds since epoch) at which the entry is
+            considered to have been added to the cache. If L{None} is given,
+            the current time is used.
+
+        @since: 16.5
+        """
+        ttl = _negativeTTL(authority)
+        if ttl is None:
+            return
+
+        if self.verbose > 1:
+            log.msg('Adding name error for %r to cache' % query)
+
+        self._addEntry(
+            query,
+            self._makeEntry(cacheTime, ([], list(authority), []), ttl, True))
+
+
+    def _makeEntry(self, cacheTime, payload, ttl, nameError):
+        """
+        Make an entry for the cache.
+
+        @see: L{_CacheEntry.__init__}
+        """
+        self._sequence += 1
+        return _CacheEntry(
+            cacheTime or self._reactor.seconds(), payload, ttl, nameError,
+            self._sequence)
+
+
+    def _addEntry(self, query, entry):
+        """
+        Add an entry to the cache as the most recently used, evict the least
+        recently used entries if the cache is full, and make sure the entry
+        will be removed when it expires.
+
+        @param query: The query which the entry answers.
+        @type query: L{dns.Query}
+
+        @param entry: The entry.
+        @type entry: L{_CacheEntry}
+        """
+        cache = self._entries
+        cache.pop(query, None)
+        cache[query] = entry
+        while len(cache) > self.maxEntries:
+            cache.popitem(last=False)
+            self._evictions += 1
+
+        expiries = self._expiries
+        expires = entry.expires
+        if len(expiries) > 2 * len(cache) + 64:
+            # Most of the heap is replaced or evicted entries; drop them.
+            expiries[:] = [
+                (e.expires, e.sequence, q) for (q, e) in cache.items()]
+            heapq.heapify(expiries)
         else:
-            m = 0
+            heapq.heappush(expiries, (expires, entry.sequence, query))
+
+        sweeper = self._sweeper
+        if sweeper is not None and sweeper.active():
+            if sweeper.getTime() > expires:
+                sweeper.reset(max(expires - self._reactor.seconds(), 0))
+        else:
+            self._scheduleSweep()
 
-        self.cancel[query] = self._reactor.callLater(m, self.clearEntry, query)
+
+    def _scheduleSweep(self):
+        """
+        Arrange for L{_sweep} to be called when the first entry expires.
+        """
+        if self._expiries:
+            self._sweeper = self._reactor.callLater(
+                max(self._expiries[0][0] - self._reactor.seconds(), 0),
+                self._sweep)
+        else:
+            self._sweeper = None
+
+
+    def _sweep(self):
+        """
+        Remove the entries which have expired.
+        """
+        now = self._reactor.seconds()
+        cache = self._entries
+        expiries = self._expiries
+        while expiries and expiries[0][0] <= now:
+            expires, sequence, query = heapq.heappop(expiries)
+            entry = cache.get(query)
+            if entry is not None and entry.sequence == sequence:
+                del cache[query]
+                self._expirations += 1
+        self._scheduleSweep()
 
 
     def clearEntry(self, query):
-        del self.cache[query]
-        del self.cancel[query]
+        """
+        Remove an entry from the cache.
+
+        @param query: The query whose entry is removed.
+        @type query: L{dns.Query}
+        """
+        del self._entries[query]
@@ -50,6 +50,16 @@ class Resolver(common.ResolverBase):
     @ivar _reactor: A provider of L{IReactorTCP}, L{IReactorUDP}, and
         L{IReactorTime} which will be used to set up network resources and
         track timeouts.
+
+    @ivar _udpPoolSize: See the C{udpPoolSize} parameter to L{__init__}.
+
+    @ivar _udpPool: The pool of protocols used for UDP queries, created when
+        the first query is issued, or L{None}.
+    @type _udpPool: L{_DatagramProtocolPool} or L{None}
+
+    @ivar _useTCP: See the C{useTCP} parameter to L{__init__}.
+
+    @ivar _tlsOptions: See the C{tlsOptions} parameter to L{__init__}.
     """
     index = 0
     timeout = None
@@ -64,7 +74,9 @@ class Resolver(common.ResolverBase):
     _lastResolvTime = None
     _resolvReadInterval = 60
 
-    def __init__(self, resolv=None, servers=None, timeout=(1, 3, 11, 45), reactor=None):
+    def __init__(self, resolv=None, servers=None, timeout=(1, 3, 11, 45),
+                 reactor=None, udpPoolSize=None, useTCP=False,
+                 tlsOptions=None):
         """
         Construct a resolver which will query domain name servers listed in
         the C{resolv.conf(5)}-format file given by C{resolv} as well as
@@ -92,6 +104,24 @@ class Resolver(common.ResolverBase):
             for DNS datagrams, and enforce timeouts.  If not provided, the
             global reactor will be used.
 
+        @type udpPoolSize: L{int} or L{None}
+        @param udpPoolSize: If not L{None}, the number of UDP ports, each
+            bound to a randomly selected port number, among which queries are
+            spread.  Otherwise each query binds a new port.
+
+        @type useTCP: L{bool}
+        @param useTCP: If C{True}, lookups are sent over a TCP connection to
+            a nameserver, which is kept open for later lookups, instead of
+            over UDP.  Lookups whose connection is lost or cannot be made are
+            tried again on a new connection, to the next nameserver.
+
+        @param tlsOptions: If not L{None}, lookups are sent over a TLS
+            connection (DNS over TLS, RFC 7858) made with these client
+            connection options, which is kept open for later lookups, instead
+            of over UDP.  The nameserver addresses should give the port on
+            which they accept DNS over TLS, usually 853.
+        @type tlsOptions: L{twisted.internet.interfaces.IOpenSSLClientConnectionCreator}
+
         @raise ValueError: Raised if no nameserver addresses can be found.
         """
         common.ResolverBase.__init__(self)
@@ -120,6 +150,11 @@ class Resolver(common.ResolverBase):
 
         self._waiting = {}
 
+        self._udpPoolSize = udpPoolSize
+        self._udpPool = None
+        self._useTCP = useTCP
+        self._tlsOptions = tlsOptions
+
         self.maybeParseConfig()
 
 
@@ -127,6 +162,7 @@ class Resolver(common.ResolverBase):
         d = self.__dict__.copy()
         d['connections'] = []
         d['_parseCall'] = None
+        d['_udpPool'] = None
         return d
 
 
@@ -254,17 +290,30 @@ class Resolver(common.ResolverBase):
         issue a query to it using C{*args}, and arrange for it to be
         disconnected from its transport after the query completes.
 
+        If a C{udpPoolSize} was given, the protocol is taken from a pool of
+        them instead, and only disconnected once it is retired from the pool.
+
         @param *args: Positional arguments to be passed to
             L{DNSDatagramProtocol.query}.
 
         @return: A L{Deferred} which will be called back with the result of the
             query.
         """
-        protocol = self._connectedProtocol()
+        if self._udpPoolSize:
+            pool = self._udpPool
+            if pool is None:
+                pool = self._udpPool = _DatagramProtocolPool(
+                    self._connectedProtocol, self._udpPoolSize)
+            protocol = pool.acquire()
+            def cbQueried(result):
+                pool.release(protocol)
+                return result
+        else:
+            protocol = self._connectedProtocol()
+            def cbQueried(result):
+                protocol.transport.stopListening()
+                return result
         d = protocol.query(*args)
-        def cbQueried(result):
-            protocol.transport.stopListening()
-            return result
         d.addBoth(cbQueried)
         return d
 
@@ -347,14 +396,53 @@ class Resolver(common.ResolverBase):
             address = self.pickServer()
             if address is None:
                 return defer.fail(IOError("No domain name servers available"))
-            host, port = address
-            self._reactor.connectTCP(host, port, self.factory)
+            # Queries made while a connection attempt is under way wait for
+            # it rather than starting another.
+            if not self.pending:
+                host, port = address
+                if self._tlsOptions is None:
+                    self._reactor.connectTCP(host, port, self.factory)
+                else:
+                    self._reactor.connectSSL(
+                        host, port, self.factory, self._tlsOptions)
             self.pending.append((defer.Deferred(), queries, timeout))
             return self.pending[-1][0]
         else:
             return self.connections[0].query(queries, timeout)
 
 
+    def _queryStream(self, queries, timeout, attempts):
+        """
+        Make a number of DNS queries via TCP, or TLS if the resolver has
+        C{tlsOptions}, trying again on a new connection, and so perhaps with
+        another nameserver, if the connection is lost or cannot be made.
+
+        @type queries: L{list} of L{dns.Query}
+        @param queries: The queries to make.
+
+        @type timeout: L{int}
+        @param timeout: The number of seconds after which each attempt fails.
+
+        @type attempts: L{int}
+        @param attempts: The most times to try.
+
+        @rtype: L{Deferred}
+        """
+        d = self.queryTCP(queries, timeout)
+        if attempts > 1:
+            d.addErrback(self._reissueStream, queries, timeout, attempts - 1)
+        return d
+
+
+    def _reissueStream(self, reason, queries, timeout, attempts):
+        """
+        Try a query made by L{_queryStream} again if its connection was lost
+        or could not be made.
+        """
+        reason.trap(error.ConnectionClosed, error.ConnectError)
+        return self._queryStream(queries, timeout, attempts)
+
+
     def filterAnswers(self, message):
         """
         Extract results from the given message.
@@ -377,11 +465,14 @@ class Resolver(common.ResolverBase):
 
     def _lookup(self, name, cls, type, timeout):
         """
-        Build a L{dns.Query} for the given parameters and dispatch it via UDP.
+        Build a L{dns.Query} for the given parameters and dispatch it via UDP,
+        or over a kept open TCP or TLS connection if the resolver was created
+        with C{useTCP} or C{tlsOptions}.
 
         If this query is already outstanding, it will not be re-issued.
         Instead, when the outstanding query receives a response, that response
-        will be re-used for this query as well.
+        will be re-used for this query as well.  Names are compared without
+        regard to case, as they are by nameservers.
 
         @type name: C{str}
         @type type: C{int}
@@ -391,11 +482,18 @@ class Resolver(common.ResolverBase):
             answer, authority, and additional sections of the response or with
             a L{Failure} if the response code is anything other than C{dns.OK}.
         """
-        key = (name, type, cls)
+        key = (name.lower(), type, cls)
         waiting = self._waiting.get(key)
         if waiting is None:
             self._waiting[key] = []
-            d = self.queryUDP([dns.Query(name, type, cls)], timeout)
+            queries = [dns.Query(name, type, cls)]
+            if self._useTCP or self._tlsOptions is not None:
+                # The whole time a UDP query could take to be answered.
+                d = self._queryStream(
+                    queries, sum(timeout or self.timeout),
+                    len(self.servers) + len(self.dynServers) + 1)
+            else:
+                d = self.queryUDP(queries, timeout)
             def cbResult(result):
                 for d in self._waiting.pop(key):
                     d.callback(result)
@@ -439,6 +537,78 @@ class Resolver(common.ResolverBase):
 
 
 
+class _DatagramProtocolPool(object):
+    """
+    A bounded pool of L{dns.DNSDatagramProtocol}s, each bound to a randomly
+    selected port, among which queries are spread.
+
+    A protocol matches responses to the queries sent with it by their IDs, so
+    many queries can be outstanding on one port.  So that source ports stay
+    hard to guess, a protocol is retired from the pool once it has been used
+    for C{maxQueries} queries, and disconnected once those are answered.
+
+    @ivar _connect: A no-argument callable returning a new protocol bound to
+        a randomly selected port.
+
+    @ivar _size: The most protocols in the pool.
+    @type _size: L{int}
+
+    @ivar _maxQueries: The number of queries after which a protocol is
+        retired.
+    @type _maxQueries: L{int}
+
+    @ivar _active: The protocols in the pool.
+    @type _active: L{list}
+
+    @ivar _counts: The number of queries issued and of queries outstanding on
+        each protocol which is in the pool or has queries outstanding.
+    @type _counts: L{dict} mapping protocols to L{list}s of two L{int}s
+    """
+
+    def __init__(self, connect, size, maxQueries=100):
+        self._connect = connect
+        self._size = size
+        self._maxQueries = maxQueries
+        self._active = []
+        self._counts = {}
+
+
+    def acquire(self):
+        """
+        Pick a protocol to issue a query with.  Each call must be matched by
+        a call to L{release} when the query completes.
+
+        @return: A L{dns.DNSDatagramProtocol}.
+        """
+        active = self._active
+        if len(active) < self._size:
+            protocol = self._connect()
+            active.append(protocol)
+            self._counts[protocol] = [0, 0]
+        else:
+            protocol = active[dns.randomSource() % len(active)]
+        counts = self._counts[protocol]
+        counts[0] += 1
+        counts[1] += 1
+        if counts[0] >= self._maxQueries:
+            active.remove(protocol)
+        return protocol
+
+
+    def release(self, protocol):
+        """
+        Note that a query issued with a protocol returned by L{acquire} has
+        completed, and disconnect the protocol if it has been retired and has
+        no other queries outstanding.
+        """
+        counts = self._counts[protocol]
+        counts[1] -= 1
+        if not counts[1] and protocol not in self._active:
+            del self._counts[protocol]
+            protocol.transport.stopListening()
+
+
+
 class AXFRController:
     timeoutCall = None
 
@@ -101,6 +101,10 @@ else:
     _nicebytes = _nicebyteslist = repr
 
 
+# The encoding of each label length, for encoding names.
+_LENGTH_BYTES = [_ord2bytes(i) for i in range(256)]
+
+
 
 def randomSource():
     """
@@ -438,14 +442,19 @@ class Name:
         of reducing the message size).
         """
         name = self.name
+        if compDict is not None:
+            offset = strio.tell() + Message.headerSize
+        chunks = []
         while name:
             if compDict is not None:
-                if name in compDict:
-                    strio.write(
-                        struct.pack("!H", 0xc000 | compDict[name]))
+                pointer = compDict.get(name)
+                if pointer is not None:
+                    chunks.append(struct.pack("!H", 0xc000 | pointer))
+                    strio.write(b''.join(chunks))
                     return
-                else:
-                    compDict[name] = strio.tell() + Message.headerSize
+                if offset < 0x4000:
+                    # Only offsets which fit in a pointer can be referred to.
+                    compDict[name] = offset
             ind = name.find(b'.')
             if ind > 0:
                 label, name = name[:ind], name[ind + 1:]
@@ -454,9 +463,11 @@ class Name:
                 label = name
                 name = None
                 ind = len(label)
-            strio.write(_ord2bytes(ind))
-            strio.write(label)
-        strio.write(b'\x00')
+            chunks.append(_LENGTH_BYTES[ind] + label)
+            if compDict is not None:
+                offset += ind + 1
+        chunks.append(b'\x00')
+        strio.write(b''.join(chunks))
 
 
     def decode(self, strio, length=None):
@@ -522,6 +533,80 @@ class Name:
 
 
 
+def _decodeName(data, view, offset, names):
+    """
+    Decode a domain name from an encoded DNS message.
+
+    @param data: The encoded message.
+    @type data: L{bytes}
+
+    @param view: C{data}, as a L{bytearray}, whose items are integers on all
+        versions of Python.
+    @type view: L{bytearray}
+
+    @param offset: The offset of the name in C{data}.
+    @type offset: L{int}
+
+    @param names: The names already decoded from C{data}, by the offset of
+        each of their labels, which is added to.  Compression pointers to
+        these offsets are resolved without decoding the labels again.
+    @type names: L{dict} mapping L{int} to L{bytes}
+
+    @return: The name and the offset of the first byte after it.
+    @rtype: L{tuple} of L{bytes} and L{int}
+
+    @raise EOFError: If the name runs past the end of C{data}.
+
+    @raise ValueError: If the name contains a compression loop.
+    """
+    starts = []
+    labels = []
+    end = None
+    visited = None
+    size = len(view)
+    while True:
+        if offset >= size:
+            raise EOFError
+        length = view[offset]
+        if length == 0:
+            name = b''
+            break
+        if length >= 0xc0:
+            if offset + 1 >= size:
+                raise EOFError
+            if end is None:
+                end = offset + 2
+            pointer = ((length & 0x3f) << 8) | view[offset + 1]
+            name = names.get(pointer)
+            if name is not None:
+                break
+            if visited is None:
+                visited = set()
+            if pointer in visited:
+                raise ValueError("Compression loop in encoded name")
+            visited.add(pointer)
+            offset = pointer
+            continue
+        labelEnd = offset + 1 + length
+        if labelEnd > size:
+            raise EOFError
+        starts.append(offset)
+        labels.append(data[offset + 1:labelEnd])
+        offset = labelEnd
+
+    if end is None:
+        end = offset + 1
+    while labels:
+        label = labels.pop()
+        if name:
+            name = label + b'.' + name
+        else:
+            name = label
+        names[starts.pop()] = name
+    return name, end
+
+
+
 @comparable
 @implementer(IEncodable)
 class Query:
@@ -935,6 +1020,65 @@ class RRHeader(tputil.FancyEqMixin):
 
 
 
+class _LazyRRHeader(RRHeader):
+    """
+    An L{RRHeader} decoded by L{Message.fromStr}, whose payload may be left
+    to be decoded when it is first used.
+
+    @ivar _recordType: The class of the payload.
+    @type _recordType: L{type}
+
+    @ivar _data: The encoded message, or L{None} once the payload has been
+        decoded.
+    @type _data: L{bytes} or L{None}
+
+    @ivar _offset: The offset of the payload in C{_data}.
+    @type _offset: L{int}
+    """
+    _payload = None
+
+    def __init__(self, name, type, cls, ttl, rdlength, auth, recordType,
+                 data, offset):
+        self.name = Name(name)
+        self.type = type
+        self.cls = cls
+        self.ttl = ttl
+        self.rdlength = rdlength
+        self.auth = auth
+        self._recordType = recordType
+        self._data = data
+        self._offset = offset
+
+
+    def _getPayload(self):
+        """
+        Decode the payload if it has not been decoded yet.
+
+        @return: The payload.
+        """
+        if self._data is not None:
+            strio = BytesIO(self._data)
+            strio.seek(self._offset)
+            payload = self._recordType(ttl=self.ttl)
+            payload.decode(strio, self.rdlength)
+            self._payload = payload
+            self._data = None
+        return self._payload
+
+
+    def _setPayload(self, payload):
+        """
+        Replace the payload.
+
+        @param payload: The new payload.
+        """
+        self._payload = payload
+        self._data = None
+
+    payload = property(_getPayload, _setPayload)
+
+
+
 @implementer(IEncodable, IRecord)
 class SimpleRecord(tputil.FancyStrMixin, tputil.FancyEqMixin):
     """
@@ -2125,6 +2269,15 @@ def _compactRepr(obj, alwaysShow=None, flagNames=None, fieldNames=None,
 
 
 
+# The record types the payloads of which L{Message.fromStr} leaves to be
+# decoded when they are first used, mapped to the length of their data, or to
+# None if it can be any length.  Decoding such a payload cannot fail once its
+# data is known to be in the message, so a malformed message is still
+# rejected by fromStr.
+_LAZY_PAYLOAD_LENGTHS = {Record_A: 4, Record_AAAA: 16, UnknownRecord: None}
+
+
+
 class Message(tputil.FancyEqMixin):
     """
     L{Message} contains all the information represented by a single
@@ -2422,10 +2575,83 @@ class Message(tputil.FancyEqMixin):
         Decode a byte string in the format described by RFC 1035 into this
         L{Message}.
 
+        Unlike L{decode}, this works on offsets into C{str} rather than on a
+        stream, decodes each name pointed to by a compression pointer only
+        once, and leaves the payloads of address records and records of
+        unknown types, which cannot be malformed, to be decoded when they are
+        first used.
+
         @param str: L{bytes}
         """
-        strio = BytesIO(str)
-        self.decode(strio)
+        data = str
+        view = bytearray(data)
+        size = len(view)
+        self.maxSize = 0
+        if size < self.headerSize:
+            raise EOFError
+        (self.id, byte3, byte4, nqueries, nans, nns, nadd) = struct.unpack_from(
+            self.headerFmt, data)
+        self.answer = ( byte3 >> 7 ) & 1
+        self.opCode = ( byte3 >> 3 ) & 0xf
+        self.auth = ( byte3 >> 2 ) & 1
+        self.trunc = ( byte3 >> 1 ) & 1
+        self.recDes = byte3 & 1
+        self.recAv = ( byte4 >> 7 ) & 1
+        self.authenticData = ( byte4 >> 5 ) & 1
+        self.checkingDisabled = ( byte4 >> 4 ) & 1
+        self.rCode = byte4 & 0xf
+
+        names = {}
+        offset = self.headerSize
+        self.queries = queries = []
+        for i in range(nqueries):
+            try:
+                name, offset = _decodeName(data, view, offset, names)
+            except EOFError:
+                return
+            if offset + 4 > size:
+                return
+            type, cls = struct.unpack_from("!HH", data, offset)
+            offset += 4
+            queries.append(Query(name, type, cls))
+
+        auth = self.auth
+        lookupRecordType = self.lookupRecordType
+        strio = None
+        for (records, count) in ((self.answers, nans),
+                                 (self.authority, nns),
+                                 (self.additional, nadd)):
+            for i in range(count):
+                try:
+                    name, offset = _decodeName(data, view, offset, names)
+                except EOFError:
+                    return
+                if offset + 10 > size:
+                    return
+                type, cls, ttl, rdlength = struct.unpack_from(
+                    RRHeader.fmt, data, offset)
+                offset += 10
+                if offset + rdlength > size:
+                    return
+                recordType = lookupRecordType(type)
+                header = _LazyRRHeader(
+                    name, type, cls, ttl, rdlength, auth, recordType, data,
+                    offset)
+                length = _LAZY_PAYLOAD_LENGTHS.get(recordType, -1)
+                if length != rdlength and length is not None:
+                    # Decode the payload now, so that a malformed one is
+                    # found while the message is being decoded.
+                    if strio is None:
+                        strio = BytesIO(data)
+                    strio.seek(offset)
+                    payload = recordType(ttl=ttl)
+                    try:
+                        payload.decode(strio, rdlength)
+                    except EOFError:
+                        return
+                    header.payload = payload
+                records.append(header)
+                offset += rdlength
 
 
 
@@ -2915,7 +3141,9 @@ class DNSDatagramProtocol(DNSMixin, protocol.DatagramProtocol):
             except CannotListenError:
                 return defer.fail()
 
-        if id is None:
+        if id is None or id in self.liveMessages:
+            # A protocol shared between queries may already be waiting for a
+            # response to a message with the requested ID.
             id = self.pickID()
         else:
             self.resends[id] = 1
@@ -2953,9 +3181,15 @@ class DNSProtocol(DNSMixin, protocol.Protocol):
     def connectionLost(self, reason):
         """
         Notify the controller that this protocol is no longer
-        connected.
+        connected, and fail the queries still waiting for a response with
+        C{reason}.
         """
         self.controller.connectionLost(self)
+        liveMessages, self.liveMessages = self.liveMessages, {}
+        if liveMessages:
+            for d, canceller in liveMessages.values():
+                canceller.cancel()
+                d.errback(reason)
 
 
     def dataReceived(self, data):
@@ -18,13 +18,231 @@ for resolvers to deal with.  Fix it.
 """
 from __future__ import division, absolute_import
 
+import struct
 import time
+from collections import OrderedDict
 
 from twisted.internet import protocol
 from twisted.names import dns, resolve
+from twisted.names.error import DNSNameError
 from twisted.python import log
 
 
+
+def _skipName(data, offset):
+    """
+    Find the end of an encoded domain name.
+
+    @param data: An encoded DNS message.
+    @type data: L{bytearray}
+
+    @param offset: The offset of the name in C{data}.
+    @type offset: L{int}
+
+    @return: The offset of the first byte after the name.
+    @rtype: L{int}
+    """
+    while True:
+        length = data[offset]
+        if length == 0:
+            return offset + 1
+        if length & 0xc0 == 0xc0:
+            return offset + 2
+        offset += length + 1
+
+
+
+def _ttlOffsets(encoded):
+    """
+    Find the TTL fields of the resource records in an encoded DNS message.
+
+    @param encoded: The encoded message.
+    @type encoded: L{bytes}
+
+    @return: The offset of the TTL of each record in C{encoded}, in the order
+        of the records.
+    @rtype: L{list} of L{int}
+    """
+    data = bytearray(encoded)
+    counts = struct.unpack('!4H', encoded[4:12])
+    offset = 12
+    for i in range(counts[0]):
+        offset = _skipName(data, offset) + 4
+    offsets = []
+    for i in range(sum(counts[1:])):
+        offset = _skipName(data, offset)
+        offsets.append(offset + 4)
+        rdlength, = struct.unpack('!H', encoded[offset + 8:offset + 10])
+        offset += 10 + rdlength
+    return offsets
+
+
+
+class _EncodedMessage(object):
+    """
+    An encoded DNS message, which stands in for a L{dns.Message} when it is
+    given to the C{writeMessage} method of L{dns.DNSDatagramProtocol} or
+    L{dns.DNSProtocol}, which only call its C{toStr} method.
+
+    @ivar _encoded: The encoded message.
+    @type _encoded: L{bytes}
+    """
+
+    def __init__(self, encoded):
+        self._encoded = encoded
+
+
+    def toStr(self):
+        """
+        @return: The encoded message.
+        @rtype: L{bytes}
+        """
+        return self._encoded
+
+
+
+class _EncodedResponse(object):
+    """
+    A response encoded by an L{EncodedResponseCache}.
+
+    @ivar records: The name, type, class and payload of each record in the
+        response.  Holding the payloads keeps them from being replaced by
+        other objects with the same identity.
+    @type records: L{list} of L{tuple}
+
+    @ivar encoded: The encoded response.
+    @type encoded: L{bytes}
+
+    @ivar ttlOffsets: The offset in C{encoded} of the TTL of each record.
+    @type ttlOffsets: L{list} of L{int}
+    """
+
+    def __init__(self, records, encoded, ttlOffsets):
+        self.records = records
+        self.encoded = encoded
+        self.ttlOffsets = ttlOffsets
+
+
+
+class EncodedResponseCache(object):
+    """
+    A cache of encoded DNS responses, so that answering the same query with
+    the same records again only means copying the encoded response and
+    writing the message ID and the TTLs of the records into it.
+
+    A cached response is used for a message with the same header fields
+    (other than the ID), the same queries and records with the same names,
+    types, classes and payloads, which are compared by identity, as answers
+    from authorities such as L{FileAuthority
+    <twisted.names.authority.FileAuthority>} and from
+    L{CacheResolver<twisted.names.cache.CacheResolver>} share them.  Record
+    payloads must therefore not be changed in place once they have been
+    sent.
+
+    @ivar maxEntries: The largest number of responses kept.  When there are
+        more, the response cached first is dropped.
+    @type maxEntries: L{int}
+
+    @ivar hits: The number of messages encoded from a cached response.
+    @type hits: L{int}
+
+    @ivar misses: The number of messages encoded in full.
+    @type misses: L{int}
+
+    @ivar _responses: The cached responses.
+    @type _responses: L{OrderedDict} mapping L{tuple} to L{_EncodedResponse}
+
+    @since: 16.5
+    """
+
+    def __init__(self, maxEntries=10000):
+        """
+        @param maxEntries: See L{maxEntries}.
+        @type maxEntries: L{int}
+        """
+        self.maxEntries = maxEntries
+        self.hits = 0
+        self.misses = 0
+        self._responses = OrderedDict()
+
+
+    def _key(self, message):
+        """
+        Describe the parts of a message which are not written into a cached
+        response.
+
+        @param message: The message.
+        @type message: L{dns.Message}
+
+        @return: A key for the cached response of C{message}.
+        @rtype: L{tuple}
+        """
+        return (
+            message.answer, message.opCode, message.auth, message.recDes,
+            message.recAv, message.authenticData, message.checkingDisabled,
+            message.rCode, message.maxSize,
+            len(message.answers), len(message.authority),
+            len(message.additional),
+            tuple((q.name.name, q.type, q.cls) for q in message.queries))
+
+
+    def toStr(self, message):
+        """
+        Encode a message, using a cached response if there is one.
+
+        @param message: The message.
+        @type message: L{dns.Message}
+
+        @return: The encoded message.
+        @rtype: L{bytes}
+        """
+        key = self._key(message)
+        response = self._responses.get(key)
+        if response is not None:
+            cachedRecords = response.records
+            index = 0
+            for section in (
+                    message.answers, message.authority, message.additional):
+                for r in section:
+                    name, type, cls, payload = cachedRecords[index]
+                    if (r.payload is not payload or r.type != type or
+                            r.cls != cls or r.name.name != name):
+                        break
+                    index += 1
+                else:
+                    continue
+                break
+            else:
+                self.hits += 1
+                encoded = bytearray(response.encoded)
+                struct.pack_into('!H', encoded, 0, message.id)
+                index = 0
+                for section in (
+                        message.answers, message.authority,
+                        message.additional):
+                    for r in section:
+                        struct.pack_into(
+                            '!I', encoded, response.ttlOffsets[index], r.ttl)
+                        index += 1
+                return bytes(encoded)
+
+        self.misses += 1
+        encoded = message.toStr()
+        if not message.trunc:
+            records = [
+                (r.name.name, r.type, r.cls, r.payload)
+                for section in (
+                    message.answers, message.authority, message.additional)
+                for r in section]
+            responses = self._responses
+            responses.pop(key, None)
+            responses[key] = _EncodedResponse(
+                records, encoded, _ttlOffsets(encoded))
+            while len(responses) > self.maxEntries:
+                responses.popitem(last=False)
+        return encoded
+
+
 class DNSServerFactory(protocol.ServerFactory):
     """
     Server factory and tracker for L{DNSProtocol} connections.  This class also
@@ -57,6 +275,10 @@ class DNSServerFactory(protocol.ServerFactory):
         L{dns.DNSProtocol}.
     @type protocol: L{IProtocolFactory} constructor
 
+    @ivar responseCache: The cache used to encode responses, or L{None} to
+        encode each response in full.  See L{__init__}.
+    @type responseCache: L{EncodedResponseCache} or L{None}
+
     @ivar _messageFactory: A response message constructor with an initializer
          signature matching L{dns.Message.__init__}.
     @type _messageFactory: C{callable}
@@ -64,10 +286,12 @@ class DNSServerFactory(protocol.ServerFactory):
 
     protocol = dns.DNSProtocol
     cache = None
+    responseCache = None
     _messageFactory = dns.Message
 
 
-    def __init__(self, authorities=None, caches=None, clients=None, verbose=0):
+    def __init__(self, authorities=None, caches=None, clients=None, verbose=0,
+                 responseCache=None):
         """
         @param authorities: Resolvers which provide authoritative answers.
         @type authorities: L{list} of L{IResolver} providers
@@ -86,6 +310,11 @@ class DNSServerFactory(protocol.ServerFactory):
             queries and responses. Default is C{0} which means no logging. Set
             to C{2} to enable logging of full query and response messages.
         @type verbose: L{int}
+
+        @param responseCache: A cache of encoded responses, which saves
+            encoding the same response again when the same query gets the
+            same answer, or L{None}.  (Since 16.5)
+        @type responseCache: L{EncodedResponseCache} or L{None}
         """
         resolvers = []
         if authorities is not None:
@@ -100,6 +329,8 @@ class DNSServerFactory(protocol.ServerFactory):
         self.verbose = verbose
         if caches:
             self.cache = caches[-1]
+        if responseCache is not None:
+            self.responseCache = responseCache
         self.connections = []
 
 
@@ -148,6 +379,8 @@ class DNSServerFactory(protocol.ServerFactory):
 
         Message payload will be logged if C{DNSServerFactory.verbose} is C{>1}.
 
+        The message is encoded with C{responseCache}, if there is one.
+
         @param protocol: The DNS protocol instance to which to send the message.
         @type protocol: L{dns.DNSDatagramProtocol} or L{dns.DNSProtocol}
 
@@ -169,10 +402,14 @@ class DNSServerFactory(protocol.ServerFactory):
                 log.msg("Authority is " + auth)
                 log.msg("Additional is " + add)
 
+        encoded = message
+        if self.responseCache is not None:
+            encoded = _EncodedMessage(self.responseCache.toStr(message))
+
         if address is None:
-            protocol.writeMessage(message)
+            protocol.writeMessage(encoded)
         else:
-            protocol.writeMessage(message, address)
+            protocol.writeMessage(encoded, address)
 
         self._verboseLog(
             "Processed query in %0.3f seconds" % (
@@ -311,10 +548,16 @@ class DNSServerFactory(protocol.ServerFactory):
         errors from C{self.resolver.query}.
 
         Constructs a response message from the original query message by
-        assigning a suitable error code to C{rCode}.
+        assigning a suitable error code to C{rCode}.  If the failure is a name
+        error given the L{dns.Message} of the reply, the authority section of
+        that reply is included in the response.
 
         An error message will be logged if C{DNSServerFactory.verbose} is C{>1}.
 
+        If the failure is a L{DNSNameError} reported by one of C{clients}, the
+        name error is cached with the C{cacheNameError} method of
+        C{self.cache}, if there is one.
+
         @param failure: The reason for the failed resolution (as reported by
             C{self.resolver.query}).
         @type failure: L{Failure<twisted.python.failure.Failure>}
@@ -331,17 +574,29 @@ class DNSServerFactory(protocol.ServerFactory):
             or L{None} if C{protocol} is a stream protocol.
         @type address: L{tuple} or L{None}
         """
+        reply = failure.value.args and failure.value.args[0]
         if failure.check(dns.DomainError, dns.AuthoritativeDomainError):
             rCode = dns.ENAME
         else:
             rCode = dns.ESERVER
             log.err(failure)
 
-        response = self._responseFromMessage(message=message, rCode=rCode)
+        if rCode == dns.ENAME and isinstance(reply, dns.Message):
+            # Negative responses carry the SOA record of the zone, as
+            # described by RFC 2308.
+            response = self._responseFromMessage(
+                message=message, rCode=rCode, authority=reply.authority)
+        else:
+            response = self._responseFromMessage(message=message, rCode=rCode)
 
         self.sendReply(protocol, response, address)
         self._verboseLog("Lookup failed")
 
+        if self.cache and failure.check(DNSNameError):
+            cacheNameError = getattr(self.cache, 'cacheNameError', None)
+            if cacheNameError is not None and isinstance(reply, dns.Message):
+                cacheNameError(message.queries[0], reply.authority)
+
 
     def handleQuery(self, message, protocol, address):
         """
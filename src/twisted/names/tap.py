@@ -138,7 +138,11 @@ def _buildResolvers(config):
 def makeService(config):
     ca, cl = _buildResolvers(config)
 
-    f = server.DNSServerFactory(config.zones, ca, cl, config['verbose'])
+    responseCache = None
+    if config.zones:
+        responseCache = server.EncodedResponseCache()
+    f = server.DNSServerFactory(config.zones, ca, cl, config['verbose'],
+                                responseCache=responseCache)
     p = dns.DNSDatagramProtocol(f)
     f.noisy = 0
     ret = service.MultiService()
@@ -142,3 +142,323 @@ class CachingTests(unittest.TestCase):
 
         return self.assertFailure(
             c.lookupAddress(b"example.com"), dns.DomainError)
+
+
+    def _answer(self, name, ttl):
+        """
+        Make the records of a response with a single A record.
+
+        @param name: The name of the record.
+        @type name: L{bytes}
+
+        @param ttl: The TTL of the record.
+        @type ttl: L{int}
+
+        @return: The answer, authority and additional records.
+        @rtype: L{tuple} of three L{list}s
+        """
+        return ([dns.RRHeader(name, dns.A, dns.IN, ttl,
+                              dns.Record_A("127.0.0.1", ttl))], [], [])
+
+
+    def test_singleDelayedCall(self):
+        """
+        However many entries are cached, L{cache.CacheResolver} uses a single
+        delayed call to remove them, which is rescheduled for the entry which
+        expires first.
+        """
+        clock = task.Clock()
+        c = cache.CacheResolver(reactor=clock)
+        c.cacheResult(dns.Query(b"a.example.com"),
+                      self._answer(b"a.example.com", 60))
+        c.cacheResult(dns.Query(b"b.example.com"),
+                      self._answer(b"b.example.com", 30))
+        c.cacheResult(dns.Query(b"c.example.com"),
+                      self._answer(b"c.example.com", 90))
+
+        calls = clock.getDelayedCalls()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0].getTime(), 30)
+
+        clock.advance(30)
+        self.assertEqual(
+            list(c.cache),
+            [dns.Query(b"a.example.com"), dns.Query(b"c.example.com")])
+        calls = clock.getDelayedCalls()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0].getTime(), 60)
+
+        clock.advance(30)
+        clock.advance(30)
+        self.assertEqual(len(c.cache), 0)
+        self.assertEqual(clock.getDelayedCalls(), [])
+        self.assertEqual(c.statistics().expirations, 3)
+
+
+    def test_replacedEntryExpires(self):
+        """
+        An entry cached again expires after the TTL of the new records, not
+        the TTL of the ones they replace.
+        """
+        clock = task.Clock()
+        c = cache.CacheResolver(reactor=clock)
+        query = dns.Query(b"example.com")
+        c.cacheResult(query, self._answer(b"example.com", 10))
+        c.cacheResult(query, self._answer(b"example.com", 60))
+
+        clock.advance(10)
+        self.assertIn(query, c.cache)
+        clock.advance(50)
+        self.assertNotIn(query, c.cache)
+
+
+    def test_leastRecentlyUsedEvicted(self):
+        """
+        When the cache holds C{maxEntries} entries, caching another evicts the
+        least recently used one.
+        """
+        clock = task.Clock()
+        c = cache.CacheResolver(reactor=clock, maxEntries=2)
+        c.cacheResult(dns.Query(b"a.example.com"),
+                      self._answer(b"a.example.com", 60))
+        c.cacheResult(dns.Query(b"b.example.com"),
+                      self._answer(b"b.example.com", 60))
+        c.lookupAddress(b"a.example.com")
+        c.cacheResult(dns.Query(b"c.example.com"),
+                      self._answer(b"c.example.com", 60))
+
+        self.assertEqual(
+            list(c.cache),
+            [dns.Query(b"a.example.com"), dns.Query(b"c.example.com")])
+        self.assertEqual(c.statistics().evictions, 1)
+        return self.assertFailure(
+            c.lookupAddress(b"b.example.com"), dns.DomainError)
+
+
+    def test_statistics(self):
+        """
+        L{cache.CacheResolver.statistics} counts the hits and misses of
+        lookups, and the entries in the cache.
+        """
+        clock = task.Clock()
+        c = cache.CacheResolver(reactor=clock)
+        c.cacheResult(dns.Query(b"example.com"),
+                      self._answer(b"example.com", 60))
+        c.lookupAddress(b"example.com")
+        c.lookupAddress(b"example.com")
+        self.failureResultOf(
+            c.lookupAddress(b"example.org"), dns.DomainError)
+
+        stats = c.statistics()
+        self.assertEqual(
+            (stats.hits, stats.negativeHits, stats.misses, stats.evictions,
+             stats.expirations, stats.size),
+            (2, 0, 1, 0, 0, 1))
+
+
+    def test_recordsSharedWithinSecond(self):
+        """
+        Lookups made within the same second share the records they are given,
+        but not the lists holding them, and the records are only made again
+        once the TTLs they have change.
+        """
+        clock = task.Clock()
+        c = cache.CacheResolver(reactor=clock)
+        c.cacheResult(dns.Query(b"example.com"),
+                      self._answer(b"example.com", 60))
+        clock.advance(0.25)
+        first = self.successResultOf(c.lookupAddress(b"example.com"))
+        clock.advance(0.5)
+        second = self.successResultOf(c.lookupAddress(b"example.com"))
+        clock.advance(1)
+        third = self.successResultOf(c.lookupAddress(b"example.com"))
+
+        self.assertIs(first[0][0], second[0][0])
+        self.assertEqual(first[0][0].ttl, 59)
+        self.assertEqual(third[0][0].ttl, 58)
+
+        first[0].append(dns.RRHeader(b"example.com"))
+        self.assertEqual(
+            1, len(self.successResultOf(c.lookupAddress(b"example.com"))[0]))
+
+
+    def test_cachingLookupResult(self):
+        """
+        Caching the records returned by a lookup in the cache leaves the
+        entry they came from unchanged.
+        """
+        clock = task.Clock()
+        c = cache.CacheResolver(reactor=clock)
+        query = dns.Query(b"example.com")
+        c.cacheResult(query, self._answer(b"example.com", 60))
+        clock.advance(10)
+        entry = c._entries[query]
+        ans, auth, add = self.successResultOf(c.lookupAddress(b"example.com"))
+        c.cacheResult(query, (ans, auth, add))
+
+        self.assertIs(c._entries[query], entry)
+        self.assertEqual(entry.when, 0)
+
+
+    def test_unpickleOldEntries(self):
+        """
+        A L{cache.CacheResolver} pickled by earlier versions, with C{(time,
+        payload)} tuples for entries and a C{cancel} attribute, is converted
+        when it is unpickled, dropping expired entries.
+        """
+        clock = task.Clock()
+        clock.advance(100)
+        fresh = dns.Query(b"example.com")
+        expired = dns.Query(b"example.org")
+        c = cache.CacheResolver(reactor=clock)
+        c.__setstate__({
+            'cache': {
+                fresh: (90, self._answer(b"example.com", 60)),
+                expired: (10, self._answer(b"example.org", 60))},
+            'cancel': {},
+            'verbose': 0,
+            '_reactor': clock})
+
+        self.assertNotIn('cancel', c.__dict__)
+        self.assertEqual([fresh], list(c.cache))
+        ans, auth, add = self.successResultOf(c.lookupAddress(b"example.com"))
+        self.assertEqual(50, ans[0].ttl)
+        clock.advance(50)
+        self.assertEqual({}, c.cache)
+
+
+    def test_cacheEntries(self):
+        """
+        L{cache.CacheResolver.cache} gives each entry as a tuple of the time
+        at which it was cached and its records.
+        """
+        clock = task.Clock()
+        clock.advance(10)
+        c = cache.CacheResolver(reactor=clock)
+        query = dns.Query(b"example.com")
+        payload = self._answer(b"example.com", 60)
+        c.cacheResult(query, payload)
+
+        self.assertEqual({query: (10, payload)}, dict(c.cache))
+        self.assertEqual(1, len(c.cache))
+
+
+    def test_cacheSetEntry(self):
+        """
+        An entry set in L{cache.CacheResolver.cache} is cached, and expires
+        like one added with L{cache.CacheResolver.cacheResult}.
+        """
+        clock = task.Clock()
+        c = cache.CacheResolver(reactor=clock)
+        query = dns.Query(b"example.com")
+        c.cache[query] = (0, self._answer(b"example.com", 60))
+
+        ans, auth, add = self.successResultOf(c.lookupAddress(b"example.com"))
+        self.assertEqual(60, ans[0].ttl)
+        clock.advance(60)
+        self.assertNotIn(query, c.cache)
+
+
+    def test_cacheDeleteEntry(self):
+        """
+        An entry deleted from L{cache.CacheResolver.cache} is removed from the
+        cache.
+        """
+        c = cache.CacheResolver(reactor=task.Clock())
+        query = dns.Query(b"example.com")
+        c.cacheResult(query, self._answer(b"example.com", 60))
+        del c.cache[query]
+
+        self.failureResultOf(c.lookupAddress(b"example.com"), dns.DomainError)
+        self.assertEqual(c.statistics().size, 0)
+
+
+    def test_cancelDeprecated(self):
+        """
+        L{cache.CacheResolver.cancel} is deprecated, and empty.
+        """
+        c = cache.CacheResolver(reactor=task.Clock())
+        c.cacheResult(dns.Query(b"example.com"),
+                      self._answer(b"example.com", 60))
+
+        self.assertEqual({}, c.cancel)
+        warnings = self.flushWarnings([self.test_cancelDeprecated])
+        self.assertEqual(1, len(warnings))
+        self.assertIs(DeprecationWarning, warnings[0]['category'])
+        self.assertEqual(
+            "twisted.names.cache.CacheResolver.cancel was deprecated in "
+            "Twisted 16.5.0",
+            warnings[0]['message'])
+
+
+    def _soa(self, ttl, minimum):
+        """
+        Make the authority section of a negative response.
+
+        @param ttl: The TTL of the SOA record.
+        @type ttl: L{int}
+
+        @param minimum: The minimum field of the SOA record.
+        @type minimum: L{int}
+
+        @return: The authority section.
+        @rtype: L{list} of L{dns.RRHeader}
+        """
+        return [dns.RRHeader(b"example.com", dns.SOA, dns.IN, ttl,
+                             dns.Record_SOA(minimum=minimum, ttl=ttl))]
+
+
+    def test_noDataNegativeTTL(self):
+        """
+        A response with no answers is cached for the smaller of the TTL and
+        the minimum field of the SOA record in its authority section.
+        """
+        clock = task.Clock()
+        c = cache.CacheResolver(reactor=clock)
+        query = dns.Query(b"example.com", dns.MX)
+        c.cacheResult(query, ([], self._soa(300, 20), []))
+
+        clock.advance(19)
+        ans, auth, add = self.successResultOf(
+            c.lookupMailExchange(b"example.com"))
+        self.assertEqual(ans, [])
+        self.assertEqual(auth[0].type, dns.SOA)
+
+        clock.advance(1)
+        self.assertNotIn(query, c.cache)
+
+
+    def test_nameError(self):
+        """
+        A name error cached with L{cache.CacheResolver.cacheNameError} makes
+        lookups fail with L{dns.AuthoritativeDomainError}, which stops a
+        resolver chain, until the negative TTL has passed.
+        """
+        clock = task.Clock()
+        c = cache.CacheResolver(reactor=clock)
+        query = dns.Query(b"example.com")
+        c.cacheNameError(query, self._soa(30, 3600))
+
+        clock.advance(29)
+        f = self.failureResultOf(
+            c.lookupAddress(b"example.com"), dns.AuthoritativeDomainError)
+        [reply] = f.value.args
+        self.assertEqual(dns.ENAME, reply.rCode)
+        self.assertEqual([query], reply.queries)
+        self.assertEqual([dns.SOA], [r.type for r in reply.authority])
+        self.assertEqual(1, reply.authority[0].ttl)
+        self.assertEqual(c.statistics().negativeHits, 1)
+
+        clock.advance(1)
+        self.assertNotIn(query, c.cache)
+        self.failureResultOf(c.lookupAddress(b"example.com"), dns.DomainError)
+
+
+    def test_nameErrorWithoutSOA(self):
+        """
+        A name error is not cached if the response has no SOA record to give
+        its negative TTL.
+        """
+        c = cache.CacheResolver(reactor=task.Clock())
+        c.cacheNameError(dns.Query(b"example.com"), [])
+        self.assertEqual(len(c.cache), 0)
@@ -7,6 +7,8 @@ Test cases for L{twisted.names.client}.
 
 from __future__ import division, absolute_import
 
+import struct
+
 from zope.interface.verify import verifyClass, verifyObject
 
 from twisted.python import failure
@@ -14,7 +16,8 @@ from twisted.python.filepath import FilePath
 from twisted.python.runtime import platform
 
 from twisted.internet import defer
-from twisted.internet.error import CannotListenError, ConnectionRefusedError
+from twisted.internet.error import (
+    CannotListenError, ConnectionDone, ConnectionRefusedError)
 from twisted.internet.interfaces import IResolver
 from twisted.internet.test.modulehelpers import AlternateReactor
 from twisted.internet.task import Clock
@@ -797,6 +800,162 @@ class ResolverTests(unittest.TestCase):
         self.assertEqual(len(prePending), 0)
 
 
+    def test_pooledProtocols(self):
+        """
+        If L{client.Resolver} is given a C{udpPoolSize}, its UDP queries are
+        spread among at most that many protocols, which stay connected after
+        the queries complete.
+        """
+        resolver = client.Resolver(
+            servers=[('example.com', 53)], udpPoolSize=2)
+        protocols = []
+
+        class FakeProtocol(object):
+            def __init__(self):
+                self.transport = StubPort()
+
+            def query(self, address, query, timeout=10, id=None):
+                protocols.append(self)
+                return defer.succeed(dns.Message())
+
+        resolver._connectedProtocol = FakeProtocol
+        for name in [b'a', b'b', b'c', b'd', b'e']:
+            resolver.query(dns.Query(name + b'.example.com'))
+        self.assertEqual(5, len(protocols))
+        self.assertEqual(2, len(set(protocols)))
+        self.assertFalse(any(p.transport.disconnected for p in protocols))
+
+
+    def test_pooledProtocolRetired(self):
+        """
+        A protocol in a L{client._DatagramProtocolPool} is replaced once it
+        has been used for C{maxQueries} queries, and disconnected once they
+        have all been released.
+        """
+        pool = client._DatagramProtocolPool(
+            StubDNSDatagramProtocol, 1, maxQueries=2)
+        first = pool.acquire()
+        self.assertIs(first, pool.acquire())
+        second = pool.acquire()
+        self.assertIsNot(first, second)
+
+        pool.release(first)
+        self.assertFalse(first.transport.disconnected)
+        pool.release(first)
+        self.assertTrue(first.transport.disconnected)
+        pool.release(second)
+        self.assertFalse(second.transport.disconnected)
+
+
+    def test_coalesceCaseInsensitive(self):
+        """
+        Lookups of names which differ only in case are answered by the same
+        query while it is outstanding.
+        """
+        protocol = StubDNSDatagramProtocol()
+        resolver = client.Resolver(servers=[('example.com', 53)])
+        resolver._connectedProtocol = lambda: protocol
+
+        first = resolver.lookupAddress(b'example.com')
+        second = resolver.lookupAddress(b'EXAMPLE.com')
+        self.assertEqual(1, len(protocol.queries))
+
+        response = dns.Message()
+        response.answers = [dns.RRHeader(
+            b'example.com', payload=dns.Record_A('10.0.0.1'))]
+        protocol.queries[0][-1].callback(response)
+        self.assertEqual(
+            self.successResultOf(first), self.successResultOf(second))
+
+
+    def test_useTCP(self):
+        """
+        If L{client.Resolver} is created with C{useTCP}, lookups are sent over
+        a single TCP connection.
+        """
+        reactor = proto_helpers.MemoryReactor()
+        resolver = client.Resolver(
+            servers=[('192.0.2.100', 53)], reactor=reactor, useTCP=True)
+        resolver._connectedProtocol = lambda: self.fail("UDP query made")
+
+        resolver.lookupAddress(b'example.com')
+        resolver.lookupAddress(b'example.net')
+        self.assertEqual(1, len(reactor.tcpClients))
+        self.assertEqual(2, len(resolver.pending))
+        self.assertEqual(60, resolver.pending[0][2])
+
+
+    def test_useTCPConnectionLost(self):
+        """
+        If the TCP connection used by a L{client.Resolver} created with
+        C{useTCP} is lost while a lookup is waiting for a response, the
+        lookup is tried again on a new connection.
+        """
+        reactor = proto_helpers.MemoryReactor()
+        resolver = client.Resolver(
+            servers=[('192.0.2.100', 53)], reactor=reactor, useTCP=True)
+        d = resolver.lookupAddress(b'example.com')
+
+        first = resolver.factory.buildProtocol(None)
+        first.makeConnection(proto_helpers.StringTransport())
+        self.assertEqual(1, len(first.liveMessages))
+        first.connectionLost(failure.Failure(ConnectionDone()))
+        self.assertNoResult(d)
+        self.assertEqual(2, len(reactor.tcpClients))
+
+        second = resolver.factory.buildProtocol(None)
+        transport = proto_helpers.StringTransport()
+        second.makeConnection(transport)
+        [id] = second.liveMessages
+        response = dns.Message(id=id, answer=1)
+        response.queries = [dns.Query(b'example.com')]
+        response.answers = [dns.RRHeader(
+            b'example.com', payload=dns.Record_A('10.0.0.1'))]
+        encoded = response.toStr()
+        second.dataReceived(struct.pack('!H', len(encoded)) + encoded)
+        answers, authority, additional = self.successResultOf(d)
+        self.assertEqual('10.0.0.1', answers[0].payload.dottedQuad())
+
+
+    def test_useTCPAttemptsLimited(self):
+        """
+        A lookup by a L{client.Resolver} created with C{useTCP} fails once a
+        connection to each nameserver, and one more, has been lost or could
+        not be made.
+        """
+        reactor = proto_helpers.MemoryReactor()
+        resolver = client.Resolver(
+            servers=[('192.0.2.100', 53)], reactor=reactor, useTCP=True)
+        d = resolver.lookupAddress(b'example.com')
+        for i in range(2):
+            factory = reactor.tcpClients[i][2]
+            factory.clientConnectionFailed(
+                reactor.connectors[i],
+                failure.Failure(ConnectionRefusedError()))
+        self.failureResultOf(d, ConnectionRefusedError)
+        self.assertEqual(2, len(reactor.tcpClients))
+
+
+    def test_tlsOptions(self):
+        """
+        If L{client.Resolver} is created with C{tlsOptions}, lookups are sent
+        over a TLS connection made with those options.
+        """
+        reactor = proto_helpers.MemoryReactor()
+        options = object()
+        resolver = client.Resolver(
+            servers=[('192.0.2.100', 853)], reactor=reactor,
+            tlsOptions=options)
+
+        resolver.lookupAddress(b'example.com')
+        self.assertEqual([], reactor.tcpClients)
+        [(host, port, factory, contextFactory, timeout, bindAddress)] = (
+            reactor.sslClients)
+        self.assertEqual(('192.0.2.100', 853), (host, port))
+        self.assertIs(options, contextFactory)
+        self.assertIs(resolver.factory, factory)
+
+
 
 class ClientTests(unittest.TestCase):
 
@@ -292,6 +292,21 @@ class NameTests(unittest.TestCase):
         self.assertRaises(ValueError, name.decode, stream)
 
 
+    def test_encodeOutOfPointerRange(self):
+        """
+        L{Name.encode} does not add names written at offsets which a
+        compression pointer cannot refer to to the compression dictionary.
+        """
+        compression = {}
+        stream = BytesIO()
+        stream.write(b"x" * 0x4000)
+        dns.Name(b"foo.example.com").encode(stream, compression)
+        self.assertEqual({}, compression)
+        self.assertEqual(
+            b"\x03foo\x07example\x03com\x00",
+            stream.getvalue()[0x4000:])
+
+
     def test_equality(self):
         """
         L{Name} instances are equal as long as they have the same value for
@@ -889,6 +904,112 @@ class MessageTests(unittest.SynchronousTestCase):
         self.assertTrue(message.answers[0].auth)
 
 
+    def _compressedResponse(self):
+        """
+        Encode a response with compressed names in its records.
+
+        @return: The encoded response.
+        @rtype: L{bytes}
+        """
+        message = dns.Message(id=5, answer=1)
+        message.queries = [dns.Query(b'example.com', dns.MX)]
+        message.answers = [
+            dns.RRHeader(b'example.com', dns.MX, ttl=60,
+                         payload=dns.Record_MX(10, b'mail.example.com', 60)),
+            dns.RRHeader(b'example.com', dns.MX, ttl=60,
+                         payload=dns.Record_MX(20, b'mx2.example.com', 60))]
+        message.additional = [
+            dns.RRHeader(b'mail.example.com', ttl=30,
+                         payload=dns.Record_A('10.0.0.1', 30))]
+        return message.toStr()
+
+
+    def test_fromStrMatchesDecode(self):
+        """
+        L{dns.Message.fromStr} decodes the same records from a response with
+        compressed names as L{dns.Message.decode}.
+        """
+        data = self._compressedResponse()
+        fromStr = dns.Message()
+        fromStr.fromStr(data)
+        decoded = dns.Message()
+        decoded.decode(BytesIO(data))
+        self.assertEqual(decoded.queries, fromStr.queries)
+        self.assertEqual(decoded.answers, fromStr.answers)
+        self.assertEqual(decoded.additional, fromStr.additional)
+        self.assertEqual(
+            dns.Name(b'mx2.example.com'), fromStr.answers[1].payload.name)
+
+
+    def test_fromStrLazyPayload(self):
+        """
+        L{dns.Message.fromStr} only decodes the payload of a record when it
+        is used, and a payload assigned to the record replaces it.
+        """
+        message = dns.Message()
+        message.fromStr(self._compressedResponse())
+        record = message.additional[0]
+        self.assertIsNot(None, record._data)
+        self.assertEqual(dns.Record_A('10.0.0.1', 30), record.payload)
+        self.assertIs(None, record._data)
+        self.assertIs(record.payload, record.payload)
+
+        replacement = dns.Record_A('10.0.0.2', 30)
+        message.answers[0].payload = replacement
+        self.assertIs(replacement, message.answers[0].payload)
+
+
+    def test_fromStrRejectsCompressionLoop(self):
+        """
+        L{dns.Message.fromStr} raises L{ValueError} if a name in the message
+        includes a compression pointer which forms a loop.
+        """
+        data = (
+            b'\x00\x01'          # Message ID
+            b'\x00\x00'          # flags
+            b'\x00\x01'          # number of queries
+            b'\x00\x00'          # number of answers
+            b'\x00\x00'          # number of authorities
+            b'\x00\x00'          # number of additionals
+            b'\x03foo\xc0\x0c'    # foo, followed by a pointer to itself
+            b'\x00\x01\x00\x01')  # type=A, cls=IN
+        self.assertRaises(ValueError, dns.Message().fromStr, data)
+
+
+    def test_fromStrRejectsMalformedPayload(self):
+        """
+        L{dns.Message.fromStr} raises L{ValueError} if the payload of a
+        record includes a name with a compression pointer which forms a
+        loop, rather than leaving it to be found when the payload is used.
+        """
+        data = (
+            b'\x00\x01'          # Message ID
+            b'\x80\x00'          # flags
+            b'\x00\x00'          # number of queries
+            b'\x00\x01'          # number of answers
+            b'\x00\x00'          # number of authorities
+            b'\x00\x00'          # number of additionals
+            b'\x03foo\x00'       # foo
+            b'\x00\x05\x00\x01'  # type=CNAME, cls=IN
+            b'\x00\x00\x00\x3c'  # ttl=60
+            b'\x00\x02'          # rdlength=2
+            b'\xc0\x1b')         # a pointer to itself
+        self.assertRaises(ValueError, dns.Message().fromStr, data)
+
+
+    def test_fromStrTruncated(self):
+        """
+        L{dns.Message.fromStr} keeps the records decoded before the end of a
+        message which is shorter than its header says.
+        """
+        data = self._compressedResponse()
+        message = dns.Message()
+        message.fromStr(data[:-10])
+        self.assertEqual(1, len(message.queries))
+        self.assertEqual(2, len(message.answers))
+        self.assertEqual([], message.additional)
+
+
 
 class MessageComparisonTests(ComparisonTestsMixin,
                              unittest.SynchronousTestCase):
@@ -1224,6 +1345,27 @@ class DatagramProtocolTests(unittest.TestCase):
         return self.assertFailure(d, CannotListenError)
 
 
+    def test_resendWithLiveID(self):
+        """
+        If L{DNSDatagramProtocol.query} is asked to reuse the ID of a message
+        for which a response is still expected, it sends the query with a new
+        ID instead, so that both queries get their own responses.
+        """
+        first = self.proto.query(('127.0.0.1', 21345), [dns.Query(b'foo')])
+        [liveID] = self.proto.liveMessages
+        second = self.proto.query(
+            ('127.0.0.1', 21345), [dns.Query(b'bar')], id=liveID)
+        self.assertEqual(2, len(self.proto.liveMessages))
+        self.assertNotIn(liveID, self.proto.resends)
+
+        [secondID] = set(self.proto.liveMessages) - set([liveID])
+        for id in liveID, secondID:
+            m = dns.Message(id=id, answer=1)
+            self.proto.datagramReceived(m.toStr(), ('127.0.0.1', 21345))
+        self.assertEqual(liveID, self.successResultOf(first).id)
+        self.assertEqual(secondID, self.successResultOf(second).id)
+
+
     def test_receiveMessageNotInLiveMessages(self):
         """
         When receiving a message whose id is not in
@@ -1290,6 +1432,20 @@ class DNSProtocolTests(unittest.TestCase):
         self.assertEqual(self.controller.connections, [])
 
 
+    def test_connectionLostFailsQueries(self):
+        """
+        When L{dns.DNSProtocol} is disconnected, the queries still waiting
+        for a response fail with the reason, and their timeouts are
+        cancelled.
+        """
+        d = self.proto.query([dns.Query(b'foo')])
+        self.proto.connectionLost(
+            Failure(ConnectionDone("Fake Connection Done")))
+        self.failureResultOf(d, ConnectionDone)
+        self.assertEqual({}, self.proto.liveMessages)
+        self.assertEqual([], self.clock.getDelayedCalls())
+
+
     def test_queryTimeout(self):
         """
         Test that query timeouts after some seconds.
@@ -25,6 +25,8 @@ from twisted.names.error import DomainError
 from twisted.names.client import Resolver
 from twisted.names.secondary import (
     SecondaryAuthorityService, SecondaryAuthority)
+from twisted.python.compat import _PY3
+from twisted.python.filepath import FilePath
 
 from twisted.test.proto_helpers import StringTransport, MemoryReactorClock
 
@@ -621,6 +623,89 @@ class AuthorityTests(unittest.TestCase):
         self._referralTest('lookupAllRecords')
 
 
+    def test_allRecordsAtOrigin(self):
+        """
+        A request of type C{ALL_RECORDS} for the origin of the zone is
+        answered with all of its records, including its I{NS} records.
+        """
+        nameserver = dns.Record_NS(b'ns1.example.com')
+        address = dns.Record_A(b'10.0.0.1')
+        authority = NoFileAuthority(
+            soa=(soa_record.mname.name, soa_record),
+            records={
+                soa_record.mname.name: [soa_record, nameserver, address]})
+        answer, authority, additional = self.successResultOf(
+            authority.lookupAllRecords(soa_record.mname.name))
+        self.assertEqual(
+            [rr.payload for rr in answer], [soa_record, nameserver, address])
+        self.assertEqual(authority, [])
+
+
+    def test_recordsReplaced(self):
+        """
+        When the records of a L{FileAuthority} are replaced, lookups are
+        answered from the new records.
+        """
+        first = dns.Record_A(b'10.0.0.1')
+        second = dns.Record_A(b'10.0.0.2')
+        name = b'www.' + soa_record.mname.name
+        authority = NoFileAuthority(
+            soa=(soa_record.mname.name, soa_record),
+            records={name: [first]})
+        answer, authority_, additional = self.successResultOf(
+            authority.lookupAddress(name))
+        self.assertEqual([rr.payload for rr in answer], [first])
+
+        authority.records = {name: [second]}
+        answer, authority_, additional = self.successResultOf(
+            authority.lookupAddress(name))
+        self.assertEqual([rr.payload for rr in answer], [second])
+
+
+
+class BindAuthorityTests(unittest.TestCase):
+    """
+    Tests for L{authority.BindAuthority}.
+    """
+    if _PY3:
+        skip = "BindAuthority is not yet ported to Python 3."
+
+    def test_loadFile(self):
+        """
+        L{authority.BindAuthority} loads the records of a zone file named
+        after the origin of the zone, and answers queries for them.
+        """
+        directory = FilePath(self.mktemp())
+        directory.makedirs()
+        directory.child('example.com').setContent(
+            b"$TTL 3600\n"
+            b"@ IN SOA ns1.example.com. hostmaster.example.com. (\n"
+            b"    1 3600 600 86400 300 )\n"
+            b"@ IN NS ns1.example.com.\n"
+            b"ns1.example.com. IN A 192.0.2.53\n"
+            b"www.example.com. 300 IN A 192.0.2.1 ; the web server\n"
+            b"www.example.com. IN MX 10 ns1.example.com.\n")
+
+        zone = authority.BindAuthority(directory.child('example.com').path)
+
+        self.assertEqual(zone.soa[0], 'example.com')
+        self.assertEqual(zone.soa[1].minimum, 300)
+        self.assertEqual(
+            sorted(zone.records), ['example.com', 'ns1.example.com',
+                                   'www.example.com'])
+        answer, authority_, additional = self.successResultOf(
+            zone.lookupAddress('www.example.com'))
+        self.assertEqual(
+            [(rr.name.name, rr.type, rr.ttl, rr.payload.dottedQuad())
+             for rr in answer],
+            [('www.example.com', dns.A, 300, '192.0.2.1')])
+        answer, authority_, additional = self.successResultOf(
+            zone.lookupMailExchange('www.example.com'))
+        self.assertEqual(
+            [(rr.name.name, rr.type, rr.ttl) for rr in answer],
+            [('www.example.com', dns.MX, 3600)])
+
+
 
 class AdditionalProcessingTests(unittest.TestCase):
     """
@@ -190,6 +190,19 @@ class RaisingCache(object):
         raise self.CacheResultArguments(args, kwargs)
 
 
+    def cacheNameError(self, *args, **kwargs):
+        """
+        Raises the supplied arguments.
+
+        @param args: Positional arguments
+        @type args: L{tuple}
+
+        @param kwargs: Keyword args
+        @type kwargs: L{dict}
+        """
+        raise self.CacheResultArguments(args, kwargs)
+
+
 
 def assertLogMessage(testCase, expectedMessages, callable, *args, **kwargs):
     """
@@ -924,6 +937,53 @@ class DNSServerFactoryTests(unittest.TestCase):
         self.assertIs(additional, expectedAdditional)
 
 
+    def test_gotResolverErrorCachingNameError(self):
+        """
+        L{server.DNSServerFactory.gotResolverError} caches a name error
+        reported by a client, with the authority section of the response, if
+        at least one cache was provided in the constructor.
+        """
+        f = NoResponseDNSServerFactory(caches=[RaisingCache()])
+
+        m = dns.Message()
+        m.addQuery(b'example.com')
+        reply = dns.Message(rCode=dns.ENAME)
+        reply.authority = [dns.RRHeader(
+            b'example.com', dns.SOA, ttl=60, payload=dns.Record_SOA())]
+
+        e = self.assertRaises(
+            RaisingCache.CacheResultArguments,
+            f.gotResolverError,
+            failure.Failure(error.DNSNameError(reply)),
+            protocol=NoopProtocol(), message=m, address=None)
+        (query, authority), kwargs = e.args
+
+        self.assertEqual(query.name.name, b'example.com')
+        self.assertIs(authority, reply.authority)
+
+
+    def test_gotResolverErrorNameErrorAuthority(self):
+        """
+        L{server.DNSServerFactory.gotResolverError} includes the authority
+        section of the reply given with a name error in the response, so that
+        it carries the SOA record of the zone.
+        """
+        f = server.DNSServerFactory()
+        reply = dns.Message(rCode=dns.ENAME)
+        reply.authority = [dns.RRHeader(
+            b'example.com', dns.SOA, ttl=60, payload=dns.Record_SOA())]
+
+        e = self.assertRaises(
+            RaisingProtocol.WriteMessageArguments,
+            f.gotResolverError,
+            failure.Failure(error.AuthoritativeDomainError(reply)),
+            protocol=RaisingProtocol(), message=dns.Message(), address=None)
+        (message,), kwargs = e.args
+
+        self.assertEqual(message.rCode, dns.ENAME)
+        self.assertEqual(message.authority, reply.authority)
+
+
     def test_gotResolverErrorCallsResponseFromMessage(self):
         """
         L{server.DNSServerFactory.gotResolverError} calls
@@ -1251,6 +1311,31 @@ class DNSServerFactoryTests(unittest.TestCase):
         self.assertEqual(message.rCode, dns.ENOTIMP)
 
 
+    def test_sendReplyResponseCache(self):
+        """
+        L{server.DNSServerFactory.sendReply} writes a message encoded by the
+        C{responseCache} given to L{server.DNSServerFactory.__init__}.
+        """
+        responseCache = server.EncodedResponseCache()
+        f = server.DNSServerFactory(responseCache=responseCache)
+        self.assertIs(f.responseCache, responseCache)
+
+        m = dns.Message(id=1234, answer=1)
+        m.addQuery(b'example.com')
+        m.answers = [dns.RRHeader(
+            b'example.com', ttl=60, payload=dns.Record_A('127.0.0.1'))]
+        m.timeReceived = 0
+
+        e = self.assertRaises(
+            RaisingProtocol.WriteMessageArguments,
+            f.sendReply, RaisingProtocol(), m, ('::1', 53))
+        (encoded, address), kwargs = e.args
+
+        self.assertEqual(encoded.toStr(), m.toStr())
+        self.assertEqual(address, ('::1', 53))
+        self.assertEqual(responseCache.misses, 1)
+
+
     def test_handleOtherLogging(self):
         """
         L{server.DNSServerFactory.handleOther} logs the message origin address
@@ -1264,3 +1349,117 @@ class DNSServerFactoryTests(unittest.TestCase):
             message=dns.Message(),
             protocol=NoopProtocol(),
             address=('::1', 53))
+
+
+
+class EncodedResponseCacheTests(unittest.TestCase):
+    """
+    Tests for L{server.EncodedResponseCache}.
+    """
+    def _response(self, id=1234, ttl=60, payload=None):
+        """
+        Make a response with an answer, an authority and an additional
+        record, whose names are compressed when it is encoded.
+
+        @param id: The ID of the message.
+        @type id: L{int}
+
+        @param ttl: The TTL of the answer.
+        @type ttl: L{int}
+
+        @param payload: The payload of the answer, or L{None} for the one
+            used by every response.
+
+        @rtype: L{dns.Message}
+        """
+        if payload is None:
+            payload = self.payload
+        m = dns.Message(id=id, answer=1, auth=1)
+        m.addQuery(b'www.example.com')
+        m.answers = [dns.RRHeader(b'www.example.com', ttl=ttl,
+                                  payload=payload, auth=True)]
+        m.authority = [dns.RRHeader(b'example.com', dns.NS, ttl=3600,
+                                    payload=self.ns, auth=True)]
+        m.additional = [dns.RRHeader(b'ns1.example.com', ttl=600,
+                                     payload=self.glue, auth=True)]
+        return m
+
+
+    def setUp(self):
+        self.payload = dns.Record_A('127.0.0.1')
+        self.ns = dns.Record_NS(b'ns1.example.com')
+        self.glue = dns.Record_A('127.0.0.2')
+        self.cache = server.EncodedResponseCache()
+
+
+    def test_miss(self):
+        """
+        L{server.EncodedResponseCache.toStr} encodes a message it has no
+        response for as L{dns.Message.toStr} does.
+        """
+        m = self._response()
+        self.assertEqual(self.cache.toStr(m), m.toStr())
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+
+    def test_hit(self):
+        """
+        L{server.EncodedResponseCache.toStr} encodes a message with the same
+        records as one it has encoded before from the cached response, with
+        the ID and TTLs of the new message.
+        """
+        self.cache.toStr(self._response())
+        m = self._response(id=4321, ttl=17)
+        self.assertEqual(self.cache.toStr(m), m.toStr())
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+
+    def test_differentPayload(self):
+        """
+        A message whose records have a different payload is encoded in full,
+        and its response replaces the one cached before.
+        """
+        self.cache.toStr(self._response())
+        m = self._response(payload=dns.Record_A('127.0.0.3'))
+        self.assertEqual(self.cache.toStr(m), m.toStr())
+        self.assertEqual(self.cache.toStr(m), m.toStr())
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+
+    def test_differentHeader(self):
+        """
+        A message with different header fields is encoded in full.
+        """
+        self.cache.toStr(self._response())
+        m = self._response()
+        m.rCode = dns.ESERVER
+        self.assertEqual(self.cache.toStr(m), m.toStr())
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+
+
+    def test_truncated(self):
+        """
+        A message which is truncated when it is encoded is not cached.
+        """
+        m = self._response()
+        m.maxSize = 40
+        encoded = self.cache.toStr(m)
+        self.assertTrue(m.trunc)
+        self.assertEqual(len(encoded), 40)
+        self.cache.toStr(m)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+
+
+    def test_maxEntries(self):
+        """
+        When the cache holds C{maxEntries} responses, the response cached
+        first is dropped to make room for another.
+        """
+        self.cache.maxEntries = 1
+        first = self._response()
+        second = self._response()
+        second.queries[0].type = dns.AAAA
+        self.cache.toStr(first)
+        self.cache.toStr(second)
+        self.cache.toStr(first)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 3))
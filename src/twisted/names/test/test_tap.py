@@ -111,7 +111,7 @@ class OptionsTests(SynchronousTestCase):
             # We want the delayed calls on the reactor, which should be all of
             # ours from the threaded resolver cleanup
             from twisted.internet import reactor
-            for x in reactor._newTimedCalls:
+            for x in reactor.getDelayedCalls():
                 if _PY3:
                     self.assertEqual(x.func.__func__,
                                      ThreadedResolver._cleanup)
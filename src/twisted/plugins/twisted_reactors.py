@@ -17,12 +17,15 @@ poll = Reactor(
     'poll', 'twisted.internet.pollreactor', 'poll(2)-based reactor.')
 epoll = Reactor(
     'epoll', 'twisted.internet.epollreactor', 'epoll(4)-based reactor.')
+epollet = Reactor(
+    'epollet', 'twisted.internet.epolletreactor',
+    'Edge-triggered epoll(4)-based reactor.')
 
 kqueue = Reactor(
     'kqueue', 'twisted.internet.kqreactor', 'kqueue(2)-based reactor.')
 
 __all__ = [
-    "default", "select", "poll", "epoll", "kqueue",
+    "default", "select", "poll", "epoll", "epollet", "kqueue",
 ]
 
 if _PY3:
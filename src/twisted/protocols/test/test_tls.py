@@ -1889,6 +1889,31 @@ class IProtocolNegotiationFactoryTests(TestCase):
         return clientDataReceived
 
 
+    def test_negotiationWithClientConnectionCreator(self):
+        """
+        A client offers the factory's protocols even if its connection creator
+        creates connections from a context which does not know about them, as
+        the ones returned by L{optionsForClientTLS} do.
+        """
+        authority, serverCertificate = certificatesForAuthorityAndServer()
+        clientFactory = ClientNegotiationFactory([b'h2', b'http/1.1'])
+        clientFactory.protocol = Protocol
+        serverFactory = ServerNegotiationFactory([b'h2', b'http/1.1'])
+        serverFactory.protocol = Protocol
+
+        clientWrapper = TLSMemoryBIOFactory(
+            optionsForClientTLS(u'example.com', trustRoot=authority),
+            True, clientFactory)
+        serverWrapper = TLSMemoryBIOFactory(
+            serverCertificate.options(), False, serverFactory)
+        server, client, pump = connectedServerAndClient(
+            lambda: serverWrapper.buildProtocol(None),
+            lambda: clientWrapper.buildProtocol(None))
+
+        self.assertEqual(client.negotiatedProtocol, b'h2')
+        self.assertEqual(server.negotiatedProtocol, b'h2')
+
+
     def test_negotiationClientOnly(self):
         """
         When factories support L{IProtocolNegotiationFactory} and only the
@@ -62,7 +62,9 @@ from twisted.internet.interfaces import (
 from twisted.internet.main import CONNECTION_LOST
 from twisted.internet.protocol import Protocol
 from twisted.internet.task import cooperate
-from twisted.internet._sslverify import _setAcceptableProtocols
+from twisted.internet._sslverify import (
+    _setAcceptableProtocols, protocolNegotiationMechanisms,
+    ProtocolNegotiationSupport)
 from twisted.protocols.policies import ProtocolWrapper, WrappingFactory
 
 
@@ -896,6 +898,14 @@ class TLSMemoryBIOFactory(WrappingFactory):
             protocols = self.wrappedFactory.acceptableProtocols()
             context = connection.get_context()
             _setAcceptableProtocols(context, protocols)
+            if (protocols and
+                    self._creatorInterface is IOpenSSLClientConnectionCreator
+                    and protocolNegotiationMechanisms() &
+                    ProtocolNegotiationSupport.ALPN):
+                # OpenSSL copies the protocols a client offers with ALPN from
+                # the context when the connection is created, which has
+                # already happened, so they must be set on the connection too.
+                connection.set_alpn_protos(protocols)
 
         return
 
@@ -133,6 +133,7 @@ modules = [
     "twisted.internet.defer",
     "twisted.internet.endpoints",
     "twisted.internet.epollreactor",
+    "twisted.internet.epolletreactor",
     "twisted.internet.error",
     "twisted.internet.fdesc",
     "twisted.internet.gireactor",
@@ -459,6 +460,7 @@ testModules = [
     "twisted.internet.test.test_default",
     "twisted.internet.test.test_endpoints",
     "twisted.internet.test.test_epollreactor",
+    "twisted.internet.test.test_epolletreactor",
     "twisted.internet.test.test_fdset",
     "twisted.internet.test.test_filedescriptor",
     "twisted.internet.test.test_gireactor",
@@ -155,6 +155,11 @@ class Failure:
     C{locals().items()}/C{globals().items()} for that frame, or an empty tuple
     if those details were not captured.
 
+    Unless C{captureVars} is set, C{stack} and C{frames} are only extracted
+    from the traceback when one of them is first used, so a L{Failure} which
+    is handled without either being looked at never pays for it.  The line
+    numbers in C{stack} are those of the calling frames at that time.
+
     @ivar value: The exception instance responsible for this failure.
     @ivar type: The exception's class.
     @ivar stack: list of frames, innermost last, excluding C{Failure.__init__}.
@@ -162,7 +167,6 @@ class Failure:
     """
 
     pickled = 0
-    stack = None
 
     # The opcode of "yield" in Python bytecode. We need this in _findFailure in
     # order to identify whether an exception was thrown by a
@@ -231,17 +235,42 @@ class Failure:
             elif _PY3:
                 tb = self.value.__traceback__
 
-        frames = self.frames = []
-        stack = self.stack = []
-
         # added 2003-06-23 by Chris Armstrong. Yes, I actually have a
         # use case where I need this traceback object, and I've made
         # sure that it'll be cleaned up.
         self.tb = tb
 
+        if tb is not None and not captureVars:
+            # Walking the stack and the traceback is expensive, and most
+            # Failures are handled without anything looking at the frames, so
+            # leave it until something does (see __getattr__).  If locals and
+            # globals are wanted they must be captured now, before they change.
+            self._stackOffset = stackOffset
+        else:
+            self._extractFrames(stackOffset)
+
+        if inspect.isclass(self.type) and issubclass(self.type, Exception):
+            parentCs = getmro(self.type)
+            self.parents = list(map(reflect.qual, parentCs))
+        else:
+            self.parents = [self.type]
+
+    def _extractFrames(self, stackOffset):
+        """
+        Set C{frames} and C{stack} from C{tb}, the traceback of the exception.
+
+        @param stackOffset: The number of frames to leave out of the top of
+            C{stack}.
+        @type stackOffset: L{int}
+        """
+        frames = self.frames = []
+        stack = self.stack = []
+        captureVars = self.captureVars
+        tb = self.tb
+
         if tb:
             f = tb.tb_frame
-        elif not isinstance(self.value, Failure):
+        else:
             # we don't do frame introspection since it's expensive,
             # and if we were passed a plain exception with no
             # traceback, it's not useful anyway
@@ -307,11 +336,21 @@ class Failure:
                 globalz,
                 ))
             tb = tb.tb_next
-        if inspect.isclass(self.type) and issubclass(self.type, Exception):
-            parentCs = getmro(self.type)
-            self.parents = list(map(reflect.qual, parentCs))
-        else:
-            self.parents = [self.type]
+
+    def __getattr__(self, name):
+        """
+        Extract C{frames} and C{stack} from the traceback the first time
+        either is used.
+        """
+        if name in ('frames', 'stack'):
+            if '_stackOffset' in self.__dict__:
+                self._extractFrames(self.__dict__.pop('_stackOffset'))
+                return self.__dict__[name]
+            if name == 'stack':
+                # XXX: Failures unpickled from older versions may have no
+                # stack at all.
+                return None
+        raise AttributeError(name)
 
     def trap(self, *errorTypes):
         """Trap this failure if its type is in a predetermined list.
@@ -484,6 +523,7 @@ class Failure:
                 ] for v in self.stack
             ]
 
+        c.pop('_stackOffset', None)
         c['pickled'] = 1
         return c
 
@@ -10,6 +10,7 @@ from __future__ import division, absolute_import
 import warnings
 import gc, traceback
 import re
+import weakref
 
 from twisted.python import failure, log
 from twisted.python.compat import _PY3
@@ -1421,6 +1422,95 @@ class DeferredTests(unittest.SynchronousTestCase, ImmediateFailureMixin):
             "Python 3 support to be fixed in #5949")
 
 
+    def test_callbackArguments(self):
+        """
+        Callbacks are called with the positional and keyword arguments they
+        were added with, whichever of them were given.
+        """
+        calls = []
+        def record(result, *args, **kwargs):
+            calls.append((result, args, kwargs))
+            return result
+        d = defer.Deferred()
+        d.addCallbacks(record)
+        d.addCallbacks(record, callbackArgs=(1,))
+        d.addCallbacks(record, callbackKeywords={'a': 2})
+        d.addCallback(record, 3, b=4)
+        d.callback('result')
+        self.assertEqual(calls, [
+            ('result', (), {}),
+            ('result', (1,), {}),
+            ('result', (), {'a': 2}),
+            ('result', (3,), {'b': 4})])
+
+
+    def test_succeedWithoutCallbacks(self):
+        """
+        L{defer.succeed} returns a L{defer.Deferred} which has been called
+        back, and whose result is passed to callbacks added to it.
+        """
+        d = defer.succeed('result')
+        self.assertTrue(d.called)
+        self.assertEqual(self.successResultOf(d), 'result')
+        self.assertRaises(defer.AlreadyCalledError, d.callback, None)
+
+
+    def test_succeedWithDeferred(self):
+        """
+        L{defer.succeed} does not accept a L{defer.Deferred} as the result,
+        like L{defer.Deferred.callback}.
+        """
+        self.assertRaises(AssertionError, defer.succeed, defer.Deferred())
+
+
+    def test_defaultAttributes(self):
+        """
+        A L{defer.Deferred} which has not been initialized, such as one made
+        by a subclass which does not call L{defer.Deferred.__init__}, has the
+        default values of the attributes which L{defer.Deferred.__init__}
+        sets, and of no others.
+        """
+        class Uninitialized(defer.Deferred):
+            def __init__(self):
+                self.callbacks = []
+
+        d = Uninitialized()
+        self.assertIs(d.called, False)
+        self.assertIs(d.paused, False)
+        self.assertIs(d._runningCallbacks, False)
+        self.assertIs(d._suppressAlreadyCalled, False)
+        self.assertIsNone(d._debugInfo)
+        self.assertIsNone(d._chainedTo)
+        self.assertFalse(hasattr(d, 'result'))
+        self.assertIs(defer.Deferred().paused, False)
+        d.addCallback(lambda result: result * 2)
+        d.callback(3)
+        self.assertEqual(self.successResultOf(d), 6)
+
+
+    def test_succeedWhenDebugging(self):
+        """
+        When debugging, the L{defer.Deferred} returned by L{defer.succeed}
+        records where it was called back.
+        """
+        self.addCleanup(defer.setDebugging, defer.getDebugging())
+        defer.setDebugging(True)
+        d = defer.succeed('result')
+        self.assertIsNotNone(d._debugInfo.invoker)
+        self.assertEqual(self.successResultOf(d), 'result')
+
+
+    def test_attributes(self):
+        """
+        Attributes other than those used by L{defer.Deferred} itself can be
+        set on a L{defer.Deferred}, and it can be weakly referenced.
+        """
+        d = defer.Deferred()
+        d.extra = 'value'
+        self.assertEqual(d.extra, 'value')
+        self.assertIs(weakref.ref(d)(), d)
+
+
 
 class FirstErrorTests(unittest.SynchronousTestCase):
     """
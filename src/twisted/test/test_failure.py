@@ -568,6 +568,65 @@ class FailureTests(SynchronousTestCase):
             '%s: division by zero>' % (typeName,))
 
 
+    def test_framesExtractedLazily(self):
+        """
+        Unless C{captureVars} is set, a L{failure.Failure} does not extract
+        C{frames} or C{stack} from its traceback until one of them is used.
+        """
+        f = getDivisionFailure()
+        self.assertNotIn('frames', f.__dict__)
+        self.assertNotIn('stack', f.__dict__)
+        self.assertEqual(f.frames[-1][0], 'getDivisionFailure')
+        self.assertIn('frames', f.__dict__)
+        self.assertIn('stack', f.__dict__)
+
+
+    def test_lazyFramesMatchCapturedFrames(self):
+        """
+        The C{frames} and C{stack} of a L{failure.Failure} created without
+        C{captureVars} name the same functions and lines as those of one
+        created with C{captureVars}.
+        """
+        try:
+            1/0
+        except ZeroDivisionError:
+            lazy = failure.Failure()
+            captured = failure.Failure(captureVars=True)
+
+        def withoutVars(frames):
+            return [frame[:3] for frame in frames]
+
+        self.assertEqual(withoutVars(lazy.frames),
+                         withoutVars(captured.frames))
+        self.assertEqual(withoutVars(lazy.stack[:-1]),
+                         withoutVars(captured.stack[:-1]))
+        self.assertEqual(lazy.stack[-1][:2], captured.stack[-1][:2])
+
+
+    def test_cleanFailureExtractsFrames(self):
+        """
+        L{failure.Failure.cleanFailure} extracts the frames before discarding
+        the traceback.
+        """
+        f = getDivisionFailure()
+        f.cleanFailure()
+        self.assertIsNone(f.tb)
+        self.assertEqual(f.frames[-1][0], 'getDivisionFailure')
+        self.assertNotIn('_stackOffset', f.__dict__)
+
+
+    def test_missingStack(self):
+        """
+        The C{stack} of a L{failure.Failure} which has none, such as one
+        unpickled from an old version of Twisted, is L{None}.
+        """
+        f = getDivisionFailure()
+        f.cleanFailure()
+        del f.stack
+        self.assertIsNone(f.stack)
+        self.assertRaises(AttributeError, getattr, f, 'noSuchAttribute')
+
+
 
 class BrokenStr(Exception):
     """
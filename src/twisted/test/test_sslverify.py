@@ -1801,6 +1801,196 @@ class ServiceIdentityTests(unittest.SynchronousTestCase):
 
 
 
+class TLSSessionCacheTests(unittest.SynchronousTestCase):
+    """
+    Tests for L{sslverify.TLSSessionCache}.
+    """
+    if skipSSL:
+        skip = skipSSL
+
+    def test_store(self):
+        """
+        L{sslverify.TLSSessionCache.get} returns the session most recently
+        stored for a hostname, or L{None} if there is none.
+        """
+        cache = sslverify.TLSSessionCache()
+        self.assertIdentical(cache.get(u"example.com"), None)
+        first, second = object(), object()
+        cache.store(u"example.com", first)
+        cache.store(u"example.org", second)
+        self.assertIdentical(cache.get(u"example.com"), first)
+        self.assertIdentical(cache.get(u"example.org"), second)
+        cache.store(u"example.com", second)
+        self.assertIdentical(cache.get(u"example.com"), second)
+        self.assertEqual(len(cache), 2)
+
+
+    def test_discard(self):
+        """
+        L{sslverify.TLSSessionCache.discard} forgets the session for a
+        hostname, if there is one.
+        """
+        cache = sslverify.TLSSessionCache()
+        cache.store(u"example.com", object())
+        cache.discard(u"example.com")
+        cache.discard(u"example.org")
+        self.assertIdentical(cache.get(u"example.com"), None)
+        self.assertEqual(len(cache), 0)
+
+
+    def test_maximumSize(self):
+        """
+        Once L{sslverify.TLSSessionCache.maximumSize} sessions are stored,
+        storing another discards the least recently used.
+        """
+        cache = sslverify.TLSSessionCache(maximumSize=2)
+        cache.store(u"a.example.com", object())
+        cache.store(u"b.example.com", object())
+        cache.get(u"a.example.com")
+        cache.store(u"c.example.com", object())
+        self.assertEqual(len(cache), 2)
+        self.assertIdentical(cache.get(u"b.example.com"), None)
+        self.assertNotIdentical(cache.get(u"a.example.com"), None)
+
+
+
+def sessionReused(protocol):
+    """
+    Determine whether the TLS connection of a L{TLSMemoryBIOProtocol} resumed
+    a session.  pyOpenSSL has no API for this, so its bindings are used.
+
+    @rtype: L{bool}
+    """
+    connection = protocol._tlsConnection
+    return bool(SSL._lib.SSL_session_reused(connection._ssl))
+
+
+
+class SessionResumptionTests(unittest.SynchronousTestCase):
+    """
+    Tests for the C{sessionCache} argument to L{sslverify.optionsForClientTLS}.
+    """
+    if skipSSL:
+        skip = skipSSL
+
+    def setUp(self):
+        self.caCert, serverCert = certificatesForAuthorityAndServer()
+        self.serverOptions = sslverify.OpenSSLCertificateOptions(
+            privateKey=serverCert.privateKey.original,
+            certificate=serverCert.original)
+
+
+    def connect(self, hostname=u"example.com", **kw):
+        """
+        Make a TLS connection to the server, and close it cleanly once the
+        handshake has completed.
+
+        @param hostname: The hostname the client expects the server to have.
+
+        @param kw: Keyword arguments for L{sslverify.optionsForClientTLS}.
+
+        @return: The client's L{TLSMemoryBIOProtocol}.
+        """
+        kw.setdefault('trustRoot', self.caCert)
+        clientOptions = sslverify.optionsForClientTLS(hostname, **kw)
+        clientFactory = TLSMemoryBIOFactory(
+            clientOptions, isClient=True,
+            wrappedFactory=protocol.Factory.forProtocol(protocol.Protocol))
+        serverFactory = TLSMemoryBIOFactory(
+            self.serverOptions, isClient=False,
+            wrappedFactory=protocol.Factory.forProtocol(protocol.Protocol))
+        sProto, cProto, pump = connectedServerAndClient(
+            lambda: serverFactory.buildProtocol(None),
+            lambda: clientFactory.buildProtocol(None))
+        cProto.loseConnection()
+        pump.flush()
+        return cProto
+
+
+    def test_sessionResumed(self):
+        """
+        Connections to a host made with the same session cache resume the
+        session established by the previous one.
+        """
+        cache = sslverify.TLSSessionCache()
+        self.assertFalse(sessionReused(self.connect(sessionCache=cache)))
+        self.assertEqual(len(cache), 1)
+        self.assertTrue(sessionReused(self.connect(sessionCache=cache)))
+        self.assertTrue(sessionReused(self.connect(sessionCache=cache)))
+
+
+    def test_noSessionCache(self):
+        """
+        Without a session cache, every connection performs a full handshake.
+        """
+        self.assertFalse(sessionReused(self.connect()))
+        self.assertFalse(sessionReused(self.connect()))
+
+
+    def test_sessionsByHostname(self):
+        """
+        Sessions are only resumed with the host they were established with.
+        """
+        cache = sslverify.TLSSessionCache()
+        self.connect(sessionCache=cache)
+        self.assertEqual(
+            [u"example.com"], [hostname for hostname, options in cache._sessions])
+
+
+    def test_sessionsByTrustRoot(self):
+        """
+        A creator does not resume a session established by a creator with a
+        different trust root, which would skip verifying the server's
+        certificate against its own trust root.
+        """
+        cache = sslverify.TLSSessionCache()
+        self.connect(sessionCache=cache)
+        otherCACert, otherServerCert = certificatesForAuthorityAndServer()
+        cProto = self.connect(trustRoot=otherCACert, sessionCache=cache)
+        self.assertFalse(sessionReused(cProto))
+        self.assertEqual(len(cache), 1)
+
+
+    def test_sessionsByClientCertificate(self):
+        """
+        A creator does not resume a session established by a creator with a
+        different client certificate, which would give the new connection
+        the identity of the earlier one.
+        """
+        cache = sslverify.TLSSessionCache()
+        self.connect(sessionCache=cache)
+        otherCACert, clientCert = certificatesForAuthorityAndServer()
+        cProto = self.connect(clientCertificate=clientCert, sessionCache=cache)
+        self.assertFalse(sessionReused(cProto))
+        self.assertEqual(len(cache), 2)
+        cProto = self.connect(clientCertificate=clientCert, sessionCache=cache)
+        self.assertTrue(sessionReused(cProto))
+
+
+    def test_extraCertificateOptionsNotShared(self):
+        """
+        Creators given C{extraCertificateOptions}, which cannot be compared,
+        only resume the sessions they established themselves.
+        """
+        cache = sslverify.TLSSessionCache()
+        extra = {'method': SSL.SSLv23_METHOD}
+        self.connect(sessionCache=cache, extraCertificateOptions=extra)
+        cProto = self.connect(
+            sessionCache=cache, extraCertificateOptions=extra)
+        self.assertFalse(sessionReused(cProto))
+
+
+    def test_failedVerificationNotCached(self):
+        """
+        The session established with a host whose identity could not be
+        verified is not stored.
+        """
+        cache = sslverify.TLSSessionCache()
+        self.connect(u"wrong.example.com", sessionCache=cache)
+        self.assertEqual(len(cache), 0)
+
+
+
 def negotiateProtocol(serverProtocols,
                       clientProtocols,
                       clientOptions=None):
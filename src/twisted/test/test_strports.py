@@ -135,5 +135,21 @@ class ServiceTests(TestCase):
         self.assertEqual(len(warnings), 1)
 
 
+
+class ListenTests(TestCase):
+    """
+    Tests for L{strports.listen}.
+    """
+
+    def test_reusePortRejected(self):
+        """
+        L{strports.listen} raises L{ValueError} for a TCP description which
+        includes C{reusePort}, which only endpoints support.
+        """
+        exc = self.assertRaises(
+            ValueError, strports.listen, "tcp:0:reusePort=1", Factory())
+        self.assertIn("serverFromString", str(exc))
+
+
 if _PY3:
     del DeprecatedParseTests
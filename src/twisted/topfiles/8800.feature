@@ -0,0 +1 @@
+twisted.internet.base.ReactorBase.installTimerStore replaces the data structure in which a reactor keeps its delayed calls; twisted.internet.base.TimingWheelTimerStore is a hierarchical timing wheel for reactors with very many timers.
@@ -0,0 +1 @@
+twisted.internet.endpoints.TCP4ServerEndpoint and TCP6ServerEndpoint, and the tcp: server endpoint string, now accept reusePort to set SO_REUSEPORT on the listening socket.
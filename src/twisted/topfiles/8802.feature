@@ -0,0 +1 @@
+twisted.internet.abstract.FileDescriptor.writeFile writes part of a file to a connection; TCP connections do so with sendfile(2), where available, as indicated by their fileWrites attribute.
@@ -0,0 +1 @@
+twisted.internet.ssl.optionsForClientTLS now accepts a sessionCache, a twisted.internet.ssl.TLSSessionCache, so that new connections resume TLS sessions rather than performing full handshakes; twisted.web.client.BrowserLikePolicyForHTTPS uses one, and twisted.web.client.Agent.keepWarm keeps connections to a server open ahead of requests.
@@ -182,4 +182,7 @@ class Element(object):
         loader = self.loader
         if loader is None:
             raise MissingTemplateLoader(self)
+        loadCompiled = getattr(loader, '_loadCompiled', None)
+        if loadCompiled is not None:
+            return loadCompiled()
         return loader.load()
@@ -15,13 +15,27 @@ from sys import exc_info
 from types import GeneratorType
 from traceback import extract_tb
 
+from zope.interface import implementer
+
 from twisted.internet.defer import Deferred
+from twisted.internet.interfaces import IPushProducer
+from twisted.internet.task import cooperate, TaskFinished
 from twisted.python.compat import unicode, nativeString, iteritems
+from twisted.python.failure import Failure
 from twisted.web._stan import Tag, slot, voidElements, Comment, CDATA, CharRef
 from twisted.web.error import UnfilledSlot, UnsupportedType, FlattenerError
 from twisted.web.iweb import IRenderable
 
 
+# The number of bytes L{flatten} collects before passing them to its write
+# callable.
+_WRITE_BUFFER_SIZE = 2 ** 16
+
+# The number of elements L{_flattenToConsumer} flattens at once before
+# handing the rest of the document over to the cooperator.
+_COOPERATE_STEPS = 1000
+
+
 
 def escapeForContent(data):
     """
@@ -150,6 +164,42 @@ def escapedComment(data):
 
 
 
+class _Serialized(object):
+    """
+    Markup which has already been serialized, as part of a document compiled
+    by L{_compileTree}.  It is written out as it is, without escaping.
+
+    @ivar data: The serialized markup.
+    @type data: L{bytes}
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+
+    def __repr__(self):
+        return '_Serialized(%r)' % (self.data,)
+
+
+
+class _Content(object):
+    """
+    Part of the contents of an element, split from the element's start and
+    end tags by L{_compileTree}.  It is flattened as it would be within the
+    element: text in it is escaped with L{escapeForContent}.
+
+    @ivar children: The contents.
+    """
+
+    def __init__(self, children):
+        self.children = children
+
+
+    def __repr__(self):
+        return '_Content(%r)' % (self.children,)
+
+
+
 def _getSlotValue(name, slotData, default=None):
     """
     Find the value of the named slot in the given stack of slot data.
@@ -210,6 +260,10 @@ def _flattenElement(request, root, write, slotData, renderFactory,
                                renderFactory, dataEscaper)
     if isinstance(root, (bytes, unicode)):
         write(dataEscaper(root))
+    elif isinstance(root, _Serialized):
+        write(root.data)
+    elif isinstance(root, _Content):
+        yield keepGoing(root.children, escapeForContent)
     elif isinstance(root, slot):
         slotValue = _getSlotValue(root.name, slotData, root.default)
         yield keepGoing(slotValue)
@@ -284,7 +338,7 @@ def _flattenElement(request, root, write, slotData, renderFactory,
 
 
 
-def _flattenTree(request, root, write):
+def _flattenTree(request, root, write, yieldEvery=None):
     """
     Make C{root} into an iterable of L{bytes} and L{Deferred} by doing a depth
     first traversal of the tree.
@@ -300,12 +354,17 @@ def _flattenTree(request, root, write):
     @param write: A callable which will be invoked with each L{bytes} produced
         by flattening C{root}.
 
+    @param yieldEvery: If not L{None}, the number of elements to flatten
+        before yielding L{None}, so that the caller can do something else
+        before iterating again.
+
     @return: An iterator which yields objects of type L{bytes} and L{Deferred}.
         A L{Deferred} is only yielded when one is encountered in the process of
         flattening C{root}.  The returned iterator must not be iterated again
         until the L{Deferred} is called back.
     """
     stack = [_flattenElement(request, root, write, [], None, escapeForContent)]
+    steps = 0
     while stack:
         try:
             frame = stack[-1].gi_frame
@@ -328,23 +387,75 @@ def _flattenTree(request, root, write):
                 yield element.addCallback(cbx)
             else:
                 stack.append(element)
+                if yieldEvery is not None:
+                    steps += 1
+                    if steps >= yieldEvery:
+                        steps = 0
+                        yield None
 
 
-def _writeFlattenedData(state, write, result):
+class _WriteBuffer(object):
     """
-    Take strings from an iterator and pass them to a writer function.
+    Collect the many small strings written while flattening, and pass them on
+    in larger chunks.
 
-    @param state: An iterator of L{str} and L{Deferred}.  L{str} instances will
-        be passed to C{write}.  L{Deferred} instances will be waited on before
-        resuming iteration of C{state}.
+    @ivar _write: The callable to pass the chunks to.
+
+    @ivar _size: The number of bytes to collect before passing them on.
+
+    @ivar _buffer: The strings collected so far.
+
+    @ivar _length: The total length of the strings in C{_buffer}.
+    """
 
-    @param write: A callable which will be invoked with each L{str}
-        produced by iterating C{state}.
+    def __init__(self, write, size):
+        self._write = write
+        self._size = size
+        self._buffer = []
+        self._length = 0
+
+
+    def write(self, data):
+        """
+        Collect C{data}, passing on everything collected if there is enough
+        of it.
+
+        @type data: L{bytes}
+        """
+        self._buffer.append(data)
+        self._length += len(data)
+        if self._length >= self._size:
+            self.flush()
+
+
+    def flush(self):
+        """
+        Pass on everything collected so far.
+        """
+        if self._buffer:
+            data = b''.join(self._buffer)
+            self._buffer = []
+            self._length = 0
+            self._write(data)
+
+
+
+def _writeFlattenedData(state, flush, result):
+    """
+    Iterate an iterator of L{Deferred}s produced by flattening, waiting for
+    each one, and finally flush what has been written.
+
+    @param state: An iterator of L{Deferred}.  Each L{Deferred} will be waited
+        on before resuming iteration of C{state}.
+
+    @param flush: A callable which passes on anything written so far.  It is
+        called before waiting for each L{Deferred}, so that what has been
+        flattened is not held up, and once C{state} is exhausted.
 
     @param result: A L{Deferred} which will be called back when C{state} has
-        been completely flattened into C{write} or which will be errbacked if
-        an exception in a generator passed to C{state} or an errback from a
-        L{Deferred} from state occurs.
+        been completely flattened and flushed or which will be errbacked if
+        an exception in a generator passed to C{state}, an errback from a
+        L{Deferred} from state, or an exception from C{flush} occurs.
 
     @return: L{None}
     """
@@ -352,18 +463,175 @@ def _writeFlattenedData(state, write, result):
         try:
             element = next(state)
         except StopIteration:
-            result.callback(None)
+            try:
+                flush()
+            except:
+                result.errback()
+            else:
+                result.callback(None)
         except:
+            try:
+                flush()
+            except:
+                pass
             result.errback()
         else:
+            try:
+                flush()
+            except:
+                result.errback()
+                break
             def cby(original):
-                _writeFlattenedData(state, write, result)
+                _writeFlattenedData(state, flush, result)
                 return original
             element.addCallbacks(cby, result.errback)
         break
 
 
 
+def _isStatic(root):
+    """
+    Determine whether C{root} always flattens to the same markup: that it
+    includes no slots, render directives, L{Deferred}s, generators or other
+    renderable objects.
+
+    @param root: An object which can be flattened.
+
+    @rtype: L{bool}
+    """
+    if isinstance(root, (bytes, unicode, CDATA, Comment, CharRef)):
+        return True
+    elif isinstance(root, (tuple, list)):
+        return all(_isStatic(element) for element in root)
+    elif isinstance(root, Tag):
+        return (root.render is None and
+                all(_isStatic(value) for value in root.attributes.values()) and
+                _isStatic(root.children))
+    return False
+
+
+
+def _serialize(root):
+    """
+    Flatten C{root}, which must be static (see L{_isStatic}).
+
+    @rtype: L{bytes}
+    """
+    io = BytesIO()
+    for deferred in _flattenTree(None, root, io.write):
+        raise UnsupportedType(deferred)
+    return io.getvalue()
+
+
+
+def _compileInto(root, parts, inContent):
+    """
+    Compile C{root}, appending the results to C{parts}.  See L{_compileTree}.
+
+    @param root: An object which can be flattened.
+
+    @param parts: The L{list} to append to.
+
+    @param inContent: Whether C{root} is within the contents of an element.
+        Text is escaped differently within an attribute, so it can only be
+        serialized in advance if this is true.  Markup, however, is escaped in
+        the same way wherever it is.
+    """
+    if isinstance(root, (bytes, unicode)):
+        if inContent:
+            parts.append(_Serialized(escapeForContent(root)))
+        else:
+            parts.append(root)
+    elif isinstance(root, (tuple, list)):
+        for element in root:
+            _compileInto(element, parts, inContent)
+    elif isinstance(root, (CDATA, Comment, CharRef)):
+        parts.append(_Serialized(_serialize(root)))
+    elif isinstance(root, Tag) and root.render is None:
+        # A tag with a render directive is left alone: it is handed to the
+        # renderer, which may look at its children.
+        if root.slotData:
+            # The slots within this tag must be filled from its slotData, so
+            # it cannot be taken apart.
+            parts.append(_compileTag(root, inContent or bool(root.tagName)))
+        elif not root.tagName:
+            _compileInto(root.children, parts, inContent)
+        elif _isStatic(root):
+            parts.append(_Serialized(_serialize(root)))
+        elif (nativeString(root.tagName) in voidElements or
+              not all(_isStatic(value) for value in root.attributes.values())):
+            parts.append(_compileTag(root, True))
+        else:
+            # Serialize the start and end tags, and compile the children in
+            # between.
+            markup = _serialize(Tag(root.tagName, attributes=root.attributes))
+            end = markup[markup.rindex(b'</'):]
+            parts.append(_Serialized(markup[:-len(end)]))
+            children = []
+            _compileInto(root.children, children, True)
+            for child in children:
+                if not isinstance(child, (_Serialized, _Content)):
+                    child = _Content(child)
+                parts.append(child)
+            parts.append(_Serialized(end))
+    else:
+        parts.append(root)
+
+
+
+def _compileTag(root, inContent):
+    """
+    Make a copy of C{root} with compiled children.
+
+    @param root: A L{Tag} without a render directive.
+
+    @param inContent: Whether the children of C{root} are within the contents
+        of an element.
+
+    @rtype: L{Tag}
+    """
+    tag = Tag(root.tagName, attributes=root.attributes,
+              children=_compileTree(root.children, inContent),
+              filename=root.filename, lineNumber=root.lineNumber,
+              columnNumber=root.columnNumber)
+    tag.slotData = root.slotData
+    return tag
+
+
+
+def _compileTree(root, inContent=False):
+    """
+    Compile C{root}, a document which will be flattened many times, so that
+    flattening it does as little work as possible.
+
+    Everything in the document which does not depend on slots, renderers or
+    other renderable objects (see L{_isStatic}) is serialized in advance,
+    and consecutive runs of serialized markup are joined together.  Flattening
+    the result is equivalent to flattening C{root}, but flattening only has
+    to deal with the parts of the document which vary.
+
+    @param root: An object which can be flattened.
+
+    @param inContent: Whether C{root} is within the contents of an element.
+
+    @return: A L{list} of the objects to flatten instead of C{root}.
+    """
+    parts = []
+    _compileInto(root, parts, inContent)
+    compiled = []
+    for part in parts:
+        if (isinstance(part, _Serialized) and compiled and
+                isinstance(compiled[-1], list)):
+            compiled[-1].append(part.data)
+        elif isinstance(part, _Serialized):
+            compiled.append([part.data])
+        else:
+            compiled.append(part)
+    return [_Serialized(b''.join(part)) if isinstance(part, list) else part
+            for part in compiled]
+
+
+
 def flatten(request, root, write):
     """
     Incrementally write out a string representation of C{root} using C{write}.
@@ -380,20 +648,222 @@ def flatten(request, root, write):
         L{list}, L{types.GeneratorType}, L{Deferred}, or something that provides
         L{IRenderable}.
 
-    @param write: A callable which will be invoked with each L{bytes} produced
-        by flattening C{root}.
+    @param write: A callable which will be invoked with the L{bytes} produced
+        by flattening C{root}.  These are collected into chunks of up to about
+        64KiB rather than being passed on one small string at a time, but
+        anything already flattened is passed on before waiting for a
+        L{Deferred}.
 
     @return: A L{Deferred} which will be called back when C{root} has been
         completely flattened into C{write} or which will be errbacked if an
         unexpected exception occurs.
     """
     result = Deferred()
-    state = _flattenTree(request, root, write)
-    _writeFlattenedData(state, write, result)
+    buffer = _WriteBuffer(write, _WRITE_BUFFER_SIZE)
+    state = _flattenTree(request, root, buffer.write)
+    _writeFlattenedData(state, buffer.flush, result)
     return result
 
 
 
+@implementer(IPushProducer)
+class _FlattenProducer(object):
+    """
+    A streaming producer which flattens a document into a consumer.
+
+    As much of the document as possible is flattened at once, as by
+    L{flatten}.  Only once C{_COOPERATE_STEPS} elements have been flattened
+    without a break is the rest flattened a little at a time by a
+    L{CooperativeTask}, which is registered with the consumer as a streaming
+    producer so that it stops while the consumer is paused.
+
+    @ivar _consumer: The L{IConsumer} being written to.
+
+    @ivar _cooperate: A callable like L{twisted.internet.task.cooperate}.
+
+    @ivar _buffer: The L{_WriteBuffer} collecting what has been flattened.
+
+    @ivar _state: The iterator returned by L{_flattenTree}.
+
+    @ivar _steps: The iterator returned by L{_stepsOf}.
+
+    @ivar _task: The L{CooperativeTask} iterating C{_steps}, or L{None} if
+        flattening has not been handed over to one.
+
+    @ivar _registered: Whether this producer has been registered with
+        C{_consumer}.
+
+    @ivar _paused: Whether C{_task} has been paused by C{pauseProducing}.
+
+    @ivar _done: The L{Deferred} returned by L{_flattenToConsumer}.
+    """
+
+    _task = None
+    _registered = False
+    _paused = False
+
+    def __init__(self, request, root, consumer, cooperate):
+        """
+        @param request: A request object which will be passed to the C{render}
+            method of any L{IRenderable} provider which is encountered.
+
+        @param root: An object to be made flatter.
+
+        @param consumer: The L{IConsumer} to write the L{bytes} produced by
+            flattening C{root} to.
+
+        @param cooperate: A callable like L{twisted.internet.task.cooperate}
+            which will be used to run the flattening if it takes long.
+        """
+        self._consumer = consumer
+        self._cooperate = cooperate
+        self._buffer = _WriteBuffer(consumer.write, _WRITE_BUFFER_SIZE)
+        self._state = _flattenTree(request, root, self._buffer.write,
+                                   _COOPERATE_STEPS)
+        self._steps = self._stepsOf(self._state)
+        self._done = Deferred()
+
+
+    def _stepsOf(self, state):
+        """
+        Iterate C{state}, passing on what has been flattened each time it
+        yields.
+
+        @param state: The iterator returned by L{_flattenTree}.
+
+        @return: An iterator which yields L{None}, when other tasks should be
+            given a chance to run, and L{Deferred}s, which must fire before
+            flattening can continue.
+        """
+        try:
+            for element in state:
+                self._buffer.flush()
+                if element is None:
+                    yield None
+                else:
+                    waiting = Deferred()
+                    def passOn(original, waiting=waiting):
+                        waiting.callback(None)
+                        return original
+                    element.addCallbacks(passOn, waiting.errback)
+                    yield waiting
+        finally:
+            self._buffer.flush()
+
+
+    def _flatten(self, ignored=None):
+        """
+        Flatten as much as possible at once: until the document has been
+        flattened, a L{Deferred} must be waited for, or C{_COOPERATE_STEPS}
+        elements have been flattened, in which case the rest is handed over
+        to a L{CooperativeTask}.
+        """
+        try:
+            element = next(self._steps)
+        except StopIteration:
+            self._finished(None)
+        except:
+            self._finished(Failure())
+        else:
+            if element is None:
+                self._handOver()
+            else:
+                element.addCallbacks(self._flatten, self._finished)
+
+
+    def _handOver(self):
+        """
+        Flatten the rest of the document with a L{CooperativeTask}, and
+        register this producer with the consumer, unless it already has a
+        producer, so that the task stops while the consumer is paused.
+        """
+        self._task = self._cooperate(self._steps)
+        if getattr(self._consumer, 'producer', None) is None:
+            self._consumer.registerProducer(self, True)
+            self._registered = True
+        self._task.whenDone().addCallbacks(
+            lambda ignored: self._finished(None), self._finished)
+
+
+    def _finished(self, result):
+        """
+        Unregister this producer, if it was registered, and fire C{_done}.
+
+        @param result: L{None}, or the L{Failure} flattening ended with.
+        """
+        if self._registered:
+            self._registered = False
+            self._consumer.unregisterProducer()
+        if isinstance(result, Failure):
+            self._done.errback(result)
+        else:
+            self._done.callback(None)
+
+
+    def pauseProducing(self):
+        """
+        Stop flattening until C{resumeProducing} is called.
+        """
+        if not self._paused:
+            self._paused = True
+            self._task.pause()
+
+
+    def resumeProducing(self):
+        """
+        Continue flattening after C{pauseProducing}.
+        """
+        if self._paused:
+            self._paused = False
+            self._task.resume()
+
+
+    def stopProducing(self):
+        """
+        Stop flattening for good.  The L{Deferred} returned by
+        L{_flattenToConsumer} fails with L{TaskStopped}.
+        """
+        try:
+            self._task.stop()
+        except TaskFinished:
+            pass
+
+
+
+def _flattenToConsumer(request, root, consumer, cooperate=cooperate):
+    """
+    Flatten C{root} into C{consumer}, as much as possible at once, as
+    L{flatten} does, but giving other tasks a chance to run while a large
+    document is flattened.
+
+    Once C{_COOPERATE_STEPS} elements have been flattened without a break,
+    the rest is flattened a little at a time by a L{CooperativeTask}, and,
+    unless C{consumer} already has a producer, a streaming producer is
+    registered with C{consumer} so that flattening stops while it is paused.
+
+    @param request: A request object which will be passed to the C{render}
+        method of any L{IRenderable} provider which is encountered.
+
+    @param root: An object to be made flatter, as for L{flatten}.
+
+    @param consumer: An L{IConsumer} which will be written to.  If a producer
+        is registered with it, it is unregistered before the returned
+        L{Deferred} fires.
+
+    @param cooperate: A callable like L{twisted.internet.task.cooperate}
+        which will be used to run the flattening of a large document.
+
+    @return: A L{Deferred} which will be called back with L{None} when C{root}
+        has been completely flattened into C{consumer}, or which will be
+        errbacked if an unexpected exception occurs or with L{TaskStopped} if
+        the producer is stopped.
+    """
+    producer = _FlattenProducer(request, root, consumer, cooperate)
+    producer._flatten()
+    return producer._done
+
+
+
 def flattenString(request, root):
     """
     Collate a string representation of C{root} into a single string.
@@ -0,0 +1,702 @@
+# -*- test-case-name: twisted.web.test.test_h2client -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+HTTP/2 client implementation.
+
+This is the client-side counterpart of L{twisted.web._http2}: a single
+L{H2ClientConnection} carries any number of concurrent requests, each on its
+own stream.  It is used by L{twisted.web.client.HTTPConnectionPool} when a
+server selects C{h2} during the TLS handshake.
+
+This API is currently considered private.
+"""
+
+from __future__ import absolute_import, division
+
+from collections import deque
+
+from zope.interface import implementer
+
+import h2.connection
+import h2.errors
+import h2.events
+import h2.exceptions
+import h2.settings
+
+from twisted.internet.defer import Deferred, CancelledError, fail
+from twisted.internet.error import ConnectionAborted, ConnectionLost
+from twisted.internet.interfaces import IConsumer, IPushProducer
+from twisted.internet.protocol import Protocol
+from twisted.python.failure import Failure
+from twisted.web.http import RESPONSES, NO_CONTENT, NOT_MODIFIED
+from twisted.web.http_headers import Headers
+from twisted.web.iweb import UNKNOWN_LENGTH
+from twisted.web._newclient import (
+    Response, ResponseFailed, ResponseNeverReceived, RequestNotSent,
+    RequestGenerationFailed,
+)
+
+
+# This API is currently considered private.
+__all__ = []
+
+
+# Headers which only make sense for a single HTTP/1.1 connection, and which
+# must not be sent over HTTP/2 (RFC 7540, section 8.1.2.2).
+_CONNECTION_HEADERS = frozenset([
+    b'connection', b'keep-alive', b'proxy-connection', b'transfer-encoding',
+    b'upgrade', b'host',
+])
+
+
+
+class H2ClientConnection(Protocol):
+    """
+    A client's end of a single HTTP/2 connection.
+
+    Each call to L{request} opens a new stream.  If the server has limited the
+    number of concurrent streams and that many are already open, the request
+    waits until one of them finishes.
+
+    @ivar conn: The HTTP/2 connection state machine.
+    @type conn: L{h2.connection.H2Connection}
+
+    @ivar streams: A mapping of stream IDs to the L{_H2ClientStream} issuing
+        the request on that stream.
+    @type streams: L{dict} mapping L{int} to L{_H2ClientStream}
+
+    @ivar _pending: Requests waiting for a stream to become available.
+    @type _pending: L{collections.deque} of L{_H2ClientStream}
+
+    @ivar _goneCallback: A callable which is called with this connection, at
+        most once, as soon as it can no longer be used for new requests:
+        because the server sent I{GOAWAY}, because L{abort} was called, or
+        because the connection was lost.
+
+    @ivar _gone: L{True} once C{_goneCallback} has been called.
+    @type _gone: L{bool}
+
+    @ivar _lostReason: The reason the connection was lost, or L{None} while
+        it is still connected.
+    @type _lostReason: L{Failure} or L{None}
+
+    @ivar _abortDeferreds: L{Deferred}s returned by L{abort}, fired when the
+        connection is lost.
+    @type _abortDeferreds: L{list} of L{Deferred}
+    """
+    def __init__(self, goneCallback=lambda connection: None):
+        self.conn = h2.connection.H2Connection(
+            client_side=True, header_encoding=None
+        )
+        # There is nowhere to deliver pushed responses, so do not accept them.
+        self.conn.local_settings = h2.settings.Settings(
+            client=True, initial_values={h2.settings.ENABLE_PUSH: 0}
+        )
+        self.streams = {}
+        self._pending = deque()
+        self._goneCallback = goneCallback
+        self._gone = False
+        self._lostReason = None
+        self._abortDeferreds = []
+
+
+    def connectionMade(self):
+        """
+        Send the connection preface and our settings.
+        """
+        self.conn.initiate_connection()
+        self._flush()
+
+
+    def request(self, request):
+        """
+        Issue C{request} on a new stream and return a L{Deferred} which will
+        fire with a L{Response} instance or an error.
+
+        @param request: The object defining the parameters of the request to
+            issue.
+        @type request: L{twisted.web._newclient.Request}
+
+        @rtype: L{Deferred}
+        @return: The same failures as L{HTTP11ClientProtocol.request} are
+            possible: L{RequestNotSent} if no more requests can be issued on
+            this connection, L{RequestGenerationFailed} if the request body
+            could not be produced, L{ResponseNeverReceived} if the stream or
+            the connection went away before a response arrived and
+            L{ResponseFailed} if the response body was not fully received.
+        """
+        if self._gone:
+            return fail(RequestNotSent())
+
+        stream = _H2ClientStream(self, request)
+        if self._canOpenStream():
+            self._openStream(stream)
+        else:
+            self._pending.append(stream)
+        return stream.finished
+
+
+    def abort(self):
+        """
+        Close the connection, failing any outstanding requests.
+
+        @return: A L{Deferred} which fires when the connection has been lost.
+        """
+        if self._lostReason is not None:
+            d = Deferred()
+            d.callback(None)
+            return d
+        self._goAway()
+        self.transport.abortConnection()
+        d = Deferred()
+        self._abortDeferreds.append(d)
+        return d
+
+
+    def dataReceived(self, data):
+        """
+        Feed data from the server into the state machine and dispatch the
+        resulting events to the streams they concern.
+
+        @param data: The data received from the transport.
+        @type data: L{bytes}
+        """
+        try:
+            events = self.conn.receive_data(data)
+        except h2.exceptions.ProtocolError:
+            # A remote protocol error terminates the connection.
+            self._flush()
+            self._goAway()
+            self.transport.loseConnection()
+            return
+
+        for event in events:
+            if isinstance(event, h2.events.ResponseReceived):
+                self._withStream(event, '_responseReceived', event.headers)
+            elif isinstance(event, h2.events.DataReceived):
+                self._withStream(
+                    event, '_dataReceived', event.data,
+                    event.flow_controlled_length)
+            elif isinstance(event, h2.events.StreamEnded):
+                self._withStream(event, '_streamEnded')
+            elif isinstance(event, h2.events.StreamReset):
+                self._withStream(
+                    event, '_streamReset', Failure(ConnectionLost(
+                        "HTTP/2 stream reset by server, error code %r" %
+                        (event.error_code,))))
+            elif isinstance(event, h2.events.WindowUpdated):
+                self._windowUpdated(event.stream_id)
+            elif isinstance(event, h2.events.RemoteSettingsChanged):
+                self._windowUpdated(0)
+                self._openPendingStreams()
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self._connectionTerminated(event)
+
+        self._flush()
+
+
+    def connectionLost(self, reason):
+        """
+        Fail every outstanding request with C{reason}.
+        """
+        self._lostReason = reason
+        self._goAway()
+        for streamID in sorted(self.streams):
+            self.streams.pop(streamID)._connectionLost(reason)
+        while self._pending:
+            self._pending.popleft()._notSent()
+        abortDeferreds, self._abortDeferreds = self._abortDeferreds, []
+        for d in abortDeferreds:
+            d.callback(None)
+
+
+    def _withStream(self, event, methodName, *args):
+        """
+        Call a method of the stream an event refers to, if it still exists.
+        """
+        stream = self.streams.get(event.stream_id)
+        if stream is not None:
+            getattr(stream, methodName)(*args)
+
+
+    def _canOpenStream(self):
+        """
+        Determine whether a new stream may be opened right now.
+
+        @rtype: L{bool}
+        """
+        return (not self._pending and self._lostReason is None and
+                self.conn.open_outbound_streams <
+                self.conn.remote_settings.max_concurrent_streams)
+
+
+    def _openStream(self, stream):
+        """
+        Send the headers for C{stream} on a new stream ID and start sending its
+        body, if it has one.
+        """
+        streamID = self.conn.get_next_available_stream_id()
+        self.streams[streamID] = stream
+        stream._start(streamID)
+        self._flush()
+
+
+    def _openPendingStreams(self):
+        """
+        Issue as many waiting requests as the server's stream limit allows.
+        """
+        while self._pending and self._lostReason is None and (
+                self.conn.open_outbound_streams <
+                self.conn.remote_settings.max_concurrent_streams):
+            self._openStream(self._pending.popleft())
+
+
+    def _streamDone(self, streamID):
+        """
+        Forget about a stream which has finished, one way or another, and let
+        a waiting request have its place.
+        """
+        if self.streams.pop(streamID, None) is not None:
+            self._openPendingStreams()
+
+
+    def _windowUpdated(self, streamID):
+        """
+        Let the streams blocked on flow control send more data: just
+        C{streamID}, or all of them for the connection window (stream 0).
+        """
+        if streamID:
+            stream = self.streams.get(streamID)
+            if stream is not None:
+                stream._sendBufferedData()
+        else:
+            for stream in list(self.streams.values()):
+                stream._sendBufferedData()
+
+
+    def _connectionTerminated(self, event):
+        """
+        The server sent I{GOAWAY}: requests on streams it did not process,
+        and requests which have not been sent yet, fail with
+        L{RequestNotSent}, so that they can safely be retried elsewhere.  The
+        state machine accepts no more frames after I{GOAWAY}, so the
+        connection is closed, failing the rest.
+        """
+        self._goAway()
+        for streamID in sorted(self.streams):
+            if streamID > event.last_stream_id:
+                self.streams.pop(streamID)._notSent()
+        while self._pending:
+            self._pending.popleft()._notSent()
+        self.transport.loseConnection()
+
+
+    def _goAway(self):
+        """
+        Stop accepting new requests and tell the pool, once.
+        """
+        if not self._gone:
+            self._gone = True
+            self._goneCallback(self)
+
+
+    def _flush(self):
+        """
+        Write whatever the state machine has queued up to the transport.
+        """
+        dataToSend = self.conn.data_to_send()
+        if dataToSend and self._lostReason is None:
+            self.transport.write(dataToSend)
+
+
+
+@implementer(IConsumer, IPushProducer)
+class _H2ClientStream(object):
+    """
+    A single request and its response, on one stream of an
+    L{H2ClientConnection}.
+
+    The stream consumes the request body from the request's body producer,
+    respecting HTTP/2 flow control, and it is the transport which the
+    L{Response} hands to the protocol consuming the response body.
+
+    @ivar streamID: The stream ID, or L{None} until the request is sent.
+    @type streamID: L{int} or L{None}
+
+    @ivar finished: A L{Deferred} which fires with the L{Response}.
+
+    @ivar response: The L{Response}, once its headers have been received.
+    @type response: L{Response} or L{None}
+
+    @ivar _outbound: Request body data waiting for flow control window.
+    @type _outbound: L{collections.deque} of L{bytes}
+
+    @ivar _bodyFinished: L{True} once the body producer has finished; the
+        stream is ended once C{_outbound} is empty.
+    @type _bodyFinished: L{bool}
+
+    @ivar _ended: L{True} once this end of the stream has been closed.
+    @type _ended: L{bool}
+
+    @ivar _producerPaused: L{True} if the body producer has been paused
+        because C{_outbound} is not empty.
+    @type _producerPaused: L{bool}
+
+    @ivar _paused: L{True} while the consumer of the response body does not
+        want any more data.  Received data is not acknowledged in the
+        meantime, so the server's window for this stream drains and it stops
+        sending.
+    @type _paused: L{bool}
+
+    @ivar _unacknowledged: The number of flow-controlled bytes received while
+        paused and not yet acknowledged.
+    @type _unacknowledged: L{int}
+    """
+    def __init__(self, connection, request):
+        self._connection = connection
+        self._request = request
+        self.streamID = None
+        self.finished = Deferred(self._cancel)
+        self.response = None
+        self._outbound = deque()
+        self._bodyFinished = False
+        self._ended = False
+        self._producerPaused = False
+        self._paused = False
+        self._unacknowledged = 0
+        self._bodyDeferred = None
+
+
+    def _start(self, streamID):
+        """
+        Send the request's headers on C{streamID}, and start producing its
+        body if it has one.
+        """
+        self.streamID = streamID
+        request = self._request
+        bodyProducer = request.bodyProducer
+        conn = self._connection.conn
+        self._ended = bodyProducer is None
+        conn.send_headers(
+            streamID, self._buildHeaders(), end_stream=self._ended)
+        if self._ended:
+            return
+
+        self._bodyDeferred = bodyProducer.startProducing(self)
+
+        def cbProduced(ignored):
+            self._bodyDeferred = None
+            self._bodyFinished = True
+            self._sendBufferedData()
+
+        def ebProduced(err):
+            self._bodyDeferred = None
+            if self.streamID in self._connection.streams:
+                self._reset(h2.errors.INTERNAL_ERROR)
+                self._connection._flush()
+                self._fail(Failure(RequestGenerationFailed([err])))
+
+        self._bodyDeferred.addCallbacks(cbProduced, ebProduced)
+
+
+    def _buildHeaders(self):
+        """
+        Build the header list for the request: pseudo-headers first, then the
+        request's own headers, lowercased and without any which are specific
+        to HTTP/1.1 connections.
+
+        @rtype: L{list} of 2-L{tuple} of L{bytes}
+        """
+        request = self._request
+        parsedURI = getattr(request, '_parsedURI', None)
+        scheme = parsedURI.scheme if parsedURI is not None else b'https'
+        authority = request.headers.getRawHeaders(b'host', [b''])[0]
+        headers = [
+            (b':method', request.method),
+            (b':scheme', scheme),
+            (b':authority', authority),
+            (b':path', request.uri),
+        ]
+        for name, values in request.headers.getAllRawHeaders():
+            name = name.lower()
+            if name in _CONNECTION_HEADERS:
+                continue
+            if name == b'te':
+                values = [v for v in values if v.lower() == b'trailers']
+            for value in values:
+                headers.append((name, value))
+
+        bodyProducer = request.bodyProducer
+        if (bodyProducer is not None and
+                bodyProducer.length is not UNKNOWN_LENGTH and
+                not request.headers.hasHeader(b'content-length')):
+            headers.append(
+                (b'content-length', str(bodyProducer.length).encode('ascii')))
+        return headers
+
+
+    # Implementation of IConsumer, for the request body.
+    def registerProducer(self, producer, streaming):
+        """
+        Body producers write straight to the stream, which pauses them when
+        the flow control window is exhausted; nothing else is needed.
+        """
+
+
+    def unregisterProducer(self):
+        """
+        See L{registerProducer}.
+        """
+
+
+    def write(self, data):
+        """
+        Send some of the request body, as much as flow control allows, and
+        pause the body producer if any of it has to wait.
+
+        @param data: A chunk of the request body.
+        @type data: L{bytes}
+        """
+        if data and self.streamID in self._connection.streams:
+            self._outbound.append(data)
+            self._sendBufferedData()
+
+
+    def _sendBufferedData(self):
+        """
+        Send as much buffered request body data as the flow control windows
+        allow, end the stream once the body is complete, and pause or resume
+        the body producer as appropriate.
+        """
+        connection = self._connection
+        conn = connection.conn
+        streamID = self.streamID
+        if streamID not in connection.streams:
+            return
+        while self._outbound:
+            window = min(conn.local_flow_control_window(streamID),
+                         conn.max_outbound_frame_size)
+            if window <= 0:
+                break
+            data = self._outbound.popleft()
+            if len(data) > window:
+                self._outbound.appendleft(data[window:])
+                data = data[:window]
+            conn.send_data(streamID, data)
+
+        producer = self._request.bodyProducer
+        if self._outbound:
+            if not self._producerPaused and not self._bodyFinished:
+                self._producerPaused = True
+                producer.pauseProducing()
+        elif self._bodyFinished and not self._ended:
+            self._ended = True
+            conn.end_stream(streamID)
+        elif self._producerPaused:
+            self._producerPaused = False
+            producer.resumeProducing()
+        connection._flush()
+
+
+    # Implementation of IPushProducer, for the response body.
+    def pauseProducing(self):
+        """
+        Stop acknowledging response data, so that the server runs out of
+        window for this stream.
+        """
+        self._paused = True
+
+
+    def resumeProducing(self):
+        """
+        Acknowledge any response data received while paused.
+        """
+        self._paused = False
+        if self._unacknowledged:
+            size, self._unacknowledged = self._unacknowledged, 0
+            self._acknowledge(size)
+
+
+    def stopProducing(self):
+        """
+        The consumer of the response body does not want any more of it: reset
+        the stream.
+        """
+        self.abortConnection()
+
+
+    def loseConnection(self):
+        """
+        Alias for L{abortConnection}: a single stream cannot be closed cleanly
+        from this end once its request has been sent.
+        """
+        self.abortConnection()
+
+
+    def abortConnection(self):
+        """
+        Reset the stream, and fail the response body with
+        L{ConnectionAborted}.
+        """
+        if self.streamID in self._connection.streams:
+            self._reset(h2.errors.CANCEL)
+            self._connectionLost(Failure(ConnectionAborted()))
+            self._connection._flush()
+
+
+    def _cancel(self, ignored):
+        """
+        The L{Deferred} returned by L{H2ClientConnection.request} was
+        cancelled before a response arrived: drop the request if it is still
+        waiting for a stream, or reset its stream.
+        """
+        connection = self._connection
+        if self in connection._pending:
+            connection._pending.remove(self)
+        elif self.streamID in connection.streams:
+            self._reset(h2.errors.CANCEL)
+            connection._flush()
+        self._stopBody()
+        self.finished.errback(
+            Failure(ResponseNeverReceived([Failure(CancelledError())])))
+
+
+    def _reset(self, errorCode):
+        """
+        Reset the stream and forget about it.
+        """
+        connection = self._connection
+        connection._streamDone(self.streamID)
+        try:
+            connection.conn.reset_stream(self.streamID, errorCode)
+        except h2.exceptions.StreamClosedError:
+            pass
+
+
+    def _acknowledge(self, size):
+        """
+        Give the server back C{size} bytes of window.
+        """
+        connection = self._connection
+        try:
+            connection.conn.acknowledge_received_data(size, self.streamID)
+        except h2.exceptions.StreamClosedError:
+            # The stream is gone; h2 still credited the connection window.
+            pass
+        connection._flush()
+
+
+    def _responseReceived(self, headers):
+        """
+        The response headers arrived: fire L{finished} with a L{Response}.
+
+        @param headers: The response headers, including pseudo-headers.
+        @type headers: L{list} of 2-L{tuple} of L{bytes}
+        """
+        code = None
+        responseHeaders = Headers()
+        for name, value in headers:
+            if name == b':status':
+                code = int(value)
+            elif not name.startswith(b':'):
+                responseHeaders.addRawHeader(name, value)
+
+        response = Response._construct(
+            (b'HTTP', 2, 0), code, RESPONSES.get(code, b''), responseHeaders,
+            self, self._request)
+        if (self._request.method == b'HEAD' or
+                code in (NO_CONTENT, NOT_MODIFIED)):
+            response.length = 0
+        else:
+            contentLength = responseHeaders.getRawHeaders(b'content-length')
+            if contentLength is not None:
+                try:
+                    response.length = int(contentLength[0])
+                except ValueError:
+                    pass
+
+        # Like HTTPClientParser, don't read any more than a little of the body
+        # until there is a protocol to deliver it to.
+        self._paused = True
+        self.response = response
+        self.finished.callback(response)
+
+
+    def _dataReceived(self, data, flowControlledLength):
+        """
+        Some of the response body arrived.
+        """
+        if self.response is None:
+            return
+        self.response._bodyDataReceived(data)
+        if self._paused:
+            self._unacknowledged += flowControlledLength
+        elif flowControlledLength:
+            self._acknowledge(flowControlledLength)
+
+
+    def _streamEnded(self):
+        """
+        The response is complete.  If the server responded before the whole
+        request body was sent, the rest of it is not wanted: reset the stream.
+        """
+        if self._ended:
+            self._connection._streamDone(self.streamID)
+        else:
+            self._reset(h2.errors.CANCEL)
+        self._stopBody()
+        if self.response is None:
+            self._fail(Failure(ResponseNeverReceived([Failure(
+                ConnectionLost("HTTP/2 stream ended without a response"))])))
+        else:
+            self.response._bodyDataFinished()
+
+
+    def _streamReset(self, reason):
+        """
+        The server reset the stream.
+        """
+        self._connection._streamDone(self.streamID)
+        self._connectionLost(reason)
+
+
+    def _connectionLost(self, reason):
+        """
+        Fail the request or the response body with C{reason}.
+        """
+        self._stopBody()
+        if self.response is None:
+            self._fail(Failure(ResponseNeverReceived([reason])))
+        else:
+            self.response._bodyDataFinished(
+                Failure(ResponseFailed([reason], self.response)))
+
+
+    def _notSent(self):
+        """
+        The request was never processed by the server.
+        """
+        self._stopBody()
+        self._fail(Failure(RequestNotSent()))
+
+
+    def _fail(self, reason):
+        """
+        Fail L{finished}, unless it has already fired.
+        """
+        if not self.finished.called:
+            self.finished.errback(reason)
+
+
+    def _stopBody(self):
+        """
+        Stop the body producer, if it is still producing.
+        """
+        if self._bodyDeferred is not None:
+            bodyDeferred, self._bodyDeferred = self._bodyDeferred, None
+            self._request.bodyProducer.stopProducing()
+            # The producer may or may not fire its Deferred when stopped;
+            # either way, nobody is waiting for the outcome any more.
+            bodyDeferred.addErrback(lambda err: None)
@@ -61,6 +61,60 @@ if sys.version_info < (2, 7, 4):
 
 
 
+class H2ConnectionStatistics(object):
+    """
+    Statistics about the flow control windows and the queued data of an
+    L{H2Connection}.
+
+    @ivar outboundWindow: The amount of data that the peer will currently
+        accept on the connection.
+    @type outboundWindow: L{int}
+
+    @ivar inboundWindow: The amount of data that the peer may currently send
+        on the connection.
+    @type inboundWindow: L{int}
+
+    @ivar queueDepths: The number of bytes of data waiting to be sent on each
+        stream.
+    @type queueDepths: L{dict} mapping L{int} stream IDs to L{int}
+
+    @ivar flowControlBlockedStreamCount: The number of streams with data
+        waiting to be sent but no room in their flow control window.
+    @type flowControlBlockedStreamCount: L{int}
+
+    @ivar dataFramesSent: The number of DATA frames sent on the connection.
+    @type dataFramesSent: L{int}
+
+    @ivar dataBytesSent: The number of bytes of data sent in DATA frames.
+    @type dataBytesSent: L{int}
+
+    @ivar windowUpdatesSent: The number of WINDOW_UPDATE frames sent, for
+        streams and for the connection.
+    @type windowUpdatesSent: L{int}
+    """
+
+    def __init__(self, outboundWindow, inboundWindow, queueDepths,
+                 flowControlBlockedStreamCount, dataFramesSent, dataBytesSent,
+                 windowUpdatesSent):
+        self.outboundWindow = outboundWindow
+        self.inboundWindow = inboundWindow
+        self.queueDepths = queueDepths
+        self.flowControlBlockedStreamCount = flowControlBlockedStreamCount
+        self.dataFramesSent = dataFramesSent
+        self.dataBytesSent = dataBytesSent
+        self.windowUpdatesSent = windowUpdatesSent
+
+
+    @property
+    def queuedBytes(self):
+        """
+        The total number of bytes of data waiting to be sent on the
+        connection.
+        """
+        return sum(self.queueDepths.values())
+
+
+
 @implementer(IProtocol, IPushProducer)
 class H2Connection(Protocol, TimeoutMixin):
     """
@@ -100,13 +154,57 @@ class H2Connection(Protocol, TimeoutMixin):
         L{collections.deque} queues, which contain either L{bytes} objects or
         C{_END_STREAM_SENTINEL}.
 
+    @ivar _outboundQueueSizes: A map of stream IDs to the number of bytes of
+        data in the corresponding queue in C{_outboundStreamQueues}.
+    @type _outboundQueueSizes: A L{dict} mapping L{int} stream IDs to L{int}
+        byte counts.
+
+    @ivar _unacknowledgedData: The number of bytes of flow controlled data
+        received on the connection which have been consumed but not yet
+        returned to the peer in a WINDOW_UPDATE frame.
+    @type _unacknowledgedData: L{int}
+
+    @ivar _unacknowledgedStreamData: A map of the IDs of streams which may
+        still receive data to the number of bytes of flow controlled data
+        received on them which have been consumed but not yet returned to the
+        peer in a WINDOW_UPDATE frame.
+    @type _unacknowledgedStreamData: A L{dict} mapping L{int} stream IDs to
+        L{int} byte counts.
+
+    @ivar _dataFramesSent: The number of DATA frames sent, for
+        L{statistics}.
+    @type _dataFramesSent: L{int}
+
+    @ivar _dataBytesSent: The number of bytes sent in DATA frames, for
+        L{statistics}.
+    @type _dataBytesSent: L{int}
+
+    @ivar _windowUpdatesSent: The number of WINDOW_UPDATE frames sent, for
+        L{statistics}.
+    @type _windowUpdatesSent: L{int}
+
     @ivar _sender: A handle to the data-sending loop, allowing it to be
         terminated if needed.
     @type _sender: L{twisted.internet.task.LoopingCall}
+
+    @ivar coalesceDataFrames: Whether consecutive chunks of data queued for a
+        stream are sent together in a single DATA frame, as large as the peer
+        will accept and the flow control window allows.  If L{False}, each
+        chunk written is sent in frames of its own.
+    @type coalesceDataFrames: L{bool}
+
+    @ivar windowUpdateRatio: The fraction of the initial flow control window
+        that must have been consumed, on a stream or on the connection, before
+        it is returned to the peer in a WINDOW_UPDATE frame.  The window is
+        returned sooner if the peer has less room left in it than it is owed.
+    @type windowUpdateRatio: L{float}
     """
     factory = None
     site = None
 
+    coalesceDataFrames = True
+    windowUpdateRatio = 0.5
+
     _log = Logger()
 
     def __init__(self, reactor=None):
@@ -119,9 +217,16 @@ class H2Connection(Protocol, TimeoutMixin):
         self._consumerBlocked = None
         self._sendingDeferred = None
         self._outboundStreamQueues = {}
+        self._outboundQueueSizes = {}
+        self._unacknowledgedData = 0
+        self._unacknowledgedStreamData = {}
         self._streamCleanupCallbacks = {}
         self._stillProducing = True
 
+        self._dataFramesSent = 0
+        self._dataBytesSent = 0
+        self._windowUpdatesSent = 0
+
         if reactor is None:
             from twisted.internet import reactor
         self._reactor = reactor
@@ -267,9 +372,11 @@ class H2Connection(Protocol, TimeoutMixin):
     #    implementation that this stream is unblocked.
     # 2. The _sendPrioritisedData() function spins in a tight loop. Each
     #    iteration it asks the priority implementation which stream should send
-    #    next, and pops a data frame off that stream's queue. If, after sending
-    #    that frame, there is no data left on that stream's queue, the function
-    #    informs the priority implementation that the stream is blocked.
+    #    next, and pops a data frame off that stream's queue, taking as many
+    #    queued chunks as will fit into it. If, after sending that frame, there
+    #    is no data left on that stream's queue, or no room left in its flow
+    #    control window, the function informs the priority implementation that
+    #    the stream is blocked.
     #
     # If all streams are blocked, or if there are no outstanding streams, the
     # _sendPrioritisedData function waits to be awoken when more data is ready
@@ -349,7 +456,8 @@ class H2Connection(Protocol, TimeoutMixin):
             return
 
         remainingWindow = self.conn.local_flow_control_window(stream)
-        frameData = self._outboundStreamQueues[stream].popleft()
+        queue = self._outboundStreamQueues[stream]
+        frameData = queue.popleft()
         maxFrameSize = min(self.conn.max_outbound_frame_size, remainingWindow)
 
         if frameData is _END_STREAM_SENTINEL:
@@ -362,11 +470,24 @@ class H2Connection(Protocol, TimeoutMixin):
             # Clean up the stream
             self._requestDone(stream)
         else:
+            # Gather up the chunks queued behind this one, so that many small
+            # writes go out in as few frames as possible.
+            if self.coalesceDataFrames and len(frameData) < maxFrameSize:
+                chunks = [frameData]
+                chunksLength = len(frameData)
+                while (queue and chunksLength < maxFrameSize and
+                       queue[0] is not _END_STREAM_SENTINEL):
+                    chunk = queue.popleft()
+                    chunks.append(chunk)
+                    chunksLength += len(chunk)
+                if len(chunks) > 1:
+                    frameData = b''.join(chunks)
+
             # Respect the max frame size.
             if len(frameData) > maxFrameSize:
                 excessData = frameData[maxFrameSize:]
                 frameData = frameData[:maxFrameSize]
-                self._outboundStreamQueues[stream].appendleft(excessData)
+                queue.appendleft(excessData)
 
             # There's deliberately no error handling here, because this just
             # absolutely should not happen.
@@ -375,9 +496,16 @@ class H2Connection(Protocol, TimeoutMixin):
             if frameData:
                 self.conn.send_data(stream, frameData)
                 self.transport.write(self.conn.data_to_send())
-
-            # If there's no data left, this stream is now blocked.
-            if not self._outboundStreamQueues[stream]:
+                self._outboundQueueSizes[stream] -= len(frameData)
+                self._dataFramesSent += 1
+                self._dataBytesSent += len(frameData)
+
+            # If there's no data left, or no room in the flow control window
+            # to send it, this stream is now blocked. Window updates will
+            # unblock it again. Ending the stream doesn't need any room.
+            if not queue or (
+                    queue[0] is not _END_STREAM_SENTINEL and
+                    self.conn.local_flow_control_window(stream) <= 0):
                 self.priority.block(stream)
 
             # Also, if the stream's flow control window is exhausted, tell it
@@ -405,6 +533,8 @@ class H2Connection(Protocol, TimeoutMixin):
         self.streams[event.stream_id] = stream
         self._streamCleanupCallbacks[event.stream_id] = Deferred()
         self._outboundStreamQueues[event.stream_id] = deque()
+        self._outboundQueueSizes[event.stream_id] = 0
+        self._unacknowledgedStreamData[event.stream_id] = 0
 
         # Add the stream to the priority tree but immediately block it.
         try:
@@ -440,6 +570,10 @@ class H2Connection(Protocol, TimeoutMixin):
             completed stream.
         @type event: L{h2.events.StreamEnded}
         """
+        # The peer won't send any more data on this stream, so there's no
+        # point in opening its window again.
+        self._unacknowledgedStreamData.pop(event.stream_id, None)
+
         stream = self.streams[event.stream_id]
         stream.requestComplete()
 
@@ -530,16 +664,13 @@ class H2Connection(Protocol, TimeoutMixin):
         @type data: L{bytes}
         """
         self._outboundStreamQueues[streamID].append(data)
+        self._outboundQueueSizes[streamID] += len(data)
 
         # There's obviously no point unblocking this stream and the sending
         # loop if the data can't actually be sent, so confirm that there's
         # some room to send data.
         if self.conn.local_flow_control_window(streamID) > 0:
-            self.priority.unblock(streamID)
-            if self._sendingDeferred is not None:
-                d = self._sendingDeferred
-                self._sendingDeferred = None
-                d.callback(streamID)
+            self._unblockStream(streamID)
 
         if self.remainingOutboundWindow(streamID) <= 0:
             self.streams[streamID].flowControlBlocked()
@@ -553,6 +684,17 @@ class H2Connection(Protocol, TimeoutMixin):
         @type streamID: L{int}
         """
         self._outboundStreamQueues[streamID].append(_END_STREAM_SENTINEL)
+        self._unblockStream(streamID)
+
+
+    def _unblockStream(self, streamID):
+        """
+        Tell the priority tree that a stream has data ready to send, and wake
+        the data-sending loop if it is waiting for some.
+
+        @param streamID: The ID of the stream to unblock.
+        @type streamID: L{int}
+        """
         self.priority.unblock(streamID)
         if self._sendingDeferred is not None:
             d = self._sendingDeferred
@@ -582,6 +724,8 @@ class H2Connection(Protocol, TimeoutMixin):
         @type streamID: L{int}
         """
         del self._outboundStreamQueues[streamID]
+        del self._outboundQueueSizes[streamID]
+        self._unacknowledgedStreamData.pop(streamID, None)
         self.priority.remove_stream(streamID)
         del self.streams[streamID]
         cleanupCallback = self._streamCleanupCallbacks.pop(streamID)
@@ -601,16 +745,8 @@ class H2Connection(Protocol, TimeoutMixin):
             stream, including the data queued to be sent.
         @rtype: L{int}
         """
-        # TODO: This involves a fair bit of looping and computation for
-        # something that is called a lot. Consider caching values somewhere.
         windowSize = self.conn.local_flow_control_window(streamID)
-        sendQueue = self._outboundStreamQueues[streamID]
-        alreadyConsumed = sum(
-            len(chunk) for chunk in sendQueue
-            if chunk is not _END_STREAM_SENTINEL
-        )
-
-        return windowSize - alreadyConsumed
+        return windowSize - self._outboundQueueSizes[streamID]
 
 
     def _handleWindowUpdate(self, event):
@@ -638,16 +774,18 @@ class H2Connection(Protocol, TimeoutMixin):
             # we do, we'll eventually get an exception inside the
             # _sendPrioritisedData loop some time later.
             if self._outboundStreamQueues.get(streamID):
-                self.priority.unblock(streamID)
+                self._unblockStream(streamID)
             self.streams[streamID].windowUpdated()
         else:
-            # Update strictly applies to all streams.
-            for stream in self.streams.values():
+            # Update strictly applies to all streams. Unblocking a stream may
+            # run the sending loop, which can finish streams, so iterate over
+            # a copy.
+            for stream in list(self.streams.values()):
                 stream.windowUpdated()
 
                 # If we still have data to send for this stream, unblock it.
                 if self._outboundStreamQueues.get(stream.streamID):
-                    self.priority.unblock(stream.streamID)
+                    self._unblockStream(stream.streamID)
 
 
     def getPeer(self):
@@ -678,6 +816,11 @@ class H2Connection(Protocol, TimeoutMixin):
         """
         Open the stream window by a given increment.
 
+        Rather than sending a WINDOW_UPDATE frame for every chunk of data
+        consumed, the increments are accumulated until they amount to
+        C{windowUpdateRatio} of the initial window, or to more than the room
+        the peer has left in the window, and are then sent together.
+
         @param streamID: The ID of the stream whose window needs to be opened.
         @type streamID: L{int}
 
@@ -685,26 +828,74 @@ class H2Connection(Protocol, TimeoutMixin):
         incremented.
         @type increment: L{int}
         """
-        # TODO: Consider whether we want some kind of consolidating logic here.
-        try:
+        if not increment:
+            return
+
+        threshold = (
+            self.conn.local_settings.initial_window_size *
+            self.windowUpdateRatio
+        )
+        updated = False
+
+        if streamID in self._unacknowledgedStreamData:
+            streamIncrement = self._unacknowledgedStreamData[streamID]
+            streamIncrement += increment
+            try:
+                if streamIncrement >= min(
+                        threshold,
+                        self.conn.remote_flow_control_window(streamID)):
+                    self.conn.increment_flow_control_window(
+                        streamIncrement, stream_id=streamID
+                    )
+                    self._windowUpdatesSent += 1
+                    updated = True
+                    streamIncrement = 0
+            except h2.exceptions.StreamClosedError:
+                # The stream got reset and we haven't worked it out yet. The
+                # stream window doesn't matter now as all the data that can
+                # possibly be received on the stream already has been. We
+                # still want to increment the connection window though: the
+                # data received on this stream counted against the connection
+                # flow control window, and if we don't expand the window this
+                # becomes a DoS vector that leads to us eventually preventing
+                # the client from sending any more data to us.
+                # NOTE: This branch may become unneeded in the future if
+                # https://github.com/python-hyper/hyper-h2/issues/228 happens.
+                del self._unacknowledgedStreamData[streamID]
+            else:
+                self._unacknowledgedStreamData[streamID] = streamIncrement
+
+        self._unacknowledgedData += increment
+        if self._unacknowledgedData >= min(
+                threshold, self.conn.inbound_flow_control_window):
             self.conn.increment_flow_control_window(
-                increment, stream_id=streamID
+                self._unacknowledgedData, stream_id=None
             )
-        except h2.exceptions.StreamClosedError:
-            # The stream got reset and we haven't worked it out yet. The stream
-            # window doesn't matter now as all the data that can possibly be
-            # received on the stream already has been. We still want to
-            # increment the connection window though: the data received on this
-            # stream counted against the connection flow control window, and if
-            # we don't expand the window this becomes a DoS vector that leads
-            # to us eventually preventing the client from sending any more data
-            # to us.
-            # NOTE: This branch may become unneeded in the future if
-            # https://github.com/python-hyper/hyper-h2/issues/228 happens.
-            pass
+            self._windowUpdatesSent += 1
+            updated = True
+            self._unacknowledgedData = 0
 
-        self.conn.increment_flow_control_window(increment, stream_id=None)
-        self.transport.write(self.conn.data_to_send())
+        if updated:
+            self.transport.write(self.conn.data_to_send())
+
+
+    def statistics(self):
+        """
+        Gather information about the flow control windows and the queued data
+        of this connection.
+
+        @return: A L{H2ConnectionStatistics} describing them.
+        """
+        queueDepths = dict(self._outboundQueueSizes)
+        blockedStreams = 0
+        for streamID, queued in queueDepths.items():
+            if queued and self.conn.local_flow_control_window(streamID) <= 0:
+                blockedStreams += 1
+        return H2ConnectionStatistics(
+            self.conn.outbound_flow_control_window,
+            self.conn.inbound_flow_control_window,
+            queueDepths, blockedStreams, self._dataFramesSent,
+            self._dataBytesSent, self._windowUpdatesSent)
 
 
     def _isSecure(self):
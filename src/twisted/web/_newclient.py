@@ -27,6 +27,8 @@ Various other classes in this module support this usage:
 """
 
 from __future__ import division, absolute_import
+
+from collections import deque
 __metaclass__ = type
 
 from zope.interface import implementer
@@ -43,7 +45,7 @@ from twisted.internet.defer import CancelledError
 from twisted.internet.protocol import Protocol
 from twisted.protocols.basic import LineReceiver
 from twisted.web.iweb import UNKNOWN_LENGTH, IResponse, IClientRequest
-from twisted.web.http_headers import Headers
+from twisted.web.http_headers import Headers, _lowercaseName
 from twisted.web.http import NO_CONTENT, NOT_MODIFIED
 from twisted.web.http import _DataLoss, PotentialDataLoss
 from twisted.web.http import _IdentityTransferDecoder, _ChunkedTransferDecoder
@@ -327,12 +329,12 @@ class HTTPParser(LineReceiver):
         """
         Store the given header in C{self.headers}.
         """
-        name = name.lower()
+        name = _lowercaseName(name)
         if self.isConnectionControlHeader(name):
             headers = self.connHeaders
         else:
             headers = self.headers
-        headers.addRawHeader(name, value)
+        headers.addLowercaseRawHeader(name, value)
 
 
     def allHeadersReceived(self):
@@ -344,6 +346,27 @@ class HTTPParser(LineReceiver):
 
 
 
+def _pipelinable(request):
+    """
+    Determine whether C{request} may be pipelined: sent over a connection
+    before the responses to the requests sent over it earlier have been
+    received.
+
+    Only persistent requests with idempotent methods and no body are
+    pipelined, so that they can safely be sent again if the connection is lost
+    before they are answered.
+
+    @param request: The request to check.
+    @type request: L{Request}
+
+    @rtype: L{bool}
+    """
+    return (request.method in (b"GET", b"HEAD", b"OPTIONS", b"DELETE",
+                               b"TRACE") and
+            request.bodyProducer is None and request.persistent)
+
+
+
 class HTTPClientParser(HTTPParser):
     """
     An HTTP parser which only handles HTTP responses.
@@ -463,7 +486,7 @@ class HTTPClientParser(HTTPParser):
             self._finished(self.clearLineBuffer())
             self.response._bodyDataFinished()
         else:
-            transferEncodingHeaders = self.connHeaders.getRawHeaders(
+            transferEncodingHeaders = self.connHeaders.getLowercaseRawHeaders(
                 b'transfer-encoding')
             if transferEncodingHeaders:
 
@@ -480,7 +503,7 @@ class HTTPClientParser(HTTPParser):
                 # allow the transfer decoder to set the response object's
                 # length attribute.
             else:
-                contentLengthHeaders = self.connHeaders.getRawHeaders(
+                contentLengthHeaders = self.connHeaders.getLowercaseRawHeaders(
                     b'content-length')
                 if contentLengthHeaders is None:
                     contentLength = None
@@ -1357,6 +1380,22 @@ class HTTP11ClientProtocol(Protocol):
 
     @ivar _abortDeferreds: A list of C{Deferred} instances that will fire when
         the connection is lost.
+
+    @ivar pipelineDepth: The number of requests which may be sent while the
+        response to an earlier request is still being waited for.  Only
+        persistent requests with idempotent methods and no body are pipelined
+        behind one another.  C{0}, the default, disables pipelining.
+        (Since 16.5)
+    @type pipelineDepth: L{int}
+
+    @ivar _pipelined: A L{deque} of C{(request, finishedDeferred)} pairs for
+        the requests which have been pipelined, in the order they were sent.
+        Each is given a parser in turn, once the responses to the requests
+        ahead of it have been received.
+
+    @ivar _lostCallback: A callable which is called with this
+        L{HTTP11ClientProtocol} when its connection is lost, whatever state
+        it is in.
     """
     _state = 'QUIESCENT'
     _parser = None
@@ -1364,11 +1403,15 @@ class HTTP11ClientProtocol(Protocol):
     _currentRequest = None
     _transportProxy = None
     _responseDeferred = None
+    pipelineDepth = 0
 
 
-    def __init__(self, quiescentCallback=lambda c: None):
+    def __init__(self, quiescentCallback=lambda c: None,
+                 lostCallback=lambda c: None):
         self._quiescentCallback = quiescentCallback
+        self._lostCallback = lostCallback
         self._abortDeferreds = []
+        self._pipelined = deque()
 
 
     @property
@@ -1393,9 +1436,13 @@ class HTTP11ClientProtocol(Protocol):
             errback with L{ResponseFailed} if the request was sent (not
             necessarily received) but some or all of the response was lost.  It
             may errback with L{RequestNotSent} if it is not possible to send
-            any more requests using this L{HTTP11ClientProtocol}.
+            any more requests using this L{HTTP11ClientProtocol}.  A request
+            which is pipelined errbacks with L{ResponseNeverReceived} if the
+            connection is closed before its response begins.
         """
         if self._state != 'QUIESCENT':
+            if self._canPipeline(request):
+                return self._pipeline(request)
             return fail(RequestNotSent())
 
         self._state = 'TRANSMITTING'
@@ -1441,6 +1488,88 @@ class HTTP11ClientProtocol(Protocol):
         return self._finishedRequest
 
 
+    def _canPipeline(self, request):
+        """
+        Determine whether C{request} can be pipelined behind the requests
+        which have already been sent over this connection.
+
+        @param request: The request which is to be sent.
+        @type request: L{Request}
+
+        @rtype: L{bool}
+        """
+        if (self._state != 'WAITING' or
+                len(self._pipelined) >= self.pipelineDepth):
+            return False
+        if not (_pipelinable(self._currentRequest) and
+                _pipelinable(request)):
+            return False
+        connHeaders = self._parser.connHeaders.getLowercaseRawHeaders(
+            b'connection', ())
+        return b'close' not in connHeaders
+
+
+    def _pipeline(self, request):
+        """
+        Send C{request} without waiting for the responses to the requests sent
+        before it.  Its response is parsed once theirs have been received.
+
+        @param request: The request to send.
+        @type request: L{Request}
+
+        @return: A L{Deferred} like the one returned by L{request}.
+        """
+        try:
+            request.writeTo(self.transport)
+        except:
+            return fail(RequestGenerationFailed([Failure()]))
+
+        def cancelRequest(ign):
+            if pipelined in self._pipelined:
+                self._pipelined.remove(pipelined)
+                finished.errback(Failure(ResponseNeverReceived(
+                    [Failure(CancelledError())])))
+                self.transport.abortConnection()
+            else:
+                self.transport.abortConnection()
+                self._disconnectParser(Failure(CancelledError()))
+        finished = Deferred(cancelRequest)
+        pipelined = (request, finished)
+        self._pipelined.append(pipelined)
+        return finished
+
+
+    def _nextPipelined(self, rest):
+        """
+        Start parsing the response to the first pipelined request.
+
+        @param rest: A C{bytes} giving any bytes received after the end of the
+            previous response, which are the beginning of this one.
+        """
+        self._state = 'WAITING'
+        self._currentRequest, self._finishedRequest = self._pipelined.popleft()
+        self._transportProxy = TransportProxyProducer(self.transport)
+        self._parser = HTTPClientParser(
+            self._currentRequest, self._finishResponse)
+        self._parser.makeConnection(self._transportProxy)
+        self._responseDeferred = self._parser._responseDeferred
+        self._responseDeferred.chainDeferred(self._finishedRequest)
+        if rest:
+            self.dataReceived(rest)
+
+
+    def _failPipelined(self, reason):
+        """
+        Fail all of the pipelined requests: no responses to them will be
+        received.
+
+        @param reason: A L{Failure} giving the reason.
+        """
+        pipelined, self._pipelined = self._pipelined, deque()
+        for request, finished in pipelined:
+            finished.errback(Failure(ResponseNeverReceived([reason])))
+
+
     def _finishResponse(self, rest):
         """
         Called by an L{HTTPClientParser} to indicate that it has parsed a
@@ -1454,9 +1583,8 @@ class HTTP11ClientProtocol(Protocol):
 
 
     def _finishResponse_WAITING(self, rest):
-        # Currently the rest parameter is ignored. Don't forget to use it if
-        # we ever add support for pipelining. And maybe check what trailers
-        # mean.
+        # The rest parameter is only used when requests have been pipelined.
+        # And maybe check what trailers mean.
         if self._state == 'WAITING':
             self._state = 'QUIESCENT'
         else:
@@ -1475,15 +1603,24 @@ class HTTP11ClientProtocol(Protocol):
             return
 
         reason = ConnectionDone(u"synthetic!")
-        connHeaders = self._parser.connHeaders.getRawHeaders(b'connection', ())
+        connHeaders = self._parser.connHeaders.getLowercaseRawHeaders(
+            b'connection', ())
         if ((b'close' in connHeaders) or self._state != "QUIESCENT" or
             not self._currentRequest.persistent):
             self._giveUp(Failure(reason))
+            self._failPipelined(Failure(reason))
         else:
             # Just in case we had paused the transport, resume it before
             # considering it quiescent again.
             self.transport.resumeProducing()
 
+            if self._pipelined:
+                # The connection is not quiescent: the next response is
+                # already on its way.
+                self._disconnectParser(reason)
+                self._nextPipelined(rest)
+                return
+
             # We call the quiescent callback first, to ensure connection gets
             # added back to connection pool before we finish the request.
             try:
@@ -1547,9 +1684,21 @@ class HTTP11ClientProtocol(Protocol):
     def connectionLost(self, reason):
         """
         The underlying transport went away.  If appropriate, notify the parser
-        object.
+        object, then fail any pipelined requests and call the lost callback.
+        """
+        self._connectionLost(reason)
+        self._failPipelined(reason)
+        try:
+            self._lostCallback(self)
+        except:
+            log.err()
+
+
+    def _connectionLost(self, reason):
+        """
+        Notify the parser object, if appropriate, of the lost connection.
         """
-    connectionLost = makeStatefulDispatcher('connectionLost', connectionLost)
+    _connectionLost = makeStatefulDispatcher('connectionLost', _connectionLost)
 
 
     def _connectionLost_QUIESCENT(self, reason):
@@ -22,6 +22,7 @@ except ImportError:
         return result.encode("charmap")
 
 import zlib
+from collections import deque
 from functools import wraps
 
 from zope.interface import implementer
@@ -39,6 +40,8 @@ from twisted.web import http
 from twisted.internet import defer, protocol, task, reactor
 from twisted.internet.abstract import isIPv6Address
 from twisted.internet.interfaces import IProtocol, IOpenSSLContextFactory
+from twisted.internet.interfaces import (
+    IHandshakeListener, INegotiated, IProtocolNegotiationFactory)
 from twisted.internet.endpoints import TCP4ClientEndpoint, SSL4ClientEndpoint
 from twisted.python.util import InsensitiveDict
 from twisted.python.components import proxyForInterface
@@ -780,6 +783,11 @@ from twisted.web._newclient import RequestNotSent, RequestTransmissionFailed
 from twisted.web._newclient import (
     ResponseNeverReceived, PotentialDataLoss, _WrapperException)
 
+if http.H2_ENABLED:
+    from twisted.web._h2client import H2ClientConnection
+else:
+    H2ClientConnection = None
+
 
 
 try:
@@ -789,7 +797,8 @@ except ImportError:
 else:
     from twisted.internet.ssl import (CertificateOptions,
                                       platformTrust,
-                                      optionsForClientTLS)
+                                      optionsForClientTLS,
+                                      TLSSessionCache)
 
 
 def _requireSSL(decoratee):
@@ -869,9 +878,20 @@ class WebClientContextFactory(object):
 class BrowserLikePolicyForHTTPS(object):
     """
     SSL connection creator for web clients.
+
+    The sessions established with each host are remembered, so that new
+    connections to it can resume them rather than perform a full handshake.
+
+    @ivar _sessionCache: The L{TLSSessionCache} shared by all the connection
+        creators made by this policy, or L{None} if pyOpenSSL is not
+        available.
     """
     def __init__(self, trustRoot=None):
         self._trustRoot = trustRoot
+        if SSL is not None:
+            self._sessionCache = TLSSessionCache()
+        else:
+            self._sessionCache = None
 
 
     @_requireSSL
@@ -896,7 +916,8 @@ class BrowserLikePolicyForHTTPS(object):
             <twisted.internet.interfaces.IOpenSSLClientConnectionCreator>}
         """
         return optionsForClientTLS(hostname.decode("ascii"),
-                                   trustRoot=self._trustRoot)
+                                   trustRoot=self._trustRoot,
+                                   sessionCache=self._sessionCache)
 
 
 
@@ -1099,14 +1120,131 @@ class _HTTP11ClientFactory(protocol.Factory):
     @ivar _quiescentCallback: The quiescent callback to be passed to protocol
         instances, used to return them to the connection pool.
 
+    @ivar _lostCallback: The lost callback to be passed to protocol
+        instances, used to tell the connection pool that their connections
+        have gone away.
+
     @since: 11.1
     """
-    def __init__(self, quiescentCallback):
+    def __init__(self, quiescentCallback, lostCallback=lambda c: None):
         self._quiescentCallback = quiescentCallback
+        self._lostCallback = lostCallback
 
 
     def buildProtocol(self, addr):
-        return HTTP11ClientProtocol(self._quiescentCallback)
+        return HTTP11ClientProtocol(
+            self._quiescentCallback, self._lostCallback)
+
+
+
+@implementer(IHandshakeListener)
+class _HTTP2NegotiatingClientProtocol(protocol.Protocol):
+    """
+    The protocol for a connection which will speak either HTTP/2 or HTTP/1.1,
+    depending on what is negotiated during the TLS handshake.
+
+    Once the handshake has completed an L{H2ClientConnection} or an
+    L{HTTP11ClientProtocol} is connected to the transport, and all data
+    received is passed on to it.
+
+    @ivar negotiated: A L{Deferred} which fires with the chosen protocol, or
+        fails if the connection is lost before the handshake completes.
+
+    @ivar _protocol: The chosen protocol, or L{None} until the handshake has
+        completed.
+    """
+    _protocol = None
+
+    def __init__(self, quiescentCallback, goneCallback,
+                 lostCallback=lambda c: None):
+        self._quiescentCallback = quiescentCallback
+        self._goneCallback = goneCallback
+        self._lostCallback = lostCallback
+        self.negotiated = defer.Deferred()
+
+
+    def connectionMade(self):
+        """
+        Without TLS there is nothing to negotiate, so speak HTTP/1.1.
+        """
+        if not INegotiated.providedBy(self.transport):
+            self._choose(HTTP11ClientProtocol(
+                self._quiescentCallback, self._lostCallback))
+
+
+    def handshakeCompleted(self):
+        """
+        Speak HTTP/2 if the server selected it, and HTTP/1.1 otherwise.
+        """
+        if self.transport.negotiatedProtocol == b'h2':
+            self._choose(H2ClientConnection(self._goneCallback))
+        else:
+            self._choose(HTTP11ClientProtocol(
+                self._quiescentCallback, self._lostCallback))
+
+
+    def _choose(self, chosen):
+        """
+        Connect C{chosen} to the transport and fire L{negotiated} with it.
+        """
+        self._protocol = chosen
+        chosen.makeConnection(self.transport)
+        self.negotiated.callback(chosen)
+
+
+    def dataReceived(self, data):
+        """
+        Pass data on to the chosen protocol.  No application data is received
+        before the handshake has completed.
+        """
+        self._protocol.dataReceived(data)
+
+
+    def connectionLost(self, reason):
+        """
+        Pass connection loss on to the chosen protocol, or fail
+        L{negotiated} if none was chosen yet.
+        """
+        if self._protocol is None:
+            self.negotiated.errback(reason)
+        else:
+            self._protocol.connectionLost(reason)
+
+
+
+@implementer(IProtocolNegotiationFactory)
+class _HTTP2NegotiatingClientFactory(protocol.Factory):
+    """
+    A factory for L{_HTTP2NegotiatingClientProtocol}, used by
+    L{HTTPConnectionPool} to offer HTTP/2 to C{https} servers.
+
+    @ivar _quiescentCallback: The quiescent callback to be passed to
+        L{HTTP11ClientProtocol} instances, used to return them to the
+        connection pool.
+
+    @ivar _goneCallback: The callback to be passed to L{H2ClientConnection}
+        instances, used to remove them from the connection pool.
+
+    @ivar _lostCallback: The lost callback to be passed to
+        L{HTTP11ClientProtocol} instances.
+    """
+    def __init__(self, quiescentCallback, goneCallback,
+                 lostCallback=lambda c: None):
+        self._quiescentCallback = quiescentCallback
+        self._goneCallback = goneCallback
+        self._lostCallback = lostCallback
+
+
+    def acceptableProtocols(self):
+        """
+        Prefer HTTP/2, but accept HTTP/1.1.
+        """
+        return [b'h2', b'http/1.1']
+
+
+    def buildProtocol(self, addr):
+        return _HTTP2NegotiatingClientProtocol(
+            self._quiescentCallback, self._goneCallback, self._lostCallback)
 
 
 
@@ -1175,6 +1313,87 @@ class _RetryingHTTP11ClientProtocol(object):
 
 
 
+class _PipeliningHTTP11ClientProtocol(object):
+    """
+    A stand-in for a connection, supplied by L{HTTPConnectionPool} when it may
+    not open any more connections to a destination and pipelining is enabled.
+
+    A request which can be pipelined is sent straight away over one of the
+    busy connections; any other request waits for a connection of its own.
+
+    @ivar _pool: The L{HTTPConnectionPool} which supplied this stand-in.
+
+    @ivar _key: The key identifying the destination.
+
+    @ivar _endpoint: An endpoint which can be used to open a new connection
+        to the destination.
+    """
+
+    def __init__(self, pool, key, endpoint):
+        self._pool = pool
+        self._key = key
+        self._endpoint = endpoint
+
+
+    def request(self, request):
+        """
+        Pipeline C{request} if possible, or wait for a connection to send it
+        over.
+
+        @param request: A L{Request} instance.
+
+        @return: A L{Deferred} like the one returned by
+            L{HTTP11ClientProtocol.request}.
+        """
+        pool, key, endpoint = self._pool, self._key, self._endpoint
+        connection = pool._pipelineConnection(key, request)
+        if connection is None:
+            return pool._waitForConnection(key, endpoint).addCallback(
+                lambda connection: connection.request(request))
+        if pool.retryAutomatically:
+            connection = _RetryingHTTP11ClientProtocol(
+                connection, lambda: pool._waitForConnection(key, endpoint))
+        return connection.request(request)
+
+
+
+class _PoolStatistics(object):
+    """
+    Statistics about the connections of an L{HTTPConnectionPool}.
+
+    @ivar idleConnectionCount: The number of idle persistent connections
+        cached by the pool.
+    @type idleConnectionCount: L{int}
+
+    @ivar busyConnectionCount: The number of connections which are being
+        opened or are in use.  HTTP/2 connections only count while they are
+        being opened.
+    @type busyConnectionCount: L{int}
+
+    @ivar waitingRequestCount: The number of requests waiting for a
+        connection to become available.
+    @type waitingRequestCount: L{int}
+
+    @ivar createdConnectionCount: The number of connections which the pool
+        has opened.
+    @type createdConnectionCount: L{int}
+
+    @ivar reusedConnectionCount: The number of times an idle connection has
+        been taken from the pool to send a request.
+    @type reusedConnectionCount: L{int}
+    """
+
+    def __init__(self, idleConnectionCount, busyConnectionCount,
+                 waitingRequestCount, createdConnectionCount,
+                 reusedConnectionCount):
+        self.idleConnectionCount = idleConnectionCount
+        self.busyConnectionCount = busyConnectionCount
+        self.waitingRequestCount = waitingRequestCount
+        self.createdConnectionCount = createdConnectionCount
+        self.reusedConnectionCount = reusedConnectionCount
+
+
+
 class HTTPConnectionPool(object):
     """
     A pool of persistent HTTP connections.
@@ -1182,6 +1401,12 @@ class HTTPConnectionPool(object):
     Features:
      - Cached connections will eventually time out.
      - Limits on maximum number of persistent connections.
+     - Optional limits on the number of connections open to each
+       destination, with requests waiting their turn in the order they were
+       made.
+     - Optional pipelining of requests over busy connections.
+     - Connections to chosen destinations can be opened in advance and kept
+       open.
 
     Connections are stored using keys, which should be chosen such that any
     connections stored under a given key can be used interchangeably.
@@ -1203,6 +1428,41 @@ class HTTPConnectionPool(object):
     @ivar retryAutomatically: C{boolean} indicating whether idempotent
         requests should be retried once if no response was received.
 
+    @ivar maxConnectionsPerHost: The maximum number of HTTP/1.1 connections,
+        idle or busy, which may be open to a C{host:port} destination at
+        once, or L{None} (the default) for no limit.  Once it has been
+        reached, further requests wait until a connection becomes idle or is
+        closed, and are served in the order they were made.  (Since 16.5)
+    @type maxConnectionsPerHost: C{int} or L{None}
+
+    @ivar pipelineDepth: The number of requests which may be pipelined behind
+        the one in progress on a busy connection, once
+        C{maxConnectionsPerHost} has been reached, rather than waiting for a
+        connection of their own.  Only persistent requests with idempotent
+        methods and no body are pipelined.  C{0}, the default, disables
+        pipelining.  (Since 16.5)
+    @type pipelineDepth: C{int}
+
+    @ivar http2: C{boolean} indicating whether HTTP/2 should be offered to
+        C{https} servers during the TLS handshake, if HTTP/2 support is
+        available.  All requests to a server which accepts share a single
+        connection, over which they are multiplexed; servers which do not are
+        spoken to with HTTP/1.1 as usual.  Only persistent pools use HTTP/2.
+        (Since 16.5)
+
+    @ivar _negotiatingFactory: The factory used for connections which offer
+        HTTP/2.
+
+    @ivar _h2Connections: Map (scheme, host, port) to the
+        L{H2ClientConnection} shared by all requests to that destination.
+
+    @ivar _h2Connecting: Map (scheme, host, port) to a list of L{Deferred}s
+        waiting for the outcome of the negotiation on a new connection to
+        that destination.
+
+    @ivar _http11Only: The set of (scheme, host, port) destinations which
+        did not accept HTTP/2, and to which it is not offered again.
+
     @ivar _factory: The factory used to connect to the proxy.
 
     @ivar _connections: Map (scheme, host, port) to lists of
@@ -1211,19 +1471,51 @@ class HTTPConnectionPool(object):
     @ivar _timeouts: Map L{HTTP11ClientProtocol} instances to a
         C{IDelayedCall} instance of their timeout.
 
+    @ivar _busy: Map (scheme, host, port) to sets of the
+        L{HTTP11ClientProtocol} instances which have been supplied for a
+        request and not yet returned to the pool or lost.
+
+    @ivar _connecting: Map (scheme, host, port) to the number of connections
+        being opened.
+
+    @ivar _waiting: Map (scheme, host, port) to a L{deque} of C{(Deferred,
+        endpoint)} pairs, one for each request waiting for a connection.
+
+    @ivar _createdConnections: The number of connections opened.
+
+    @ivar _reusedConnections: The number of idle connections supplied for a
+        request.
+
+    @ivar _warm: Map (scheme, host, port) to C{(endpoint, minimum)} pairs
+        giving the number of connections to keep open to a destination, and
+        the endpoint with which to open them.
+
     @since: 12.1
     """
 
     _factory = _HTTP11ClientFactory
+    _negotiatingFactory = _HTTP2NegotiatingClientFactory
     maxPersistentPerHost = 2
     cachedConnectionTimeout = 240
     retryAutomatically = True
+    http2 = False
+    maxConnectionsPerHost = None
+    pipelineDepth = 0
 
     def __init__(self, reactor, persistent=True):
         self._reactor = reactor
         self.persistent = persistent
         self._connections = {}
         self._timeouts = {}
+        self._h2Connections = {}
+        self._h2Connecting = {}
+        self._http11Only = set()
+        self._busy = {}
+        self._connecting = {}
+        self._waiting = {}
+        self._createdConnections = 0
+        self._reusedConnections = 0
+        self._warm = {}
 
 
     def getConnection(self, key, endpoint):
@@ -1245,9 +1537,40 @@ class HTTPConnectionPool(object):
             if no cached connection is available.
 
         @return: A C{Deferred} that will fire with a L{HTTP11ClientProtocol}
-           (or a wrapper) that can be used to send a single HTTP request.
+           (or a wrapper) that can be used to send a single HTTP request, or
+           with an L{H2ClientConnection} that can be used to send any number
+           of them.
+        """
+        if self._offerHTTP2(key):
+            connection = self._h2Connections.get(key)
+            if connection is not None:
+                return defer.succeed(connection)
+            waiting = self._h2Connecting.get(key)
+            if waiting is not None:
+                d = defer.Deferred()
+                waiting.append(d)
+                return d
+
+        # Requests which are already waiting go first.
+        if not self._waiting.get(key):
+            connection = self._cachedConnection(key, endpoint)
+            if connection is not None:
+                return defer.succeed(connection)
+            if not self._atLimit(key):
+                return self._newConnection(key, endpoint)
+
+        if self.pipelineDepth:
+            return defer.succeed(
+                _PipeliningHTTP11ClientProtocol(self, key, endpoint))
+        return self._waitForConnection(key, endpoint)
+
+
+    def _cachedConnection(self, key, endpoint):
+        """
+        Take an idle connection from the cache, if there is one.
+
+        @return: The connection (or a wrapper), or L{None}.
         """
-        # Try to get cached version:
         connections = self._connections.get(key)
         while connections:
             connection = connections.pop(0)
@@ -1255,13 +1578,192 @@ class HTTPConnectionPool(object):
             self._timeouts[connection].cancel()
             del self._timeouts[connection]
             if connection.state == "QUIESCENT":
+                self._busy.setdefault(key, set()).add(connection)
+                self._reusedConnections += 1
                 if self.retryAutomatically:
                     newConnection = lambda: self._newConnection(key, endpoint)
                     connection = _RetryingHTTP11ClientProtocol(
                         connection, newConnection)
-                return defer.succeed(connection)
+                return connection
+        return None
+
+
+    def _atLimit(self, key):
+        """
+        Determine whether C{maxConnectionsPerHost} connections are open, or
+        being opened, to the destination identified by C{key}.
+        """
+        if self.maxConnectionsPerHost is None:
+            return False
+        return self._openCount(key) >= self.maxConnectionsPerHost
+
+
+    def _openCount(self, key):
+        """
+        Count the HTTP/1.1 connections which are open, or being opened, to
+        the destination identified by C{key}.
+        """
+        return (len(self._connections.get(key, ())) +
+                len(self._busy.get(key, ())) +
+                self._connecting.get(key, 0))
+
+
+    def keepWarm(self, key, endpoint, minimum):
+        """
+        Keep at least C{minimum} connections open to a destination, so that
+        requests do not have to wait for a connection to be established (and
+        for a TLS handshake) first.
+
+        The connections which are missing are opened straight away, and
+        whenever a connection to the destination is closed, whether by the
+        server, because it has been idle for C{cachedConnectionTimeout}
+        seconds or for any other reason, a new one is opened to replace it.
+        If a connection cannot be opened, no further attempt is made until
+        another connection to the destination has been closed.
+
+        Only one connection is kept open to a destination which accepts
+        HTTP/2, since it is shared by all requests.  No more than
+        C{maxConnectionsPerHost} connections are opened.
+
+        @param key: A unique key identifying connections that can be used
+            interchangeably, as for L{getConnection}.
+
+        @param endpoint: An endpoint that can be used to open the connections.
+
+        @param minimum: The number of connections to keep open.  C{0} stops
+            keeping connections open to the destination.
+        @type minimum: L{int}
+
+        @since: 16.5
+        """
+        if minimum:
+            self._warm[key] = (endpoint, minimum)
+        else:
+            self._warm.pop(key, None)
+        self._warmUp(key)
+
+
+    def _warmUp(self, key):
+        """
+        Open any connections which are missing from those to be kept open to
+        the destination identified by C{key}.
+        """
+        if key not in self._warm:
+            return
+        endpoint, minimum = self._warm[key]
+        if self._offerHTTP2(key):
+            if key in self._h2Connections or key in self._h2Connecting:
+                return
+            minimum = 1
+        elif self.maxConnectionsPerHost is not None:
+            minimum = min(minimum, self.maxConnectionsPerHost)
+        # Connections may be opened (and fail) synchronously, in which case
+        # _warmedUp will already have been called for them, so count again
+        # before opening each one.
+        for i in range(minimum):
+            if self._openCount(key) >= minimum or key in self._h2Connecting:
+                break
+            self._newConnection(key, endpoint).addCallbacks(
+                self._warmedUp, self._warmUpFailed, (key,), None, (key,))
+
+
+    def _warmedUp(self, connection, key):
+        """
+        Add a connection opened to be kept open to the pool.
+        """
+        if connection is not self._h2Connections.get(key):
+            self._putConnection(key, connection)
+            # A server which did not accept HTTP/2 may need more connections.
+            self._warmUp(key)
+
+
+    def _warmUpFailed(self, reason, key):
+        """
+        Log the failure to open a connection to be kept open.
+        """
+        log.msg(format="Could not open a connection to %(key)r: %(reason)s",
+                key=key, reason=reason.getErrorMessage())
+
+
+    def _waitForConnection(self, key, endpoint):
+        """
+        Wait for a connection to the destination identified by C{key}, behind
+        any other requests which are already waiting.
+
+        @return: A L{Deferred} which fires like the one returned by
+            L{getConnection}.  Cancelling it stops waiting.
+        """
+        waiting = self._waiting.setdefault(key, deque())
+
+        def cancel(d):
+            if waiter in waiting:
+                waiting.remove(waiter)
+                if not waiting and self._waiting.get(key) is waiting:
+                    del self._waiting[key]
+        d = defer.Deferred(cancel)
+        waiter = (d, endpoint)
+        waiting.append(waiter)
+        self._serveWaiting(key)
+        return d
+
 
-        return self._newConnection(key, endpoint)
+    def _serveWaiting(self, key):
+        """
+        Supply idle or new connections to the requests waiting for a
+        connection to the destination identified by C{key}, for as long as
+        there are any available.
+        """
+        waiting = self._waiting.get(key)
+        while waiting:
+            connection = self._cachedConnection(key, waiting[0][1])
+            if connection is None and self._atLimit(key):
+                break
+            d, endpoint = waiting.popleft()
+            if connection is not None:
+                d.callback(connection)
+            else:
+                self._newConnection(key, endpoint).addCallbacks(
+                    self._connectedForWaiter, self._failedForWaiter,
+                    (d,), None, (d,))
+        if waiting is not None and not waiting:
+            self._waiting.pop(key, None)
+
+
+    def _connectedForWaiter(self, connection, d):
+        """
+        Supply a connection opened for a waiting request, unless the request
+        stopped waiting while it was being opened.
+        """
+        if d.called:
+            connection.transport.loseConnection()
+        else:
+            d.callback(connection)
+
+
+    def _failedForWaiter(self, reason, d):
+        """
+        Report the failure to open a connection for a waiting request, unless
+        the request stopped waiting while it was being opened.
+        """
+        if not d.called:
+            d.errback(reason)
+
+
+    def _pipelineConnection(self, key, request):
+        """
+        Find a busy connection over which C{request} can be pipelined.
+
+        @return: The busy L{HTTP11ClientProtocol} with the fewest requests
+            already pipelined, or L{None} if there is none which will accept
+            C{request}.
+        """
+        connections = [
+            connection for connection in self._busy.get(key, ())
+            if connection._canPipeline(request)]
+        if not connections:
+            return None
+        return min(connections,
+                   key=lambda connection: len(connection._pipelined))
 
 
     def _newConnection(self, key, endpoint):
@@ -1272,8 +1774,92 @@ class HTTPConnectionPool(object):
         """
         def quiescentCallback(protocol):
             self._putConnection(key, protocol)
-        factory = self._factory(quiescentCallback)
-        return endpoint.connect(factory)
+
+        def lostCallback(protocol):
+            self._lostConnection(key, protocol)
+
+        def connected(connection):
+            self._doneConnecting(key)
+            self._createdConnections += 1
+            if connection is not self._h2Connections.get(key):
+                connection.pipelineDepth = self.pipelineDepth
+                self._busy.setdefault(key, set()).add(connection)
+            return connection
+
+        def failed(reason):
+            self._doneConnecting(key)
+            self._serveWaiting(key)
+            return reason
+
+        self._connecting[key] = self._connecting.get(key, 0) + 1
+        if self._offerHTTP2(key):
+            d = self._newNegotiatedConnection(
+                key, endpoint, quiescentCallback, lostCallback)
+        else:
+            factory = self._factory(quiescentCallback, lostCallback)
+            d = defer.maybeDeferred(endpoint.connect, factory)
+        return d.addCallbacks(connected, failed)
+
+
+    def _doneConnecting(self, key):
+        """
+        Record that an attempt to open a connection to the destination
+        identified by C{key} has finished.
+        """
+        self._connecting[key] -= 1
+        if not self._connecting[key]:
+            del self._connecting[key]
+
+
+    def _offerHTTP2(self, key):
+        """
+        Determine whether connections for C{key} should offer HTTP/2.
+        """
+        return (self.http2 and self.persistent and
+                H2ClientConnection is not None and
+                key[0] == b'https' and key not in self._http11Only)
+
+
+    def _newNegotiatedConnection(self, key, endpoint, quiescentCallback,
+                                 lostCallback):
+        """
+        Create a new connection which offers HTTP/2.
+
+        Until the TLS handshake has completed, other requests for C{key} wait
+        for it, so that they can share the connection if the server accepts
+        HTTP/2.  If it doesn't, they go on to use HTTP/1.1 connections of their
+        own.
+        """
+        waiting = self._h2Connecting[key] = []
+
+        def gone(connection):
+            if self._h2Connections.get(key) is connection:
+                del self._h2Connections[key]
+                self._warmUp(key)
+
+        def negotiated(connection):
+            del self._h2Connecting[key]
+            if isinstance(connection, H2ClientConnection):
+                self._h2Connections[key] = connection
+                for d in waiting:
+                    d.callback(connection)
+            else:
+                self._http11Only.add(key)
+                for d in waiting:
+                    self.getConnection(key, endpoint).chainDeferred(d)
+            return connection
+
+        def failed(reason):
+            del self._h2Connecting[key]
+            for d in waiting:
+                d.errback(reason)
+            return reason
+
+        d = endpoint.connect(
+            self._negotiatingFactory(quiescentCallback, gone, lostCallback))
+        d.addCallback(lambda protocol: protocol.negotiated)
+        d.addCallbacks(negotiated, failed)
+        return d
 
 
     def _removeConnection(self, key, connection):
@@ -1285,10 +1871,32 @@ class HTTPConnectionPool(object):
         del self._timeouts[connection]
 
 
+    def _lostConnection(self, key, connection):
+        """
+        Forget a connection which has been lost.  This will be called by
+        L{HTTP11ClientProtocol} when its connection is lost, and may let a
+        waiting request open a new connection.
+        """
+        busy = self._busy.get(key)
+        if busy is not None:
+            busy.discard(connection)
+            if not busy:
+                del self._busy[key]
+        connections = self._connections.get(key)
+        if connections and connection in connections:
+            connections.remove(connection)
+            self._timeouts.pop(connection).cancel()
+        self._serveWaiting(key)
+        self._warmUp(key)
+
+
     def _putConnection(self, key, connection):
         """
         Return a persistent connection to the pool. This will be called by
         L{HTTP11ClientProtocol} when the connection becomes quiescent.
+
+        If requests are waiting for a connection, the first of them is given
+        it once the response which has just been received is finished.
         """
         if connection.state != "QUIESCENT":
             # Log with traceback for debugging purposes:
@@ -1298,8 +1906,16 @@ class HTTPConnectionPool(object):
             except:
                 log.err()
             return
+        busy = self._busy.get(key)
+        if busy is not None:
+            busy.discard(connection)
+            if not busy:
+                del self._busy[key]
         connections = self._connections.setdefault(key, [])
-        if len(connections) == self.maxPersistentPerHost:
+        maximum = self.maxPersistentPerHost
+        if key in self._warm:
+            maximum = max(maximum, self._warm[key][1])
+        if len(connections) >= maximum:
             dropped = connections.pop(0)
             dropped.transport.loseConnection()
             self._timeouts[dropped].cancel()
@@ -1309,20 +1925,46 @@ class HTTPConnectionPool(object):
                                       self._removeConnection,
                                       key, connection)
         self._timeouts[connection] = cid
+        if self._waiting.get(key):
+            self._reactor.callLater(0, self._serveWaiting, key)
+
+
+    def statistics(self):
+        """
+        Gather information about the connections of this pool.
+
+        @return: A L{_PoolStatistics} describing them.
+
+        @since: 16.5
+        """
+        return _PoolStatistics(
+            sum(len(connections)
+                for connections in itervalues(self._connections)),
+            sum(len(busy) for busy in itervalues(self._busy)) +
+            sum(itervalues(self._connecting)),
+            sum(len(waiting) for waiting in itervalues(self._waiting)),
+            self._createdConnections, self._reusedConnections)
 
 
     def closeCachedConnections(self):
         """
         Close all persistent connections and remove them from the pool.
 
+        Connections are no longer kept open to the destinations given to
+        L{keepWarm}.
+
         @return: L{defer.Deferred} that fires when all connections have been
             closed.
         """
+        self._warm = {}
         results = []
         for protocols in itervalues(self._connections):
             for p in protocols:
                 results.append(p.abort())
         self._connections = {}
+        for connection in list(itervalues(self._h2Connections)):
+            results.append(connection.abort())
+        self._h2Connections = {}
         for dc in itervalues(self._timeouts):
             dc.cancel()
         self._timeouts = {}
@@ -1602,6 +2244,29 @@ class Agent(_AgentBase):
                                          parsedURI.originForm)
 
 
+    def keepWarm(self, uri, minimum):
+        """
+        Keep at least C{minimum} connections open to the server indicated by
+        the given C{uri}, using L{HTTPConnectionPool.keepWarm}.
+
+        @param uri: A URI for the server; only its scheme, host and port are
+            used.
+        @type uri: L{bytes}
+
+        @param minimum: The number of connections to keep open.  C{0} stops
+            keeping connections open to the server.
+        @type minimum: L{int}
+
+        @raise SchemeNotSupported: If the scheme of C{uri} is not supported.
+
+        @since: 16.5
+        """
+        parsedURI = URI.fromBytes(uri)
+        endpoint = self._getEndpoint(parsedURI)
+        key = (parsedURI.scheme, parsedURI.host, parsedURI.port)
+        self._pool.keepWarm(key, endpoint, minimum)
+
+
 
 @implementer(IAgent)
 class ProxyAgent(_AgentBase):
@@ -102,7 +102,7 @@ from twisted.protocols import policies, basic
 
 from twisted.web.iweb import (
     IRequest, IAccessLogFormatter, INonQueuedRequestFactory)
-from twisted.web.http_headers import Headers
+from twisted.web.http_headers import Headers, _lowercaseNames, _lowercaseName
 
 try:
     from twisted.web._http2 import H2Connection
@@ -132,6 +132,14 @@ from twisted.web._responses import (
 
     RESPONSES)
 
+# Pre-encoded status lines for every standard response code, keyed on the
+# version, code and reason phrase they are made from.
+_STATUS_LINES = dict(
+    ((version, intToBytes(code), reason),
+     version + b" " + intToBytes(code) + b" " + reason + b"\r\n")
+    for version in (b"HTTP/1.0", b"HTTP/1.1")
+    for code, reason in RESPONSES.items())
+
 if _PY3:
     _intTypes = int
 else:
@@ -675,7 +683,7 @@ class Request:
 
         This method is not intended for users.
         """
-        cookieheaders = self.requestHeaders.getRawHeaders(b"cookie")
+        cookieheaders = self.requestHeaders.getLowercaseRawHeaders(b"cookie")
 
         if cookieheaders is None:
             return
@@ -736,7 +744,7 @@ class Request:
 
         # Argument processing
         args = self.args
-        ctype = self.requestHeaders.getRawHeaders(b'content-type')
+        ctype = self.requestHeaders.getLowercaseRawHeaders(b'content-type')
         if ctype is not None:
             ctype = ctype[0]
 
@@ -906,17 +914,19 @@ class Request:
             # chunked mode, so that we can support pipelining in
             # persistent connections.
             if ((version == b"HTTP/1.1") and
-                (self.responseHeaders.getRawHeaders(b'content-length') is None) and
+                (self.responseHeaders.getLowercaseRawHeaders(
+                    b'content-length') is None) and
                 self.method != b"HEAD" and self.code not in NO_BODY_CODES):
                 headers.append((b'Transfer-Encoding', b'chunked'))
                 self.chunked = 1
 
             if self.lastModified is not None:
-                if self.responseHeaders.hasHeader(b'last-modified'):
+                if self.responseHeaders.getLowercaseRawHeaders(
+                        b'last-modified') is not None:
                     log.msg("Warning: last-modified specified both in"
                             " header list and lastModified attribute.")
                 else:
-                    self.responseHeaders.setRawHeaders(
+                    self.responseHeaders.setLowercaseRawHeaders(
                         b'last-modified',
                         [datetimeToString(self.lastModified)])
 
@@ -1616,6 +1626,34 @@ class _NoPushProducer(object):
 
 
 
+# The request headers which determine how the body of a request is received.
+_TRANSFER_HEADERS = frozenset([b'content-length', b'transfer-encoding'])
+
+
+
+def _foldHeaderLines(lines):
+    """
+    Join each continuation line of a header (one starting with a space or a
+    tab) to the line before it, as L{HTTPChannel.lineReceived} does.
+
+    @param lines: The request line followed by the header lines of a
+        request.
+    @type lines: L{list} of L{bytes}
+
+    @return: C{lines}, with continuation lines joined to the header they
+        continue.
+    @rtype: L{list} of L{bytes}
+    """
+    folded = lines[:2]
+    for line in lines[2:]:
+        if line[:1] in (b' ', b'\t'):
+            folded[-1] = folded[-1] + b'\n' + line
+        else:
+            folded.append(line)
+    return folded
+
+
+
 @implementer(interfaces.ITransport)
 class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
     """
@@ -1650,10 +1688,24 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
         L{interfaces.IPushProducer}. Used to attempt to prevent the transport
         from producing excess data when we're responding to a request.
     @type _producer: L{interfaces.IPushProducer}
+
+    @ivar headerBlockParsing: Whether to parse the request line and headers
+        of each request in one pass, once all of them have been received,
+        instead of line by line.  This avoids most of the per-line overhead
+        of L{basic.LineReceiver}, but L{lineReceived} and L{headerReceived}
+        are not called, and C{MAX_LENGTH} is not enforced (although
+        C{totalHeadersSize} is).  (Since 16.5)
+    @type headerBlockParsing: L{bool}
+
+    @ivar _headerBlockScanned: The number of bytes at the start of
+        C{_buffer} which have already been searched for the end of the
+        header block.
+    @type _headerBlockScanned: L{int}
     """
 
     maxHeaders = 500
     totalHeadersSize = 16384
+    headerBlockParsing = False
 
     length = 0
     persistent = 1
@@ -1667,6 +1719,7 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
     _savedTimeOut = None
     _receivedHeaderCount = 0
     _receivedHeaderSize = 0
+    _headerBlockScanned = 0
 
     def __init__(self):
         # the request queue
@@ -1683,6 +1736,172 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
         )
 
 
+    def dataReceived(self, data):
+        """
+        Parse the data received from the connection into requests.
+
+        @see: L{headerBlockParsing}
+        """
+        if self.headerBlockParsing:
+            return self._headerBlockDataReceived(data)
+        return basic.LineReceiver.dataReceived(self, data)
+
+
+    def _headerBlockDataReceived(self, data):
+        """
+        Like L{basic.LineReceiver.dataReceived}, but instead of delivering
+        each line of a request's header to L{lineReceived}, wait for all of
+        it and deliver it to L{_headerBlockReceived}.
+
+        @param data: The bytes received.
+        @type data: L{bytes}
+        """
+        if self._busyReceiving:
+            self._buffer += data
+            return
+
+        try:
+            self._busyReceiving = True
+            self._buffer += data
+            while self._buffer and not self.paused:
+                if not self.line_mode:
+                    data = self._buffer
+                    self._buffer = b''
+                    why = self.rawDataReceived(data)
+                    if why:
+                        return why
+                    continue
+
+                # If we're currently handling a request, buffer this data.
+                # We shouldn't have received it (we've paused the
+                # transport), but let's be cautious.
+                if self._handlingRequest:
+                    self._dataBuffer.append(self._buffer)
+                    self._buffer = b''
+                    self._headerBlockScanned = 0
+                    return
+
+                # if this connection is not persistent, drop any data which
+                # the client (illegally) sent after the last request.
+                if not self.persistent:
+                    self.dataReceived = self.lineReceived = (
+                        lambda *args: None)
+                    self._buffer = b''
+                    return
+
+                buffer = self._buffer
+                # IE sends an extraneous empty line (\r\n) after a POST
+                # request; eat up such a line, but only ONCE
+                if self.__first_line == 1 and buffer[:1] == b'\r':
+                    if len(buffer) < 2:
+                        return
+                    if buffer[1:2] == b'\n':
+                        self.__first_line = 2
+                        buffer = self._buffer = buffer[2:]
+                        self._headerBlockScanned = 0
+                        continue
+
+                end = buffer.find(
+                    b'\r\n\r\n', max(0, self._headerBlockScanned - 3))
+                if end == -1:
+                    self._headerBlockScanned = len(buffer)
+                    if (len(buffer) > self.totalHeadersSize and
+                            len(buffer) - 2 * buffer.count(b'\r\n') >
+                            self.totalHeadersSize):
+                        self._respondToBadRequestAndDisconnect()
+                    return
+
+                self._buffer = buffer[end + 4:]
+                self._headerBlockScanned = 0
+                self.resetTimeout()
+                self._headerBlockReceived(buffer[:end])
+                if self.transport and self.transport.disconnecting:
+                    return
+        finally:
+            self._busyReceiving = False
+
+
+    def _headerBlockReceived(self, block):
+        """
+        Parse the request line and all of the headers of a request, and
+        dispatch it (or, if it has a body, start receiving that).
+
+        If the request is invalid, or exceeds C{maxHeaders} or
+        C{totalHeadersSize}, respond with I{400 Bad Request} and disconnect,
+        just as L{lineReceived} would.
+
+        @param block: The request line and headers, each terminated by
+            C{b"\r\n"} except for the last, without the empty line which
+            ends them.
+        @type block: L{bytes}
+        """
+        lines = block.split(b'\r\n')
+        if len(block) - 2 * (len(lines) - 1) > self.totalHeadersSize:
+            self._respondToBadRequestAndDisconnect()
+            return
+
+        # create a new Request object
+        if INonQueuedRequestFactory.providedBy(self.requestFactory):
+            request = self.requestFactory(self)
+        else:
+            request = self.requestFactory(self, len(self.requests))
+        self.requests.append(request)
+
+        self.__first_line = 0
+
+        parts = lines[0].split()
+        if len(parts) != 3:
+            self._respondToBadRequestAndDisconnect()
+            return
+        command, path, version = parts
+        try:
+            command.decode("ascii")
+        except UnicodeDecodeError:
+            self._respondToBadRequestAndDisconnect()
+            return
+
+        self._command = command
+        self._path = path
+        self._version = version
+
+        if b'\r\n ' in block or b'\r\n\t' in block:
+            lines = _foldHeaderLines(lines)
+
+        rawHeaders = request.requestHeaders._rawHeaders
+        lowercaseNames = _lowercaseNames
+        maxHeaders = self.maxHeaders
+        count = 0
+        for line in lines[1:]:
+            header, colon, data = line.partition(b':')
+            if not colon:
+                self._respondToBadRequestAndDisconnect()
+                return
+            lowercase = lowercaseNames.get(header)
+            if lowercase is None:
+                lowercase = header.lower()
+            header = lowercase
+            data = data.strip()
+            if header in _TRANSFER_HEADERS:
+                if not self._transferHeaderReceived(header, data):
+                    return
+            values = rawHeaders.get(header)
+            if values is None:
+                rawHeaders[header] = [data]
+            else:
+                values.append(data)
+
+            count += 1
+            if count > maxHeaders:
+                self._respondToBadRequestAndDisconnect()
+                return
+
+        self.allHeadersReceived()
+        if self.length == 0:
+            self.allContentReceived()
+        else:
+            self.setRawMode()
+
+
     def lineReceived(self, line):
         """
         Called for each line from request until the end of headers when
@@ -1765,8 +1984,10 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
 
 
     def _finishRequestBody(self, data):
-        self.allContentReceived()
+        # Buffer whatever follows the body first, so that it is parsed if the
+        # request is finished before allContentReceived returns.
         self._dataBuffer.append(data)
+        self.allContentReceived()
 
 
     def headerReceived(self, line):
@@ -1787,8 +2008,35 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
             self._respondToBadRequestAndDisconnect()
             return False
 
-        header = header.lower()
+        header = _lowercaseName(header)
         data = data.strip()
+        if header in _TRANSFER_HEADERS:
+            if not self._transferHeaderReceived(header, data):
+                return False
+        self.requests[-1].requestHeaders.addLowercaseRawHeader(header, data)
+
+        self._receivedHeaderCount += 1
+        if self._receivedHeaderCount > self.maxHeaders:
+            self._respondToBadRequestAndDisconnect()
+            return False
+
+        return True
+
+
+    def _transferHeaderReceived(self, header, data):
+        """
+        Prepare to receive the body of the current request, as described by a
+        I{Content-Length} or I{Transfer-Encoding} header.
+
+        @param header: The lowercase name of the header.
+        @type header: L{bytes}
+
+        @param data: The value of the header.
+        @type data: L{bytes}
+
+        @return: A flag indicating whether the header was valid.
+        @rtype: L{bool}
+        """
         if header == b'content-length':
             try:
                 self.length = int(data)
@@ -1798,24 +2046,12 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
                 return False
             self._transferDecoder = _IdentityTransferDecoder(
                 self.length, self.requests[-1].handleContentChunk, self._finishRequestBody)
-        elif header == b'transfer-encoding' and data.lower() == b'chunked':
+        elif data.lower() == b'chunked':
             # XXX Rather poorly tested code block, apparently only exercised by
             # test_chunkedEncoding
             self.length = None
             self._transferDecoder = _ChunkedTransferDecoder(
                 self.requests[-1].handleContentChunk, self._finishRequestBody)
-        reqHeaders = self.requests[-1].requestHeaders
-        values = reqHeaders.getRawHeaders(header)
-        if values is not None:
-            values.append(data)
-        else:
-            reqHeaders.setRawHeaders(header, [data])
-
-        self._receivedHeaderCount += 1
-        if self._receivedHeaderCount > self.maxHeaders:
-            self._respondToBadRequestAndDisconnect()
-            return False
-
         return True
 
 
@@ -1867,7 +2103,7 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
         req.gotLength(self.length)
         # Handle 'Expect: 100-continue' with automated 100 response code,
         # a simplistic implementation of RFC 2686 8.2.3:
-        expectContinue = req.requestHeaders.getRawHeaders(b'expect')
+        expectContinue = req.requestHeaders.getLowercaseRawHeaders(b'expect')
         if (expectContinue and expectContinue[0].lower() == b'100-continue' and
             self._version == b'HTTP/1.1'):
             self._send100Continue()
@@ -1890,7 +2126,8 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
             must be closed in order to indicate the completion of the response
             to C{request}.
         """
-        connection = request.requestHeaders.getRawHeaders(b'connection')
+        connection = request.requestHeaders.getLowercaseRawHeaders(
+            b'connection')
         if connection:
             tokens = [t.lower() for t in connection[0].split(b' ')]
         else:
@@ -1909,7 +2146,8 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
 
         if version == b"HTTP/1.1":
             if b'close' in tokens:
-                request.responseHeaders.setRawHeaders(b'connection', [b'close'])
+                request.responseHeaders.setLowercaseRawHeaders(
+                    b'connection', [b'close'])
                 return False
             else:
                 return True
@@ -1983,7 +2221,9 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
         @param headers: The headers to write to the transport.
         @type headers: L{twisted.web.http_headers.Headers}
         """
-        responseLine = version + b" " + code + b" " + reason + b"\r\n"
+        responseLine = _STATUS_LINES.get((version, code, reason))
+        if responseLine is None:
+            responseLine = version + b" " + code + b" " + reason + b"\r\n"
         headerSequence = [responseLine]
         headerSequence.extend(
             name + b': ' + value + b"\r\n" for name, value in headers
@@ -2296,6 +2536,16 @@ class _GenericHTTPChannelProtocol(proxyForInterface(IProtocol, "_channel")):
         self._channel.timeOut = value
 
 
+    @property
+    def headerBlockParsing(self):
+        return self._channel.headerBlockParsing
+
+
+    @headerBlockParsing.setter
+    def headerBlockParsing(self, value):
+        self._channel.headerBlockParsing = value
+
+
     def dataReceived(self, data):
         """
         An override of L{IProtocol.dataReceived} that checks what protocol we're
@@ -2350,9 +2600,14 @@ class HTTPFactory(protocol.ServerFactory):
     @type _logDateTime: C{str}
 
     @ivar _logDateTimeCall: A delayed call for the next update to the cached
-        log datetime string.
+        log datetime string, and to C{_responseDateTime}.
     @type _logDateTimeCall: L{IDelayedCall} provided
 
+    @ivar _responseDateTime: A cached datetime string for I{Date} response
+        headers, updated by C{_logDateTimeCall}, or L{None} if this factory
+        is not started.
+    @type _responseDateTime: C{bytes} or L{None}
+
     @ivar _logFormatter: See the C{logFormatter} parameter to L{__init__}
 
     @ivar _nativeize: A flag that indicates whether the log file being written
@@ -2362,6 +2617,9 @@ class HTTPFactory(protocol.ServerFactory):
 
     @ivar _reactor: An L{IReactorTime} provider used to compute logging
         timestamps.
+
+    @ivar headerBlockParsing: See the C{headerBlockParsing} parameter to
+        L{__init__}.  (Since 16.5)
     """
 
     protocol = _genericHTTPChannelProtocolFactory
@@ -2370,8 +2628,12 @@ class HTTPFactory(protocol.ServerFactory):
 
     timeOut = 60 * 60 * 12
 
+    headerBlockParsing = False
+
+    _responseDateTime = None
+
     def __init__(self, logPath=None, timeout=60*60*12, logFormatter=None,
-                 reactor=None):
+                 reactor=None, headerBlockParsing=False):
         """
         @param logFormatter: An object to format requests into log lines for
             the access log.
@@ -2379,6 +2641,11 @@ class HTTPFactory(protocol.ServerFactory):
 
         @param reactor: A L{IReactorTime} provider used to compute logging
             timestamps.
+
+        @param headerBlockParsing: Whether the channels built by this factory
+            should parse the request line and headers of each request in one
+            pass.  See L{HTTPChannel.headerBlockParsing}.
+        @type headerBlockParsing: L{bool}
         """
         if not reactor:
             from twisted.internet import reactor
@@ -2388,6 +2655,7 @@ class HTTPFactory(protocol.ServerFactory):
             logPath = os.path.abspath(logPath)
         self.logPath = logPath
         self.timeOut = timeout
+        self.headerBlockParsing = headerBlockParsing
         if logFormatter is None:
             logFormatter = combinedLogFormatter
         self._logFormatter = logFormatter
@@ -2399,9 +2667,12 @@ class HTTPFactory(protocol.ServerFactory):
 
     def _updateLogDateTime(self):
         """
-        Update log datetime periodically, so we aren't always recalculating it.
+        Update log and response datetimes periodically, so we aren't always
+        recalculating them.
         """
-        self._logDateTime = datetimeToLogString(self._reactor.seconds())
+        now = self._reactor.seconds()
+        self._logDateTime = datetimeToLogString(now)
+        self._responseDateTime = datetimeToString(now)
         self._logDateTimeCall = self._reactor.callLater(1, self._updateLogDateTime)
 
 
@@ -2410,6 +2681,7 @@ class HTTPFactory(protocol.ServerFactory):
         # timeOut needs to be on the Protocol instance cause
         # TimeoutMixin expects it there
         p.timeOut = self.timeOut
+        p.headerBlockParsing = self.headerBlockParsing
         return p
 
 
@@ -2437,6 +2709,7 @@ class HTTPFactory(protocol.ServerFactory):
         if self._logDateTimeCall is not None and self._logDateTimeCall.active():
             self._logDateTimeCall.cancel()
             self._logDateTimeCall = None
+        self._responseDateTime = None
 
 
     def _openLogFile(self, path):
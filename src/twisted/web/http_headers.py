@@ -11,6 +11,69 @@ from __future__ import division, absolute_import
 from twisted.python.compat import comparable, cmp, unicode
 
 
+# The canonical capitalization of commonly used header names.
+_COMMON_HEADER_NAMES = [
+    b'Accept', b'Accept-Charset', b'Accept-Encoding', b'Accept-Language',
+    b'Accept-Ranges', b'Age', b'Allow', b'Authorization', b'Cache-Control',
+    b'Connection', b'Content-Disposition', b'Content-Encoding',
+    b'Content-Language', b'Content-Length', b'Content-Location',
+    b'Content-MD5', b'Content-Range', b'Content-Type', b'Cookie', b'Date',
+    b'DNT', b'ETag', b'Expect', b'Expires', b'From', b'Host', b'If-Match',
+    b'If-Modified-Since', b'If-None-Match', b'If-Range',
+    b'If-Unmodified-Since', b'Keep-Alive', b'Last-Modified', b'Link',
+    b'Location', b'Origin', b'P3P', b'Pragma', b'Proxy-Authenticate',
+    b'Proxy-Authorization', b'Range', b'Referer', b'Retry-After', b'Server',
+    b'Set-Cookie', b'TE', b'Trailer', b'Transfer-Encoding', b'Upgrade',
+    b'User-Agent', b'Vary', b'Via', b'Warning', b'WWW-Authenticate',
+    b'X-Forwarded-For', b'X-Forwarded-Host', b'X-Forwarded-Proto',
+    b'X-Requested-With', b'X-XSS-Protection',
+]
+
+# A mapping from common header names, as they are usually written, to a
+# single shared lowercase copy of each.
+_lowercaseNames = {}
+
+# A mapping from the id of the _caseMappings of Headers and each subclass of
+# it to a tuple of a copy of the _caseMappings, as it was when the entry was
+# made, the _caseMappings itself, so that its id is not reused, and a mapping
+# from lowercase header names to their canonical capitalization according to
+# it.  Each starts with the common header names, and the names of other
+# headers are added as they are canonicalized, up to _MAX_CANONICAL_NAMES of
+# them.  Once there are _MAX_CASE_MAPPINGS entries, they are all forgotten.
+_canonicalNames = {}
+
+_MAX_CANONICAL_NAMES = 1000
+_MAX_CASE_MAPPINGS = 100
+
+for _name in _COMMON_HEADER_NAMES:
+    _lowercase = _name.lower()
+    _lowercaseNames[_name] = _lowercase
+    _lowercaseNames[_lowercase] = _lowercase
+del _name, _lowercase
+
+
+
+def _lowercaseName(name):
+    """
+    Lowercase the name of a header, sharing one copy of the lowercase name
+    of each common header.
+
+    @param name: The name of a header.
+    @type name: L{bytes}
+
+    @rtype: L{bytes}
+    """
+    try:
+        lowercase = _lowercaseNames.get(name)
+    except TypeError:
+        # An unhashable name, such as a bytearray.
+        lowercase = None
+    if lowercase is None:
+        lowercase = name.lower()
+    return lowercase
+
+
+
 def _dashCapitalize(name):
     """
     Return a byte string which is capitalized using '-' as a word separator.
@@ -25,6 +88,36 @@ def _dashCapitalize(name):
 
 
 
+def _canonicalNamesFor(caseMappings):
+    """
+    Find the remembered canonical names of headers for the C{_caseMappings}
+    of L{Headers} or a subclass of it.
+
+    @param caseMappings: The C{_caseMappings}.
+    @type caseMappings: L{dict} mapping L{bytes} to L{bytes}
+
+    @return: The mapping in L{_canonicalNames} for C{caseMappings}, which is
+        created if there is none yet, or if C{caseMappings} has been changed
+        since it was.
+    @rtype: L{dict} mapping L{bytes} to L{bytes}
+    """
+    entry = _canonicalNames.get(id(caseMappings))
+    if entry is not None and entry[0] == caseMappings:
+        return entry[2]
+    names = {}
+    for lowercase in set(_lowercaseNames.values()):
+        canonical = caseMappings.get(lowercase)
+        if canonical is None:
+            canonical = _dashCapitalize(lowercase)
+        names[lowercase] = canonical
+    if len(_canonicalNames) >= _MAX_CASE_MAPPINGS:
+        _canonicalNames.clear()
+    _canonicalNames[id(caseMappings)] = (
+        dict(caseMappings), caseMappings, names)
+    return names
+
+
+
 @comparable
 class Headers(object):
     """
@@ -41,6 +134,11 @@ class Headers(object):
     ensure no decoding or encoding is done, and L{Headers} will treat the keys
     and values as opaque byte strings.
 
+    L{Headers.getLowercaseRawHeaders}, L{Headers.setLowercaseRawHeaders} and
+    L{Headers.addLowercaseRawHeader} go further: they only accept lowercase
+    L{bytes} names and L{bytes} values, and do no conversion at all, for code
+    which handles headers in that form already, such as HTTP parsers.
+
     @cvar _caseMappings: A L{dict} that maps lowercase header names
         to their canonicalized representation.
 
@@ -95,7 +193,14 @@ class Headers(object):
         """
         if isinstance(name, unicode):
             return name.lower().encode('iso-8859-1')
-        return name.lower()
+        try:
+            lowercase = _lowercaseNames.get(name)
+        except TypeError:
+            # An unhashable name, such as a bytearray.
+            lowercase = None
+        if lowercase is None:
+            lowercase = name.lower()
+        return lowercase
 
 
     def _encodeValue(self, value):
@@ -124,11 +229,10 @@ class Headers(object):
         @return: C{values}, with each item encoded if required
         @rtype: L{list} of L{bytes}
         """
-        newValues = []
-
         for value in values:
-            newValues.append(self._encodeValue(value))
-        return newValues
+            if isinstance(value, unicode):
+                return [self._encodeValue(value) for value in values]
+        return list(values)
 
 
     def _decodeValues(self, values):
@@ -216,14 +320,13 @@ class Headers(object):
         @type value: L{bytes} or L{unicode}
         @param value: The value to set for the named header.
         """
-        values = self.getRawHeaders(name)
-
-        if values is not None:
-            values.append(value)
+        name = self._encodeName(name)
+        value = self._encodeValue(value)
+        values = self._rawHeaders.get(name)
+        if values is None:
+            self._rawHeaders[name] = [value]
         else:
-            values = [value]
-
-        self.setRawHeaders(name, values)
+            values.append(value)
 
 
     def getRawHeaders(self, name, default=None):
@@ -248,20 +351,86 @@ class Headers(object):
         return values
 
 
+    def getLowercaseRawHeaders(self, name, default=None):
+        """
+        Returns the list of values of the named header, without converting
+        the name or the values.
+
+        @param name: The name of the HTTP header to get the values of, which
+            must be lowercase.
+        @type name: L{bytes}
+
+        @param default: The value to return if no header with the given C{name}
+            exists.
+
+        @return: The L{list} of L{bytes} values of the header itself, which
+            may be modified to change them, or C{default}.
+
+        @since: 16.5
+        """
+        return self._rawHeaders.get(name, default)
+
+
+    def setLowercaseRawHeaders(self, name, values):
+        """
+        Sets the values of the named header, without converting the name or
+        the values.
+
+        @param name: The name of the HTTP header to set the values for, which
+            must be lowercase.
+        @type name: L{bytes}
+
+        @param values: The values of the header.  The list is stored as it
+            is, rather than being copied.
+        @type values: L{list} of L{bytes}
+
+        @since: 16.5
+        """
+        self._rawHeaders[name] = values
+
+
+    def addLowercaseRawHeader(self, name, value):
+        """
+        Add a new value for the named header, without converting the name or
+        the value.
+
+        @param name: The name of the HTTP header to add a value to, which must
+            be lowercase.
+        @type name: L{bytes}
+
+        @param value: The value to add.
+        @type value: L{bytes}
+
+        @since: 16.5
+        """
+        values = self._rawHeaders.get(name)
+        if values is None:
+            self._rawHeaders[name] = [value]
+        else:
+            values.append(value)
+
+
     def getAllRawHeaders(self):
         """
         Return an iterator of key, value pairs of all headers contained in this
         object, as L{bytes}.  The keys are capitalized in canonical
         capitalization.
         """
+        canonicalNames = _canonicalNamesFor(self._caseMappings)
         for k, v in self._rawHeaders.items():
-            yield self._canonicalNameCaps(k), v
+            name = canonicalNames.get(k)
+            if name is None:
+                name = self._canonicalNameCaps(k)
+            yield name, v
 
 
     def _canonicalNameCaps(self, name):
         """
         Return the canonical name for the given header.
 
+        The canonical names of headers are remembered for each
+        C{_caseMappings}, so they only have to be worked out once.
+
         @type name: L{bytes}
         @param name: The all-lowercase header name to capitalize in its
             canonical form.
@@ -269,7 +438,15 @@ class Headers(object):
         @rtype: L{bytes}
         @return: The canonical name of the header.
         """
-        return self._caseMappings.get(name, _dashCapitalize(name))
+        canonicalNames = _canonicalNamesFor(self._caseMappings)
+        canonical = canonicalNames.get(name)
+        if canonical is None:
+            canonical = self._caseMappings.get(name)
+            if canonical is None:
+                canonical = _dashCapitalize(name)
+            if len(canonicalNames) < _MAX_CANONICAL_NAMES:
+                canonicalNames[name] = canonical
+        return canonical
 
 
 
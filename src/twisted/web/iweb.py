@@ -352,6 +352,56 @@ class IAccessLogFormatter(Interface):
 
 
 
+class IRequestMetrics(Interface):
+    """
+    An object which collects measurements of the requests handled by a
+    L{twisted.web.server.Site}, as an alternative to scraping them from the
+    access log.
+
+    @since: 16.5
+    """
+    def requestStarted(request):
+        """
+        A request has been received, and is about to be processed.
+
+        @param request: The request.
+        @type request: L{twisted.web.server.Request}
+        """
+
+
+    def requestFinished(request, code, path, responseSize, timeToFirstByte,
+                        duration):
+        """
+        A request passed to L{requestStarted} has been responded to, or its
+        connection has been lost first, in which case C{request.finished} is
+        false.  This is called exactly once for each such request.
+
+        @param request: The request.
+        @type request: L{twisted.web.server.Request}
+
+        @param code: The response status code.
+        @type code: L{int}
+
+        @param path: The path of the resource which handled the request: the
+            path segments which were consumed in finding it.
+        @type path: L{bytes}
+
+        @param responseSize: The number of bytes of the response body which
+            were written.
+        @type responseSize: L{int}
+
+        @param timeToFirstByte: The number of seconds between the request
+            starting and the response headers being written, or L{None} if
+            they never were.
+        @type timeToFirstByte: L{float} or L{None}
+
+        @param duration: The number of seconds between the request starting
+            and finishing.
+        @type duration: L{float}
+        """
+
+
+
 class ICredentialFactory(Interface):
     """
     A credential factory defines a way to generate a particular kind of
@@ -786,6 +836,6 @@ UNKNOWN_LENGTH = u"twisted.web.iweb.UNKNOWN_LENGTH"
 __all__ = [
     "IUsernameDigestHash", "ICredentialFactory", "IRequest",
     "IBodyProducer", "IRenderable", "IResponse", "_IRequestEncoder",
-    "_IRequestEncoderFactory", "IClientRequest",
+    "_IRequestEncoderFactory", "IClientRequest", "IRequestMetrics",
 
     "UNKNOWN_LENGTH"]
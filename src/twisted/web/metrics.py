@@ -0,0 +1,385 @@
+# -*- test-case-name: twisted.web.test.test_metrics -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Collection and export of measurements of the requests handled by a
+L{twisted.web.server.Site}.
+
+To measure the requests handled by a site, set its C{metrics} attribute to a
+L{HistogramCollector}, and make the measurements available to a Prometheus
+server with a L{PrometheusResource}::
+
+    collector = HistogramCollector()
+    root.putChild(b"metrics", PrometheusResource(collector))
+    site = Site(root)
+    site.metrics = collector
+
+@since: 16.5
+"""
+
+from __future__ import division, absolute_import
+
+from zope.interface import implementer
+
+from twisted.python.compat import intToBytes
+from twisted.web.iweb import IRequestMetrics
+from twisted.web.resource import Resource
+
+__all__ = ["Histogram", "HistogramCollector", "PrometheusResource"]
+
+
+
+class Histogram(object):
+    """
+    A histogram of non-negative integers, in the style of an HDR histogram:
+    values are counted in buckets whose width grows with the values they
+    hold, so that the histogram keeps a fixed relative precision over any
+    range of values, while recording a value takes constant time.
+
+    Values less than C{2 ** precision} are counted exactly.  Larger values
+    are counted in buckets no wider than C{2 ** (1 - precision)} of the
+    values in them.
+
+    @ivar count: The number of values recorded.
+    @type count: L{int}
+
+    @ivar total: The sum of the values recorded.
+    @type total: L{int}
+
+    @ivar maximum: The largest value recorded, or 0.
+    @type maximum: L{int}
+
+    @ivar _precision: See the C{precision} parameter to L{__init__}.
+
+    @ivar _counts: The number of values in each bucket, indexed by
+        L{_bucketIndex}, up to the bucket of the largest value recorded.
+    @type _counts: L{list} of L{int}
+    """
+
+    def __init__(self, precision=7):
+        """
+        @param precision: The number of significant bits of each value which
+            are kept.
+        @type precision: L{int}
+        """
+        self._precision = precision
+        self._counts = []
+        self.count = 0
+        self.total = 0
+        self.maximum = 0
+
+
+    def _bucketIndex(self, value):
+        """
+        Find the bucket in which a value is counted.
+
+        @param value: A non-negative value.
+        @type value: L{int}
+
+        @return: The index of the bucket in C{_counts}.
+        @rtype: L{int}
+        """
+        shift = value.bit_length() - self._precision
+        if shift <= 0:
+            return value
+        return (shift << (self._precision - 1)) + (value >> shift)
+
+
+    def _bucketBounds(self, index):
+        """
+        Find the range of values counted in a bucket.
+
+        @param index: The index of the bucket in C{_counts}.
+        @type index: L{int}
+
+        @return: The smallest and largest values in the bucket.
+        @rtype: L{tuple} of two L{int}s
+        """
+        if index < (1 << self._precision):
+            return index, index
+        shift = (index >> (self._precision - 1)) - 1
+        top = index - (shift << (self._precision - 1))
+        return top << shift, ((top + 1) << shift) - 1
+
+
+    def record(self, value):
+        """
+        Record a value.
+
+        @param value: The value, which is rounded down to an integer.
+            Negative values are recorded as 0.
+        @type value: L{int} or L{float}
+        """
+        value = int(value)
+        if value < 0:
+            value = 0
+        # This is _bucketIndex, inlined.
+        precision = self._precision
+        shift = value.bit_length() - precision
+        if shift > 0:
+            index = (shift << (precision - 1)) + (value >> shift)
+        else:
+            index = value
+        counts = self._counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+
+    def percentile(self, percentile):
+        """
+        Estimate a percentile of the values recorded.
+
+        @param percentile: The percentile, between 0 and 100.
+        @type percentile: L{int} or L{float}
+
+        @return: The largest value which could be in the bucket holding the
+            value at the given percentile, or the largest value recorded if
+            that is smaller; 0 if no values have been recorded.
+        @rtype: L{int}
+        """
+        if not self.count:
+            return 0
+        rank = max(1, self.count * percentile / 100)
+        seen = 0
+        for index, bucketCount in enumerate(self._counts):
+            seen += bucketCount
+            if seen >= rank:
+                return min(self._bucketBounds(index)[1], self.maximum)
+        return self.maximum
+
+
+
+@implementer(IRequestMetrics)
+class HistogramCollector(object):
+    """
+    An L{IRequestMetrics} provider which counts requests and responses, and
+    keeps L{Histogram}s of their latencies and sizes.
+
+    Latencies are recorded in microseconds, and response sizes in bytes.
+
+    @ivar requestsStarted: The number of requests started.
+    @type requestsStarted: L{int}
+
+    @ivar requestsFinished: The number of requests finished, including those
+        whose connections were lost.
+    @type requestsFinished: L{int}
+
+    @ivar requestsLost: The number of requests whose connections were lost
+        before they were finished.
+    @type requestsLost: L{int}
+
+    @ivar responses: The number of responses finished with each status code.
+    @type responses: L{dict} mapping L{int} to L{int}
+
+    @ivar bytesSent: The total size of the response bodies written.
+    @type bytesSent: L{int}
+
+    @ivar duration: The time taken by each finished request, in
+        microseconds.
+    @type duration: L{Histogram}
+
+    @ivar timeToFirstByte: The time taken to write the response headers of
+        each finished request which wrote them, in microseconds.
+    @type timeToFirstByte: L{Histogram}
+
+    @ivar responseSize: The size of the response body of each finished
+        request, in bytes.
+    @type responseSize: L{Histogram}
+    """
+
+    def __init__(self, precision=7):
+        """
+        @param precision: The precision of the histograms.  See
+            L{Histogram.__init__}.
+        @type precision: L{int}
+        """
+        self.requestsStarted = 0
+        self.requestsFinished = 0
+        self.requestsLost = 0
+        self.responses = {}
+        self.bytesSent = 0
+        self.duration = Histogram(precision)
+        self.timeToFirstByte = Histogram(precision)
+        self.responseSize = Histogram(precision)
+
+
+    @property
+    def requestsInFlight(self):
+        """
+        The number of requests which have been started but not finished.
+        """
+        return self.requestsStarted - self.requestsFinished
+
+
+    def requestStarted(self, request):
+        """
+        Count a request.
+
+        @see: L{IRequestMetrics.requestStarted}
+        """
+        self.requestsStarted += 1
+
+
+    def requestFinished(self, request, code, path, responseSize,
+                        timeToFirstByte, duration):
+        """
+        Count a finished request, and record its measurements.
+
+        @see: L{IRequestMetrics.requestFinished}
+        """
+        self.requestsFinished += 1
+        if request.finished:
+            responses = self.responses
+            responses[code] = responses.get(code, 0) + 1
+        else:
+            self.requestsLost += 1
+        self.bytesSent += responseSize
+        self.duration.record(duration * 1000000)
+        if timeToFirstByte is not None:
+            self.timeToFirstByte.record(timeToFirstByte * 1000000)
+        self.responseSize.record(responseSize)
+
+
+
+class PrometheusResource(Resource):
+    """
+    A resource which renders the measurements of a L{HistogramCollector} in
+    the Prometheus text exposition format.
+
+    Counters are exposed as such, and histograms as summaries, with the
+    quantiles given by C{quantiles}.
+
+    @ivar quantiles: The quantiles reported for each histogram.
+    @type quantiles: L{tuple} of L{float}s
+    """
+    isLeaf = True
+
+    quantiles = (0.5, 0.9, 0.99, 0.999)
+
+    def __init__(self, collector, prefix=b"twisted_web"):
+        """
+        @param collector: The collector whose measurements are rendered.
+        @type collector: L{HistogramCollector}
+
+        @param prefix: The prefix of the metric names.
+        @type prefix: L{bytes}
+        """
+        Resource.__init__(self)
+        self.collector = collector
+        self.prefix = prefix
+
+
+    def _metric(self, lines, name, kind, description, samples):
+        """
+        Add the lines describing one metric.
+
+        @param lines: The lines to add to.
+        @type lines: L{list} of L{bytes}
+
+        @param name: The name of the metric, without the prefix.
+        @type name: L{bytes}
+
+        @param kind: The Prometheus type of the metric.
+        @type kind: L{bytes}
+
+        @param description: A description of the metric.
+        @type description: L{bytes}
+
+        @param samples: The samples of the metric, as the suffix of the name
+            and labels of each sample, and its value.
+        @type samples: iterable of L{tuple} of L{bytes} and a number
+        """
+        name = self.prefix + b"_" + name
+        lines.append(b"# HELP " + name + b" " + description)
+        lines.append(b"# TYPE " + name + b" " + kind)
+        for suffix, value in samples:
+            if isinstance(value, float):
+                value = repr(value).encode("ascii")
+            else:
+                value = intToBytes(value)
+            lines.append(name + suffix + b" " + value)
+
+
+    def _summary(self, lines, name, description, histogram, scale):
+        """
+        Add the lines describing a histogram as a summary.
+
+        @param lines: The lines to add to.
+        @type lines: L{list} of L{bytes}
+
+        @param name: The name of the metric, without the prefix.
+        @type name: L{bytes}
+
+        @param description: A description of the metric.
+        @type description: L{bytes}
+
+        @param histogram: The histogram.
+        @type histogram: L{Histogram}
+
+        @param scale: The number of the units of the values in the histogram
+            in the unit of the metric, or L{None} if they are the same.
+        @type scale: L{int} or L{None}
+        """
+        samples = []
+        for quantile in self.quantiles:
+            value = histogram.percentile(quantile * 100)
+            if scale is not None:
+                value /= scale
+            samples.append((
+                b'{quantile="' + repr(quantile).encode("ascii") + b'"}',
+                value))
+        total = histogram.total
+        if scale is not None:
+            total /= scale
+        samples.append((b"_sum", total))
+        samples.append((b"_count", histogram.count))
+        self._metric(lines, name, b"summary", description, samples)
+
+
+    def render_GET(self, request):
+        """
+        Render the measurements.
+        """
+        collector = self.collector
+        lines = []
+        self._metric(
+            lines, b"requests_started_total", b"counter",
+            b"Requests started.",
+            [(b"", collector.requestsStarted)])
+        self._metric(
+            lines, b"requests_in_flight", b"gauge",
+            b"Requests started but not finished.",
+            [(b"", collector.requestsInFlight)])
+        self._metric(
+            lines, b"requests_lost_total", b"counter",
+            b"Requests whose connections were lost before they finished.",
+            [(b"", collector.requestsLost)])
+        self._metric(
+            lines, b"responses_total", b"counter",
+            b"Responses finished, by status code.",
+            [(b'{code="' + intToBytes(code) + b'"}', count)
+             for code, count in sorted(collector.responses.items())])
+        self._metric(
+            lines, b"response_bytes_total", b"counter",
+            b"Bytes of response bodies written.",
+            [(b"", collector.bytesSent)])
+        self._summary(
+            lines, b"request_duration_seconds",
+            b"Time taken to finish requests.",
+            collector.duration, 1000000)
+        self._summary(
+            lines, b"time_to_first_byte_seconds",
+            b"Time taken to write response headers.",
+            collector.timeToFirstByte, 1000000)
+        self._summary(
+            lines, b"response_size_bytes",
+            b"Sizes of response bodies.",
+            collector.responseSize, None)
+        request.setHeader(b"content-type", b"text/plain; version=0.0.4")
+        return b"\n".join(lines) + b"\n"
@@ -100,6 +100,13 @@ class Request(Copyable, http.Request, components.Componentized):
 
     @ivar _secureSession: The L{Session} object representing the state that
         will be transmitted only over HTTPS.
+
+    @ivar _metricsStarted: The time at which processing of this request
+        started, if the site's C{metrics} are still to be told about it
+        finishing, or L{None}.
+
+    @ivar _metricsFirstByte: The time at which the response headers were
+        written, if the site has C{metrics}, or L{None}.
     """
 
     defaultContentType = b"text/html"
@@ -109,6 +116,8 @@ class Request(Copyable, http.Request, components.Componentized):
     __pychecker__ = 'unusednames=issuer'
     _inFakeHead = False
     _encoder = None
+    _metricsStarted = None
+    _metricsFirstByte = None
 
     def __init__(self, *args, **kw):
         http.Request.__init__(self, *args, **kw)
@@ -173,9 +182,17 @@ class Request(Copyable, http.Request, components.Componentized):
         # get site from channel
         self.site = self.channel.site
 
+        metrics = getattr(self.site, 'metrics', None)
+        if metrics is not None:
+            self._metricsStarted = self.site._reactor.seconds()
+            metrics.requestStarted(self)
+
         # set various default headers
         self.setHeader(b'server', version)
-        self.setHeader(b'date', http.datetimeToString())
+        date = getattr(self.site, '_responseDateTime', None)
+        if date is None:
+            date = http.datetimeToString()
+        self.setHeader(b'date', date)
 
         # Resource Identification
         self.prepath = []
@@ -217,6 +234,8 @@ class Request(Copyable, http.Request, components.Componentized):
         if not self._inFakeHead:
             if self._encoder:
                 data = self._encoder.encode(data)
+            if self._metricsStarted is not None and not self.startedWriting:
+                self._metricsFirstByte = self.site._reactor.seconds()
             http.Request.write(self, data)
 
 
@@ -228,7 +247,36 @@ class Request(Copyable, http.Request, components.Componentized):
             data = self._encoder.finish()
             if data:
                 http.Request.write(self, data)
-        return http.Request.finish(self)
+        result = http.Request.finish(self)
+        if self._metricsStarted is not None:
+            self._finishMetrics()
+        return result
+
+
+    def connectionLost(self, reason):
+        """
+        Override C{http.Request.connectionLost} to tell the site's metrics
+        that an unfinished request is over.
+        """
+        http.Request.connectionLost(self, reason)
+        if self._metricsStarted is not None:
+            self._finishMetrics()
+
+
+    def _finishMetrics(self):
+        """
+        Tell the site's metrics that this request has finished.
+        """
+        started = self._metricsStarted
+        self._metricsStarted = None
+        now = self.site._reactor.seconds()
+        if self._metricsFirstByte is None:
+            timeToFirstByte = None
+        else:
+            timeToFirstByte = self._metricsFirstByte - started
+        self.site.metrics.requestFinished(
+            self, self.code, b'/' + b'/'.join(self.prepath), self.sentLength,
+            timeToFirstByte, now - started)
 
 
     def render(self, resrc):
@@ -682,12 +730,16 @@ class Site(http.HTTPFactory):
         rendered pages. Default to C{True}.
     @ivar sessionFactory: factory for sessions objects. Default to L{Session}.
     @ivar sessionCheckTime: Deprecated.  See L{Session.sessionTimeout} instead.
+    @ivar metrics: An L{iweb.IRequestMetrics} provider which is told about
+        every request processed by the site, or L{None}.  See
+        L{twisted.web.metrics.HistogramCollector}.  (Since 16.5)
     """
     counter = 0
     requestFactory = Request
     displayTracebacks = True
     sessionFactory = Session
     sessionCheckTime = 1800
+    metrics = None
     _entropy = os.urandom
 
     def __init__(self, resource, requestFactory=None, *args, **kwargs):
@@ -8,13 +8,18 @@ Static resources for L{twisted.web}.
 
 from __future__ import division, absolute_import
 
+import io
 import os
+import types
 import warnings
 import itertools
 import time
 import errno
 import mimetypes
 
+from collections import OrderedDict
+from io import BytesIO
+
 from zope.interface import implementer
 
 from twisted.web import server
@@ -167,6 +172,314 @@ def getTypeAndEncoding(filename, types, encodings, defaultType):
 
 
 
+def _acceptedEncodings(request):
+    """
+    Find the content codings a request accepts, according to its
+    I{Accept-Encoding} headers.
+
+    @param request: The request.
+    @type request: L{IRequest}
+
+    @return: The codings, lowercased, which are given a non-zero quality.
+    @rtype: L{set} of native L{str}
+    """
+    accepted = set()
+    headers = request.requestHeaders.getRawHeaders(b'accept-encoding', [])
+    for coding in b','.join(headers).split(b','):
+        params = coding.split(b';')
+        name = params[0].strip().lower()
+        quality = 1.0
+        for param in params[1:]:
+            key, _, value = param.partition(b'=')
+            if key.strip().lower() == b'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            accepted.add(nativeString(name))
+    return accepted
+
+
+
+class _FileCacheEntry(object):
+    """
+    What a L{FileCache} knows about a file.
+
+    @ivar statinfo: The result of C{stat}ing the file.
+
+    @ivar expires: The time at which this entry will no longer be used, or
+        L{None} if it is used until it is invalidated.
+
+    @ivar etag: The entity tag for the file, derived from C{statinfo}.
+    @type etag: L{bytes}
+
+    @ivar typeAndEncoding: The C{(type, encoding)} of the file found by
+        L{getTypeAndEncoding}, or L{None} if it has not been looked up yet.
+
+    @ivar content: The contents of the file, or L{None} if they have not been
+        read or the file is too big for them to be kept.
+    @type content: L{bytes}
+
+    @ivar encoded: A L{dict} mapping content codings to C{content} encoded
+        with them.
+
+    @ivar siblings: A L{dict} mapping the extensions in
+        L{File.precompressed} to whether there is a file with that extension
+        appended to this one's name.  It is emptied whenever the entry
+        expires.
+    """
+    typeAndEncoding = None
+    content = None
+
+    def __init__(self, statinfo, expires):
+        self.statinfo = statinfo
+        self.expires = expires
+        self.etag = networkString('"%x-%x-%x"' % (
+            statinfo.st_ino, statinfo.st_size,
+            int(statinfo.st_mtime * 1000000)))
+        self.encoded = {}
+        self.siblings = {}
+
+
+
+class FileCache(object):
+    """
+    A bounded cache of what L{File} resources find out about the files they
+    serve: their C{stat} results, content types and entity tags, and the
+    contents of small files.  The least recently used files are forgotten
+    first.
+
+    A L{File} uses a cache if its C{cache} attribute is set, and the L{File}s
+    it creates for its children share the cache, so that frequently requested
+    files can be served without any filesystem system calls::
+
+        root = File("/var/www")
+        root.cache = FileCache()
+
+    Responses for files in the cache have an I{ETag} header.  The cache only
+    holds files which exist, and it holds at most C{maxEntries} of them.  It
+    keeps the contents of files no bigger than C{maxFileSize} bytes, and, if
+    a response is being encoded (see
+    L{EncodingResourceWrapper<twisted.web.resource.EncodingResourceWrapper>}),
+    the encoded contents too, so that they are not compressed again for each
+    response.
+
+    By default, what the cache knows about a file is used for C{ttl} seconds,
+    so changes to the file are noticed at most that long after they happen.
+    On Linux, an L{twisted.internet.inotify.INotify} can be given so that a
+    file is forgotten as soon as it changes, in which case C{ttl} can be
+    L{None}.
+
+    @ivar maxEntries: The greatest number of files to remember.
+    @type maxEntries: L{int}
+
+    @ivar maxFileSize: The size in bytes of the biggest file the contents of
+        which will be kept.
+    @type maxFileSize: L{int}
+
+    @ivar ttl: The number of seconds for which to use what is known about a
+        file, or L{None} to use it until the file is forgotten.
+    @type ttl: L{float}
+
+    @ivar _notifier: The L{twisted.internet.inotify.INotify} watching the
+        files in the cache, or L{None}.
+
+    @ivar _entries: A L{OrderedDict} mapping the paths of the files in the
+        cache to L{_FileCacheEntry} instances, least recently used first.
+
+    @ivar _watched: A L{dict} mapping the bytes paths being watched by
+        C{_notifier} to the keys of C{_entries}.
+
+    @since: 16.5
+    """
+
+    def __init__(self, maxEntries=1000, maxFileSize=64 * 1024, ttl=1.0,
+                 notifier=None, reactor=None):
+        """
+        @param maxEntries: See L{FileCache.maxEntries}.
+        @param maxFileSize: See L{FileCache.maxFileSize}.
+        @param ttl: See L{FileCache.ttl}.
+
+        @param notifier: A started L{twisted.internet.inotify.INotify} with
+            which to watch the files in the cache for changes, or L{None}.
+
+        @param reactor: The L{IReactorTime} provider with which to find out
+            when entries expire.  If L{None}, the global reactor is used.
+        """
+        if reactor is None:
+            from twisted.internet import reactor
+        self.maxEntries = maxEntries
+        self.maxFileSize = maxFileSize
+        self.ttl = ttl
+        self._notifier = notifier
+        self._reactor = reactor
+        self._entries = OrderedDict()
+        self._watched = {}
+
+
+    def __len__(self):
+        """
+        @return: The number of files in the cache.
+        """
+        return len(self._entries)
+
+
+    def restat(self, path):
+        """
+        Update the C{stat} information of a path, using what the cache knows
+        about it if that can still be used, and remembering it otherwise.
+
+        @param path: The path to update.
+        @type path: L{filepath.FilePath}
+
+        @return: The L{_FileCacheEntry} for the path, or L{None} if the path
+            does not exist.
+        """
+        key = path.path
+        old = self._entries.pop(key, None)
+        if old is not None:
+            if old.expires is None or self._reactor.seconds() < old.expires:
+                self._entries[key] = old
+                path._statinfo = old.statinfo
+                return old
+            self._forget(key)
+
+        path.restat(False)
+        if not path._statinfo:
+            return None
+        if self.ttl is None:
+            expires = None
+        else:
+            expires = self._reactor.seconds() + self.ttl
+        entry = _FileCacheEntry(path._statinfo, expires)
+        if old is not None and old.etag == entry.etag:
+            # The file has not changed, so neither has anything else about
+            # it, but files may have been added or removed beside it.
+            old.statinfo, old.expires = entry.statinfo, entry.expires
+            old.siblings.clear()
+            entry = old
+        if self._notifier is not None:
+            self._watch(path, key)
+        self._entries[key] = entry
+        while len(self._entries) > self.maxEntries:
+            self._forget(next(iter(self._entries)))
+        return entry
+
+
+    def invalidate(self, path=None):
+        """
+        Forget about a file, or all of them.
+
+        @param path: The path of the file to forget about, or L{None} to
+            forget about all of them.
+        @type path: L{filepath.FilePath}
+        """
+        if path is None:
+            for key in list(self._entries):
+                self._forget(key)
+        else:
+            self._forget(path.path)
+
+
+    def _readContent(self, entry, fileObject, size):
+        """
+        Keep the contents of a file in its entry, if it is small enough.
+
+        @param entry: The L{_FileCacheEntry} for the file.
+
+        @param fileObject: The file, opened for reading.  It is read from its
+            current position, and then returned there.
+
+        @param size: The size of the file.
+        @type size: L{int}
+        """
+        if size > self.maxFileSize:
+            return
+        position = fileObject.tell()
+        content = fileObject.read(size + 1)
+        fileObject.seek(position)
+        # The file may have changed since it was stat()ed.
+        if len(content) == size:
+            entry.content = content
+
+
+    def _encode(self, entry, encoder, coding):
+        """
+        Encode the contents of a file, or find them already encoded.
+
+        @param entry: The L{_FileCacheEntry} for the file, the contents of
+            which have been kept.
+
+        @param encoder: The L{_IRequestEncoder<iweb._IRequestEncoder>} with
+            which to encode the contents, if they have not been already.  It
+            is finished with.
+
+        @param coding: The content coding C{encoder} applies.
+        @type coding: L{bytes}
+
+        @return: The encoded contents.
+        @rtype: L{bytes}
+        """
+        encoded = entry.encoded.get(coding)
+        if encoded is None:
+            encoded = encoder.encode(entry.content) + encoder.finish()
+            entry.encoded[coding] = encoded
+        return encoded
+
+
+    def _watch(self, path, key):
+        """
+        Watch a file for changes with C{_notifier}.
+
+        @param path: The path of the file.
+        @type path: L{filepath.FilePath}
+
+        @param key: The key of the file's entry.
+        """
+        from twisted.internet import inotify
+        path = path.asBytesMode()
+        mask = (inotify.IN_MODIFY | inotify.IN_ATTRIB | inotify.IN_MOVE_SELF |
+                inotify.IN_DELETE_SELF)
+        try:
+            self._notifier.watch(path, mask, callbacks=[self._changed])
+        except inotify.INotifyError:
+            return
+        self._watched[path.path] = key
+
+
+    def _changed(self, ignored, path, mask):
+        """
+        Forget about a file which has changed.
+
+        This is called by C{_notifier}.
+
+        @param path: The path of the file.
+        @type path: L{filepath.FilePath}
+        """
+        key = self._watched.get(path.path)
+        if key is not None:
+            self._forget(key)
+
+
+    def _forget(self, key):
+        """
+        Forget about a file, and stop watching it.
+
+        @param key: The key of the file's entry.
+        """
+        self._entries.pop(key, None)
+        if self._notifier is not None:
+            path = filepath.FilePath(key).asBytesMode()
+            if self._watched.pop(path.path, None) is not None:
+                try:
+                    self._notifier.ignore(path)
+                except KeyError:
+                    # It stopped being watched when it was deleted.
+                    pass
+
+
+
 class File(resource.Resource, filepath.FilePath):
     """
     File is a resource that represents a plain non-interpreted file
@@ -186,6 +499,17 @@ class File(resource.Resource, filepath.FilePath):
 
     @cvar childNotFound: L{Resource} used to render 404 Not Found error pages.
     @cvar forbidden: L{Resource} used to render 403 Forbidden error pages.
+
+    @ivar cache: A L{FileCache} of information about this file and the files
+        in this directory, shared with the L{File}s created for its children,
+        or L{None} (the default) for none.  (Since 16.5)
+
+    @ivar precompressed: A sequence of C{(coding, extension)} pairs, such as
+        C{[("br", ".br"), ("gzip", ".gz")]}, in order of preference.  If a
+        request accepts one of the content codings and there is a file named
+        with the extension appended to this file's name, that file is served
+        instead, with the coding as its I{Content-Encoding}.  Empty by
+        default.  (Since 16.5)
     """
 
     contentTypes = loadMimeTypes()
@@ -201,6 +525,10 @@ class File(resource.Resource, filepath.FilePath):
 
     type = None
 
+    cache = None
+
+    precompressed = ()
+
     def __init__(self, path, defaultType="text/html", ignoredExts=(), registry=None, allowExt=0):
         """
         Create a file with the given path.
@@ -268,7 +596,7 @@ class File(resource.Resource, filepath.FilePath):
 
         If C{path} is the empty string, return a L{DirectoryLister} instead.
         """
-        self.restat(reraise=False)
+        self._restat(self)
 
         if not self.isdir():
             return self.childNotFound
@@ -283,6 +611,8 @@ class File(resource.Resource, filepath.FilePath):
             if fpath is None:
                 return self.directoryListing()
 
+        if self.cache is not None:
+            self.cache.restat(fpath)
         if not fpath.exists():
             fpath = fpath.siblingExtensionSearch(*self.ignoredExts)
             if fpath is None:
@@ -299,6 +629,23 @@ class File(resource.Resource, filepath.FilePath):
         return self.createSimilarFile(fpath.path)
 
 
+    def _restat(self, path):
+        """
+        Update the C{stat} information of a path, using C{self.cache} if
+        there is one.
+
+        @param path: The path to update.
+        @type path: L{filepath.FilePath}
+
+        @return: The cache's L{_FileCacheEntry} for the path, or L{None} if
+            there is no cache or the path does not exist.
+        """
+        if self.cache is None:
+            path.restat(False)
+            return None
+        return self.cache.restat(path)
+
+
     # methods to allow subclasses to e.g. decrypt files on the fly:
     def openForReading(self):
         """Open a file and return it."""
@@ -580,13 +927,17 @@ class File(resource.Resource, filepath.FilePath):
         Begin sending the contents of this L{File} (or a subset of the
         contents, based on the 'range' header) to the given request.
         """
-        self.restat(False)
+        entry = self._restat(self)
 
         if self.type is None:
-            self.type, self.encoding = getTypeAndEncoding(self.basename(),
-                                                          self.contentTypes,
-                                                          self.contentEncodings,
-                                                          self.defaultType)
+            if entry is not None and entry.typeAndEncoding is not None:
+                self.type, self.encoding = entry.typeAndEncoding
+            else:
+                self.type, self.encoding = getTypeAndEncoding(
+                    self.basename(), self.contentTypes,
+                    self.contentEncodings, self.defaultType)
+                if entry is not None:
+                    entry.typeAndEncoding = self.type, self.encoding
 
         if not self.exists():
             return self.childNotFound.render(request)
@@ -594,17 +945,38 @@ class File(resource.Resource, filepath.FilePath):
         if self.isdir():
             return self.redirect(request)
 
-        request.setHeader(b'accept-ranges', b'bytes')
+        if self.precompressed:
+            variant = self._findPrecompressed(request, entry)
+            if variant is not None:
+                return variant.render_GET(request)
 
-        try:
-            fileForReading = self.openForReading()
-        except IOError as e:
-            if e.errno == errno.EACCES:
-                return self.forbidden.render(request)
-            else:
-                raise
+        request.setHeader(b'accept-ranges', b'bytes')
 
-        if request.setLastModified(self.getModificationTime()) is http.CACHED:
+        if entry is not None and entry.content is not None:
+            fileForReading = BytesIO(entry.content)
+        else:
+            try:
+                fileForReading = self.openForReading()
+            except IOError as e:
+                if e.errno == errno.EACCES:
+                    return self.forbidden.render(request)
+                else:
+                    raise
+
+        encoder = getattr(request, '_encoder', None)
+        if encoder is not None:
+            coding = b','.join(
+                request.responseHeaders.getRawHeaders(b'content-encoding', []))
+
+        cached = request.setLastModified(self.getModificationTime())
+        if entry is not None:
+            etag = entry.etag
+            if encoder is not None:
+                # A strong validator must differ between content codings.
+                etag = etag[:-1] + b'-' + coding + b'"'
+            if request.setETag(etag) is http.CACHED:
+                cached = http.CACHED
+        if cached is http.CACHED:
             # `setLastModified` also sets the response code for us, so if the
             # request is cached, we close the file now that we've made sure that
             # the request would otherwise succeed and return an empty body.
@@ -619,7 +991,28 @@ class File(resource.Resource, filepath.FilePath):
             fileForReading.close()
             return b''
 
+        if entry is not None and entry.content is None:
+            self.cache._readContent(
+                entry, fileForReading, self.getFileSize())
+
+        if (encoder is not None and entry is not None and
+                entry.content is not None and not self.encoding and
+                request.getHeader(b'range') is None):
+            # Encode all of the file at once, or use the encoded contents
+            # from last time, rather than encoding it as it is written.
+            data = self.cache._encode(entry, encoder, coding)
+            request._encoder = None
+            fileForReading.close()
+            self._setContentHeaders(request, len(data))
+            request.setResponseCode(http.OK)
+            return data
+
         producer = self.makeProducer(request, fileForReading)
+        openForReading = getattr(
+            File.openForReading, '__func__', File.openForReading)
+        if getattr(self.openForReading, '__func__', None) is not openForReading:
+            # Subclasses may e.g. decrypt files on the fly.
+            producer._fileWrites = False
         producer.start()
 
         # and make sure the connection doesn't get closed
@@ -627,6 +1020,42 @@ class File(resource.Resource, filepath.FilePath):
     render_HEAD = render_GET
 
 
+    def _findPrecompressed(self, request, entry):
+        """
+        Find a precompressed variant of this file, as described by
+        C{precompressed}, which the request accepts.
+
+        @param request: The request.
+
+        @param entry: The cache's L{_FileCacheEntry} for this file, or
+            L{None}.
+
+        @return: A L{File} for the variant, or L{None} if there is none.
+        """
+        request.responseHeaders.addRawHeader(b'vary', b'accept-encoding')
+        accepted = _acceptedEncodings(request)
+        for coding, extension in self.precompressed:
+            if coding not in accepted:
+                continue
+            if entry is not None and entry.siblings.get(extension) is False:
+                continue
+            sibling = self.siblingExtension(
+                filepath._coerceToFilesystemEncoding(self.path, extension))
+            if entry is not None:
+                self.cache.restat(sibling)
+                entry.siblings[extension] = sibling.isfile()
+            if sibling.isfile():
+                variant = self.createSimilarFile(sibling.path)
+                variant.type = self.type
+                variant.encoding = coding
+                variant.precompressed = ()
+                # It should not be compressed again.
+                if getattr(request, '_encoder', None) is not None:
+                    request._encoder = None
+                return variant
+        return None
+
+
     def redirect(self, request):
         return redirectTo(_addSlash(request), request)
 
@@ -648,21 +1077,72 @@ class File(resource.Resource, filepath.FilePath):
         f.processors = self.processors
         f.indexNames = self.indexNames[:]
         f.childNotFound = self.childNotFound
+        f.cache = self.cache
+        f.precompressed = self.precompressed
         return f
 
 
 
+# The types of file objects opened straight from the file system, the file
+# descriptors of which may be handed to the transport: a file object of
+# another type, such as gzip.GzipFile, may read something else from its file
+# descriptor.  On Python 2, FilePath.open returns a file.
+_plainFileTypes = (io.FileIO,) + tuple(
+    fileType for fileType in [getattr(types, 'FileType', None)]
+    if fileType is not None)
+
+
+
+def _isPlainFile(fileObject):
+    """
+    Determine whether the contents of a file object are the contents of the
+    file its file descriptor refers to.
+
+    @param fileObject: The file object.
+
+    @return: C{True} if C{fileObject} is a file opened from the file system
+        with L{open}, or C{False} if it might be decoding, decrypting or
+        otherwise transforming what it reads.
+    @rtype: L{bool}
+    """
+    fileType = type(fileObject)
+    if fileType is io.BufferedReader:
+        return type(fileObject.raw) in _plainFileTypes
+    return fileType in _plainFileTypes
+
+
+
 @implementer(interfaces.IPullProducer)
 class StaticProducer(object):
     """
     Superclass for classes that implement the business of producing.
 
+    If the request's transport can write parts of a file itself (see
+    L{abstract.FileDescriptor.writeFile}), as a TCP connection can with
+    C{sendfile(2)}, subclasses have it do so rather than reading the file
+    into memory and writing that to the request.
+
     @ivar request: The L{IRequest} to write the contents of the file to.
     @ivar fileObject: The file the contents of which to write to the request.
+
+    @ivar _fileWrites: C{False} if the file must be read and written to the
+        request even if the transport could write it itself, as when the file
+        was opened by an overridden L{File.openForReading}.
+
+    @ivar _transport: The transport which writes the file, or L{None} if the
+        file is being read and written to the request.
+
+    @ivar _fileParts: If C{_transport} is not L{None}, an iterator of the
+        C{(separator, offset, size)} parts of the response left to write,
+        which are written as C{separator} followed by C{size} bytes of the
+        file starting at C{offset}.
     """
 
     bufferSize = abstract.FileDescriptor.bufferSize
 
+    _fileWrites = True
+    _transport = None
+    _fileParts = None
 
     def __init__(self, request, fileObject):
         """
@@ -676,6 +1156,66 @@ class StaticProducer(object):
         raise NotImplementedError(self.start)
 
 
+    def _findFileTransport(self):
+        """
+        Find out whether the request's transport can write the file itself,
+        and if so, remember it as C{_transport}.
+
+        It can if it is a TCP connection without TLS (rather than, say, an
+        HTTP/2 stream or a protocol wrapper such as
+        L{twisted.protocols.tls.TLSMemoryBIOProtocol}, which may forward
+        attribute lookups to the connection it wraps), and nothing else needs
+        to see the response body on its way there: it is not being encoded
+        or chunked, and the file is a plain file.  The response headers are
+        written to find out.
+
+        @return: C{True} if the transport can write the file, in which case
+            C{_fileParts} should be set and the parts written with
+            L{_resumeWritingFile}.
+        @rtype: L{bool}
+        """
+        request = self.request
+        transport = getattr(request, 'transport', None)
+        if not self._fileWrites:
+            return False
+        # Only a transport whose class declares it can write files will do:
+        # protocol wrappers forward unknown attributes to their transport.
+        if not (getattr(type(transport), 'fileWrites', False) and
+                transport.fileWrites):
+            return False
+        if getattr(request, '_encoder', None) is not None:
+            return False
+        if not _isPlainFile(self.fileObject):
+            return False
+        try:
+            self.fileObject.fileno()
+        except (AttributeError, IOError, ValueError):
+            return False
+        request.write(b'')
+        if getattr(request, 'chunked', False):
+            return False
+        self._transport = transport
+        return True
+
+
+    def _resumeWritingFile(self):
+        """
+        Have the request's transport write the next part of the response, or
+        finish it if there are no more.
+        """
+        for separator, offset, size in self._fileParts:
+            if separator:
+                self.request.write(separator)
+            if size:
+                self.request.sentLength += size
+                self._transport.writeFile(
+                    self.fileObject.fileno(), offset, size)
+                return
+        self.request.unregisterProducer()
+        self.request.finish()
+        self.stopProducing()
+
+
     def resumeProducing(self):
         raise NotImplementedError(self.resumeProducing)
 
@@ -699,12 +1239,19 @@ class NoRangeStaticProducer(StaticProducer):
     """
 
     def start(self):
+        if self._findFileTransport():
+            offset = self.fileObject.tell()
+            size = os.fstat(self.fileObject.fileno()).st_size - offset
+            self._fileParts = iter([(b'', offset, size)])
         self.request.registerProducer(self, False)
 
 
     def resumeProducing(self):
         if not self.request:
             return
+        if self._transport is not None:
+            self._resumeWritingFile()
+            return
         data = self.fileObject.read(self.bufferSize)
         if data:
             # this .write will spin the reactor, calling .doWrite and then
@@ -739,12 +1286,17 @@ class SingleRangeStaticProducer(StaticProducer):
     def start(self):
         self.fileObject.seek(self.offset)
         self.bytesWritten = 0
+        if self._findFileTransport():
+            self._fileParts = iter([(b'', self.offset, self.size)])
         self.request.registerProducer(self, 0)
 
 
     def resumeProducing(self):
         if not self.request:
             return
+        if self._transport is not None:
+            self._resumeWritingFile()
+            return
         data = self.fileObject.read(
             min(self.bufferSize, self.size - self.bytesWritten))
         if data:
@@ -783,6 +1335,8 @@ class MultipleRangeStaticProducer(StaticProducer):
     def start(self):
         self.rangeIter = iter(self.rangeInfo)
         self._nextRange()
+        if self._findFileTransport():
+            self._fileParts = iter(self.rangeInfo)
         self.request.registerProducer(self, 0)
 
 
@@ -795,6 +1349,9 @@ class MultipleRangeStaticProducer(StaticProducer):
     def resumeProducing(self):
         if not self.request:
             return
+        if self._transport is not None:
+            self._resumeWritingFile()
+            return
         data = []
         dataLength = 0
         done = False
@@ -9,12 +9,15 @@ Support for creating a service which runs a web server.
 from __future__ import absolute_import, division
 
 import os
+import signal
+import sys
 
 from twisted.web import server, static, script, demo, wsgi
-from twisted.internet import interfaces, reactor
+from twisted.internet import interfaces, reactor, defer
 from twisted.python import usage, reflect, threadpool
 from twisted.python.compat import _PY3
 from twisted.application import internet, service, strports
+from twisted.runner.procmon import ProcessMonitor
 
 if not _PY3:
     # FIXME: https://twistedmatrix.com/trac/ticket/8009
@@ -43,6 +46,10 @@ class Options(usage.Options):
                       "SSL certificate to use for HTTPS. "],
                      ["privkey", "k", "server.pem",
                       "SSL certificate to use for HTTPS."],
+                     ["workers", None, None,
+                      "Number of worker processes to start, each serving "
+                      "--port (which must be a TCP port) with SO_REUSEPORT "
+                      "set.", int],
                      ]
 
     optFlags = [
@@ -73,6 +80,18 @@ demo webserver that has the Test class from twisted.web.demo in it."""
         usage.Options.__init__(self)
         self['indexes'] = []
         self['root'] = None
+        self['arguments'] = []
+
+
+    def parseOptions(self, options=None):
+        """
+        Parse C{options}, remembering them so that they can be passed on to
+        worker processes.
+        """
+        if options is None:
+            options = sys.argv[1:]
+        self['arguments'] = list(options)
+        usage.Options.parseOptions(self, options)
 
 
     def opt_index(self, indexName):
@@ -192,6 +211,9 @@ demo webserver that has the Test class from twisted.web.demo in it."""
 
         If no server port was supplied, select a default appropriate for the
         other options supplied.
+
+        If worker processes were requested, check that they can share the
+        server port, and arrange for them to set C{SO_REUSEPORT} on it.
         """
         if self['https']:
             try:
@@ -205,6 +227,34 @@ demo webserver that has the Test class from twisted.web.demo in it."""
                 self['port'] = 'unix:' + path
             else:
                 self['port'] = 'tcp:8080'
+        if self['workers'] is not None:
+            if self['workers'] < 1:
+                raise usage.UsageError("--workers must be at least 1.")
+            if (self['https'] or (not _PY3 and self['personal']) or
+                    self['port'].split(':', 1)[0] not in ('tcp', 'tcp6')):
+                raise usage.UsageError(
+                    "--workers can only be used with a TCP --port.")
+            self['port'] += ':reusePort=1'
+
+
+    def workerArguments(self):
+        """
+        Compute the command line arguments to run each worker process with.
+
+        @return: The arguments this plugin was given, without C{--workers}
+            and with C{--port} set to listen with C{SO_REUSEPORT}.
+        @rtype: L{list} of L{str}
+        """
+        arguments = []
+        skipNext = False
+        for argument in self['arguments']:
+            if skipNext:
+                skipNext = False
+            elif argument == '--workers':
+                skipNext = True
+            elif not argument.startswith('--workers='):
+                arguments.append(argument)
+        return arguments + ['--port', self['port']]
 
 
 
@@ -220,7 +270,139 @@ def makePersonalServerFactory(site):
 
 
 
+class _WorkerMonitor(ProcessMonitor):
+    """
+    A L{ProcessMonitor} for the worker processes started by the C{--workers}
+    option.
+
+    Stopping it (for example, because this process received C{SIGTERM})
+    sends C{SIGTERM} to each worker and waits for them to exit.  Receiving
+    C{SIGHUP} restarts all of the workers.
+
+    @ivar _stopped: A L{Deferred} which fires when the last worker has
+        exited after C{stopService} was called, or L{None}.
+
+    @ivar _previousHandler: The C{SIGHUP} handler replaced by
+        C{startService}.
+    """
+    _stopped = None
+    _previousHandler = None
+
+    def startService(self):
+        """
+        Start the workers and handle C{SIGHUP}.
+        """
+        ProcessMonitor.startService(self)
+        if getattr(signal, 'SIGHUP', None) is not None:
+            self._previousHandler = signal.signal(
+                signal.SIGHUP, self._sighupReceived)
+
+
+    def _sighupReceived(self, signum, frame):
+        """
+        Restart all of the workers.
+        """
+        self._reactor.callFromThread(self.restartAll)
+
+
+    def stopService(self):
+        """
+        Stop handling C{SIGHUP} and stop all of the workers.
+
+        @return: A L{Deferred} which fires when all of the workers have
+            exited.
+        """
+        if self._previousHandler is not None:
+            signal.signal(signal.SIGHUP, self._previousHandler)
+            self._previousHandler = None
+        ProcessMonitor.stopService(self)
+        if not self.protocols:
+            return defer.succeed(None)
+        self._stopped = defer.Deferred()
+        return self._stopped
+
+
+    def connectionLost(self, name):
+        """
+        Restart the worker which exited, or, if this service is stopping and
+        it was the last one, fire C{_stopped}.
+        """
+        ProcessMonitor.connectionLost(self, name)
+        if self._stopped is not None and not self.protocols:
+            stopped, self._stopped = self._stopped, None
+            stopped.callback(None)
+
+
+
+def _twistArguments(options):
+    """
+    Compute the C{twist} options to run each worker process with, so that
+    the workers use the same reactor and logging as this process.
+
+    @param options: The options of the command running the web plugin, such
+        as L{twisted.application.twist._options.TwistOptions}, or L{None}.
+        Options this command was not given, or which C{twist} does not have,
+        are left out.
+    @type options: L{dict}
+
+    @return: The options.
+    @rtype: L{list} of L{str}
+    """
+    if options is None:
+        return []
+    arguments = []
+    reactorName = options.get('reactorName')
+    if reactorName not in (None, 'default'):
+        arguments.append('--reactor=' + reactorName)
+    logLevel = options.get('logLevel')
+    if logLevel is not None:
+        arguments.append('--log-level=' + logLevel.name)
+    logFile = options.get('logFile')
+    if logFile is sys.stderr:
+        arguments.append('--log-file=+')
+    elif logFile is not None and logFile is not sys.stdout:
+        arguments.append('--log-file=' + logFile.name)
+    logFormat = options.get('logFormat')
+    if logFormat is not None:
+        arguments.append('--log-format=' + logFormat)
+    return arguments
+
+
+
+def makeWorkerService(config):
+    """
+    Create a service which runs C{config['workers']} copies of the web
+    server, each in its own process, all listening on the same port.
+
+    Each worker runs C{twist web} with the arguments given by
+    L{Options.workerArguments}.  The reactor, log level, log file and log
+    format given to the C{twist} command running this plugin are given to
+    each worker too.  Workers which exit are restarted.
+
+    @param config: The parsed options.
+    @type config: L{Options}
+
+    @return: The service.
+    @rtype: L{ProcessMonitor}
+
+    @since: 16.5
+    """
+    monitor = _WorkerMonitor()
+    arguments = [
+        sys.executable, '-c',
+        'from twisted.application.twist._twist import Twist; Twist.main()'
+        ] + _twistArguments(config.parent) + ['web'] + config.workerArguments()
+    for i in range(config['workers']):
+        monitor.addProcess('web-worker-%d' % (i,), arguments,
+                           env=dict(os.environ))
+    return monitor
+
+
+
 def makeService(config):
+    if config['workers'] is not None:
+        return makeWorkerService(config)
+
     s = service.MultiService()
     if config['root']:
         root = config['root']
@@ -34,8 +34,10 @@ from zope.interface import implementer
 
 from xml.sax import make_parser, handler
 
+from twisted.internet.task import TaskStopped
 from twisted.python import log
 from twisted.python.compat import NativeStringIO, items
+from twisted.python.failure import Failure
 from twisted.python.filepath import FilePath
 from twisted.web._stan import Tag, slot, Comment, CDATA, CharRef
 from twisted.web.iweb import ITemplateLoader
@@ -357,6 +359,54 @@ def _flatsaxParse(fl):
     return s.document
 
 
+class _CompilingLoader(object):
+    """
+    Mixin for L{ITemplateLoader} implementations whose documents are rendered
+    over and over again, which compiles them the second time they are loaded
+    so that rendering them does as little work as possible.
+
+    The markup in the document which does not depend on slots or renderers is
+    serialized once, when it is compiled, instead of being serialized again
+    each time the document is rendered.  Changes made to the document after
+    it has been loaded twice will not be rendered, so this is only for
+    loaders of documents which they parse themselves, and not for loaders
+    such as L{TagLoader} of objects which applications may go on changing.
+
+    @ivar _loadedFrom: The items in the document returned by C{load} the last
+        time, or L{None} if it has not been loaded.
+    @type _loadedFrom: L{list} or L{None}
+
+    @ivar _compiled: The compiled document, or L{None} if it has not been
+        compiled.
+    @type _compiled: L{list} or L{None}
+    """
+
+    _loadedFrom = None
+    _compiled = None
+
+    def _loadCompiled(self):
+        """
+        Load the document, compiling it if the same document has been loaded
+        before.
+
+        @return: An object which renders the same as the document returned by
+            C{load}.
+        """
+        document = self.load()
+        if not isinstance(document, list):
+            return document
+        loadedFrom = self._loadedFrom
+        if (loadedFrom is not None and len(loadedFrom) == len(document) and
+                all(a is b for a, b in zip(loadedFrom, document))):
+            if self._compiled is None:
+                self._compiled = _compileTree(document)
+            return self._compiled
+        self._loadedFrom = list(document)
+        self._compiled = None
+        return document
+
+
+
 @implementer(ITemplateLoader)
 class TagLoader(object):
     """
@@ -380,10 +430,14 @@ class TagLoader(object):
 
 
 @implementer(ITemplateLoader)
-class XMLString(object):
+class XMLString(_CompilingLoader):
     """
     An L{ITemplateLoader} that loads and parses XML from a string.
 
+    To render it faster, the parsed document is compiled the second time it
+    is rendered; changes made to the document returned by L{load} after that
+    are not rendered.
+
     @ivar _loadedTemplate: The loaded document.
     @type _loadedTemplate: a C{list} of Stan objects.
     """
@@ -413,10 +467,14 @@ class XMLString(object):
 
 
 @implementer(ITemplateLoader)
-class XMLFile(object):
+class XMLFile(_CompilingLoader):
     """
     An L{ITemplateLoader} that loads and parses XML from a file.
 
+    To render it faster, the parsed document is compiled the second time it
+    is rendered; changes made to the document returned by L{load} after that
+    are not rendered.
+
     @ivar _loadedTemplate: The loaded document, or L{None}, if not loaded.
     @type _loadedTemplate: a C{list} of Stan objects, or L{None}.
 
@@ -537,6 +595,11 @@ def renderElement(request, element,
 
     @returns: NOT_DONE_YET
 
+    A large element is rendered a little at a time, and, unless the request
+    already has a producer, rendering stops while the request is paused, so
+    that a large response is neither held in memory nor generated all at
+    once.  Rendering is then abandoned if the request's connection is lost.
+
     @since: 12.1
     """
     if doctype is not None:
@@ -546,9 +609,12 @@ def renderElement(request, element,
     if _failElement is None:
         _failElement = twisted.web.util.FailureElement
 
-    d = flatten(request, element, request.write)
+    d = _flattenToConsumer(request, element, request)
 
     def eb(failure):
+        if failure.check(TaskStopped):
+            # The request's connection was lost, so there is no one to tell.
+            return failure
         log.err(failure, "An error occurred while rendering the response.")
         if request.site.displayTracebacks:
             return flatten(request, _failElement(failure),
@@ -560,12 +626,17 @@ def renderElement(request, element,
                  b'color:#F00'
                  b'">An error occurred while rendering the response.</div>'))
 
+    def finish(result):
+        if not (isinstance(result, Failure) and result.check(TaskStopped)):
+            request.finish()
+
     d.addErrback(eb)
-    d.addBoth(lambda _: request.finish())
+    d.addBoth(finish)
     return NOT_DONE_YET
 
 
 
 from twisted.web._element import Element, renderer
 from twisted.web._flatten import flatten, flattenString
+from twisted.web._flatten import _compileTree, _flattenToConsumer
 import twisted.web.util
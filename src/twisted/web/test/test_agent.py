@@ -17,6 +17,7 @@ from twisted.web._newclient import RequestNotSent, RequestTransmissionFailed
 from twisted.web._newclient import ResponseNeverReceived, ResponseFailed
 from twisted.web._newclient import PotentialDataLoss
 from twisted.internet import defer, task
+from twisted.python import log
 from twisted.python.failure import Failure
 from twisted.python.compat import cookielib, intToBytes
 from twisted.python.components import proxyForInterface
@@ -383,7 +384,7 @@ class DummyFactory(Factory):
     """
     Create C{StubHTTPProtocol} instances.
     """
-    def __init__(self, quiescentCallback):
+    def __init__(self, quiescentCallback, lostCallback=None):
         pass
 
     protocol = StubHTTPProtocol
@@ -1365,6 +1366,21 @@ class AgentHTTPSTests(TestCase, FakeReactorAndConnectMixin):
         self.assertIs(trustRoot.context, connection.get_context())
 
 
+    def test_sharedSessionCache(self):
+        """
+        The connection creators returned by
+        L{BrowserLikePolicyForHTTPS.creatorForNetloc} share the policy's
+        L{ssl.TLSSessionCache}, so that connections resume the sessions
+        established by earlier connections to the same host.
+        """
+        policy = BrowserLikePolicyForHTTPS()
+        self.assertIsInstance(policy._sessionCache, ssl.TLSSessionCache)
+        first = policy.creatorForNetloc(b"example.com", 443)
+        second = policy.creatorForNetloc(b"example.org", 443)
+        self.assertIs(first._sessionCache, policy._sessionCache)
+        self.assertIs(second._sessionCache, policy._sessionCache)
+
+
 
 class WebClientContextFactoryTests(TestCase):
     """
@@ -1705,6 +1721,513 @@ class HTTPConnectionPoolRetryTests(TestCase, FakeReactorAndConnectMixin):
 
 
 
+class RecordingEndpoint(object):
+    """
+    An endpoint which connects the protocols built by the given factory to
+    fake transports, and records them.
+
+    @ivar protocols: The protocols which have been connected.
+    """
+
+    def __init__(self):
+        self.protocols = []
+
+
+    def connect(self, factory):
+        protocol = factory.buildProtocol(None)
+        protocol.makeConnection(StringTransport())
+        self.protocols.append(protocol)
+        return succeed(protocol)
+
+
+
+class HTTPConnectionPoolLimitTests(TestCase, FakeReactorAndConnectMixin):
+    """
+    Tests for L{HTTPConnectionPool.maxConnectionsPerHost},
+    L{HTTPConnectionPool.pipelineDepth} and L{HTTPConnectionPool.statistics}.
+    """
+    key = (b"http", b"example.com", 80)
+
+    def setUp(self):
+        self.fakeReactor = self.Reactor()
+        self.pool = HTTPConnectionPool(self.fakeReactor)
+        self.pool.maxConnectionsPerHost = 2
+        self.pool.retryAutomatically = False
+        self.endpoint = RecordingEndpoint()
+
+
+    def getConnection(self):
+        """
+        Get a connection from the pool for C{self.key}.
+        """
+        return self.pool.getConnection(self.key, self.endpoint)
+
+
+    def request(self, connection, method=b'GET'):
+        """
+        Issue a persistent request using C{connection}.
+        """
+        return connection.request(
+            Request(method, b'/', Headers({b'host': [b'example.com']}), None,
+                    persistent=True))
+
+
+    def respond(self, protocol, body=b''):
+        """
+        Deliver a complete persistent response to C{protocol}.
+        """
+        protocol.dataReceived(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Length: " + intToBytes(len(body)) + b"\r\n"
+            b"\r\n" + body)
+
+
+    def assertStatistics(self, idle, busy, waiting, created, reused):
+        """
+        Assert that the pool's statistics are as given.
+        """
+        statistics = self.pool.statistics()
+        self.assertEqual(
+            (statistics.idleConnectionCount, statistics.busyConnectionCount,
+             statistics.waitingRequestCount,
+             statistics.createdConnectionCount,
+             statistics.reusedConnectionCount),
+            (idle, busy, waiting, created, reused))
+
+
+    def test_unlimitedByDefault(self):
+        """
+        By default, L{HTTPConnectionPool} opens as many connections as are
+        asked for.
+        """
+        pool = HTTPConnectionPool(self.fakeReactor)
+        for i in range(10):
+            self.successResultOf(pool.getConnection(self.key, self.endpoint))
+        self.assertEqual(len(self.endpoint.protocols), 10)
+
+
+    def test_limitQueuesRequests(self):
+        """
+        Once C{maxConnectionsPerHost} connections are open, further requests
+        for a connection wait.
+        """
+        first = self.successResultOf(self.getConnection())
+        second = self.successResultOf(self.getConnection())
+        self.assertNotIdentical(first, second)
+        self.assertNoResult(self.getConnection())
+        self.assertEqual(len(self.endpoint.protocols), 2)
+        self.assertStatistics(idle=0, busy=2, waiting=1, created=2, reused=0)
+
+
+    def test_limitPerKey(self):
+        """
+        C{maxConnectionsPerHost} is enforced for each key separately.
+        """
+        self.getConnection()
+        self.getConnection()
+        self.successResultOf(self.pool.getConnection(
+            (b"http", b"example.org", 80), self.endpoint))
+
+
+    def test_idleConnectionToWaiter(self):
+        """
+        When a busy connection becomes idle, it is given to the first request
+        which is waiting for one, once the response is finished.
+        """
+        first = self.successResultOf(self.getConnection())
+        self.getConnection()
+        waiting = self.getConnection()
+        self.request(first)
+        self.respond(first)
+        self.assertNoResult(waiting)
+        self.fakeReactor.advance(0)
+        self.assertIdentical(self.successResultOf(waiting), first)
+        self.assertEqual(self.pool._connections[self.key], [])
+        self.assertStatistics(idle=0, busy=2, waiting=0, created=2, reused=1)
+
+
+    def test_waitersServedInOrder(self):
+        """
+        Requests waiting for a connection are given connections in the order
+        in which they asked for them.
+        """
+        first = self.successResultOf(self.getConnection())
+        second = self.successResultOf(self.getConnection())
+        waiting = [self.getConnection() for i in range(3)]
+        for connection in (second, first):
+            self.request(connection)
+            self.respond(connection)
+            self.fakeReactor.advance(0)
+        self.assertIdentical(self.successResultOf(waiting[0]), second)
+        self.assertIdentical(self.successResultOf(waiting[1]), first)
+        self.assertNoResult(waiting[2])
+
+
+    def test_newRequestsQueueBehindWaiters(self):
+        """
+        While requests are waiting, a new request waits behind them even if a
+        connection has just become idle.
+        """
+        first = self.successResultOf(self.getConnection())
+        self.getConnection()
+        waiting = self.getConnection()
+        self.request(first)
+        self.respond(first)
+        later = self.getConnection()
+        self.fakeReactor.advance(0)
+        self.assertIdentical(self.successResultOf(waiting), first)
+        self.assertNoResult(later)
+
+
+    def test_lostConnectionLetsWaiterConnect(self):
+        """
+        When a busy connection is lost, the first waiting request is given a
+        new connection.
+        """
+        first = self.successResultOf(self.getConnection())
+        self.getConnection()
+        waiting = self.getConnection()
+        first.connectionLost(Failure(ConnectionDone()))
+        connection = self.successResultOf(waiting)
+        self.assertIdentical(connection, self.endpoint.protocols[2])
+        self.assertStatistics(idle=0, busy=2, waiting=0, created=3, reused=0)
+
+
+    def test_lostIdleConnectionForgotten(self):
+        """
+        When an idle connection is lost, it is removed from the pool and its
+        timeout is cancelled.
+        """
+        connection = self.successResultOf(self.getConnection())
+        self.request(connection)
+        self.respond(connection)
+        timeout = self.pool._timeouts[connection]
+        connection.connectionLost(Failure(ConnectionDone()))
+        self.assertEqual(self.pool._connections[self.key], [])
+        self.assertNotIn(connection, self.pool._timeouts)
+        self.assertTrue(timeout.cancelled)
+        self.assertStatistics(idle=0, busy=0, waiting=0, created=1, reused=0)
+
+
+    def test_cancelWaiting(self):
+        """
+        Cancelling the L{Deferred} for a waiting request stops it waiting.
+        """
+        first = self.successResultOf(self.getConnection())
+        self.getConnection()
+        waiting = self.getConnection()
+        waiting.cancel()
+        self.failureResultOf(waiting, CancelledError)
+        self.assertNotIn(self.key, self.pool._waiting)
+        self.assertStatistics(idle=0, busy=2, waiting=0, created=2, reused=0)
+        first.connectionLost(Failure(ConnectionDone()))
+        self.assertEqual(len(self.endpoint.protocols), 2)
+
+
+    def test_failedConnectionLetsWaiterConnect(self):
+        """
+        If a connection attempt fails, a waiting request may try again.
+        """
+        attempts = []
+
+        class FailingEndpoint(object):
+            def connect(self, factory):
+                attempts.append(factory)
+                d = Deferred()
+                attempts.append(d)
+                return d
+
+        endpoint = FailingEndpoint()
+        first = self.pool.getConnection(self.key, endpoint)
+        self.pool.getConnection(self.key, endpoint)
+        waiting = self.pool.getConnection(self.key, endpoint)
+        self.assertStatistics(idle=0, busy=2, waiting=1, created=0, reused=0)
+        attempts[1].errback(ConnectionRefusedError())
+        self.failureResultOf(first, ConnectionRefusedError)
+        self.assertEqual(len(attempts), 6)
+        self.assertNoResult(waiting)
+        self.assertStatistics(idle=0, busy=2, waiting=0, created=0, reused=0)
+
+
+    def test_cancelledWaiterConnectionFails(self):
+        """
+        If a waiting request stops waiting while a connection is being opened
+        for it, and opening the connection fails, the failure is ignored.
+        """
+        attempts = []
+
+        class FailingEndpoint(object):
+            def connect(self, factory):
+                d = Deferred()
+                attempts.append(d)
+                return d
+
+        endpoint = FailingEndpoint()
+        first = self.pool.getConnection(self.key, endpoint)
+        self.pool.getConnection(self.key, endpoint)
+        waiting = self.pool.getConnection(self.key, endpoint)
+        attempts[0].errback(ConnectionRefusedError())
+        self.failureResultOf(first, ConnectionRefusedError)
+        self.assertEqual(len(attempts), 3)
+        waiting.cancel()
+        self.failureResultOf(waiting, CancelledError)
+        attempts[2].errback(ConnectionRefusedError())
+        self.assertEqual([], self.flushLoggedErrors())
+
+
+    def test_statistics(self):
+        """
+        L{HTTPConnectionPool.statistics} counts idle and busy connections,
+        waiting requests, and the connections which have been created and
+        reused.
+        """
+        self.assertStatistics(idle=0, busy=0, waiting=0, created=0, reused=0)
+        connection = self.successResultOf(self.getConnection())
+        self.request(connection)
+        self.respond(connection)
+        self.assertStatistics(idle=1, busy=0, waiting=0, created=1, reused=0)
+        self.assertIdentical(
+            self.successResultOf(self.getConnection()), connection)
+        self.assertStatistics(idle=0, busy=1, waiting=0, created=1, reused=1)
+
+
+    def test_pipelining(self):
+        """
+        With C{pipelineDepth} set, once C{maxConnectionsPerHost} connections
+        are busy a request which can be pipelined is sent straight away over
+        one of them.
+        """
+        self.pool.maxConnectionsPerHost = 1
+        self.pool.pipelineDepth = 1
+        connection = self.successResultOf(self.getConnection())
+        first = self.request(connection)
+        protocol = self.endpoint.protocols[0]
+        protocol.transport.clear()
+
+        second = self.request(self.successResultOf(self.getConnection()))
+        self.assertTrue(protocol.transport.value().startswith(b'GET / '))
+        self.respond(protocol, b'a')
+        self.respond(protocol, b'b')
+        self.assertEqual(self.successResultOf(first).code, 200)
+        self.assertEqual(self.successResultOf(second).code, 200)
+        self.assertEqual(len(self.endpoint.protocols), 1)
+
+
+    def test_unpipelinableRequestWaits(self):
+        """
+        A request which cannot be pipelined waits for a connection of its own
+        instead.
+        """
+        self.pool.maxConnectionsPerHost = 1
+        self.pool.pipelineDepth = 1
+        connection = self.successResultOf(self.getConnection())
+        self.request(connection)
+        protocol = self.endpoint.protocols[0]
+        protocol.transport.clear()
+
+        second = self.request(
+            self.successResultOf(self.getConnection()), b'POST')
+        self.assertEqual(protocol.transport.value(), b'')
+        self.assertStatistics(idle=0, busy=1, waiting=1, created=1, reused=0)
+        self.respond(protocol)
+        self.fakeReactor.advance(0)
+        self.assertTrue(protocol.transport.value().startswith(b'POST / '))
+        self.respond(protocol)
+        self.assertEqual(self.successResultOf(second).code, 200)
+
+
+    def test_pipelinedRequestRetried(self):
+        """
+        If C{retryAutomatically} is set and the server closes the connection
+        instead of answering a pipelined request, the request is sent again
+        over another connection.
+        """
+        self.pool.maxConnectionsPerHost = 1
+        self.pool.pipelineDepth = 1
+        self.pool.retryAutomatically = True
+        connection = self.successResultOf(self.getConnection())
+        self.request(connection)
+        second = self.request(self.successResultOf(self.getConnection()))
+        protocol = self.endpoint.protocols[0]
+        protocol.dataReceived(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Connection: close\r\n"
+            b"Content-Length: 0\r\n"
+            b"\r\n")
+        protocol.connectionLost(Failure(ConnectionDone()))
+        self.assertEqual(len(self.endpoint.protocols), 2)
+        self.respond(self.endpoint.protocols[1])
+        self.assertEqual(self.successResultOf(second).code, 200)
+
+
+
+class FailingEndpoint(object):
+    """
+    An endpoint which fails to connect, and records the attempts.
+
+    @ivar attempts: The number of attempts which have been made to connect.
+    """
+
+    def __init__(self):
+        self.attempts = 0
+
+
+    def connect(self, factory):
+        self.attempts += 1
+        return defer.fail(ConnectionRefusedError())
+
+
+
+class HTTPConnectionPoolKeepWarmTests(TestCase, FakeReactorAndConnectMixin):
+    """
+    Tests for L{HTTPConnectionPool.keepWarm}.
+    """
+    key = (b"http", b"example.com", 80)
+
+    def setUp(self):
+        self.fakeReactor = self.Reactor()
+        self.pool = HTTPConnectionPool(self.fakeReactor)
+        self.endpoint = RecordingEndpoint()
+
+
+    def test_opensConnections(self):
+        """
+        L{HTTPConnectionPool.keepWarm} opens the given number of connections
+        straight away, and keeps them in the pool until they are needed.
+        """
+        self.pool.keepWarm(self.key, self.endpoint, 2)
+        self.assertEqual(len(self.endpoint.protocols), 2)
+        self.assertEqual(self.pool._connections[self.key],
+                         self.endpoint.protocols)
+        connection = self.successResultOf(
+            self.pool.getConnection(self.key, self.endpoint))
+        self.assertIn(connection._clientProtocol, self.endpoint.protocols)
+        self.assertEqual(len(self.endpoint.protocols), 2)
+
+
+    def test_countsOpenConnections(self):
+        """
+        Connections which are already open to the destination count towards
+        the number to keep open.
+        """
+        self.successResultOf(self.pool.getConnection(self.key, self.endpoint))
+        self.pool.keepWarm(self.key, self.endpoint, 2)
+        self.assertEqual(len(self.endpoint.protocols), 2)
+        self.assertEqual(len(self.pool._connections[self.key]), 1)
+
+
+    def test_replacesLostConnections(self):
+        """
+        When a connection kept open is closed, another is opened to replace
+        it.
+        """
+        self.pool.keepWarm(self.key, self.endpoint, 2)
+        lost = self.endpoint.protocols[0]
+        lost.connectionLost(Failure(ConnectionDone()))
+        self.assertEqual(len(self.endpoint.protocols), 3)
+        self.assertNotIn(lost, self.pool._connections[self.key])
+        self.assertEqual(len(self.pool._connections[self.key]), 2)
+
+
+    def test_replacesTimedOutConnections(self):
+        """
+        Connections kept open which are closed because they have been idle
+        for C{cachedConnectionTimeout} seconds are replaced.
+        """
+        self.pool.keepWarm(self.key, self.endpoint, 1)
+        [first] = self.endpoint.protocols
+        self.fakeReactor.advance(self.pool.cachedConnectionTimeout)
+        first.connectionLost(Failure(ConnectionDone()))
+        self.assertEqual(len(self.endpoint.protocols), 2)
+        self.assertEqual(self.pool._connections[self.key],
+                         self.endpoint.protocols[1:])
+
+
+    def test_maxConnectionsPerHost(self):
+        """
+        No more than C{maxConnectionsPerHost} connections are kept open.
+        """
+        self.pool.maxConnectionsPerHost = 2
+        self.pool.keepWarm(self.key, self.endpoint, 5)
+        self.assertEqual(len(self.endpoint.protocols), 2)
+
+
+    def test_maxPersistentPerHost(self):
+        """
+        The connections kept open remain in the pool, even if there are more
+        of them than C{maxPersistentPerHost}.
+        """
+        self.pool.maxPersistentPerHost = 1
+        self.pool.keepWarm(self.key, self.endpoint, 3)
+        self.assertEqual(len(self.pool._connections[self.key]), 3)
+        for protocol in self.endpoint.protocols:
+            self.assertFalse(protocol.transport.disconnecting)
+
+
+    def test_stop(self):
+        """
+        Passing a minimum of C{0} to L{HTTPConnectionPool.keepWarm} stops
+        connections from being replaced.
+        """
+        self.pool.keepWarm(self.key, self.endpoint, 1)
+        self.pool.keepWarm(self.key, self.endpoint, 0)
+        self.endpoint.protocols[0].connectionLost(Failure(ConnectionDone()))
+        self.assertEqual(len(self.endpoint.protocols), 1)
+
+
+    def test_closeCachedConnections(self):
+        """
+        L{HTTPConnectionPool.closeCachedConnections} stops connections from
+        being replaced.
+        """
+        self.pool.keepWarm(self.key, self.endpoint, 1)
+        self.pool.closeCachedConnections()
+        self.endpoint.protocols[0].connectionLost(Failure(ConnectionDone()))
+        self.assertEqual(len(self.endpoint.protocols), 1)
+
+
+    def test_failureLogged(self):
+        """
+        If a connection cannot be opened, the failure is logged, and no
+        further attempt is made.
+        """
+        messages = []
+        log.addObserver(messages.append)
+        self.addCleanup(log.removeObserver, messages.append)
+        endpoint = FailingEndpoint()
+        self.pool.keepWarm(self.key, endpoint, 1)
+        self.assertEqual(endpoint.attempts, 1)
+        self.assertEqual(self.pool._openCount(self.key), 0)
+        self.assertIn("Could not open a connection",
+                      log.textFromEventDict(messages[-1]))
+
+
+    def test_agent(self):
+        """
+        L{Agent.keepWarm} keeps connections open to the server given by a
+        URI, using the agent's pool.
+        """
+        calls = []
+        self.pool.keepWarm = lambda *args: calls.append(args)
+        agent = client.Agent(self.fakeReactor, pool=self.pool)
+        agent.keepWarm(b"http://example.com/index.html", 3)
+        [(key, endpoint, minimum)] = calls
+        self.assertEqual(key, self.key)
+        self.assertIsInstance(endpoint, TCP4ClientEndpoint)
+        self.assertEqual(minimum, 3)
+
+
+    def test_agentSchemeNotSupported(self):
+        """
+        L{Agent.keepWarm} raises L{SchemeNotSupported} for a URI with an
+        unsupported scheme.
+        """
+        agent = client.Agent(self.fakeReactor, pool=self.pool)
+        self.assertRaises(SchemeNotSupported,
+                          agent.keepWarm, b"gopher://example.com/", 1)
+
+
+
 class CookieTestsMixin(object):
     """
     Mixin for unit tests dealing with cookies.
@@ -18,13 +18,17 @@ from zope.interface import implementer
 from twisted.trial.unittest import TestCase
 from twisted.test.testutils import XMLAssertionMixin
 
-from twisted.internet.defer import passthru, succeed, gatherResults
+from twisted.internet.defer import passthru, succeed, gatherResults, Deferred
+from twisted.internet.task import Clock, Cooperator, TaskStopped
+from twisted.test.proto_helpers import StringTransport
 
 from twisted.web.iweb import IRenderable
 from twisted.web.error import UnfilledSlot, UnsupportedType, FlattenerError
 
 from twisted.web.template import tags, Tag, Comment, CDATA, CharRef, slot
 from twisted.web.template import Element, renderer, TagLoader, flattenString
+from twisted.web._flatten import flatten, _compileTree, _Serialized, _Content
+from twisted.web._flatten import _WRITE_BUFFER_SIZE, _flattenToConsumer
 
 from twisted.web.test._util import FlattenTestCase
 
@@ -392,6 +396,356 @@ class SerializationTests(FlattenTestCase, XMLAssertionMixin):
         return self.assertFlatteningRaises(None, UnsupportedType)
 
 
+class CompileTreeTests(FlattenTestCase):
+    """
+    Tests for L{_compileTree}.
+    """
+
+    def assertCompilesTo(self, root, target):
+        """
+        Assert that C{root} flattens to C{target}, and so does the result of
+        compiling it.
+
+        @return: The result of compiling C{root}.
+        """
+        self.assertFlattensImmediately(root, target)
+        compiled = _compileTree(root)
+        self.assertFlattensImmediately(compiled, target)
+        return compiled
+
+
+    def test_static(self):
+        """
+        A document without slots or renderers is compiled to a single piece
+        of serialized markup.
+        """
+        compiled = self.assertCompilesTo(
+            [tags.html(tags.p('a & b', class_='c<'), tags.br(), CharRef(9731),
+                       CDATA('d'), Comment('e'), Tag('')('f', tags.i('g')))],
+            b'<html><p class="c&lt;">a &amp; b</p><br />&#9731;'
+            b'<![CDATA[d]]><!--e-->f<i>g</i></html>')
+        self.assertEqual(len(compiled), 1)
+        self.assertIsInstance(compiled[0], _Serialized)
+
+
+    def test_slot(self):
+        """
+        The markup around a slot in the contents of a tag is serialized, and
+        the slot is left to be filled when the document is flattened.
+        """
+        root = tags.div(tags.p('a', slot('b')), tags.p('c'))
+        root.fillSlots(b='<b>')
+        self.assertCompilesTo(root, b'<div><p>a&lt;b&gt;</p><p>c</p></div>')
+        compiled = _compileTree(tags.p('a', slot('b'), 'c'))
+        self.assertEqual(
+            [part.data if isinstance(part, _Serialized) else part
+             for part in compiled],
+            [b'<p>a', compiled[1], b'c</p>'])
+        self.assertIsInstance(compiled[1], _Content)
+        self.assertIsInstance(compiled[1].children, slot)
+
+
+    def test_slotInAttribute(self):
+        """
+        A tag with a slot in an attribute is compiled to a tag with compiled
+        children.
+        """
+        compiled = _compileTree(
+            tags.div(tags.a('x', href=slot('href')), tags.i('y')))
+        link = compiled[1].children
+        self.assertIsInstance(link, Tag)
+        self.assertEqual(link.tagName, 'a')
+        self.assertEqual(len(link.children), 1)
+        self.assertEqual(link.children[0].data, b'x')
+        root = Tag('')(compiled)
+        root.fillSlots(href='"&')
+        self.assertFlattensImmediately(
+            root, b'<div><a href="&quot;&amp;">x</a><i>y</i></div>')
+
+
+    def test_renderer(self):
+        """
+        Tags with render directives are left as they are, so that renderers
+        are given the original tag.
+        """
+        class RenderfulElement(Element):
+            @renderer
+            def renderMethod(self, request, tag):
+                return tag('b')
+        inner = tags.span('c', render='renderMethod')
+        root = tags.p('a', inner)
+        compiled = _compileTree(root)
+        self.assertIs(compiled[1].children, inner)
+        self.assertFlattensImmediately(
+            RenderfulElement(TagLoader(compiled)), b'<p>a<span>cb</span></p>')
+
+
+    def test_voidElementWithSlot(self):
+        """
+        A void element with dynamic children is compiled correctly.
+        """
+        root = tags.br(slot('a'))
+        root.fillSlots(a='b')
+        self.assertCompilesTo(root, b'<br>b</br>')
+
+
+    def test_slotData(self):
+        """
+        Tags with slot data are kept, so the slots within them are filled.
+        """
+        root = Tag('')('a', tags.p(slot('b')))
+        root.fillSlots(b='<')
+        self.assertCompilesTo(root, b'a<p>&lt;</p>')
+
+
+    def test_attributeContext(self):
+        """
+        A compiled document flattens the same within an attribute value as
+        the original document does, including text outside of any tag.
+        """
+        def inAttribute(root):
+            return tags.div(title=Element(TagLoader(root)))
+        root = ['a<', tags.p('b&', slot('c')), Tag('')('"', tags.i('d'))]
+        expected = (b'<div title="a&lt;&lt;p&gt;b&amp;amp;e&amp;lt;&lt;/p&gt;'
+                    b'&quot;&lt;i&gt;d&lt;/i&gt;"></div>')
+        original = Tag('')(root)
+        original.fillSlots(c='e<')
+        compiled = Tag('')(_compileTree(root))
+        compiled.fillSlots(c='e<')
+        self.assertFlattensImmediately(inAttribute(original), expected)
+        self.assertFlattensImmediately(inAttribute(compiled), expected)
+
+
+
+class FlattenWriteTests(TestCase):
+    """
+    Tests for the way L{flatten} passes on what it writes.
+    """
+
+    def test_coalesced(self):
+        """
+        Strings flattened one after another are passed on together.
+        """
+        written = []
+        d = flatten(None, [tags.p(str(i)) for i in range(100)], written.append)
+        self.assertEqual(written, [b''.join(
+            b'<p>' + str(i).encode('ascii') + b'</p>' for i in range(100))])
+        return d
+
+
+    def test_flushBeforeDeferred(self):
+        """
+        Everything flattened before a L{Deferred} is passed on before waiting
+        for it.
+        """
+        written = []
+        waiting = Deferred()
+        d = flatten(None, tags.p('a', waiting, 'c'), written.append)
+        self.assertEqual(written, [b'<p>a'])
+        waiting.callback('b')
+        self.assertEqual(written, [b'<p>a', b'bc</p>'])
+        return d
+
+
+    def test_largeChunks(self):
+        """
+        Once enough has been flattened, it is passed on without waiting for
+        flattening to finish.
+        """
+        written = []
+        chunk = u'x' * 1024
+        count = 2 * _WRITE_BUFFER_SIZE // len(chunk)
+        d = flatten(None, [chunk] * count, written.append)
+        self.assertEqual(len(written), 2)
+        self.assertEqual(b''.join(written), b'x' * (count * len(chunk)))
+        return d
+
+
+    def test_writeFails(self):
+        """
+        If passing on what has been flattened raises an exception, the
+        L{Deferred} returned by L{flatten} fails with it.
+        """
+        def write(data):
+            raise RuntimeError("write failed")
+        d = flatten(None, tags.p('a'), write)
+        return self.assertFailure(d, RuntimeError)
+
+
+
+class FlattenToConsumerTests(TestCase):
+    """
+    Tests for L{_flattenToConsumer}.
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        # Do one unit of work each time the clock is advanced by a second.
+        self.cooperator = Cooperator(
+            terminationPredicateFactory=lambda: lambda: True,
+            scheduler=lambda work: self.clock.callLater(1, work))
+        self.consumer = StringTransport()
+        self.root = [tags.p(str(i)) for i in range(1000)]
+        self.expected = b''.join(
+            b'<p>' + str(i).encode('ascii') + b'</p>' for i in range(1000))
+
+
+    def flatten(self, root):
+        """
+        Flatten C{root} into C{self.consumer}.
+
+        @return: The L{Deferred} returned by L{_flattenToConsumer}.
+        """
+        return _flattenToConsumer(None, root, self.consumer,
+                                  self.cooperator.cooperate)
+
+
+    def runUntilIdle(self):
+        """
+        Advance C{self.clock} until there is no more work to do.
+        """
+        while self.clock.getDelayedCalls():
+            self.clock.advance(1)
+
+
+    def test_flatten(self):
+        """
+        L{_flattenToConsumer} writes the flattened document to the consumer,
+        and unregisters its producer before the L{Deferred} it returns fires.
+        """
+        d = self.flatten(self.root)
+        self.assertTrue(self.consumer.streaming)
+        self.assertNoResult(d)
+        self.runUntilIdle()
+        self.assertIsNone(self.successResultOf(d))
+        self.assertEqual(self.consumer.value(), self.expected)
+        self.assertIsNone(self.consumer.producer)
+
+
+    def test_smallDocument(self):
+        """
+        A small document is flattened into the consumer at once, without
+        registering a producer or waiting for the cooperator.
+        """
+        registered = []
+        self.consumer.registerProducer = (
+            lambda producer, streaming: registered.append(producer))
+        d = self.flatten(tags.p('a'))
+        self.assertIsNone(self.successResultOf(d))
+        self.assertEqual(self.consumer.value(), b'<p>a</p>')
+        self.assertEqual(registered, [])
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_cooperates(self):
+        """
+        A large document is flattened at once until enough of it has been
+        flattened, and the rest over several units of work, what has been
+        flattened being written when each one is done.
+        """
+        d = self.flatten(self.root)
+        first = self.consumer.value()
+        self.assertTrue(first)
+        self.assertTrue(self.expected.startswith(first))
+        self.clock.advance(1)
+        written = self.consumer.value()
+        self.assertTrue(written.startswith(first))
+        self.assertNotEqual(written, first)
+        self.assertNotEqual(written, self.expected)
+        self.assertNoResult(d)
+        self.runUntilIdle()
+        self.assertEqual(self.consumer.value(), self.expected)
+
+
+    def test_existingProducer(self):
+        """
+        If the consumer already has a producer, a large document is still
+        flattened a little at a time, without registering another one.
+        """
+        other = object()
+        self.consumer.registerProducer(other, True)
+        d = self.flatten(self.root)
+        self.assertNoResult(d)
+        self.runUntilIdle()
+        self.assertIsNone(self.successResultOf(d))
+        self.assertEqual(self.consumer.value(), self.expected)
+        self.assertIs(self.consumer.producer, other)
+
+
+    def test_pause(self):
+        """
+        No more is flattened while the producer is paused, until it is
+        resumed.
+        """
+        d = self.flatten(self.root)
+        self.clock.advance(1)
+        written = self.consumer.value()
+        self.consumer.producer.pauseProducing()
+        self.runUntilIdle()
+        self.assertEqual(self.consumer.value(), written)
+        self.assertNoResult(d)
+        self.consumer.producer.resumeProducing()
+        self.runUntilIdle()
+        self.successResultOf(d)
+        self.assertEqual(self.consumer.value(), self.expected)
+
+
+    def test_resumeWithoutPause(self):
+        """
+        Resuming the producer when it was not paused does nothing.
+        """
+        d = self.flatten(self.root)
+        self.consumer.producer.resumeProducing()
+        self.runUntilIdle()
+        self.successResultOf(d)
+
+
+    def test_stop(self):
+        """
+        Nothing more is flattened once the producer is stopped, and the
+        L{Deferred} returned by L{_flattenToConsumer} fails with
+        L{TaskStopped}.
+        """
+        d = self.flatten(self.root)
+        self.clock.advance(1)
+        written = self.consumer.value()
+        producer = self.consumer.producer
+        producer.stopProducing()
+        self.failureResultOf(d, TaskStopped)
+        self.assertIsNone(self.consumer.producer)
+        producer.stopProducing()
+        self.runUntilIdle()
+        self.assertEqual(self.consumer.value(), written)
+
+
+    def test_deferred(self):
+        """
+        What has been flattened before a L{Deferred} is written, and
+        flattening continues once it fires.
+        """
+        waiting = Deferred()
+        d = self.flatten(tags.p('a', waiting, 'c'))
+        self.assertEqual(self.consumer.value(), b'<p>a')
+        self.assertNoResult(d)
+        waiting.callback('b')
+        self.successResultOf(d)
+        self.assertEqual(self.consumer.value(), b'<p>abc</p>')
+        self.assertEqual(self.successResultOf(waiting), 'b')
+
+
+    def test_failure(self):
+        """
+        If flattening fails, the L{Deferred} returned by L{_flattenToConsumer}
+        fails with a L{FlattenerError}, after what was flattened before the
+        failure is written.
+        """
+        d = self.flatten(tags.p('a', object()))
+        self.failureResultOf(d, FlattenerError)
+        self.assertEqual(self.consumer.value(), b'<p>a')
+        self.assertIsNone(self.consumer.producer)
+
+
+
 # Use the co_filename mechanism (instead of the __file__ mechanism) because
 # it is the mechanism traceback formatting uses.  The two do not necessarily
 # agree with each other.  This requires a code object compiled in this file.
@@ -0,0 +1,806 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.web._h2client} and its use by
+L{twisted.web.client.HTTPConnectionPool}.
+"""
+
+from __future__ import absolute_import, division
+
+from zope.interface import directlyProvides, implementer
+
+from twisted.internet import defer, reactor
+from twisted.internet.defer import CancelledError
+from twisted.internet.error import ConnectionAborted, ConnectionDone
+from twisted.internet.interfaces import INegotiated
+from twisted.python.failure import Failure
+from twisted.test.proto_helpers import StringTransport
+from twisted.trial import unittest
+from twisted.web import client, resource, server
+from twisted.web.client import (
+    HTTPConnectionPool, Request, readBody,
+    _HTTP2NegotiatingClientFactory)
+from twisted.web.http_headers import Headers
+from twisted.web.iweb import IPolicyForHTTPS
+from twisted.web._newclient import (
+    HTTP11ClientProtocol, RequestGenerationFailed, RequestNotSent,
+    ResponseFailed, ResponseNeverReceived)
+from twisted.web.test.test_http2 import FrameFactory
+from twisted.web.test.test_newclient import StringProducer
+
+skipH2 = None
+
+try:
+    from twisted.web._h2client import H2ClientConnection
+
+    # These third-party imports are guaranteed to be present if HTTP/2 support
+    # is compiled in. We do not use them in the main code: only in the tests.
+    import h2.connection
+    import h2.errors
+    import h2.events
+    import h2.settings
+except ImportError:
+    skipH2 = "HTTP/2 support not enabled"
+
+try:
+    from twisted.internet import ssl
+    from twisted.test.test_sslverify import certificatesForAuthorityAndServer
+except ImportError:
+    ssl = None
+
+
+
+class FakeServer(object):
+    """
+    The server's end of an HTTP/2 connection to an L{H2ClientConnection},
+    driven by hand.
+
+    @ivar conn: The server's HTTP/2 state machine.
+    @ivar transport: The client's transport.
+    @ivar client: The L{H2ClientConnection}.
+    """
+    def __init__(self, client, transport, settings=None):
+        self.client = client
+        self.transport = transport
+        self.conn = h2.connection.H2Connection(
+            client_side=False, header_encoding=None)
+        if settings is not None:
+            self.conn.local_settings = h2.settings.Settings(
+                client=False, initial_values=settings)
+        self.conn.initiate_connection()
+
+
+    def receive(self):
+        """
+        Process everything the client has written.
+
+        @return: The resulting events.
+        """
+        data = self.transport.value()
+        self.transport.clear()
+        return self.conn.receive_data(data)
+
+
+    def send(self):
+        """
+        Deliver everything the server has queued up to the client.
+        """
+        self.client.dataReceived(self.conn.data_to_send())
+
+
+    def exchange(self):
+        """
+        Let the client and the server talk until neither has anything to say.
+
+        @return: The events the server saw.
+        """
+        events = []
+        while True:
+            events.extend(self.receive())
+            data = self.conn.data_to_send()
+            if not data and not self.transport.value():
+                return events
+            self.client.dataReceived(data)
+
+
+    def respond(self, streamID, body=None, status=b'200', headers=()):
+        """
+        Send a response on C{streamID}.
+        """
+        self.conn.send_headers(
+            streamID, [(b':status', status)] + list(headers),
+            end_stream=body is None)
+        if body is not None:
+            self.conn.send_data(streamID, body, end_stream=True)
+        self.send()
+
+
+
+class PausableStringProducer(StringProducer):
+    """
+    A L{StringProducer} which records whether it is paused.
+    """
+    paused = False
+
+    def pauseProducing(self):
+        self.paused = True
+
+
+    def resumeProducing(self):
+        self.paused = False
+
+
+
+def connect(settings=None, goneCallback=lambda connection: None):
+    """
+    Create an L{H2ClientConnection} connected to a L{FakeServer}, which have
+    exchanged their settings.
+
+    @return: A 3-tuple of the client, its transport and the server.
+    """
+    protocol = H2ClientConnection(goneCallback)
+    transport = StringTransport()
+    protocol.makeConnection(transport)
+    fakeServer = FakeServer(protocol, transport, settings)
+    fakeServer.exchange()
+    return protocol, transport, fakeServer
+
+
+
+def makeRequest(method=b'GET', uri=b'/', bodyProducer=None, headers=None):
+    """
+    Create a L{Request} for C{https://example.com}.
+    """
+    if headers is None:
+        headers = Headers()
+    headers.setRawHeaders(b'host', [b'example.com'])
+    return Request._construct(
+        method, uri, headers, bodyProducer, persistent=True,
+        parsedURI=client.URI.fromBytes(b'https://example.com' + uri))
+
+
+
+class H2ClientConnectionTests(unittest.TestCase):
+    """
+    Tests for L{H2ClientConnection}.
+    """
+    if skipH2:
+        skip = skipH2
+
+    def requestsReceived(self, events):
+        """
+        Pick the L{h2.events.RequestReceived} events out of C{events}.
+        """
+        return [e for e in events
+                if isinstance(e, h2.events.RequestReceived)]
+
+
+    def test_request(self):
+        """
+        L{H2ClientConnection.request} sends the request on a new stream,
+        translating it into HTTP/2 headers, and fires with a L{Response}
+        whose body is the data received on that stream.
+        """
+        protocol, transport, fakeServer = connect()
+        headers = Headers({b'user-agent': [b'test'],
+                           b'connection': [b'close']})
+        d = protocol.request(makeRequest(uri=b'/foo?a=b', headers=headers))
+        [received] = self.requestsReceived(fakeServer.receive())
+        self.assertEqual(received.stream_id, 1)
+        self.assertEqual(received.headers, [
+            (b':method', b'GET'), (b':scheme', b'https'),
+            (b':authority', b'example.com'), (b':path', b'/foo?a=b'),
+            (b'user-agent', b'test')])
+
+        fakeServer.respond(
+            1, b'hello', headers=[(b'content-length', b'5'),
+                                  (b'x-foo', b'bar')])
+        response = self.successResultOf(d)
+        self.assertEqual(response.version, (b'HTTP', 2, 0))
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.phrase, b'OK')
+        self.assertEqual(response.length, 5)
+        self.assertEqual(
+            response.headers.getRawHeaders(b'x-foo'), [b'bar'])
+        self.assertEqual(self.successResultOf(readBody(response)), b'hello')
+        self.assertEqual(protocol.streams, {})
+
+
+    def test_headResponse(self):
+        """
+        The response to a I{HEAD} request has no body, whatever its
+        I{Content-Length} says.
+        """
+        protocol, transport, fakeServer = connect()
+        d = protocol.request(makeRequest(method=b'HEAD'))
+        fakeServer.receive()
+        fakeServer.respond(1, headers=[(b'content-length', b'100')])
+        response = self.successResultOf(d)
+        self.assertEqual(response.length, 0)
+        self.assertEqual(self.successResultOf(readBody(response)), b'')
+
+
+    def test_concurrentRequests(self):
+        """
+        Requests issued while others are outstanding are sent straight away on
+        streams of their own, and their responses may arrive in any order.
+        """
+        protocol, transport, fakeServer = connect()
+        first = protocol.request(makeRequest(uri=b'/first'))
+        second = protocol.request(makeRequest(uri=b'/second'))
+        received = self.requestsReceived(fakeServer.receive())
+        self.assertEqual([e.stream_id for e in received], [1, 3])
+
+        fakeServer.respond(3, b'second')
+        fakeServer.respond(1, b'first')
+        self.assertEqual(
+            self.successResultOf(readBody(self.successResultOf(second))),
+            b'second')
+        self.assertEqual(
+            self.successResultOf(readBody(self.successResultOf(first))),
+            b'first')
+
+
+    def test_maxConcurrentStreams(self):
+        """
+        Requests beyond the server's limit on concurrent streams wait until a
+        stream finishes.
+        """
+        protocol, transport, fakeServer = connect(
+            {h2.settings.MAX_CONCURRENT_STREAMS: 1})
+        first = protocol.request(makeRequest(uri=b'/first'))
+        second = protocol.request(makeRequest(uri=b'/second'))
+        received = self.requestsReceived(fakeServer.receive())
+        self.assertEqual([e.stream_id for e in received], [1])
+
+        fakeServer.respond(1, b'first')
+        self.successResultOf(first)
+        received = self.requestsReceived(fakeServer.receive())
+        self.assertEqual([e.stream_id for e in received], [3])
+        fakeServer.respond(3, b'second')
+        self.successResultOf(second)
+
+
+    def test_requestBody(self):
+        """
+        The request body is written to the stream, which is ended when the
+        body producer finishes, and its length is sent as
+        I{Content-Length}.
+        """
+        protocol, transport, fakeServer = connect()
+        producer = StringProducer(10)
+        protocol.request(makeRequest(method=b'POST', bodyProducer=producer))
+        [received] = self.requestsReceived(fakeServer.receive())
+        self.assertIn((b'content-length', b'10'), received.headers)
+
+        producer.consumer.write(b'0123456789')
+        producer.finished.callback(None)
+        events = fakeServer.receive()
+        self.assertEqual(
+            b''.join(e.data for e in events
+                     if isinstance(e, h2.events.DataReceived)),
+            b'0123456789')
+        self.assertTrue(
+            [e for e in events if isinstance(e, h2.events.StreamEnded)])
+
+
+    def test_requestBodyFlowControl(self):
+        """
+        When the request body exceeds the flow control window, the body
+        producer is paused and the rest of the data kept until the server
+        opens the window again.
+        """
+        protocol, transport, fakeServer = connect()
+        producer = PausableStringProducer(100000)
+        protocol.request(makeRequest(method=b'POST', bodyProducer=producer))
+        fakeServer.receive()
+
+        producer.consumer.write(b'x' * 100000)
+        self.assertTrue(producer.paused)
+        producer.finished.callback(None)
+        events = fakeServer.receive()
+        received = sum(len(e.data) for e in events
+                       if isinstance(e, h2.events.DataReceived))
+        self.assertEqual(received, 65535)
+
+        fakeServer.conn.acknowledge_received_data(received, 1)
+        fakeServer.send()
+        events = fakeServer.receive()
+        received += sum(len(e.data) for e in events
+                        if isinstance(e, h2.events.DataReceived))
+        self.assertEqual(received, 100000)
+        self.assertTrue(
+            [e for e in events if isinstance(e, h2.events.StreamEnded)])
+
+
+    def test_requestBodyResumed(self):
+        """
+        Once everything buffered has been sent, a paused body producer is
+        resumed.
+        """
+        protocol, transport, fakeServer = connect()
+        producer = PausableStringProducer(100000)
+        protocol.request(makeRequest(method=b'POST', bodyProducer=producer))
+        fakeServer.receive()
+
+        producer.consumer.write(b'x' * 70000)
+        self.assertTrue(producer.paused)
+        fakeServer.receive()
+        fakeServer.conn.acknowledge_received_data(65535, 1)
+        fakeServer.send()
+        self.assertFalse(producer.paused)
+
+
+    def test_requestBodyFailed(self):
+        """
+        If the body producer fails, the stream is reset and the request fails
+        with L{RequestGenerationFailed}.
+        """
+        protocol, transport, fakeServer = connect()
+        producer = StringProducer(10)
+        d = protocol.request(
+            makeRequest(method=b'POST', bodyProducer=producer))
+        fakeServer.receive()
+        producer.finished.errback(Failure(ZeroDivisionError()))
+        failure = self.failureResultOf(d, RequestGenerationFailed)
+        failure.value.reasons[0].trap(ZeroDivisionError)
+        events = fakeServer.receive()
+        self.assertTrue(
+            [e for e in events if isinstance(e, h2.events.StreamReset)])
+
+
+    def test_responseBeforeRequestBody(self):
+        """
+        If the whole response arrives before the request body has been sent,
+        the body producer is stopped and the stream reset.
+        """
+        protocol, transport, fakeServer = connect()
+        producer = StringProducer(10)
+        d = protocol.request(
+            makeRequest(method=b'POST', bodyProducer=producer))
+        fakeServer.receive()
+        fakeServer.respond(1, b'too soon')
+        self.assertTrue(producer.stopped)
+        response = self.successResultOf(d)
+        self.assertEqual(self.successResultOf(readBody(response)), b'too soon')
+        events = fakeServer.receive()
+        [reset] = [e for e in events if isinstance(e, h2.events.StreamReset)]
+        self.assertEqual(reset.error_code, h2.errors.CANCEL)
+
+
+    def test_responseFlowControl(self):
+        """
+        Response data is not acknowledged until there is a protocol to deliver
+        it to, so the server cannot send more than a window's worth.
+        """
+        protocol, transport, fakeServer = connect()
+        d = protocol.request(makeRequest())
+        fakeServer.receive()
+        fakeServer.conn.send_headers(1, [(b':status', b'200')])
+        for i in range(4):
+            fakeServer.conn.send_data(1, b'x' * 10000)
+        fakeServer.send()
+        response = self.successResultOf(d)
+        fakeServer.receive()
+        self.assertEqual(fakeServer.conn.local_flow_control_window(1), 25535)
+
+        body = readBody(response)
+        fakeServer.receive()
+        self.assertEqual(fakeServer.conn.local_flow_control_window(1), 65535)
+        fakeServer.conn.send_data(1, b'y', end_stream=True)
+        fakeServer.send()
+        self.assertEqual(self.successResultOf(body), b'x' * 40000 + b'y')
+
+
+    def test_streamReset(self):
+        """
+        If the server resets the stream before responding, the request fails
+        with L{ResponseNeverReceived}.
+        """
+        protocol, transport, fakeServer = connect()
+        d = protocol.request(makeRequest())
+        fakeServer.receive()
+        fakeServer.conn.reset_stream(1, h2.errors.REFUSED_STREAM)
+        fakeServer.send()
+        self.failureResultOf(d, ResponseNeverReceived)
+        self.assertEqual(protocol.streams, {})
+
+
+    def test_streamResetDuringBody(self):
+        """
+        If the server resets the stream while sending the response body, the
+        body fails with L{ResponseFailed}.
+        """
+        protocol, transport, fakeServer = connect()
+        d = protocol.request(makeRequest())
+        fakeServer.receive()
+        fakeServer.conn.send_headers(1, [(b':status', b'200')])
+        fakeServer.send()
+        body = readBody(self.successResultOf(d))
+        fakeServer.conn.reset_stream(1, h2.errors.INTERNAL_ERROR)
+        fakeServer.send()
+        self.failureResultOf(body, ResponseFailed)
+
+
+    def test_connectionLost(self):
+        """
+        When the connection is lost, outstanding requests fail with
+        L{ResponseNeverReceived} and response bodies with L{ResponseFailed}.
+        """
+        gone = []
+        protocol, transport, fakeServer = connect(goneCallback=gone.append)
+        first = protocol.request(makeRequest())
+        second = protocol.request(makeRequest())
+        fakeServer.receive()
+        fakeServer.conn.send_headers(1, [(b':status', b'200')])
+        fakeServer.send()
+        body = readBody(self.successResultOf(first))
+
+        protocol.connectionLost(Failure(ConnectionDone()))
+        self.failureResultOf(body, ResponseFailed)
+        self.failureResultOf(second, ResponseNeverReceived)
+        self.assertEqual(gone, [protocol])
+        self.failureResultOf(protocol.request(makeRequest()), RequestNotSent)
+
+
+    def test_goAway(self):
+        """
+        When the server sends I{GOAWAY}, requests on streams it did not
+        process fail with L{RequestNotSent}, no new requests may be issued,
+        and the connection is closed.
+        """
+        gone = []
+        protocol, transport, fakeServer = connect(goneCallback=gone.append)
+        first = protocol.request(makeRequest())
+        second = protocol.request(makeRequest())
+        fakeServer.receive()
+        protocol.dataReceived(
+            FrameFactory().buildGoAwayFrame(lastStreamID=1).serialize())
+        self.assertEqual(gone, [protocol])
+        self.failureResultOf(second, RequestNotSent)
+        self.failureResultOf(protocol.request(makeRequest()), RequestNotSent)
+        self.assertTrue(transport.disconnecting)
+        self.assertNoResult(first)
+        protocol.connectionLost(Failure(ConnectionDone()))
+        self.failureResultOf(first, ResponseNeverReceived)
+
+
+    def test_cancel(self):
+        """
+        Cancelling the L{Deferred} returned by
+        L{H2ClientConnection.request} resets the stream, and the request fails
+        with L{ResponseNeverReceived} wrapping L{CancelledError}.
+        """
+        protocol, transport, fakeServer = connect()
+        d = protocol.request(makeRequest())
+        fakeServer.receive()
+        d.cancel()
+        failure = self.failureResultOf(d, ResponseNeverReceived)
+        failure.value.reasons[0].trap(CancelledError)
+        events = fakeServer.receive()
+        [reset] = [e for e in events if isinstance(e, h2.events.StreamReset)]
+        self.assertEqual(reset.error_code, h2.errors.CANCEL)
+
+
+    def test_cancelPending(self):
+        """
+        Cancelling a request still waiting for a stream drops it from the
+        queue.
+        """
+        protocol, transport, fakeServer = connect(
+            {h2.settings.MAX_CONCURRENT_STREAMS: 1})
+        first = protocol.request(makeRequest())
+        second = protocol.request(makeRequest())
+        second.cancel()
+        self.failureResultOf(second, ResponseNeverReceived)
+        fakeServer.receive()
+        fakeServer.respond(1, b'first')
+        self.successResultOf(first)
+        self.assertEqual(self.requestsReceived(fakeServer.receive()), [])
+
+
+    def test_abortBody(self):
+        """
+        Aborting the transport of a response body resets just its stream.
+        """
+        protocol, transport, fakeServer = connect()
+        d = protocol.request(makeRequest())
+        fakeServer.receive()
+        fakeServer.conn.send_headers(1, [(b':status', b'200')])
+        fakeServer.send()
+        body = readBody(self.successResultOf(d))
+        body.cancel()
+        failure = self.failureResultOf(body, ResponseFailed)
+        failure.value.reasons[0].trap(ConnectionAborted)
+        events = fakeServer.receive()
+        [reset] = [e for e in events if isinstance(e, h2.events.StreamReset)]
+        self.assertEqual(reset.error_code, h2.errors.CANCEL)
+        self.assertFalse(transport.disconnecting)
+
+
+    def test_abort(self):
+        """
+        L{H2ClientConnection.abort} aborts the transport and returns a
+        L{Deferred} which fires once the connection has been lost.
+        """
+        protocol, transport, fakeServer = connect()
+        d = protocol.abort()
+        self.assertTrue(transport.disconnecting)
+        self.assertNoResult(d)
+        protocol.connectionLost(Failure(ConnectionDone()))
+        self.successResultOf(d)
+
+
+
+class NegotiatedTransport(StringTransport):
+    """
+    A L{StringTransport} which pretends to have negotiated a protocol over
+    TLS.
+    """
+    negotiatedProtocol = None
+
+    def __init__(self):
+        StringTransport.__init__(self)
+        directlyProvides(self, INegotiated)
+
+
+
+class NegotiatingEndpoint(object):
+    """
+    An endpoint which connects the protocols built by a factory to
+    L{NegotiatedTransport}s, without completing the handshake.
+
+    @ivar protocols: The protocols which have been connected.
+    """
+    def __init__(self):
+        self.protocols = []
+
+
+    def connect(self, factory):
+        protocol = factory.buildProtocol(None)
+        protocol.makeConnection(NegotiatedTransport())
+        self.protocols.append(protocol)
+        return defer.succeed(protocol)
+
+
+    def handshake(self, negotiatedProtocol):
+        """
+        Complete the handshake for the most recent connection.
+        """
+        protocol = self.protocols[-1]
+        protocol.transport.negotiatedProtocol = negotiatedProtocol
+        protocol.handshakeCompleted()
+
+
+
+class HTTP2NegotiationTests(unittest.TestCase):
+    """
+    Tests for the negotiation of HTTP/2 by L{HTTPConnectionPool}.
+    """
+    if skipH2:
+        skip = skipH2
+
+    def setUp(self):
+        self.pool = HTTPConnectionPool(None)
+        self.pool.http2 = True
+        self.endpoint = NegotiatingEndpoint()
+        self.key = (b'https', b'example.com', 443)
+
+
+    def test_acceptableProtocols(self):
+        """
+        Connections offering HTTP/2 prefer it to HTTP/1.1.
+        """
+        factory = _HTTP2NegotiatingClientFactory(None, None)
+        self.assertEqual(factory.acceptableProtocols(), [b'h2', b'http/1.1'])
+
+
+    def test_sharedConnection(self):
+        """
+        If the server selects C{h2}, every request for the same key is given
+        the same L{H2ClientConnection}, including those made while the
+        handshake was in progress.
+        """
+        first = self.pool.getConnection(self.key, self.endpoint)
+        second = self.pool.getConnection(self.key, self.endpoint)
+        self.assertEqual(len(self.endpoint.protocols), 1)
+        self.assertNoResult(first)
+        self.assertNoResult(second)
+
+        self.endpoint.handshake(b'h2')
+        connection = self.successResultOf(first)
+        self.assertIsInstance(connection, H2ClientConnection)
+        self.assertIs(self.successResultOf(second), connection)
+        self.assertIs(
+            self.successResultOf(
+                self.pool.getConnection(self.key, self.endpoint)),
+            connection)
+        self.assertEqual(len(self.endpoint.protocols), 1)
+
+
+    def test_fallBackToHTTP11(self):
+        """
+        If the server does not select C{h2}, requests go on to use HTTP/1.1
+        connections of their own, which do not offer HTTP/2 again.
+        """
+        first = self.pool.getConnection(self.key, self.endpoint)
+        second = self.pool.getConnection(self.key, self.endpoint)
+        self.endpoint.handshake(b'http/1.1')
+        self.assertIsInstance(
+            self.successResultOf(first), HTTP11ClientProtocol)
+        self.assertIsInstance(
+            self.successResultOf(second), HTTP11ClientProtocol)
+        self.assertEqual(len(self.endpoint.protocols), 2)
+        self.assertIsInstance(self.endpoint.protocols[1], HTTP11ClientProtocol)
+        self.assertIn(self.key, self.pool._http11Only)
+
+
+    def test_connectionLostBeforeHandshake(self):
+        """
+        If the connection is lost before the handshake completes, all the
+        requests waiting for it fail.
+        """
+        first = self.pool.getConnection(self.key, self.endpoint)
+        second = self.pool.getConnection(self.key, self.endpoint)
+        self.endpoint.protocols[0].connectionLost(
+            Failure(ConnectionDone()))
+        self.failureResultOf(first, ConnectionDone)
+        self.failureResultOf(second, ConnectionDone)
+        self.assertEqual(self.pool._h2Connecting, {})
+
+
+    def test_goneConnectionReplaced(self):
+        """
+        Once an L{H2ClientConnection} cannot take new requests, the pool
+        forgets it and negotiates a new connection for the next request.
+        """
+        d = self.pool.getConnection(self.key, self.endpoint)
+        self.endpoint.handshake(b'h2')
+        connection = self.successResultOf(d)
+        connection.connectionLost(Failure(ConnectionDone()))
+        self.pool.getConnection(self.key, self.endpoint)
+        self.assertEqual(len(self.endpoint.protocols), 2)
+
+
+    def test_onlyHTTPS(self):
+        """
+        HTTP/2 is only offered to C{https} servers.
+        """
+        self.pool.getConnection((b'http', b'example.com', 80), self.endpoint)
+        self.assertIsInstance(self.endpoint.protocols[0], HTTP11ClientProtocol)
+
+
+    def test_notByDefault(self):
+        """
+        HTTP/2 is not offered unless L{HTTPConnectionPool.http2} is set.
+        """
+        self.pool.http2 = False
+        self.pool.getConnection(self.key, self.endpoint)
+        self.assertIsInstance(self.endpoint.protocols[0], HTTP11ClientProtocol)
+
+
+    def test_closeCachedConnections(self):
+        """
+        L{HTTPConnectionPool.closeCachedConnections} aborts shared
+        L{H2ClientConnection}s too.
+        """
+        d = self.pool.getConnection(self.key, self.endpoint)
+        self.endpoint.handshake(b'h2')
+        connection = self.successResultOf(d)
+        closed = self.pool.closeCachedConnections()
+        self.assertTrue(connection.transport.disconnecting)
+        connection.connectionLost(Failure(ConnectionDone()))
+        self.successResultOf(closed)
+        self.assertEqual(self.pool._h2Connections, {})
+
+
+
+class HTTP11OnlySite(server.Site):
+    """
+    A L{server.Site} which only offers HTTP/1.1 over TLS.
+    """
+    def acceptableProtocols(self):
+        return [b'http/1.1']
+
+
+
+class HelloResource(resource.Resource):
+    """
+    A resource which says hello and which protocol version it was asked for.
+    """
+    isLeaf = True
+
+    def render_GET(self, request):
+        return b'hello over ' + request.clientproto
+
+
+
+@implementer(IPolicyForHTTPS)
+class TrustingPolicy(object):
+    """
+    A policy which expects every server to have a certificate for
+    C{example.com} issued by the given certificate authority.
+    """
+    def __init__(self, trustRoot):
+        self._trustRoot = trustRoot
+
+
+    def creatorForNetloc(self, hostname, port):
+        return ssl.optionsForClientTLS(
+            u'example.com', trustRoot=self._trustRoot)
+
+
+
+class HTTP2AgentIntegrationTests(unittest.TestCase):
+    """
+    Tests for L{client.Agent} with a pool offering HTTP/2, against a real
+    server over TLS.
+    """
+    if skipH2:
+        skip = skipH2
+    elif ssl is None:
+        skip = "SSL not available"
+
+    def setUp(self):
+        self.caCert, self.serverCert = certificatesForAuthorityAndServer()
+
+
+    def listen(self, siteFactory):
+        """
+        Start a TLS server for a site created by C{siteFactory}.
+
+        @return: The port number.
+        """
+        options = ssl.CertificateOptions(
+            privateKey=self.serverCert.privateKey.original,
+            certificate=self.serverCert.original)
+        site = siteFactory(HelloResource())
+        site.timeOut = None
+        port = reactor.listenSSL(0, site, options, interface='127.0.0.1')
+        self.addCleanup(port.stopListening)
+        return port.getHost().port
+
+
+    def agent(self):
+        """
+        Create an L{client.Agent} with a pool offering HTTP/2, which trusts
+        the test certificate authority.
+        """
+        pool = HTTPConnectionPool(reactor)
+        pool.http2 = True
+        self.addCleanup(pool.closeCachedConnections)
+        return client.Agent(reactor, TrustingPolicy(self.caCert), pool=pool)
+
+
+    @defer.inlineCallbacks
+    def test_http2(self):
+        """
+        If the server accepts HTTP/2, concurrent requests are multiplexed over
+        a single connection.
+        """
+        port = self.listen(server.Site)
+        agent = self.agent()
+        url = b'https://127.0.0.1:' + str(port).encode('ascii') + b'/'
+        responses = yield defer.gatherResults(
+            [agent.request(b'GET', url) for i in range(3)])
+        for response in responses:
+            self.assertEqual(response.version, (b'HTTP', 2, 0))
+            body = yield readBody(response)
+            self.assertEqual(body, b'hello over HTTP/2')
+        self.assertEqual(len(agent._pool._h2Connections), 1)
+
+
+    @defer.inlineCallbacks
+    def test_http11(self):
+        """
+        If the server does not accept HTTP/2, HTTP/1.1 is used.
+        """
+        port = self.listen(HTTP11OnlySite)
+        agent = self.agent()
+        url = b'https://127.0.0.1:' + str(port).encode('ascii') + b'/'
+        response = yield agent.request(b'GET', url)
+        self.assertEqual(response.version, (b'HTTP', 1, 1))
+        body = yield readBody(response)
+        self.assertEqual(body, b'hello over HTTP/1.1')
+        self.assertEqual(agent._pool._h2Connections, {})
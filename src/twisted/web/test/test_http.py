@@ -368,6 +368,20 @@ class PipeliningBodyTests(unittest.TestCase, ResponseTestMixin):
         self.assertResponseEquals(value, self.expectedResponses)
 
 
+    def test_pipelinedRequestsAtOnce(self):
+        """
+        Pipelined requests with bodies delivered all at once are all
+        processed, even when each is finished as soon as it is received.
+        """
+        b = StringTransport()
+        a = http.HTTPChannel()
+        a.requestFactory = DummyHTTPHandler
+        a.makeConnection(b)
+        a.dataReceived(self.requests)
+        self.assertEqual([], a.requests)
+        self.assertResponseEquals(b.value(), self.expectedResponses)
+
+
 
 class ShutdownTests(unittest.TestCase):
     """
@@ -1611,6 +1625,141 @@ Hello,
 
 
 
+class HeaderBlockParsingTests(ParsingTests, ResponseTestMixin):
+    """
+    Tests for protocol parsing in L{HTTPChannel} with
+    L{HTTPChannel.headerBlockParsing} enabled.
+    """
+    def runRequest(self, httpRequest, requestFactory=None, success=True,
+                   channel=None):
+        """
+        Like L{ParsingTests.runRequest}, but parse with
+        L{HTTPChannel.headerBlockParsing} enabled.
+        """
+        if not channel:
+            channel = http.HTTPChannel()
+        channel.headerBlockParsing = True
+        return ParsingTests.runRequest(
+            self, httpRequest, requestFactory, success, channel)
+
+
+    def test_invalidNonAsciiMethod(self):
+        """
+        When client sends invalid HTTP method containing
+        non-ascii characters HTTP 400 'Bad Request' status will be returned.
+
+        Unlike L{ParsingTests.test_invalidNonAsciiMethod}, the request has to
+        end with an empty line, since it is not parsed until it does.
+        """
+        processed = []
+        class MyRequest(http.Request):
+            def process(self):
+                processed.append(self)
+                self.finish()
+
+        badRequestLine = b"GE\xc2\xa9 / HTTP/1.1\n\n"
+        channel = self.runRequest(badRequestLine, MyRequest, 0)
+        self.assertEqual(
+            channel.transport.value(),
+            b"HTTP/1.1 400 Bad Request\r\n\r\n")
+        self.assertTrue(channel.transport.disconnecting)
+        self.assertEqual(processed, [])
+
+
+    def test_wholeRequests(self):
+        """
+        Several requests, and their bodies, delivered at once are all parsed.
+        """
+        transport = StringTransport()
+        channel = http.HTTPChannel()
+        channel.headerBlockParsing = True
+        channel.requestFactory = DummyHTTPHandler
+        channel.makeConnection(transport)
+        channel.dataReceived(PipeliningBodyTests.requests)
+        self.assertResponseEquals(
+            transport.value(), PipeliningBodyTests.expectedResponses)
+
+
+    def test_pipelinedRequestsBuffered(self):
+        """
+        Requests received while a request is being processed are buffered
+        until it has finished.
+        """
+        transport = StringTransport()
+        channel = http.HTTPChannel()
+        channel.headerBlockParsing = True
+        channel.requestFactory = DelayedHTTPHandler
+        channel.makeConnection(transport)
+        channel.dataReceived(PipeliningBodyTests.requests)
+        self.assertEqual(b'', transport.value())
+        self.assertEqual(1, len(channel.requests))
+        channel.requests[0].delayedProcess()
+        self.assertEqual(1, len(channel.requests))
+        channel.requests[0].delayedProcess()
+        self.assertEqual([], channel.requests)
+        self.assertResponseEquals(
+            transport.value(), PipeliningBodyTests.expectedResponses)
+
+
+    def test_multilineHeaders(self):
+        """
+        A header line starting with a space or a tab continues the header
+        before it.
+        """
+        processed = []
+        class MyRequest(http.Request):
+            def process(self):
+                processed.append(self)
+                self.finish()
+
+        requestLines = [
+            b"GET / HTTP/1.1",
+            b"X-Multiline: line-0",
+            b"\tline-1",
+            b"X-Multiline2: line-2",
+            b" line-3",
+            b"",
+            b""]
+        self.runRequest(b"\n".join(requestLines), MyRequest, 0)
+        [request] = processed
+        self.assertEqual(
+            [b"line-0\n\tline-1"],
+            request.requestHeaders.getRawHeaders(b"x-multiline"))
+        self.assertEqual(
+            [b"line-2\n line-3"],
+            request.requestHeaders.getRawHeaders(b"x-multiline2"))
+
+
+    def test_incompleteHeadersTooBig(self):
+        """
+        If more than C{totalHeadersSize} bytes of a request's headers are
+        received without the end of them, a 400 (Bad Request) response is
+        sent to the client and the connection is closed.
+        """
+        transport = StringTransport()
+        channel = http.HTTPChannel()
+        channel.headerBlockParsing = True
+        channel.totalHeadersSize = 40
+        channel.makeConnection(transport)
+        channel.dataReceived(b"GET / HTTP/1.1\r\n")
+        channel.dataReceived(b"Some-Header: more-than-40-altogether\r\n")
+        self.assertEqual(
+            b"HTTP/1.1 400 Bad Request\r\n\r\n", transport.value())
+        self.assertTrue(transport.disconnecting)
+
+
+    def test_factory(self):
+        """
+        The I{headerBlockParsing} argument to L{http.HTTPFactory} enables
+        L{HTTPChannel.headerBlockParsing} on the channels it builds.
+        """
+        factory = http.HTTPFactory()
+        self.assertFalse(factory.buildProtocol(None).headerBlockParsing)
+        factory = http.HTTPFactory(headerBlockParsing=True)
+        self.assertTrue(factory.buildProtocol(None).headerBlockParsing)
+
+
+
 class QueryArgumentsTests(unittest.TestCase):
     def testParseqs(self):
         self.assertEqual(
@@ -2580,6 +2729,41 @@ class RequestTests(unittest.TestCase, ResponseTestMixin):
                       factory.logFile.getvalue())
 
 
+    def test_responseDateTimeFromFactory(self):
+        """
+        L{HTTPFactory} keeps a datetime string for I{Date} response headers
+        while it is started, and updates it every second.
+        """
+        clock = Clock()
+        clock.advance(1234567)
+        factory = http.HTTPFactory(reactor=clock)
+        self.assertIsNone(factory._responseDateTime)
+        factory.startFactory()
+        self.assertEqual(
+            http.datetimeToString(1234567), factory._responseDateTime)
+        clock.advance(1)
+        self.assertEqual(
+            http.datetimeToString(1234568), factory._responseDateTime)
+        factory.stopFactory()
+        self.assertIsNone(factory._responseDateTime)
+
+
+    def test_writeHeadersStatusLine(self):
+        """
+        L{HTTPChannel.writeHeaders} writes a status line made from the given
+        version, code and reason phrase, whether or not they are standard.
+        """
+        for reason in [b"OK", b"Everything Is Fine"]:
+            channel = http.HTTPChannel()
+            transport = StringTransport()
+            channel.makeConnection(transport)
+            channel.writeHeaders(
+                b"HTTP/1.1", b"200", reason, [(b"Server", b"test")])
+            self.assertEqual(
+                b"HTTP/1.1 200 " + reason + b"\r\nServer: test\r\n\r\n",
+                transport.value())
+
+
     def test_requestBodyTimeoutFromFactory(self):
         """
         L{HTTPChannel} timeouts whenever data from a request body is not
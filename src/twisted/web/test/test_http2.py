@@ -515,9 +515,10 @@ class HTTP2ServerTests(unittest.TestCase, HTTP2TestHelpers):
         def validate(streamID):
             frames = framesFromBytes(b.value())
 
-            # One Settings frame, 8 WindowUpdate frames, one Headers frame,
-            # and two Data frames
-            self.assertEqual(len(frames), 12)
+            # One Settings frame, one Headers frame, and two Data frames. The
+            # request body is too small for its flow control window to need
+            # opening again.
+            self.assertEqual(len(frames), 4)
             self.assertTrue(all(f.stream_id == 1 for f in frames[-3:]))
 
             self.assertTrue(
@@ -573,9 +574,10 @@ class HTTP2ServerTests(unittest.TestCase, HTTP2TestHelpers):
         def validate(streamID):
             frames = framesFromBytes(b.value())
 
-            # One Settings frame, 8 WindowUpdate frames, one Headers frame,
-            # and two Data frames
-            self.assertEqual(len(frames), 12)
+            # One Settings frame, one Headers frame, and two Data frames. The
+            # request body is too small for its flow control window to need
+            # opening again.
+            self.assertEqual(len(frames), 4)
             self.assertTrue(all(f.stream_id == 1 for f in frames[-3:]))
 
             self.assertTrue(
@@ -629,10 +631,9 @@ class HTTP2ServerTests(unittest.TestCase, HTTP2TestHelpers):
         def validate(results):
             frames = framesFromBytes(b.value())
 
-            # We expect 1 Settings frame for the connection, and then 11 frames
-            # *per stream* (8 WindowUpdate frames, 1 Headers frame,
-            # 2 Data frames).
-            self.assertEqual(len(frames), 1 + (11 * 40))
+            # We expect 1 Settings frame for the connection, and then 3 frames
+            # *per stream* (1 Headers frame, 2 Data frames).
+            self.assertEqual(len(frames), 1 + (3 * 40))
 
             # Let's check the data is ok. We need the non-WindowUpdate frames
             # for each stream.
@@ -677,6 +678,9 @@ class HTTP2ServerTests(unittest.TestCase, HTTP2TestHelpers):
         b = StringTransport()
         a = H2Connection()
         a.requestFactory = ChunkedHTTPHandler
+        # Send each chunk in a frame of its own, so that there is something
+        # to interleave.
+        a.coalesceDataFrames = False
         getRequestHeaders = self.getRequestHeaders
         getRequestHeaders[2] = (':path', '/chunked/4')
 
@@ -810,17 +814,17 @@ class HTTP2ServerTests(unittest.TestCase, HTTP2TestHelpers):
         self.assertTrue(request._data, b"hello world, it's http/2!")
 
         # *That* will have also caused the H2Connection object to emit almost
-        # all the data it needs. That'll be a Headers frame, as well as two
-        # WindowUpdate frames.
+        # all the data it needs. That'll be a Headers frame: the request body
+        # is too small for the flow control window to need opening again.
         frames = framesFromBytes(b.value())
-        self.assertEqual(len(frames), 4)
+        self.assertEqual(len(frames), 2)
 
         def validate(streamID):
             # Confirm that the response is ok.
             frames = framesFromBytes(b.value())
 
             # The only new frames here are the two Data frames.
-            self.assertEqual(len(frames), 6)
+            self.assertEqual(len(frames), 4)
             self.assertTrue('END_STREAM' in frames[-1].flags)
 
         return a._streamCleanupCallbacks[1].addCallback(validate)
@@ -867,13 +871,12 @@ class HTTP2ServerTests(unittest.TestCase, HTTP2TestHelpers):
             # Confirm that the response is ok.
             frames = framesFromBytes(b.value())
 
-            # We expect a Settings frame, two WindowUpdate frames, and a
-            # RstStream frame.
-            self.assertEqual(len(frames), 4)
+            # We expect a Settings frame and a RstStream frame.
+            self.assertEqual(len(frames), 2)
             self.assertTrue(
-                isinstance(frames[3], hyperframe.frame.RstStreamFrame)
+                isinstance(frames[1], hyperframe.frame.RstStreamFrame)
             )
-            self.assertEqual(frames[3].stream_id, 1)
+            self.assertEqual(frames[1].stream_id, 1)
 
         return cleanupCallback.addCallback(validate)
 
@@ -1128,8 +1131,9 @@ class HTTP2ServerTests(unittest.TestCase, HTTP2TestHelpers):
         def validate(streamID):
             frames = framesFromBytes(b.value())
 
-            # Settings, Headers, 7 Data frames.
-            self.assertEqual(len(frames), 9)
+            # Settings, Headers, and 2 Data frames: the writes are all sent
+            # together, and then the stream is ended.
+            self.assertEqual(len(frames), 4)
             self.assertTrue(all(f.stream_id == 1 for f in frames[1:]))
 
             self.assertTrue(
@@ -1143,7 +1147,7 @@ class HTTP2ServerTests(unittest.TestCase, HTTP2TestHelpers):
             ]
             self.assertEqual(
                 receivedDataChunks,
-                dataChunks + [b""],
+                [b"".join(dataChunks), b""],
             )
 
         return a._streamCleanupCallbacks[1].addCallback(validate)
@@ -1214,8 +1218,7 @@ class HTTP2ServerTests(unittest.TestCase, HTTP2TestHelpers):
             self.assertEqual(
                 dataChunks,
                 [
-                    b"0", b"1", b"2", b"3", b"4", b"5",
-                    b"6", b"7", b"8", b"9", b""
+                    b"0", b"123456789", b""
                 ]
             )
 
@@ -1322,7 +1325,7 @@ class HTTP2ServerTests(unittest.TestCase, HTTP2TestHelpers):
             self.assertEqual(
                 dataChunks,
                 [
-                    b"Hello", b",", b"world!", b""
+                    b"Hello,world!", b""
                 ]
             )
 
@@ -1380,8 +1383,9 @@ class HTTP2ServerTests(unittest.TestCase, HTTP2TestHelpers):
         def validate(streamID):
             frames = framesFromBytes(b.value())
 
-            # 2 Settings, Headers, 7 Data frames.
-            self.assertEqual(len(frames), 9)
+            # 2 Settings, Headers, 3 Data frames: the delayed writes are all
+            # sent together once the window opens.
+            self.assertEqual(len(frames), 6)
             self.assertTrue(all(f.stream_id == 1 for f in frames[2:]))
 
             self.assertTrue(
@@ -1395,7 +1399,7 @@ class HTTP2ServerTests(unittest.TestCase, HTTP2TestHelpers):
             ]
             self.assertEqual(
                 receivedDataChunks,
-                [b"fiver"] + dataChunks + [b""],
+                [b"fiver", b"".join(dataChunks), b""],
             )
 
         return a._streamCleanupCallbacks[1].addCallback(validate)
@@ -1602,7 +1606,7 @@ class H2FlowControlTests(unittest.TestCase, HTTP2TestHelpers):
             ]
             self.assertEqual(
                 dataChunks,
-                [b"helloworld", b"helloworld", b""]
+                [b"helloworldhelloworld", b""]
             )
 
         return a._streamCleanupCallbacks[1].addCallback(validate)
@@ -1675,7 +1679,7 @@ class H2FlowControlTests(unittest.TestCase, HTTP2TestHelpers):
                 f.data for f in frames
                 if isinstance(f, hyperframe.frame.DataFrame)
             ]
-            self.assertEqual(dataChunks, [b"hello", b"world", b"h", b""])
+            self.assertEqual(dataChunks, [b"hello", b"worldh", b""])
 
         validateDefer = a._streamCleanupCallbacks[1].addCallback(validate)
         return defer.DeferredList([windowDefer, validateDefer])
@@ -2088,6 +2092,8 @@ class H2FlowControlTests(unittest.TestCase, HTTP2TestHelpers):
         transport = StringTransport()
         a = H2Connection()
         a.requestFactory = DummyHTTPHandler
+        # Return each chunk of data to the window as soon as it's consumed.
+        a.windowUpdateRatio = 0
 
         # Send the request, but instead of the last frame send a RST_STREAM
         # frame instead.
@@ -2135,6 +2141,286 @@ class H2FlowControlTests(unittest.TestCase, HTTP2TestHelpers):
 
 
 
+class H2DataFramingTests(unittest.TestCase, HTTP2TestHelpers):
+    """
+    Tests for the way that L{H2Connection} packs response data into DATA frames
+    and returns consumed request data to the flow control windows.
+    """
+    getRequestHeaders = [
+        (b':method', b'GET'),
+        (b':authority', b'localhost'),
+        (b':path', b'/'),
+        (b':scheme', b'https'),
+        (b'user-agent', b'twisted-test-code'),
+    ]
+
+
+    postRequestHeaders = [
+        (b':method', b'POST'),
+        (b':authority', b'localhost'),
+        (b':path', b'/post_endpoint'),
+        (b':scheme', b'https'),
+        (b'user-agent', b'twisted-test-code'),
+    ]
+
+
+    def connect(self, requestFactory, requestBytes):
+        """
+        Build a L{H2Connection} driven by a L{task.Clock}, and send it the
+        client connection preface followed by some bytes.
+
+        @param requestFactory: The L{Request} factory to use with the
+            connection.
+
+        @param requestBytes: The bytes to send after the preface.
+        @type requestBytes: L{bytes}
+
+        @return: The clock, the connection and its transport.
+        @rtype: L{tuple}
+        """
+        clock = task.Clock()
+        connection = H2Connection(clock)
+        connection.requestFactory = requestFactory
+        transport = StringTransport()
+        connection.makeConnection(transport)
+        connection.dataReceived(
+            FrameFactory().clientConnectionPreface() + requestBytes
+        )
+        return clock, connection, transport
+
+
+    def uploadBytes(self, frameFactory, chunks):
+        """
+        Build the bytes of a POST request whose body is sent in the given
+        chunks, without ending the stream.
+
+        @param frameFactory: The L{FrameFactory} to build the frames with.
+        @type frameFactory: L{FrameFactory}
+
+        @param chunks: The chunks of the request body.
+        @type chunks: L{list} of L{bytes}
+
+        @rtype: L{bytes}
+        """
+        frames = buildRequestFrames(
+            self.postRequestHeaders, chunks, frameFactory
+        )
+        frames[-1].flags = set()
+        return b''.join(f.serialize() for f in frames)
+
+
+    def windowUpdates(self, data):
+        """
+        Find the WINDOW_UPDATE frames in some data.
+
+        @param data: The data sent by a L{H2Connection}.
+        @type data: L{bytes}
+
+        @return: The stream ID and increment of each WINDOW_UPDATE frame.
+        @rtype: L{list} of L{tuple}
+        """
+        return [
+            (f.stream_id, f.window_increment) for f in framesFromBytes(data)
+            if isinstance(f, hyperframe.frame.WindowUpdateFrame)
+        ]
+
+
+    def sentData(self, data):
+        """
+        Find the data in the DATA frames in some data.
+
+        @param data: The data sent by a L{H2Connection}.
+        @type data: L{bytes}
+
+        @return: The data of each DATA frame.
+        @rtype: L{list} of L{bytes}
+        """
+        return [
+            f.data for f in framesFromBytes(data)
+            if isinstance(f, hyperframe.frame.DataFrame)
+        ]
+
+
+    def test_coalesceDataFrames(self):
+        """
+        Data written to a stream in many small chunks is sent in as few DATA
+        frames as the peer's maximum frame size allows.
+        """
+        f = FrameFactory()
+        clock, a, b = self.connect(
+            DummyProducerHandler,
+            buildRequestBytes(self.getRequestHeaders, [], f),
+        )
+        request = a.streams[1]._request
+        chunks = [b'x' * 1000] * 20
+        for chunk in chunks:
+            request.write(chunk)
+        request.unregisterProducer()
+        request.finish()
+        clock.advance(0)
+
+        dataFrames = self.sentData(b.value())
+        self.assertEqual(
+            [len(data) for data in dataFrames],
+            [a.conn.max_outbound_frame_size, 20000 - 16384, 0],
+        )
+        self.assertEqual(b''.join(dataFrames), b''.join(chunks))
+
+
+    def test_coalesceWithinWindow(self):
+        """
+        Coalesced DATA frames are no larger than the room left in the flow
+        control window.
+        """
+        f = FrameFactory()
+        requestBytes = f.buildSettingsFrame(
+            {h2.settings.INITIAL_WINDOW_SIZE: 5}
+        ).serialize()
+        requestBytes += buildRequestBytes(self.getRequestHeaders, [], f)
+        clock, a, b = self.connect(DummyProducerHandler, requestBytes)
+        request = a.streams[1]._request
+        request.write(b'abc')
+        request.write(b'def')
+        clock.advance(0)
+
+        self.assertEqual(self.sentData(b.value()), [b'abcde'])
+
+
+    def test_noCoalescing(self):
+        """
+        If L{H2Connection.coalesceDataFrames} is L{False}, each chunk of data
+        written to a stream is sent in a DATA frame of its own.
+        """
+        f = FrameFactory()
+        clock, a, b = self.connect(
+            DummyProducerHandler,
+            buildRequestBytes(self.getRequestHeaders, [], f),
+        )
+        a.coalesceDataFrames = False
+        request = a.streams[1]._request
+        for chunk in [b'hello', b'world']:
+            request.write(chunk)
+        request.unregisterProducer()
+        request.finish()
+        clock.advance(0)
+
+        self.assertEqual(
+            self.sentData(b.value()), [b'hello', b'world', b'']
+        )
+
+
+    def test_windowUpdatesBatched(self):
+        """
+        Consumed request data is only returned to the stream and connection
+        flow control windows once half of the initial window has been
+        consumed.
+        """
+        f = FrameFactory()
+        clock, a, b = self.connect(
+            DummyHTTPHandler, self.uploadBytes(f, [b'x' * 16384])
+        )
+        self.assertEqual(self.windowUpdates(b.value()), [])
+
+        a.dataReceived(f.buildDataFrame(b'x' * 16384).serialize())
+        self.assertEqual(
+            self.windowUpdates(b.value()), [(1, 32768), (0, 32768)]
+        )
+
+        a.dataReceived(f.buildDataFrame(b'x' * 16384).serialize())
+        self.assertEqual(
+            self.windowUpdates(b.value()), [(1, 32768), (0, 32768)]
+        )
+
+
+    def test_windowUpdatesWhenWindowLow(self):
+        """
+        Consumed request data is returned to the flow control windows as soon
+        as the peer has less room left in them than it is owed, whatever
+        L{H2Connection.windowUpdateRatio} is.
+        """
+        f = FrameFactory()
+        clock, a, b = self.connect(DummyHTTPHandler, b'')
+        a.windowUpdateRatio = 1
+        a.dataReceived(self.uploadBytes(f, [b'x' * 16384]))
+        self.assertEqual(self.windowUpdates(b.value()), [])
+
+        # The peer now has 32767 bytes of room, and is owed 32768.
+        a.dataReceived(f.buildDataFrame(b'x' * 16384).serialize())
+        self.assertEqual(
+            self.windowUpdates(b.value()), [(1, 32768), (0, 32768)]
+        )
+
+
+    def test_windowUpdatesWaitForConsumer(self):
+        """
+        Request data that has been buffered because the stream isn't producing
+        is only returned to the flow control windows once it is consumed.
+        """
+        f = FrameFactory()
+        clock, a, b = self.connect(
+            ConsumerDummyHandler, self.uploadBytes(f, [b'x' * 16384] * 3)
+        )
+        self.assertEqual(self.windowUpdates(b.value()), [])
+
+        a.streams[1]._request.acceptData()
+        self.assertEqual(
+            self.windowUpdates(b.value()), [(1, 49152), (0, 49152)]
+        )
+
+
+    def test_noStreamWindowUpdateAfterEnd(self):
+        """
+        Once the peer has ended a stream, consumed data is returned only to the
+        connection flow control window.
+        """
+        f = FrameFactory()
+        frames = buildRequestFrames(
+            self.postRequestHeaders, [b'x' * 16384] * 3, f
+        )
+        clock, a, b = self.connect(
+            ConsumerDummyHandler, b''.join(f.serialize() for f in frames)
+        )
+        a.streams[1]._request.acceptData()
+        self.assertEqual(self.windowUpdates(b.value()), [(0, 49152)])
+
+
+    def test_statistics(self):
+        """
+        L{H2Connection.statistics} describes the flow control windows of the
+        connection, the data waiting to be sent on each stream, and the frames
+        that have been sent.
+        """
+        f = FrameFactory()
+        requestBytes = f.buildSettingsFrame(
+            {h2.settings.INITIAL_WINDOW_SIZE: 5}
+        ).serialize()
+        requestBytes += buildRequestBytes(self.getRequestHeaders, [], f)
+        clock, a, b = self.connect(DummyProducerHandler, requestBytes)
+        a.streams[1]._request.write(b'helloworld')
+        clock.advance(0)
+
+        statistics = a.statistics()
+        self.assertEqual(statistics.outboundWindow, 65535 - 5)
+        self.assertEqual(statistics.inboundWindow, 65535)
+        self.assertEqual(statistics.queueDepths, {1: 5})
+        self.assertEqual(statistics.queuedBytes, 5)
+        self.assertEqual(statistics.flowControlBlockedStreamCount, 1)
+        self.assertEqual(statistics.dataFramesSent, 1)
+        self.assertEqual(statistics.dataBytesSent, 5)
+        self.assertEqual(statistics.windowUpdatesSent, 0)
+
+        a.dataReceived(
+            f.buildWindowUpdateFrame(streamID=1, increment=50).serialize()
+        )
+        clock.advance(0)
+
+        statistics = a.statistics()
+        self.assertEqual(statistics.queueDepths, {1: 0})
+        self.assertEqual(statistics.flowControlBlockedStreamCount, 0)
+        self.assertEqual(statistics.dataFramesSent, 2)
+        self.assertEqual(statistics.dataBytesSent, 10)
+
+
 class HTTP2TransportChecking(unittest.TestCase, HTTP2TestHelpers):
     getRequestHeaders = [
         (b':method', b'GET'),
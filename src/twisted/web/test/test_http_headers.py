@@ -7,9 +7,13 @@ Tests for L{twisted.web.http_headers}.
 
 from __future__ import division, absolute_import
 
+import gc
+import weakref
+
 from twisted.trial.unittest import TestCase
 from twisted.python.compat import _PY3
-from twisted.web.http_headers import Headers
+from twisted.web import http_headers
+from twisted.web.http_headers import Headers, _lowercaseName
 
 class BytesHeadersTests(TestCase):
     """
@@ -167,6 +171,183 @@ class BytesHeadersTests(TestCase):
                                (b"Test", (b"lemurs",))]))
 
 
+    def test_canonicalNamesRemembered(self):
+        """
+        L{Headers._canonicalNameCaps} remembers the canonical names of
+        headers it has not seen before, up to a limit.
+        """
+        self.patch(http_headers, '_canonicalNames', {})
+        names = http_headers._canonicalNamesFor(Headers._caseMappings)
+        self.patch(http_headers, '_MAX_CANONICAL_NAMES', len(names) + 1)
+        h = Headers()
+        self.assertEqual(h._canonicalNameCaps(b"x-first"), b"X-First")
+        self.assertEqual(h._canonicalNameCaps(b"x-second"), b"X-Second")
+        self.assertEqual(names.get(b"x-first"), b"X-First")
+        self.assertNotIn(b"x-second", names)
+
+
+    def test_caseMappingsChanged(self):
+        """
+        Changes to C{_caseMappings}, whether it is replaced or changed in
+        place, are used for the canonical names of headers even after they
+        have been remembered.
+        """
+        class ShoutingHeaders(Headers):
+            _caseMappings = {b'x-foo': b'X-FOO'}
+
+        h = ShoutingHeaders()
+        h.setRawHeaders(b"x-foo", [b"bar"])
+        self.assertEqual(list(h.getAllRawHeaders()), [(b"X-FOO", [b"bar"])])
+        ShoutingHeaders._caseMappings[b'x-foo'] = b'x-FOO'
+        self.assertEqual(list(h.getAllRawHeaders()), [(b"x-FOO", [b"bar"])])
+        ShoutingHeaders._caseMappings = {b'x-foo': b'X-fOO'}
+        self.assertEqual(list(h.getAllRawHeaders()), [(b"X-fOO", [b"bar"])])
+
+
+    def test_classesNotKept(self):
+        """
+        Remembering the canonical names of the headers of a subclass of
+        L{Headers} does not keep the subclass alive.
+        """
+        class ShoutingHeaders(Headers):
+            _caseMappings = {b'x-foo': b'X-FOO'}
+
+        h = ShoutingHeaders()
+        h.setRawHeaders(b"x-foo", [b"bar"])
+        list(h.getAllRawHeaders())
+        ref = weakref.ref(ShoutingHeaders)
+        del h, ShoutingHeaders
+        gc.collect()
+        self.assertIsNone(ref())
+
+
+    def test_caseMappingsLimited(self):
+        """
+        Once the canonical names for C{_MAX_CASE_MAPPINGS} different
+        C{_caseMappings} have been remembered, they are all forgotten.
+        """
+        self.patch(http_headers, '_canonicalNames', {})
+        self.patch(http_headers, '_MAX_CASE_MAPPINGS', 2)
+        mappings = [{}, {}, {}]
+        for caseMappings in mappings:
+            http_headers._canonicalNamesFor(caseMappings)
+        self.assertEqual(
+            list(http_headers._canonicalNames), [id(mappings[2])])
+
+
+    def test_subclassCaseMappings(self):
+        """
+        The C{_caseMappings} of a subclass of L{Headers} are used for its
+        headers, even for common headers, and do not affect the canonical
+        names of the headers of other classes.
+        """
+        class ShoutingHeaders(Headers):
+            _caseMappings = {
+                b'content-type': b'CONTENT-TYPE', b'x-foo': b'X-FOO'}
+
+        self.patch(http_headers, '_canonicalNames', {})
+        shouting = ShoutingHeaders()
+        shouting.setRawHeaders(b"content-type", [b"text/plain"])
+        shouting.setRawHeaders(b"x-foo", [b"bar"])
+        shouting.setRawHeaders(b"etag", [b'"x"'])
+        self.assertEqual(
+            sorted(shouting.getAllRawHeaders()),
+            [(b"CONTENT-TYPE", [b"text/plain"]), (b"Etag", [b'"x"']),
+             (b"X-FOO", [b"bar"])])
+
+        h = Headers()
+        h.setRawHeaders(b"content-type", [b"text/plain"])
+        h.setRawHeaders(b"x-foo", [b"bar"])
+        self.assertEqual(
+            sorted(h.getAllRawHeaders()),
+            [(b"Content-Type", [b"text/plain"]), (b"X-Foo", [b"bar"])])
+
+
+    def test_commonCanonicalNames(self):
+        """
+        The canonical names of common headers are known in advance, and used
+        by L{Headers.getAllRawHeaders}.
+        """
+        h = Headers()
+        h.setRawHeaders(b"content-md5", [b"x"])
+        h.setRawHeaders(b"content-type", [b"text/plain"])
+        self.assertEqual(
+            sorted(h.getAllRawHeaders()),
+            [(b"Content-MD5", [b"x"]), (b"Content-Type", [b"text/plain"])])
+
+
+    def test_lowercaseName(self):
+        """
+        L{_lowercaseName} lowercases header names, returning the same object
+        for a common header whatever its capitalization.
+        """
+        self.assertIs(_lowercaseName(b"Content-Type"),
+                      _lowercaseName(b"content-type"))
+        self.assertEqual(_lowercaseName(b"Content-Type"), b"content-type")
+        self.assertEqual(_lowercaseName(b"X-Unusual"), b"x-unusual")
+
+
+    def test_lowercaseUnhashableName(self):
+        """
+        L{_lowercaseName} and L{Headers._encodeName} lowercase unhashable
+        names, such as a L{bytearray}.
+        """
+        self.assertEqual(
+            _lowercaseName(bytearray(b"Content-Type")), b"content-type")
+        self.assertEqual(
+            Headers()._encodeName(bytearray(b"X-Unusual")), b"x-unusual")
+
+
+    def test_getLowercaseRawHeaders(self):
+        """
+        L{Headers.getLowercaseRawHeaders} returns the list of values of the
+        header with the given lowercase name, or the default if there is no
+        such header.
+        """
+        h = Headers()
+        h.setRawHeaders(b"Test", [b"lemur"])
+        h.getLowercaseRawHeaders(b"test").append(b"panda")
+        self.assertEqual(h.getRawHeaders(b"test"), [b"lemur", b"panda"])
+        self.assertIsNone(h.getLowercaseRawHeaders(b"missing"))
+        default = object()
+        self.assertIs(h.getLowercaseRawHeaders(b"missing", default), default)
+
+
+    def test_setLowercaseRawHeaders(self):
+        """
+        L{Headers.setLowercaseRawHeaders} stores the given list as the values
+        of the header with the given lowercase name.
+        """
+        h = Headers()
+        values = [b"lemur"]
+        h.setLowercaseRawHeaders(b"test", values)
+        self.assertIs(h.getLowercaseRawHeaders(b"test"), values)
+        self.assertEqual(h.getRawHeaders(b"Test"), [b"lemur"])
+
+
+    def test_addLowercaseRawHeader(self):
+        """
+        L{Headers.addLowercaseRawHeader} adds a value for the header with the
+        given lowercase name.
+        """
+        h = Headers()
+        h.addLowercaseRawHeader(b"test", b"lemur")
+        h.addLowercaseRawHeader(b"test", b"panda")
+        self.assertEqual(h.getRawHeaders(b"test"), [b"lemur", b"panda"])
+
+
+    def test_setRawHeadersCopies(self):
+        """
+        L{Headers.setRawHeaders} stores a copy of the given list, so changing
+        the list afterwards does not change the header.
+        """
+        h = Headers()
+        values = [b"lemur"]
+        h.setRawHeaders(b"test", values)
+        values.append(b"panda")
+        self.assertEqual(h.getRawHeaders(b"test"), [b"lemur"])
+
+
     def test_headersComparison(self):
         """
         A L{Headers} instance compares equal to itself and to another
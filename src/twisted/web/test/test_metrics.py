@@ -0,0 +1,406 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.web.metrics} and the C{metrics} of
+L{twisted.web.server.Site}.
+"""
+
+from __future__ import division, absolute_import
+
+from zope.interface import implementer
+from zope.interface.verify import verifyObject
+
+from twisted.internet.task import Clock
+from twisted.test.proto_helpers import StringTransport
+from twisted.trial.unittest import TestCase
+from twisted.web.iweb import IRequestMetrics
+from twisted.web.metrics import Histogram, HistogramCollector
+from twisted.web.metrics import PrometheusResource
+from twisted.web.resource import Resource
+from twisted.web.server import NOT_DONE_YET, Site
+from twisted.web.test._util import _render
+from twisted.web.test.requesthelper import DummyRequest
+
+
+
+class HistogramTests(TestCase):
+    """
+    Tests for L{Histogram}.
+    """
+    def test_empty(self):
+        """
+        A L{Histogram} with no values recorded has a count, total, maximum
+        and percentiles of 0.
+        """
+        histogram = Histogram()
+        self.assertEqual(histogram.count, 0)
+        self.assertEqual(histogram.total, 0)
+        self.assertEqual(histogram.maximum, 0)
+        self.assertEqual(histogram.percentile(50), 0)
+
+
+    def test_record(self):
+        """
+        L{Histogram.record} counts a value, and adds it to the total.
+        """
+        histogram = Histogram()
+        for value in [3, 1, 2]:
+            histogram.record(value)
+        self.assertEqual(histogram.count, 3)
+        self.assertEqual(histogram.total, 6)
+        self.assertEqual(histogram.maximum, 3)
+
+
+    def test_recordRoundsDown(self):
+        """
+        L{Histogram.record} rounds values down to integers, and records
+        negative values as 0.
+        """
+        histogram = Histogram()
+        histogram.record(2.9)
+        histogram.record(-5)
+        self.assertEqual(histogram.total, 2)
+        self.assertEqual(histogram.percentile(50), 0)
+
+
+    def test_smallValuesExact(self):
+        """
+        Values less than C{2 ** precision} are counted exactly.
+        """
+        histogram = Histogram(precision=4)
+        for value in range(16):
+            histogram.record(value)
+        self.assertEqual(
+            [histogram.percentile(100 * (value + 1) / 16)
+             for value in range(16)],
+            list(range(16)))
+
+
+    def test_buckets(self):
+        """
+        Each bucket of a L{Histogram} follows on from the one before it, and
+        is no wider than C{2 ** (1 - precision)} of the values in it.
+        """
+        histogram = Histogram(precision=4)
+        previousHigh = -1
+        for index in range(200):
+            low, high = histogram._bucketBounds(index)
+            self.assertEqual(low, previousHigh + 1)
+            self.assertTrue(high - low + 1 <= max(1, low / 8))
+            self.assertEqual(histogram._bucketIndex(low), index)
+            self.assertEqual(histogram._bucketIndex(high), index)
+            previousHigh = high
+
+
+    def test_percentile(self):
+        """
+        L{Histogram.percentile} gives the largest value which could be in the
+        bucket holding the value at the given percentile, but no more than
+        the largest value recorded.
+        """
+        histogram = Histogram(precision=4)
+        for value in range(1, 1001):
+            histogram.record(value)
+        self.assertEqual(histogram.percentile(50), 511)
+        self.assertEqual(histogram.percentile(90), 959)
+        self.assertEqual(histogram.percentile(100), 1000)
+
+
+
+@implementer(IRequestMetrics)
+class RecordingMetrics(object):
+    """
+    An L{IRequestMetrics} provider which records the calls made to it.
+
+    @ivar calls: The method name and arguments of each call.
+    @type calls: L{list} of L{tuple}
+    """
+    def __init__(self):
+        self.calls = []
+
+
+    def requestStarted(self, request):
+        self.calls.append(("requestStarted", request))
+
+
+    def requestFinished(self, request, code, path, responseSize,
+                        timeToFirstByte, duration):
+        self.calls.append(
+            ("requestFinished", request, code, path, responseSize,
+             timeToFirstByte, duration))
+
+
+
+class DelayedResource(Resource):
+    """
+    A resource which responds to a request later.
+
+    @ivar requests: The requests rendered.
+    @type requests: L{list}
+    """
+    isLeaf = True
+
+    def __init__(self):
+        Resource.__init__(self)
+        self.requests = []
+
+
+    def render(self, request):
+        self.requests.append(request)
+        return NOT_DONE_YET
+
+
+
+class SiteMetricsTests(TestCase):
+    """
+    Tests for the C{metrics} of L{Site}.
+    """
+    def setUp(self):
+        self.clock = Clock()
+        self.resource = DelayedResource()
+        root = Resource()
+        root.putChild(b"delayed", self.resource)
+        self.metrics = RecordingMetrics()
+        self.site = Site(root, timeout=None, reactor=self.clock)
+        self.site.metrics = self.metrics
+        self.transport = StringTransport()
+        self.channel = self.site.buildProtocol(None)
+        self.channel.makeConnection(self.transport)
+
+
+    def test_default(self):
+        """
+        A L{Site} has no C{metrics} by default.
+        """
+        self.assertIsNone(Site(Resource()).metrics)
+
+
+    def test_requestStarted(self):
+        """
+        L{IRequestMetrics.requestStarted} is called when a request is
+        processed.
+        """
+        self.channel.dataReceived(b"GET /delayed/x HTTP/1.1\r\n\r\n")
+        [request] = self.resource.requests
+        self.assertEqual(self.metrics.calls, [("requestStarted", request)])
+
+
+    def test_requestFinished(self):
+        """
+        L{IRequestMetrics.requestFinished} is called when a request is
+        finished, with the response status code, the path of the resource
+        which handled it, the size of the response body, the time taken to
+        write the response headers and the time taken to finish.
+        """
+        self.channel.dataReceived(b"GET /delayed/x HTTP/1.1\r\n\r\n")
+        [request] = self.resource.requests
+        request.setResponseCode(201)
+        self.clock.advance(1.5)
+        request.write(b"hello")
+        self.clock.advance(2)
+        request.write(b"world")
+        request.finish()
+        self.assertEqual(
+            self.metrics.calls[1:],
+            [("requestFinished", request, 201, b"/delayed", 10, 1.5, 3.5)])
+
+
+    def test_requestFinishedWithoutWrites(self):
+        """
+        A request finished without writing anything has a time to first byte
+        of the time taken to finish it, as the response headers are written
+        then.
+        """
+        self.channel.dataReceived(b"GET /delayed HTTP/1.1\r\n\r\n")
+        [request] = self.resource.requests
+        self.clock.advance(1)
+        request.finish()
+        self.assertEqual(
+            self.metrics.calls[1:],
+            [("requestFinished", request, 200, b"/delayed", 0, 1, 1)])
+
+
+    def test_connectionLost(self):
+        """
+        L{IRequestMetrics.requestFinished} is called when the connection of
+        an unfinished request is lost, and not again if it is finished later.
+        """
+        self.channel.dataReceived(b"GET /delayed HTTP/1.1\r\n\r\n")
+        [request] = self.resource.requests
+        self.clock.advance(1)
+        self.channel.connectionLost(None)
+        self.assertEqual(
+            self.metrics.calls[1:],
+            [("requestFinished", request, 200, b"/delayed", 0, None, 1)])
+        self.assertFalse(request.finished)
+
+
+    def test_collector(self):
+        """
+        A L{HistogramCollector} measures the requests of a L{Site}.
+        """
+        collector = HistogramCollector()
+        self.site.metrics = collector
+        self.channel.dataReceived(
+            b"GET /delayed HTTP/1.1\r\n\r\n" * 2)
+        self.assertEqual(collector.requestsInFlight, 1)
+        [request] = self.resource.requests
+        self.clock.advance(0.25)
+        request.write(b"x" * 100)
+        request.finish()
+        self.assertEqual(collector.requestsStarted, 2)
+        self.assertEqual(collector.requestsFinished, 1)
+        self.assertEqual(collector.requestsInFlight, 1)
+        self.assertEqual(collector.responses, {200: 1})
+        self.assertEqual(collector.bytesSent, 100)
+        self.assertEqual(collector.duration.total, 250000)
+        self.assertEqual(collector.timeToFirstByte.total, 250000)
+        self.assertEqual(collector.responseSize.total, 100)
+
+
+
+class FakeRequest(object):
+    """
+    A request as far as L{HistogramCollector} is concerned.
+
+    @ivar finished: Whether the request was finished.
+    @type finished: L{bool}
+    """
+    def __init__(self, finished=True):
+        self.finished = finished
+
+
+
+class HistogramCollectorTests(TestCase):
+    """
+    Tests for L{HistogramCollector}.
+    """
+    def test_interface(self):
+        """
+        L{HistogramCollector} provides L{IRequestMetrics}.
+        """
+        self.assertTrue(verifyObject(IRequestMetrics, HistogramCollector()))
+
+
+    def test_requestFinished(self):
+        """
+        L{HistogramCollector.requestFinished} counts the response, and records
+        its latencies in microseconds and its size in bytes.
+        """
+        collector = HistogramCollector()
+        request = FakeRequest()
+        collector.requestStarted(request)
+        collector.requestFinished(request, 404, b"/", 20, 0.001, 0.002)
+        self.assertEqual(collector.requestsStarted, 1)
+        self.assertEqual(collector.requestsFinished, 1)
+        self.assertEqual(collector.requestsLost, 0)
+        self.assertEqual(collector.responses, {404: 1})
+        self.assertEqual(collector.bytesSent, 20)
+        self.assertEqual(collector.timeToFirstByte.maximum, 1000)
+        self.assertEqual(collector.duration.maximum, 2000)
+        self.assertEqual(collector.responseSize.maximum, 20)
+
+
+    def test_requestLost(self):
+        """
+        L{HistogramCollector.requestFinished} counts an unfinished request as
+        lost rather than as a response, and doesn't record a time to first
+        byte of L{None}.
+        """
+        collector = HistogramCollector()
+        request = FakeRequest(finished=False)
+        collector.requestStarted(request)
+        collector.requestFinished(request, 200, b"/", 0, None, 1)
+        self.assertEqual(collector.requestsLost, 1)
+        self.assertEqual(collector.requestsInFlight, 0)
+        self.assertEqual(collector.responses, {})
+        self.assertEqual(collector.timeToFirstByte.count, 0)
+        self.assertEqual(collector.duration.count, 1)
+
+
+
+class PrometheusResourceTests(TestCase):
+    """
+    Tests for L{PrometheusResource}.
+    """
+    def render(self, resource):
+        """
+        Render a resource for a I{GET} request.
+
+        @return: The lines of the response body.
+        @rtype: L{list} of L{bytes}
+        """
+        request = DummyRequest([b""])
+        d = _render(resource, request)
+        d.addCallback(lambda ignored: b"".join(request.written))
+        body = self.successResultOf(d)
+        self.assertEqual(
+            request.responseHeaders.getRawHeaders(b"content-type"),
+            [b"text/plain; version=0.0.4"])
+        self.assertTrue(body.endswith(b"\n"))
+        return body.splitlines()
+
+
+    def test_render(self):
+        """
+        L{PrometheusResource} renders the counters of a L{HistogramCollector}
+        as counters and gauges, and its histograms as summaries, in seconds
+        and bytes.
+        """
+        collector = HistogramCollector()
+        for code in [200, 200, 404]:
+            request = FakeRequest()
+            collector.requestStarted(request)
+            collector.requestFinished(request, code, b"/", 100, 0.5, 1)
+        collector.requestStarted(FakeRequest())
+        lines = self.render(PrometheusResource(collector))
+
+        self.assertEqual(lines[:15], [
+            b"# HELP twisted_web_requests_started_total Requests started.",
+            b"# TYPE twisted_web_requests_started_total counter",
+            b"twisted_web_requests_started_total 4",
+            b"# HELP twisted_web_requests_in_flight "
+            b"Requests started but not finished.",
+            b"# TYPE twisted_web_requests_in_flight gauge",
+            b"twisted_web_requests_in_flight 1",
+            b"# HELP twisted_web_requests_lost_total "
+            b"Requests whose connections were lost before they finished.",
+            b"# TYPE twisted_web_requests_lost_total counter",
+            b"twisted_web_requests_lost_total 0",
+            b"# HELP twisted_web_responses_total "
+            b"Responses finished, by status code.",
+            b"# TYPE twisted_web_responses_total counter",
+            b'twisted_web_responses_total{code="200"} 2',
+            b'twisted_web_responses_total{code="404"} 1',
+            b"# HELP twisted_web_response_bytes_total "
+            b"Bytes of response bodies written.",
+            b"# TYPE twisted_web_response_bytes_total counter",
+        ])
+        self.assertIn(b"twisted_web_response_bytes_total 300", lines)
+        self.assertIn(
+            b"# TYPE twisted_web_request_duration_seconds summary", lines)
+        self.assertIn(
+            b'twisted_web_request_duration_seconds{quantile="0.5"} 1.0',
+            lines)
+        self.assertIn(b"twisted_web_request_duration_seconds_sum 3.0", lines)
+        self.assertIn(b"twisted_web_request_duration_seconds_count 3", lines)
+        self.assertIn(
+            b'twisted_web_time_to_first_byte_seconds{quantile="0.99"} 0.5',
+            lines)
+        self.assertIn(b'twisted_web_response_size_bytes{quantile="0.9"} 100',
+                      lines)
+        self.assertIn(b"twisted_web_response_size_bytes_sum 300", lines)
+
+
+    def test_prefix(self):
+        """
+        The names of the metrics rendered by L{PrometheusResource} start with
+        the given prefix.
+        """
+        lines = self.render(PrometheusResource(HistogramCollector(), b"app"))
+        self.assertEqual(
+            lines[:3],
+            [b"# HELP app_requests_started_total Requests started.",
+             b"# TYPE app_requests_started_total counter",
+             b"app_requests_started_total 0"])
@@ -1730,6 +1730,200 @@ class HTTP11ClientProtocolTests(TestCase):
 
 
 
+class HTTP11ClientProtocolPipeliningTests(TestCase):
+    """
+    Tests for pipelining requests with L{HTTP11ClientProtocol}.
+    """
+    def setUp(self):
+        """
+        Create an L{HTTP11ClientProtocol} which pipelines up to two requests,
+        connected to a fake transport.
+        """
+        self.quiescent = []
+        self.lost = []
+        self.transport = StringTransport()
+        self.protocol = HTTP11ClientProtocol(
+            self.quiescent.append, self.lost.append)
+        self.protocol.pipelineDepth = 2
+        self.protocol.makeConnection(self.transport)
+
+
+    def request(self, method=b'GET', uri=b'/', bodyProducer=None,
+                persistent=True):
+        """
+        Issue a request over the protocol.
+        """
+        return self.protocol.request(
+            Request(method, uri, _boringHeaders, bodyProducer,
+                    persistent=persistent))
+
+
+    def test_disabledByDefault(self):
+        """
+        Unless C{pipelineDepth} is set, a request issued while waiting for a
+        response fails with L{RequestNotSent}.
+        """
+        protocol = HTTP11ClientProtocol()
+        protocol.makeConnection(StringTransport())
+        protocol.request(Request(b'GET', b'/', _boringHeaders, None))
+        self.failureResultOf(
+            protocol.request(Request(b'GET', b'/', _boringHeaders, None)),
+            RequestNotSent)
+
+
+    def test_pipelinedRequestWritten(self):
+        """
+        A request issued while waiting for the response to an earlier one is
+        written to the transport straight away.
+        """
+        self.request(uri=b'/first')
+        self.transport.clear()
+        self.request(uri=b'/second')
+        self.assertEqual(
+            self.transport.value(),
+            b'GET /second HTTP/1.1\r\nHost: example.com\r\n\r\n')
+
+
+    def test_responsesInOrder(self):
+        """
+        The responses to pipelined requests are parsed in the order the
+        requests were sent, even if they are all received at once, and the
+        C{quiescentCallback} is only called after the last of them.
+        """
+        first = self.request(uri=b'/first')
+        second = self.request(uri=b'/second')
+        third = self.request(method=b'HEAD', uri=b'/third')
+        self.protocol.dataReceived(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Length: 5\r\n"
+            b"\r\n"
+            b"first"
+            b"HTTP/1.1 404 Not Found\r\n"
+            b"Content-Length: 6\r\n"
+            b"\r\n"
+            b"second"
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Length: 1000\r\n"
+            b"\r\n")
+        self.assertEqual(
+            [self.successResultOf(d).code for d in (first, second, third)],
+            [200, 404, 200])
+        self.assertEqual(self.quiescent, [self.protocol])
+        self.assertEqual(self.protocol.state, 'QUIESCENT')
+
+
+    def test_partialResponses(self):
+        """
+        A pipelined response which arrives in pieces, along with the end of
+        the response ahead of it, is parsed correctly.
+        """
+        first = self.request(uri=b'/first')
+        second = self.request(uri=b'/second')
+        self.protocol.dataReceived(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Length: 3\r\n"
+            b"\r\n")
+        self.protocol.dataReceived(b"abcHTTP/1.1 20")
+        self.assertNoResult(second)
+        self.protocol.dataReceived(b"4 No Content\r\n\r\n")
+        self.assertEqual(self.successResultOf(first).code, 200)
+        self.assertEqual(self.successResultOf(second).code, 204)
+
+
+    def test_depth(self):
+        """
+        No more than C{pipelineDepth} requests are pipelined behind the one
+        being waited for.
+        """
+        self.request()
+        self.request()
+        self.request()
+        self.failureResultOf(self.request(), RequestNotSent)
+
+
+    def test_unsafeRequestNotPipelined(self):
+        """
+        Requests with a non-idempotent method, with a body, or which close
+        the connection are not pipelined, and nothing is pipelined behind
+        them.
+        """
+        self.request()
+        self.failureResultOf(self.request(method=b'POST'), RequestNotSent)
+        self.failureResultOf(
+            self.request(bodyProducer=StringProducer(3)), RequestNotSent)
+        self.failureResultOf(self.request(persistent=False), RequestNotSent)
+        protocol = HTTP11ClientProtocol()
+        protocol.pipelineDepth = 2
+        protocol.makeConnection(StringTransport())
+        protocol.request(Request(b'POST', b'/', _boringHeaders, None))
+        self.failureResultOf(
+            protocol.request(Request(b'GET', b'/', _boringHeaders, None)),
+            RequestNotSent)
+
+
+    def test_notPipelinedBehindClose(self):
+        """
+        Once the response being received has said that the connection will be
+        closed, no more requests are pipelined.
+        """
+        self.request()
+        self.protocol.dataReceived(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Connection: close\r\n"
+            b"Content-Length: 10\r\n"
+            b"\r\n")
+        self.failureResultOf(self.request(), RequestNotSent)
+
+
+    def test_closedAfterResponse(self):
+        """
+        If the server closes the connection after the response to the first
+        request, the pipelined requests fail with L{ResponseNeverReceived}.
+        """
+        first = self.request()
+        second = self.request()
+        self.protocol.dataReceived(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Connection: close\r\n"
+            b"Content-Length: 0\r\n"
+            b"\r\n")
+        self.assertEqual(self.successResultOf(first).code, 200)
+        self.assertTrue(self.transport.disconnecting)
+        return assertWrapperExceptionTypes(
+            self, second, ResponseNeverReceived, [ConnectionDone])
+
+
+    def test_connectionLost(self):
+        """
+        If the connection is lost, the pipelined requests fail with
+        L{ResponseNeverReceived} and the C{lostCallback} is called.
+        """
+        first = self.request()
+        second = self.request()
+        self.protocol.connectionLost(Failure(ConnectionLost()))
+        self.assertEqual(self.lost, [self.protocol])
+        self.assertEqual(self.protocol.state, 'CONNECTION_LOST')
+        d = assertWrapperExceptionTypes(
+            self, first, ResponseNeverReceived, [ConnectionLost])
+        return d.addCallback(lambda ignored: assertWrapperExceptionTypes(
+            self, second, ResponseNeverReceived, [ConnectionLost]))
+
+
+    def test_cancelPipelined(self):
+        """
+        Cancelling a pipelined request aborts the connection, since the
+        server will answer it anyway, and fails it with
+        L{ResponseNeverReceived} wrapping L{CancelledError}.
+        """
+        self.request()
+        second = self.request()
+        second.cancel()
+        self.assertTrue(self.transport.aborting)
+        return assertWrapperExceptionTypes(
+            self, second, ResponseNeverReceived, [CancelledError])
+
+
+
 @implementer(IBodyProducer)
 class StringProducer:
     """
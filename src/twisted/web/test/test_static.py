@@ -5,6 +5,7 @@
 Tests for L{twisted.web.static}.
 """
 import errno
+import gzip
 import inspect
 import mimetypes
 import os
@@ -15,18 +16,33 @@ from io import BytesIO as StringIO
 
 from zope.interface.verify import verifyObject
 
-from twisted.internet import abstract, interfaces
+from twisted.internet import abstract, interfaces, defer
+from twisted.internet.protocol import Factory, Protocol
+from twisted.internet.task import Clock
+from twisted.protocols.policies import ProtocolWrapper, WrappingFactory
 from twisted.python.runtime import platform
 from twisted.python.filepath import FilePath
-from twisted.python import log
+from twisted.python import log, filepath
+from twisted.python.reflect import requireModule
 from twisted.python.compat import intToBytes, networkString, _PY3
+from twisted.test.proto_helpers import StringTransport
 from twisted.trial.unittest import TestCase
-from twisted.web import static, http, script, resource
+from twisted.web import static, http, script, resource, server
 from twisted.web.server import UnsupportedMethod
 from twisted.web.test.requesthelper import DummyRequest
 from twisted.web.test._util import _render
 from twisted.web._responses import FOUND
 
+if requireModule('twisted.python._inotify') is not None:
+    from twisted.internet import inotify
+else:
+    inotify = None
+
+if requireModule('OpenSSL') is not None:
+    from twisted.internet import ssl
+    from twisted.protocols.tls import TLSMemoryBIOFactory
+else:
+    ssl = None
 
 class StaticDataTests(TestCase):
     """
@@ -760,6 +776,405 @@ class StaticMakeProducerTests(TestCase):
 
 
 
+class FileCacheTests(TestCase):
+    """
+    Tests for L{static.FileCache} and its use by L{static.File}.
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        self.base = FilePath(self.mktemp())
+        self.base.makedirs()
+        self.base.child(b'small').setContent(b'hello')
+        self.base.child(b'big').setContent(b'x' * 100)
+        self.cache = static.FileCache(
+            maxEntries=3, maxFileSize=10, ttl=5, reactor=self.clock)
+        self.root = static.File(self.base.path)
+        self.root.cache = self.cache
+
+
+    def render(self, name):
+        """
+        Render a child of C{self.root}.
+
+        @param name: The name of the child.
+        @type name: L{bytes}
+
+        @return: The request, once the response has been rendered.
+        """
+        request = DummyRequest([name])
+        child = resource.getChildForRequest(self.root, request)
+        self.successResultOf(_render(child, request))
+        return request
+
+
+    def test_childrenShareCache(self):
+        """
+        The L{static.File}s created for the children of a L{static.File}
+        share its cache.
+        """
+        request = DummyRequest([b'small'])
+        child = resource.getChildForRequest(self.root, request)
+        self.assertIs(self.cache, child.cache)
+
+
+    def test_noSystemCalls(self):
+        """
+        Once a small file is in the cache, it is served without C{stat}ing or
+        opening it.
+        """
+        self.render(b'small')
+        def fail(*args):
+            self.fail("Should not have been called.")
+        self.patch(filepath, 'stat', fail)
+        self.patch(static.File, 'openForReading', fail)
+        request = self.render(b'small')
+        self.assertEqual(b'hello', b''.join(request.written))
+        self.assertEqual(
+            [b'text/html'], request.responseHeaders.getRawHeaders(
+                b'content-type'))
+
+
+    def test_bigFileContentNotKept(self):
+        """
+        The contents of files bigger than L{static.FileCache.maxFileSize}
+        are not kept, so they are read each time they are served.
+        """
+        self.render(b'big')
+        entry = self.cache.restat(self.base.child(b'big'))
+        self.assertIs(None, entry.content)
+        request = self.render(b'big')
+        self.assertEqual(b'x' * 100, b''.join(request.written))
+
+
+    def test_ttl(self):
+        """
+        What the cache knows about a file is used for
+        L{static.FileCache.ttl} seconds.
+        """
+        self.render(b'small')
+        small = self.base.child(b'small')
+        small.setContent(b'changed')
+        self.clock.advance(4)
+        self.assertEqual(b'hello', b''.join(self.render(b'small').written))
+        self.clock.advance(1)
+        self.assertEqual(b'changed', b''.join(self.render(b'small').written))
+
+
+    def test_range(self):
+        """
+        Ranges of files in the cache are served from the kept contents.
+        """
+        self.render(b'small')
+        request = DummyRequest([b'small'])
+        request.requestHeaders.addRawHeader(b'range', b'bytes=1-3')
+        child = resource.getChildForRequest(self.root, request)
+        self.successResultOf(_render(child, request))
+        self.assertEqual(b'ell', b''.join(request.written))
+
+
+    def test_leastRecentlyUsedForgotten(self):
+        """
+        Once L{static.FileCache.maxEntries} files are in the cache, the least
+        recently used one is forgotten to make room for another.
+        """
+        paths = []
+        for name in [b'a', b'b', b'c']:
+            path = self.base.child(name)
+            path.setContent(name)
+            paths.append(path)
+            self.cache.restat(path)
+        self.cache.restat(paths[0])
+        self.cache.restat(self.base.child(b'small'))
+        self.assertEqual(3, len(self.cache))
+        self.assertEqual(
+            [paths[2].path, paths[0].path, self.base.child(b'small').path],
+            list(self.cache._entries))
+
+
+    def test_missingNotKept(self):
+        """
+        Paths which do not exist are not kept in the cache.
+        """
+        self.assertIs(None, self.cache.restat(self.base.child(b'missing')))
+        self.assertEqual(0, len(self.cache))
+        self.assertEqual(404, self.render(b'missing').responseCode)
+
+
+    def test_invalidate(self):
+        """
+        L{static.FileCache.invalidate} forgets about one file, or all of them.
+        """
+        small = self.base.child(b'small')
+        self.cache.restat(small)
+        self.cache.restat(self.base.child(b'big'))
+        self.cache.invalidate(small)
+        self.assertEqual([self.base.child(b'big').path],
+                         list(self.cache._entries))
+        self.cache.invalidate()
+        self.assertEqual(0, len(self.cache))
+
+
+    def test_etag(self):
+        """
+        Responses for files in the cache have an entity tag, and are not sent
+        if the request's I{If-None-Match} header matches it.
+        """
+        request = DummyRequest([b'small'])
+        etags = []
+        def setETag(etag):
+            etags.append(etag)
+            return http.CACHED
+        request.setETag = setETag
+        child = resource.getChildForRequest(self.root, request)
+        self.successResultOf(_render(child, request))
+        entry = self.cache.restat(self.base.child(b'small'))
+        self.assertEqual([entry.etag], etags)
+        self.assertEqual(b'', b''.join(request.written))
+
+
+    def test_notifier(self):
+        """
+        If L{static.FileCache} is given an L{inotify.INotify}, it forgets
+        about files in the cache as soon as they change.
+        """
+        notifier = inotify.INotify()
+        notifier.startReading()
+        self.addCleanup(notifier.loseConnection)
+        cache = static.FileCache(ttl=None, notifier=notifier)
+        self.root.cache = cache
+        self.render(b'small')
+        forgotten = defer.Deferred()
+        forget = cache._forget
+        def _forget(key):
+            forget(key)
+            forgotten.callback(key)
+        cache._forget = _forget
+        self.base.child(b'small').setContent(b'changed')
+
+        def cbForgotten(key):
+            self.assertEqual(self.base.child(b'small').path, key)
+            self.assertEqual(
+                b'changed', b''.join(self.render(b'small').written))
+        return forgotten.addCallback(cbForgotten)
+    if inotify is None:
+        test_notifier.skip = "This platform doesn't support INotify."
+
+
+
+class CountingEncoder(object):
+    """
+    An encoder which reverses what it encodes, and counts the times it is
+    used.
+
+    @ivar encoded: The number of times C{encode} has been called.
+    """
+    encoded = 0
+
+    def encode(self, data):
+        CountingEncoder.encoded += 1
+        return data[::-1]
+
+
+    def finish(self):
+        return b''
+
+
+
+class PrecompressedTests(TestCase):
+    """
+    Tests for L{static.File.precompressed}, and for the encoded contents kept
+    by L{static.FileCache}.
+    """
+
+    def setUp(self):
+        self.base = FilePath(self.mktemp())
+        self.base.makedirs()
+        self.base.child(b'app.css').setContent(b'plain')
+        self.base.child(b'app.css.gz').setContent(b'gzipped')
+        self.root = static.File(self.base.path)
+        self.root.precompressed = [('br', '.br'), ('gzip', '.gz')]
+
+
+    def render(self, acceptEncoding=None, name=b'app.css'):
+        """
+        Render a child of C{self.root}.
+
+        @param acceptEncoding: The I{Accept-Encoding} header of the request,
+            or L{None} for none.
+
+        @param name: The name of the child.
+
+        @return: The request, once the response has been rendered.
+        """
+        request = DummyRequest([name])
+        if acceptEncoding is not None:
+            request.requestHeaders.setRawHeaders(
+                b'accept-encoding', [acceptEncoding])
+        child = resource.getChildForRequest(self.root, request)
+        self.successResultOf(_render(child, request))
+        return request
+
+
+    def test_acceptedEncodings(self):
+        """
+        L{static._acceptedEncodings} finds the codings in the
+        I{Accept-Encoding} headers given a non-zero quality.
+        """
+        request = DummyRequest([])
+        request.requestHeaders.setRawHeaders(
+            b'accept-encoding', [b'GZIP;q=0.5, br;q=0', b'deflate;q=x, sdch'])
+        self.assertEqual(
+            set(['gzip', 'sdch']), static._acceptedEncodings(request))
+
+
+    def test_precompressed(self):
+        """
+        If the request accepts a coding and there is a file with the
+        corresponding extension, it is served instead, with that coding and
+        the original file's content type.
+        """
+        request = self.render(b'gzip, deflate')
+        self.assertEqual(b'gzipped', b''.join(request.written))
+        headers = request.responseHeaders
+        self.assertEqual(
+            [b'gzip'], headers.getRawHeaders(b'content-encoding'))
+        self.assertEqual(
+            [b'text/css'],
+            headers.getRawHeaders(b'content-type'))
+        self.assertEqual([b'accept-encoding'], headers.getRawHeaders(b'vary'))
+
+
+    def test_preference(self):
+        """
+        The first of L{static.File.precompressed} which the request accepts
+        and which exists is served.
+        """
+        self.base.child(b'app.css.br').setContent(b'brotli')
+        self.assertEqual(
+            b'brotli', b''.join(self.render(b'gzip, br').written))
+        self.assertEqual(b'gzipped', b''.join(self.render(b'gzip').written))
+
+
+    def test_notAccepted(self):
+        """
+        If the request does not accept any of the codings, the file itself is
+        served.
+        """
+        request = self.render(b'br, gzip;q=0')
+        self.assertEqual(b'plain', b''.join(request.written))
+        self.assertIs(
+            None, request.responseHeaders.getRawHeaders(b'content-encoding'))
+        self.assertEqual(
+            [b'accept-encoding'], request.responseHeaders.getRawHeaders(b'vary'))
+        self.assertEqual(b'plain', b''.join(self.render().written))
+
+
+    def test_notEncodedAgain(self):
+        """
+        A precompressed file is not encoded again by the request's encoder.
+        """
+        request = DummyRequest([b'app.css'])
+        request.requestHeaders.setRawHeaders(b'accept-encoding', [b'gzip'])
+        request._encoder = CountingEncoder()
+        child = resource.getChildForRequest(self.root, request)
+        self.successResultOf(_render(child, request))
+        self.assertIs(None, request._encoder)
+        self.assertEqual(b'gzipped', b''.join(request.written))
+
+
+    def test_missingRemembered(self):
+        """
+        If L{static.File} has a cache, it remembers which precompressed files
+        are missing.
+        """
+        self.root.cache = static.FileCache(reactor=Clock())
+        self.render(b'br')
+        def fail(*args):
+            self.fail("Should not have been called.")
+        self.patch(filepath, 'stat', fail)
+        request = self.render(b'br')
+        self.assertEqual(b'plain', b''.join(request.written))
+
+
+    def test_missingForgottenOnExpiry(self):
+        """
+        A precompressed file created after L{static.File} found it missing is
+        served once the cache entry for the file expires.
+        """
+        clock = Clock()
+        self.root.cache = static.FileCache(ttl=1.0, reactor=clock)
+        self.assertEqual(b'plain', b''.join(self.render(b'br').written))
+        self.assertEqual(b'plain', b''.join(self.render(b'br').written))
+        self.base.child(b'app.css.br').setContent(b'brotli')
+        clock.advance(2)
+        self.assertEqual(b'brotli', b''.join(self.render(b'br').written))
+
+
+    def test_encodedETag(self):
+        """
+        The entity tag of a response encoded by the request's encoder differs
+        from that of the file itself.
+        """
+        self.root.precompressed = ()
+        self.root.cache = static.FileCache(reactor=Clock())
+        etags = []
+        for encoder in [None, CountingEncoder()]:
+            request = DummyRequest([b'app.css'])
+            request.setETag = etags.append
+            if encoder is not None:
+                request.responseHeaders.setRawHeaders(
+                    b'content-encoding', [b'reversed'])
+                request._encoder = encoder
+            child = resource.getChildForRequest(self.root, request)
+            self.successResultOf(_render(child, request))
+        identity, encoded = etags
+        self.assertEqual(identity[:-1] + b'-reversed"', encoded)
+
+
+    def test_encodedKept(self):
+        """
+        If L{static.File} has a cache, a small file is encoded only once for
+        all the responses which are encoded in the same way.
+        """
+        self.root.precompressed = ()
+        self.root.cache = static.FileCache(reactor=Clock())
+        self.patch(CountingEncoder, 'encoded', 0)
+        for i in range(3):
+            request = DummyRequest([b'app.css'])
+            request.responseHeaders.setRawHeaders(
+                b'content-encoding', [b'reversed'])
+            request._encoder = CountingEncoder()
+            child = resource.getChildForRequest(self.root, request)
+            self.successResultOf(_render(child, request))
+            self.assertEqual(b'nialp', b''.join(request.written))
+            self.assertIs(None, request._encoder)
+        self.assertEqual(1, CountingEncoder.encoded)
+
+
+    def test_gzipEncodedKept(self):
+        """
+        The encoded contents kept by L{static.FileCache} for
+        L{server.GzipEncoderFactory} are the gzipped contents of the file.
+        """
+        self.root.precompressed = ()
+        self.root.cache = static.FileCache(reactor=Clock())
+        request = DummyRequest([b'app.css'])
+        request.requestHeaders.setRawHeaders(b'accept-encoding', [b'gzip'])
+        request.startedWriting = False
+        request._encoder = server.GzipEncoderFactory().encoderForRequest(
+            request)
+        child = resource.getChildForRequest(self.root, request)
+        self.successResultOf(_render(child, request))
+        compressed = b''.join(request.written)
+        self.assertEqual(
+            b'plain', gzip.GzipFile(fileobj=StringIO(compressed)).read())
+        self.assertEqual(
+            [intToBytes(len(compressed))],
+            request.responseHeaders.getRawHeaders(b'content-length'))
+
+
+
 class StaticProducerTests(TestCase):
     """
     Tests for the abstract L{StaticProducer}.
@@ -789,6 +1204,273 @@ class StaticProducerTests(TestCase):
 
 
 
+class FileWritingTransport(object):
+    """
+    A transport which can write parts of files itself, and records the parts
+    it is asked to write.
+
+    @ivar parts: A C{list} to which the C{(offset, count)} tuples of the parts
+        of files passed to C{writeFile} are appended.
+    """
+    fileWrites = True
+
+    def __init__(self, parts):
+        self.parts = parts
+
+
+    def writeFile(self, fileno, offset, count):
+        self.parts.append((offset, count))
+
+
+
+class FileWritingStringTransport(StringTransport):
+    """
+    A L{StringTransport} which can write parts of files itself, like
+    L{FileWritingTransport}.
+    """
+    fileWrites = True
+
+    def __init__(self, parts):
+        StringTransport.__init__(self)
+        self.parts = parts
+
+
+    def writeFile(self, fileno, offset, count):
+        self.parts.append((offset, count))
+
+
+
+class FileWritingRequest(DummyRequest):
+    """
+    A L{DummyRequest} with a L{FileWritingTransport}.
+
+    @ivar parts: A C{list} of everything written to the request, and the
+        C{(offset, count)} tuples of the parts of files written by its
+        transport, in order.
+    """
+    chunked = False
+
+    def __init__(self, postpath):
+        DummyRequest.__init__(self, postpath)
+        self.parts = []
+        self.transport = FileWritingTransport(self.parts)
+        self.sentLength = 0
+
+
+    def write(self, data):
+        DummyRequest.write(self, data)
+        if data:
+            self.parts.append(data)
+
+
+
+class FileWritesTests(TestCase):
+    """
+    Tests for the producers' use of transports which can write parts of
+    files themselves.
+    """
+
+    def makeFile(self, content):
+        """
+        Make a file with the given content.
+
+        @param content: The content of the file.
+        @type content: L{bytes}
+
+        @return: The file, opened for reading.
+        """
+        path = FilePath(self.mktemp())
+        path.setContent(content)
+        fileObject = path.open()
+        self.addCleanup(fileObject.close)
+        return fileObject
+
+
+    def test_noRange(self):
+        """
+        L{NoRangeStaticProducer} has the transport write all of the file from
+        its current position, and then finishes the request.
+        """
+        request = FileWritingRequest([])
+        fileObject = self.makeFile(b'abcdef')
+        fileObject.seek(1)
+        producer = static.NoRangeStaticProducer(request, fileObject)
+        producer.start()
+        self.assertEqual([(1, 5)], request.parts)
+        self.assertEqual(5, request.sentLength)
+        self.assertEqual(1, request.finished)
+        self.assertTrue(fileObject.closed)
+
+
+    def test_singleRange(self):
+        """
+        L{SingleRangeStaticProducer} has the transport write the range of the
+        file.
+        """
+        request = FileWritingRequest([])
+        fileObject = self.makeFile(b'abcdef')
+        producer = static.SingleRangeStaticProducer(request, fileObject, 2, 3)
+        producer.start()
+        self.assertEqual([(2, 3)], request.parts)
+        self.assertEqual(1, request.finished)
+
+
+    def test_multipleRange(self):
+        """
+        L{MultipleRangeStaticProducer} writes the boundary before each range,
+        and has the transport write the ranges of the file.
+        """
+        request = FileWritingRequest([])
+        fileObject = self.makeFile(b'abcdef')
+        producer = static.MultipleRangeStaticProducer(
+            request, fileObject, [(b'1', 0, 2), (b'2', 3, 1), (b'3', 0, 0)])
+        producer.start()
+        self.assertEqual([b'1', (0, 2), b'2', (3, 1), b'3'], request.parts)
+        self.assertEqual(3, request.sentLength)
+        self.assertEqual(1, request.finished)
+
+
+    def test_encoded(self):
+        """
+        If the response is being encoded, the file is read and written to the
+        request instead.
+        """
+        request = FileWritingRequest([])
+        request._encoder = object()
+        producer = static.NoRangeStaticProducer(
+            request, self.makeFile(b'abcdef'))
+        producer.start()
+        self.assertEqual([b'abcdef'], request.parts)
+
+
+    def test_chunked(self):
+        """
+        If the response is chunked, the file is read and written to the
+        request instead.
+        """
+        request = FileWritingRequest([])
+        request.chunked = True
+        producer = static.NoRangeStaticProducer(
+            request, self.makeFile(b'abcdef'))
+        producer.start()
+        self.assertEqual([b'abcdef'], request.parts)
+
+
+    def test_noFileno(self):
+        """
+        If the file has no file descriptor, it is read and written to the
+        request instead.
+        """
+        request = FileWritingRequest([])
+        producer = static.NoRangeStaticProducer(request, StringIO(b'abcdef'))
+        producer.start()
+        self.assertEqual([b'abcdef'], request.parts)
+
+
+    def test_noFileWrites(self):
+        """
+        If the transport cannot write parts of files, the file is read and
+        written to the request instead.
+        """
+        request = FileWritingRequest([])
+        request.transport.fileWrites = False
+        producer = static.NoRangeStaticProducer(
+            request, self.makeFile(b'abcdef'))
+        producer.start()
+        self.assertEqual([b'abcdef'], request.parts)
+
+
+    def test_protocolWrapper(self):
+        """
+        If the transport is a L{ProtocolWrapper}, which forwards C{fileWrites}
+        from the transport it wraps, the file is read and written to the
+        request, so that the wrapper sees it.
+        """
+        request = FileWritingRequest([])
+        wrapper = ProtocolWrapper(WrappingFactory(Factory()), Protocol())
+        wrapper.makeConnection(request.transport)
+        self.assertTrue(wrapper.fileWrites)
+        request.transport = wrapper
+        producer = static.NoRangeStaticProducer(
+            request, self.makeFile(b'abcdef'))
+        producer.start()
+        self.assertEqual([b'abcdef'], request.parts)
+
+
+    def test_tlsMemoryBIO(self):
+        """
+        If the transport is a L{TLSMemoryBIOProtocol}, as used by
+        C{listenSSL} and I{ssl:} endpoints, the file is read and written to
+        the request, so that it is encrypted.
+        """
+        parts = []
+        transport = FileWritingStringTransport(parts)
+        tlsFactory = TLSMemoryBIOFactory(
+            ssl.optionsForClientTLS(u'example.com'), True, Factory.forProtocol(
+                Protocol))
+        tlsProtocol = tlsFactory.buildProtocol(None)
+        tlsProtocol.makeConnection(transport)
+        self.assertTrue(tlsProtocol.fileWrites)
+        request = FileWritingRequest([])
+        request.transport = tlsProtocol
+        producer = static.NoRangeStaticProducer(
+            request, self.makeFile(b'abcdef'))
+        producer.start()
+        self.assertEqual([b'abcdef'], request.parts)
+        self.assertEqual([], parts)
+
+    if ssl is None:
+        test_tlsMemoryBIO.skip = "OpenSSL not present"
+
+
+    def test_gzipFile(self):
+        """
+        If the file is not a plain file, such as a L{gzip.GzipFile} which has
+        the file descriptor of the compressed file, it is read and written to
+        the request instead.
+        """
+        path = FilePath(self.mktemp())
+        with gzip.GzipFile(path.path, 'wb') as compressed:
+            compressed.write(b'abcdef')
+        fileObject = gzip.GzipFile(path.path, 'rb')
+        self.addCleanup(fileObject.close)
+        request = FileWritingRequest([])
+        producer = static.NoRangeStaticProducer(request, fileObject)
+        producer.start()
+        self.assertEqual([b'abcdef'], request.parts)
+
+
+    def test_openForReading(self):
+        """
+        L{File.render_GET} has the transport write the file if the file was
+        opened by L{File.openForReading}.
+        """
+        path = FilePath(self.mktemp())
+        path.setContent(b'abcdef')
+        request = FileWritingRequest([])
+        static.File(path.path).render_GET(request)
+        self.assertEqual([(0, 6)], request.parts)
+
+
+    def test_openForReadingOverridden(self):
+        """
+        If a subclass of L{File} overrides L{File.openForReading}, for
+        example to decrypt files on the fly, L{File.render_GET} has the file
+        read and written to the request.
+        """
+        class OtherFile(static.File):
+            def openForReading(self):
+                return FilePath(self.path).siblingExtension('.other').open()
+
+        path = FilePath(self.mktemp())
+        path.setContent(b'abcdef')
+        path.siblingExtension('.other').setContent(b'ghijkl')
+        request = FileWritingRequest([])
+        OtherFile(path.path).render_GET(request)
+        self.assertEqual([b'ghijkl'], request.parts)
+
+
+
 class NoRangeStaticProducerTests(TestCase):
     """
     Tests for L{NoRangeStaticProducer}.
@@ -8,7 +8,9 @@ Tests for L{twisted.web.tap}.
 from __future__ import absolute_import, division
 
 import os
+import signal
 import stat
+import sys
 
 from twisted.python.reflect import requireModule
 from twisted.python.usage import UsageError
@@ -18,13 +20,15 @@ from twisted.internet import reactor, endpoints
 from twisted.python.threadpool import ThreadPool
 from twisted.trial.unittest import TestCase
 from twisted.application import strports
+from twisted.application.twist._options import TwistOptions
 from twisted.python.compat import _PY3
 
 from twisted.web.server import Site
 from twisted.web.static import Data, File
-from twisted.web.tap import Options, makeService
+from twisted.web.tap import Options, makeService, _WorkerMonitor
 from twisted.web.script import PythonScript
 from twisted.web.wsgi import WSGIResource
+from twisted.runner.test.test_procmon import DummyProcessReactor
 
 if not _PY3:
     # FIXME: https://twistedmatrix.com/trac/ticket/8009
@@ -270,3 +274,189 @@ class ServiceTests(TestCase):
 
     if requireModule('OpenSSL.SSL') is None:
         test_HTTPSAcceptedOnAvailableSSL.skip = 'SSL module is not available.'
+
+
+
+class WorkersTests(TestCase):
+    """
+    Tests for the I{--workers} option.
+    """
+    def test_reusePort(self):
+        """
+        I{--workers} makes the server port set C{SO_REUSEPORT}.
+        """
+        options = Options()
+        options.parseOptions(['--workers', '2', '--port', 'tcp:8080'])
+        self.assertEqual(2, options['workers'])
+        self.assertEqual('tcp:8080:reusePort=1', options['port'])
+
+
+    def test_defaultPortReused(self):
+        """
+        If no port is given, I{--workers} makes the default port set
+        C{SO_REUSEPORT}.
+        """
+        options = Options()
+        options.parseOptions(['--workers=2'])
+        self.assertEqual('tcp:8080:reusePort=1', options['port'])
+
+
+    def test_notEnoughWorkers(self):
+        """
+        I{--workers} must be given at least 1.
+        """
+        options = Options()
+        exc = self.assertRaises(
+            UsageError, options.parseOptions, ['--workers', '0'])
+        self.assertEqual("--workers must be at least 1.", str(exc))
+
+
+    def test_notTCP(self):
+        """
+        I{--workers} can only be used with a TCP I{--port}.
+        """
+        options = Options()
+        exc = self.assertRaises(
+            UsageError, options.parseOptions,
+            ['--workers', '2', '--port', 'unix:/tmp/web.sock'])
+        self.assertEqual(
+            "--workers can only be used with a TCP --port.", str(exc))
+
+
+    def test_workerArguments(self):
+        """
+        L{Options.workerArguments} returns the arguments the options were
+        parsed from, without I{--workers}, followed by a I{--port} which sets
+        C{SO_REUSEPORT}.
+        """
+        options = Options()
+        options.parseOptions(
+            ['--workers', '3', '--path', '/srv', '--workers=3',
+             '--port', 'tcp:80'])
+        self.assertEqual(
+            ['--path', '/srv', '--port', 'tcp:80',
+             '--port', 'tcp:80:reusePort=1'],
+            options.workerArguments())
+
+
+    def test_makeService(self):
+        """
+        With I{--workers}, L{makeService} returns a service which monitors
+        that many processes, each running C{twist web} with the worker
+        arguments.
+        """
+        options = Options()
+        options.parseOptions(['--workers', '2', '--port', 'tcp:8080'])
+        monitor = makeService(options)
+        self.assertIsInstance(monitor, _WorkerMonitor)
+        self.assertEqual(
+            ['web-worker-0', 'web-worker-1'], sorted(monitor.processes))
+        args = monitor.processes['web-worker-0'][0]
+        self.assertEqual(sys.executable, args[0])
+        self.assertEqual(
+            ['web', '--port', 'tcp:8080', '--port', 'tcp:8080:reusePort=1'],
+            args[3:])
+
+
+    def test_makeServiceTwistOptions(self):
+        """
+        The reactor, log level, log file and log format given to C{twist} are
+        given to each worker before the I{web} plugin name.
+        """
+        logPath = self.mktemp()
+        parent = TwistOptions()
+        parent.opt_reactor('epollet')
+        parent.opt_log_level('debug')
+        parent.opt_log_file(logPath)
+        self.addCleanup(parent['logFile'].close)
+        parent.opt_log_format('text')
+        options = Options()
+        options.parent = parent
+        options.parseOptions(['--workers', '2', '--port', 'tcp:8080'])
+        monitor = makeService(options)
+        args = monitor.processes['web-worker-0'][0]
+        self.assertEqual(
+            ['--reactor=epollet', '--log-level=debug',
+             '--log-file=' + logPath, '--log-format=text',
+             'web', '--port', 'tcp:8080', '--port', 'tcp:8080:reusePort=1'],
+            args[3:])
+
+
+    def test_makeServiceTwistStandardStreams(self):
+        """
+        Workers log to standard error if C{twist} was told to, and to
+        standard output, the default, otherwise.
+        """
+        parent = TwistOptions()
+        parent.opt_log_file('+')
+        options = Options()
+        options.parent = parent
+        options.parseOptions(['--workers', '1', '--port', 'tcp:8080'])
+        args = makeService(options).processes['web-worker-0'][0]
+        self.assertIn('--log-file=+', args)
+
+        parent.opt_log_file('-')
+        args = makeService(options).processes['web-worker-0'][0]
+        self.assertEqual(
+            [], [arg for arg in args if arg.startswith('--log-file')])
+
+
+
+class ThreadedDummyProcessReactor(DummyProcessReactor):
+    """
+    A L{DummyProcessReactor} which also supports C{callFromThread}.
+    """
+    def callFromThread(self, f, *args, **kwargs):
+        """
+        Call C{f} on the next iteration, as if from another thread.
+        """
+        self.callLater(0, f, *args, **kwargs)
+
+
+
+class WorkerMonitorTests(TestCase):
+    """
+    Tests for L{_WorkerMonitor}.
+    """
+    if getattr(signal, 'SIGHUP', None) is None:
+        skip = "SIGHUP is not available"
+
+    def setUp(self):
+        self.reactor = ThreadedDummyProcessReactor()
+        self.monitor = _WorkerMonitor(reactor=self.reactor)
+        self.monitor.addProcess('web-worker-0', ['twist'])
+        self.monitor.addProcess('web-worker-1', ['twist'])
+        self.handler = signal.getsignal(signal.SIGHUP)
+        self.addCleanup(signal.signal, signal.SIGHUP, self.handler)
+
+
+    def test_stopWaitsForWorkers(self):
+        """
+        The L{Deferred} returned by L{_WorkerMonitor.stopService} fires once
+        every worker has exited, and the workers are not restarted.
+        """
+        self.monitor.startService()
+        self.assertEqual(2, len(self.reactor.spawnedProcesses))
+        stopped = self.monitor.stopService()
+        self.assertNoResult(stopped)
+        self.reactor.advance(self.monitor.killTime - 1)
+        self.assertIsNone(self.successResultOf(stopped))
+        self.assertEqual(2, len(self.reactor.spawnedProcesses))
+        self.assertEqual({}, self.monitor.protocols)
+
+
+    def test_sighup(self):
+        """
+        While it is running, L{_WorkerMonitor} restarts every worker when
+        C{SIGHUP} is received, and it restores the previous handler when it
+        stops.
+        """
+        self.monitor.startService()
+        handler = signal.getsignal(signal.SIGHUP)
+        self.assertNotEqual(self.handler, handler)
+        handler(signal.SIGHUP, None)
+        self.reactor.advance(0)
+        self.reactor.advance(1)
+        self.assertEqual(4, len(self.reactor.spawnedProcesses))
+        self.monitor.stopService()
+        self.assertEqual(self.handler, signal.getsignal(signal.SIGHUP))
@@ -256,6 +256,23 @@ class XMLLoaderTestsMixin(object):
     test_loadTwice.suppress = [_xmlFileSuppress]
 
 
+    def test_compiledOnSecondLoad(self):
+        """
+        The document is compiled the second time it is loaded for rendering,
+        and the compiled document is used from then on, while C{load} still
+        returns the parsed document.
+        """
+        loader = self.loaderFactory()
+        document = loader.load()
+        self.assertEqual(loader._loadCompiled(), document)
+        compiled = loader._loadCompiled()
+        self.assertEqual([part.data for part in compiled],
+                         [b'<p>Hello, world.</p>'])
+        self.assertIs(loader._loadCompiled(), compiled)
+        self.assertIs(loader.load(), document)
+    test_compiledOnSecondLoad.suppress = [_xmlFileSuppress]
+
+
 
 class XMLStringLoaderTests(TestCase, XMLLoaderTestsMixin):
     """
@@ -632,6 +649,64 @@ class TagLoaderTests(FlattenTestCase):
         self.assertFlattensImmediately(e, b'<i>test</i>')
 
 
+    def test_tagChangesRendered(self):
+        """
+        Changes made to the tag of a L{TagLoader} are rendered, however many
+        times it has been rendered before.
+        """
+        tag = tags.div(tags.i('&'))
+        loader = TagLoader(tag)
+        for i in range(3):
+            self.assertFlattensImmediately(
+                Element(loader), b'<div><i>&amp;</i></div>')
+        tag.children.append(tags.b('more'))
+        self.assertFlattensImmediately(
+            Element(loader), b'<div><i>&amp;</i><b>more</b></div>')
+
+
+
+class CompilingLoaderTests(FlattenTestCase):
+    """
+    Tests for the compilation of the documents of L{XMLString} and
+    L{XMLFile}.
+    """
+
+    def test_flattenCompiled(self):
+        """
+        An L{Element} using an L{XMLString} flattens the same way each time,
+        once the document has been compiled.
+        """
+        class RenderfulElement(Element):
+            @renderer
+            def count(self, request, tag):
+                return tag(str(len(counts)))
+        counts = []
+        loader = XMLString(
+            '<div xmlns:t='
+            '"http://twistedmatrix.com/ns/twisted.web.template/0.1">'
+            '<p t:render="count" /><i>&amp;</i></div>')
+        for i in range(3):
+            counts.append(i)
+            self.assertFlattensImmediately(
+                RenderfulElement(loader),
+                ('<div><p>%d</p><i>&amp;</i></div>' % (i + 1,)).encode(
+                    'ascii'))
+        self.assertIsNot(loader._compiled, None)
+
+
+    def test_differentDocumentNotCompiled(self):
+        """
+        A document is not compiled if it is different each time it is loaded.
+        """
+        class FreshLoader(XMLString):
+            def load(self):
+                return [tags.i('test')]
+        loader = FreshLoader('<i>test</i>')
+        for i in range(3):
+            self.assertFlattensImmediately(Element(loader), b'<i>test</i>')
+        self.assertIs(loader._compiled, None)
+
+
 
 class TestElement(Element):
     """
@@ -816,3 +891,45 @@ class RenderElementTests(TestCase):
         renderElement(self.request, element, doctype=None)
 
         return d
+
+
+    def test_smallElementNoProducer(self):
+        """
+        L{renderElement} renders a small element at once, without
+        registering a producer with the request.
+        """
+        self.request.registerProducer = lambda producer, streaming: self.fail(
+            "No producer should be registered.")
+
+        renderElement(self.request, TestElement())
+
+        self.assertEqual(
+            b"".join(self.request.written),
+            b"<!DOCTYPE html>\n<p>Hello, world.</p>")
+        self.assertTrue(self.request.finished)
+
+
+    def test_stopped(self):
+        """
+        L{renderElement} registers a streaming producer with the request
+        while rendering a large element, and if it is stopped because the
+        request's connection is lost, rendering is abandoned without
+        finishing the request or logging an error.
+        """
+        producers = []
+        self.request.registerProducer = (
+            lambda producer, streaming: producers.append((producer, streaming)))
+        self.request.unregisterProducer = lambda: None
+        element = Element(TagLoader(
+            tags.div([tags.p(str(i)) for i in range(1000)])))
+
+        renderElement(self.request, element)
+
+        [(producer, streaming)] = producers
+        self.assertTrue(streaming)
+        written = b"".join(self.request.written)
+        self.assertTrue(written.startswith(b"<!DOCTYPE html>\n<div><p>0</p>"))
+        producer.stopProducing()
+        self.assertEqual(b"".join(self.request.written), written)
+        self.assertFalse(self.request.finished)
+        self.assertEqual(self.flushLoggedErrors(), [])
@@ -554,6 +554,25 @@ class RequestTests(unittest.TestCase):
         self.assertEqual(request.prePathURL(), b'https://foo.com:81/foo/bar')
 
 
+    def test_dateFromSite(self):
+        """
+        L{server.Request.process} sets the I{Date} response header to the
+        datetime string cached by its site, when it has one.
+        """
+        clock = Clock()
+        clock.advance(1234567)
+        d = DummyChannel()
+        d.site = server.Site(resource.Resource(), reactor=clock)
+        d.site.startFactory()
+        self.addCleanup(d.site.stopFactory)
+        request = server.Request(d, 1)
+        request.gotLength(0)
+        request.requestReceived(b'GET', b'/', b'HTTP/1.0')
+        self.assertEqual(
+            [http.datetimeToString(1234567)],
+            request.responseHeaders.getRawHeaders(b'date'))
+
+
     def test_prePathURLQuoting(self):
         """
         L{Request.prePathURL} quotes special characters in the URL segments to
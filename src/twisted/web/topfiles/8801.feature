@@ -0,0 +1 @@
+twist web --workers=N now runs N copies of the web server, each in its own process, all listening on the same TCP port.
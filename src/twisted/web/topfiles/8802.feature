@@ -0,0 +1 @@
+twisted.web.static.File now has plain TCP connections send the files it serves with sendfile(2), where available, rather than reading them into memory.
@@ -0,0 +1 @@
+twisted.web.client.HTTPConnectionPool now speaks HTTP/2 to https servers which select it with ALPN when its http2 attribute is set, sending every request to such a server over one multiplexed connection.
@@ -0,0 +1 @@
+twisted.web.client.HTTPConnectionPool now has maxConnectionsPerHost, to limit the number of connections to each host, pipelineDepth, to pipeline idempotent requests once that limit is reached, and statistics(), which reports how its connections are used.